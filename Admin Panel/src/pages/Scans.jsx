@@ -90,7 +90,7 @@ const ScansPage = () => {
                         {/* Image */}
                         <div className="relative h-48 bg-gradient-to-br from-gray-100 to-gray-200 overflow-hidden">
                             <img
-                                src={scan.image_path?.startsWith('http') ? scan.image_path : `http://localhost:8000/static/${scan.image_path?.split('/').pop()}`}
+                                src={scan.image_path?.startsWith('http') ? scan.image_path : `http://localhost:8000/static/${scan.image_path?.split('/').pop()}?w=512&fmt=webp`}
                                 alt={scan.food_name}
                                 className="w-full h-full object-cover group-hover:scale-110 transition-transform duration-300"
                                 onError={(e) => {
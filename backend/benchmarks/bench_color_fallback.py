@@ -0,0 +1,74 @@
+"""
+Benchmark the color-fallback classifier against the previous implementation.
+
+The previous version reopened the stored file, built a list of 10,000 pixel
+tuples and averaged them in Python. The current one classifies the analysis
+thumbnail that the scan pipeline already decodes for the perceptual hash, so
+the fallback itself does no I/O or decoding. The end-to-end figure includes
+that shared thumbnail decode for comparison.
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_color_fallback
+"""
+import io
+import os
+import random
+import tempfile
+import time
+
+from PIL import Image
+
+from backend.benchmarks.bench_compress import make_photo
+from backend.services.color_classifier import analyze_image_colors
+from backend.services.image_processing import compress_image, decode_thumbnail
+
+ROUNDS = 50
+
+def legacy_analyze_image_colors(image_path: str) -> str:
+    """The pre-vectorization implementation, kept here as the comparison baseline"""
+    try:
+        img = Image.open(image_path)
+        img = img.resize((100, 100))
+        pixels = list(img.getdata())
+        avg_r = sum(p[0] for p in pixels) / len(pixels)
+        avg_g = sum(p[1] for p in pixels) / len(pixels)
+        avg_b = sum(p[2] for p in pixels) / len(pixels)
+        if avg_r > 150 and avg_g < 100:
+            return random.choice(['Pizza', 'Burger', 'Pasta with Tomato Sauce'])
+        elif avg_g > avg_r and avg_g > avg_b:
+            return random.choice(['Salad', 'Vegetables', 'Green Smoothie'])
+        elif avg_r > 200 and avg_g > 150 and avg_b < 100:
+            return random.choice(['Rice', 'Pasta', 'Chicken'])
+        elif avg_r > 100 and avg_g > 80 and avg_b > 60:
+            return random.choice(['Chicken', 'Beef', 'Sandwich'])
+        else:
+            return random.choice(['Mixed Meal', 'Healthy Bowl', 'Lunch Plate'])
+    except Exception:
+        return 'Delicious Food'
+
+def bench(func, arg):
+    start = time.perf_counter()
+    outputs = {func(arg) for _ in range(ROUNDS)}
+    return (time.perf_counter() - start) / ROUNDS, outputs
+
+def main():
+    # A stored scan image: what the fallback actually sees in production
+    content = compress_image(make_photo(4, 0))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'scan.jpg')
+        with open(path, 'wb') as f:
+            f.write(content)
+        legacy_time, legacy_outputs = bench(legacy_analyze_image_colors, path)
+
+    thumbnail = decode_thumbnail(content)
+    new_time, new_outputs = bench(analyze_image_colors, thumbnail)
+    e2e_time, _ = bench(lambda data: analyze_image_colors(decode_thumbnail(data)), content)
+    print(f"image: {Image.open(io.BytesIO(content)).size}, {len(content) / 1024:.0f} KB")
+    print(f"legacy:            {legacy_time * 1000:.3f} ms/image, "
+          f"distinct outputs over {ROUNDS} runs: {len(legacy_outputs)}")
+    print(f"vectorized:        {new_time * 1000:.3f} ms/image, "
+          f"distinct outputs over {ROUNDS} runs: {len(new_outputs)}  ({legacy_time / new_time:.0f}x)")
+    print(f"incl. thumbnail:   {e2e_time * 1000:.3f} ms/image  ({legacy_time / e2e_time:.1f}x)")
+
+if __name__ == "__main__":
+    main()
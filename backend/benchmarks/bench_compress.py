@@ -0,0 +1,92 @@
+"""
+Benchmark compress_image against the previous quality-stepping loop.
+
+Generates a corpus of synthetic 1-12 MP photos (smooth gradients plus
+sensor-like noise, saved as camera-quality JPEGs) and reports per-image encode
+time and output size for both implementations at each byte target.
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_compress
+"""
+import io
+import time
+import statistics
+
+import numpy as np
+from PIL import Image, ImageFilter
+
+from backend.services.image_processing import compress_image
+
+MEGAPIXELS = [1, 2, 4, 8, 12]
+# 500 KB is the production budget; the tighter target exercises the quality search
+TARGETS_KB = [500, 60]
+REPEATS = 3
+
+def legacy_compress_image(file_content: bytes, max_size_kb: int = 500) -> bytes:
+    """The pre-engine implementation, kept here as the comparison baseline"""
+    image = Image.open(io.BytesIO(file_content))
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGB')
+    max_dimension = 1024
+    if max(image.size) > max_dimension:
+        ratio = max_dimension / max(image.size)
+        new_size = tuple(int(dim * ratio) for dim in image.size)
+        image = image.resize(new_size, Image.Resampling.LANCZOS)
+    output = io.BytesIO()
+    quality = 85
+    image.save(output, format='JPEG', quality=quality, optimize=True)
+    while output.tell() > max_size_kb * 1024 and quality > 50:
+        output = io.BytesIO()
+        quality -= 10
+        image.save(output, format='JPEG', quality=quality, optimize=True)
+    return output.getvalue()
+
+def make_photo(megapixels: int, seed: int) -> bytes:
+    rng = np.random.default_rng(seed)
+    width = int((megapixels * 1_000_000 * 4 / 3) ** 0.5)
+    height = int(width * 3 / 4)
+    x = np.linspace(0, 1, width, dtype=np.float32)[None, :]
+    y = np.linspace(0, 1, height, dtype=np.float32)[:, None]
+    channels = [
+        120 + 90 * np.sin(6 * x + 3 * y + seed),
+        100 + 80 * np.cos(4 * y - 2 * x),
+        80 + 60 * np.sin(5 * (x + y)),
+    ]
+    pixels = np.stack(channels, axis=2) + rng.normal(0, 12, (height, width, 3))
+    image = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+    image = image.filter(ImageFilter.GaussianBlur(1))
+    output = io.BytesIO()
+    image.save(output, format='JPEG', quality=92)
+    return output.getvalue()
+
+def time_it(func, content: bytes, max_size_kb: int):
+    timings = []
+    result = b''
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = func(content, max_size_kb)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), len(result)
+
+def main():
+    corpus = [(megapixels, make_photo(megapixels, seed)) for seed, megapixels in enumerate(MEGAPIXELS)]
+    print(f"{'target':>6} {'MP':>4} {'input KB':>9} | {'legacy ms':>10} {'legacy KB':>10} | "
+          f"{'engine ms':>10} {'engine KB':>10} | {'speedup':>7}")
+    total_legacy = total_engine = 0.0
+    for target_kb in TARGETS_KB:
+        for megapixels, content in corpus:
+            legacy_time, legacy_size = time_it(legacy_compress_image, content, target_kb)
+            engine_time, engine_size = time_it(compress_image, content, target_kb)
+            total_legacy += legacy_time
+            total_engine += engine_time
+            print(
+                f"{target_kb:>6} {megapixels:>4} {len(content) / 1024:>9.0f} | "
+                f"{legacy_time * 1000:>10.1f} {legacy_size / 1024:>10.1f} | "
+                f"{engine_time * 1000:>10.1f} {engine_size / 1024:>10.1f} | "
+                f"{legacy_time / engine_time:>6.1f}x"
+            )
+    print(f"total: legacy {total_legacy * 1000:.1f} ms, engine {total_engine * 1000:.1f} ms "
+          f"({total_legacy / total_engine:.1f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Benchmark fuzzy food-name resolution against a 100k-food catalog.
+
+Builds a synthetic catalog of 100,000 distinct dish names and resolves
+Clarifai-style concept names against it, reporting index build time and
+per-lookup latency for first-time (unmemoized) and repeated queries.
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_food_resolver
+"""
+import random
+import statistics
+import time
+
+from backend.services.food_resolver import TrigramIndex
+
+STYLES = [
+    'grilled', 'fried', 'baked', 'roasted', 'steamed', 'smoked', 'spicy', 'sweet', 'sour', 'creamy',
+    'crispy', 'braised', 'stuffed', 'glazed', 'pickled', 'poached', 'seared', 'stewed', 'toasted', 'whipped',
+    'marinated', 'barbecue', 'garlic', 'lemon', 'honey', 'herb', 'pepper', 'cheesy', 'tangy', 'savory',
+    'homemade', 'classic', 'rustic', 'mini', 'jumbo', 'vegan', 'organic', 'wild', 'fresh', 'frozen',
+]
+FOODS = [
+    'pizza', 'burger', 'salad', 'chicken', 'beef', 'pork', 'lamb', 'salmon', 'tuna', 'shrimp',
+    'rice', 'noodles', 'pasta', 'spaghetti', 'lasagna', 'risotto', 'tacos', 'burrito', 'quesadilla', 'sushi',
+    'ramen', 'curry', 'soup', 'stew', 'sandwich', 'wrap', 'omelette', 'pancakes', 'waffles', 'toast',
+    'potatoes', 'fries', 'dumplings', 'tofu', 'lentils', 'beans', 'broccoli', 'spinach', 'mushrooms', 'eggplant',
+    'cake', 'pie', 'cookies', 'brownies', 'muffins', 'yogurt', 'smoothie', 'oatmeal', 'granola', 'bagel',
+    'kebab', 'falafel', 'hummus', 'paella', 'gnocchi', 'ravioli', 'casserole', 'meatballs', 'sausage', 'steak',
+]
+SERVINGS = [
+    'bowl', 'plate', 'platter', 'skewers', 'bites', 'slices', 'rolls', 'cups', 'sticks', 'wedges',
+    'salad', 'sandwich', 'soup', 'pie', 'bake', 'melt', 'hash', 'fry', 'tart', 'stack',
+    'with rice', 'with salad', 'with fries', 'with sauce', 'with beans', 'with greens', 'with bread',
+    'with gravy', 'with salsa', 'with dip', 'deluxe', 'special', 'combo', 'supreme', 'feast', 'medley',
+    'style', 'fusion', 'delight', 'classic', 'lite', 'royale',
+]
+QUERIES = [
+    'Pepperoni Pizza', 'Grilled Chicken Breast', 'Spaghetti Carbonara', 'Beef Burger', 'Caesar Salad',
+    'Fried Rice', 'Chicken Curry', 'Salmon Sushi Roll', 'Chocolate Cake', 'Vegetable Soup',
+    'Shrimp Tacos', 'Mushroom Risotto', 'Pork Dumplings', 'Greek Yogurt', 'Banana Smoothie',
+]
+
+def make_catalog(size: int, seed: int = 0):
+    rng = random.Random(seed)
+    names = set()
+    while len(names) < size:
+        names.add(f"{rng.choice(STYLES)} {rng.choice(FOODS)} {rng.choice(SERVINGS)}")
+    return sorted(names)
+
+def main():
+    names = make_catalog(100_000)
+    start = time.perf_counter()
+    index = TrigramIndex(names)
+    print(f"catalog: {len(index)} foods, index built in {time.perf_counter() - start:.2f} s")
+
+    cold, warm = [], []
+    for query in QUERIES:
+        start = time.perf_counter()
+        match = index.resolve(query)
+        cold.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        index.resolve(query)
+        warm.append(time.perf_counter() - start)
+        print(f"  {query:24} -> {match[0] if match else None} ({match[1] if match else 0:.2f})")
+
+    print(f"first lookup:    mean {statistics.mean(cold) * 1000:.3f} ms, max {max(cold) * 1000:.3f} ms")
+    print(f"repeated lookup: mean {statistics.mean(warm) * 1e6:.2f} us")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Benchmark the offline k-NN recognition backend.
+
+Reports single-core throughput of LocalKnnEngine on analysis thumbnails (what
+the scan pipeline hands to recognition backends), both one image at a time
+and in batches, against the memory-mapped synthetic reference set.
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_local_recognition
+"""
+import tempfile
+import time
+
+from backend.benchmarks.bench_compress import make_photo
+from backend.services.image_processing import prepare_image
+from backend.services.local_recognition import LocalKnnEngine
+
+IMAGES = 32
+ROUNDS = 20
+BATCH_SIZES = [1, 8, 32]
+
+def main():
+    thumbnails = [prepare_image(make_photo(1, seed)).thumbnail for seed in range(IMAGES)]
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        engine = LocalKnnEngine.load(tmp)
+        engine.recognize(thumbnails[:1])
+        print(f"reference set: {engine.features.shape[0]} images x {engine.features.shape[1]} features, "
+              f"built and mapped in {(time.perf_counter() - start) * 1000:.0f} ms")
+        start = time.perf_counter()
+        LocalKnnEngine.load(tmp).recognize(thumbnails[:1])
+        print(f"memory-mapped load of the saved set: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        for batch_size in BATCH_SIZES:
+            start = time.perf_counter()
+            for _ in range(ROUNDS):
+                for offset in range(0, IMAGES, batch_size):
+                    engine.recognize(thumbnails[offset:offset + batch_size])
+            elapsed = time.perf_counter() - start
+            per_second = IMAGES * ROUNDS / elapsed
+            print(f"batch {batch_size:>2}: {per_second:8.0f} images/s per core "
+                  f"({elapsed / (IMAGES * ROUNDS) * 1e6:.0f} us/image)")
+
+if __name__ == "__main__":
+    main()
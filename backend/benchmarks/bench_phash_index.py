@@ -0,0 +1,63 @@
+"""
+Benchmark PerceptualIndex lookups at 1M stored hashes.
+
+Fills the index with random 64-bit hashes, then times lookups for near
+duplicates (a stored hash with up to PHASH_MAX_DISTANCE bits flipped) and for
+unrelated hashes, and prints the index size and memory use.
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_phash_index
+"""
+import time
+import statistics
+
+import numpy as np
+
+from backend.services.perceptual_index import PerceptualIndex, PHASH_MAX_DISTANCE
+
+STORED = 1_000_000
+QUERIES = 5_000
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def time_lookups(index, queries):
+    timings = []
+    hits = 0
+    for query in queries:
+        start = time.perf_counter()
+        found = index.lookup(query)
+        timings.append(time.perf_counter() - start)
+        hits += found is not None
+    return timings, hits
+
+def main():
+    rng = np.random.default_rng(0)
+    hashes = rng.integers(0, 2 ** 63, size=STORED, dtype=np.int64).astype(np.uint64) * np.uint64(2) + np.uint64(1)
+    index = PerceptualIndex(capacity=STORED)
+
+    start = time.perf_counter()
+    result = {'name': 'Pizza', 'confidence': 90}
+    for value in hashes.tolist():
+        index.add(value, result)
+    print(f"inserted {len(index):,} hashes in {time.perf_counter() - start:.1f} s")
+
+    near = []
+    for value in rng.choice(hashes, size=QUERIES).tolist():
+        for bit in rng.choice(64, size=rng.integers(0, PHASH_MAX_DISTANCE + 1), replace=False).tolist():
+            value ^= 1 << bit
+        near.append(value)
+    unrelated = rng.integers(0, 2 ** 63, size=QUERIES, dtype=np.int64).tolist()
+
+    for label, queries in (('near-duplicate', near), ('unrelated', unrelated)):
+        timings, hits = time_lookups(index, queries)
+        print(f"{label:>15}: mean {statistics.mean(timings) * 1e6:7.1f} us  "
+              f"p99 {percentile(timings, 0.99) * 1e6:7.1f} us  hits {hits}/{len(queries)}")
+
+    stats = index.stats()
+    print(f"size {stats['size']:,}  memory {stats['memory_bytes'] / 2 ** 20:.1f} MiB  "
+          f"max_distance {stats['max_distance']}")
+
+if __name__ == "__main__":
+    main()
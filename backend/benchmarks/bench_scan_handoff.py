@@ -0,0 +1,108 @@
+"""
+Benchmark the compression -> storage -> recognition hand-off of one scan.
+
+The previous pipeline wrote the compressed image to uploads/<filename>, had
+recognize_food() open and read the same file back, and let the color
+fallback open and decode it a third time. The current one passes a
+PreparedImage (compressed bytes, SHA-256 and the analysis thumbnail decoded
+during compression) straight to recognition and writes the file once,
+concurrently. Both paths build the Clarifai payload and run the fallback.
+
+Syscall and byte counts come from /proc/self/io (Linux) and file opens from
+an audit hook, so they cover everything the process did, including PIL.
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_scan_handoff
+"""
+import os
+import sys
+import tempfile
+import time
+
+from backend.benchmarks.bench_color_fallback import legacy_analyze_image_colors
+from backend.benchmarks.bench_compress import make_photo
+from backend.services.ai_recognition import _build_clarifai_payload, _thumbnail_phash
+from backend.services.color_classifier import analyze_image_colors
+from backend.services.image_processing import compress_image, prepare_image
+from backend.services.storage import LocalFileStorage, content_key
+
+ROUNDS = 20
+
+_opens = 0
+
+def _audit(event, args):
+    global _opens
+    if event == 'open':
+        _opens += 1
+
+def _io_counters():
+    try:
+        with open('/proc/self/io') as f:
+            counters = dict(line.split(': ') for line in f.read().splitlines())
+        return {key: int(value) for key, value in counters.items()}
+    except OSError:
+        return {}
+
+def legacy_scan(original: bytes, upload_dir: str, filename: str):
+    """The previous hand-off, kept here as the comparison baseline"""
+    content = compress_image(original)
+    file_location = f"{upload_dir}/{filename}"
+    with open(file_location, "wb") as f:
+        f.write(content)
+    # recognize_food() read the stored file back
+    with open(file_location, 'rb') as f:
+        image_bytes = f.read()
+    _build_clarifai_payload([image_bytes])
+    # ...and the color fallback opened and decoded it again
+    return legacy_analyze_image_colors(file_location)
+
+def inmemory_scan(original: bytes, storage: LocalFileStorage):
+    prepared = prepare_image(original)
+    storage.put(content_key(prepared.sha256, 'jpg'), prepared.content)
+    _build_clarifai_payload([prepared.content])
+    _thumbnail_phash(prepared.thumbnail)
+    return analyze_image_colors(prepared.thumbnail)
+
+def measure(scan, photos, make_target):
+    targets = [make_target(i) for i in range(len(photos))]
+    before = _io_counters()
+    opens_before = _opens
+    start = time.perf_counter()
+    for photo, target in zip(photos, targets):
+        scan(photo, *target)
+    elapsed = time.perf_counter() - start
+    after = _io_counters()
+    per_scan = {key: (after[key] - before[key]) / len(photos) for key in after}
+    per_scan['opens'] = (_opens - opens_before) / len(photos)
+    return elapsed / len(photos), per_scan
+
+def main():
+    sys.addaudithook(_audit)
+    photos = [make_photo(4, seed) for seed in range(ROUNDS)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_time, legacy = measure(
+            legacy_scan, photos, lambda i: (tmp, f"photo_{i}.jpg")
+        )
+        new_time, new = measure(
+            inmemory_scan, photos, lambda i: (LocalFileStorage(os.path.join(tmp, f"store_{i}")),)
+        )
+
+    print(f"{ROUNDS} scans of 4 MP photos, per scan:")
+    print(f"{'':18}{'legacy':>12}{'in-memory':>12}")
+    print(f"{'time (ms)':18}{legacy_time * 1000:12.1f}{new_time * 1000:12.1f}")
+    print(f"{'file opens':18}{legacy['opens']:12.1f}{new['opens']:12.1f}")
+    if 'syscr' in legacy:
+        rows = [
+            ('read syscalls', 'syscr', 1),
+            ('write syscalls', 'syscw', 1),
+            ('bytes read (KB)', 'rchar', 1024),
+            ('bytes written (KB)', 'wchar', 1024),
+        ]
+        for label, key, scale in rows:
+            print(f"{label:18}{legacy[key] / scale:12.1f}{new[key] / scale:12.1f}")
+    else:
+        print("(/proc/self/io not available: syscall counts skipped)")
+
+if __name__ == "__main__":
+    main()
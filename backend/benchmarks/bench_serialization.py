@@ -0,0 +1,90 @@
+"""
+Benchmark response serialization for /api/scan/recent and /api/admin/users.
+
+Legacy path: parse each scan's stored nutrition_json with json.loads, run
+FastAPI's jsonable_encoder over the result and render it with the standard
+json encoder (JSONResponse). Current path: embed the stored nutrition_json
+as a raw fragment and render with orjson (FastJSONResponse), which the
+endpoints return directly so jsonable_encoder is skipped.
+
+Times are CPU time per response (time.process_time) for the work done after
+the rows come back from Supabase.
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_serialization
+"""
+import json
+import random
+import time
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from backend.routers.scan import _with_nutrition_data
+from backend.services.serialization import FastJSONResponse, dumps_str
+
+ROUNDS = 2000
+RECENT_LIMIT = 10
+ADMIN_USERS = 1000
+
+FOODS = ['Pizza', 'Burger', 'Salad', 'Pasta', 'Sushi', 'Chicken', 'Apple']
+
+def make_scan(scan_id: int, rng: random.Random) -> dict:
+    nutrition = {
+        'name': rng.choice(FOODS), 'confidence': rng.randint(50, 99), 'calories': rng.randint(50, 900),
+        'macros': {'protein': f"{rng.randint(1, 40)}g", 'carbs': f"{rng.randint(1, 90)}g",
+                   'fat': f"{rng.randint(1, 40)}g"},
+        'healthScore': rng.randint(10, 95),
+        'ingredients': rng.sample(['Dough', 'Tomato', 'Cheese', 'Lettuce', 'Rice', 'Fish', 'Beef',
+                                   'Olive Oil', 'Basil', 'Onion', 'Garlic', 'Pepper'], 6),
+        'coins_earned': 1, 'total_coins': rng.randint(1, 500),
+    }
+    return {'id': scan_id, 'user_id': 1, 'food_name': nutrition['name'], 'confidence': nutrition['confidence'],
+            'image_path': f"/static/ab/cd/{scan_id:064x}.jpg", 'nutrition_json': dumps_str(nutrition),
+            'created_at': f"2025-01-{1 + scan_id % 28:02d}T12:00:00.000000+00:00"}
+
+def make_user(user_id: int, rng: random.Random) -> dict:
+    return {'id': user_id, 'phone_number': f"+1555{user_id:07d}", 'name': f"User {user_id}",
+            'email': f"user{user_id}@example.com", 'profile_image': None, 'coins': rng.randint(0, 5000),
+            'created_at': '2025-01-01T00:00:00+00:00', 'updated_at': '2025-01-02T00:00:00+00:00'}
+
+def legacy_recent(rows):
+    for scan in rows:
+        if scan.get('nutrition_json'):
+            scan['nutrition_data'] = json.loads(scan['nutrition_json'])
+    return JSONResponse(jsonable_encoder(rows)).body
+
+def current_recent(rows):
+    return FastJSONResponse([_with_nutrition_data(scan) for scan in rows]).body
+
+def legacy_users(rows):
+    return JSONResponse(jsonable_encoder(rows)).body
+
+def current_users(rows):
+    return FastJSONResponse(rows).body
+
+def measure(render, make_rows, rounds=ROUNDS):
+    samples = [make_rows() for _ in range(rounds)]
+    start = time.process_time()
+    for rows in samples:
+        body = render(rows)
+    return (time.process_time() - start) / rounds, body
+
+def report(name, legacy, current, make_rows, rounds=ROUNDS):
+    legacy_cpu, legacy_body = measure(legacy, make_rows, rounds)
+    current_cpu, current_body = measure(current, make_rows, rounds)
+    assert json.loads(legacy_body) == json.loads(current_body)
+    print(f"{name}: legacy {legacy_cpu * 1e6:.1f} us, current {current_cpu * 1e6:.1f} us per response "
+          f"({legacy_cpu / current_cpu:.1f}x, {(1 - current_cpu / legacy_cpu) * 100:.0f}% CPU saved)")
+
+def main():
+    rng = random.Random(0)
+    scans = [make_scan(i, rng) for i in range(RECENT_LIMIT)]
+    users = [make_user(i, rng) for i in range(ADMIN_USERS)]
+    report(f"/api/scan/recent ({RECENT_LIMIT} scans)", legacy_recent, current_recent,
+           lambda: [dict(scan) for scan in scans])
+    report(f"/api/admin/users ({ADMIN_USERS} users)", legacy_users, current_users,
+           lambda: [dict(user) for user in users], rounds=ROUNDS // 10)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Benchmark Supabase reads from async endpoints: sync client vs async layer.
+
+A local PostgREST stand-in answers GET /rest/v1/users?id=eq.<n> after a
+fixed delay that plays the part of the database and the network round
+trip. REQUESTS lookups are issued with CONCURRENCY in flight, the way
+concurrent API calls reach one worker process:
+
+  sync, on the event loop   the same lookup on the sync supabase client,
+                            called directly from async def code (the old
+                            endpoints); each call blocks the loop, so
+                            requests run one by one
+  sync, in the threadpool   the same calls through run_io
+  async, HTTP/1.1           supabase_async.get_user_by_id on the shared
+                            keep-alive pool
+  async, HTTP/2             the same, multiplexed over HTTP/2 (what the
+                            layer negotiates with Supabase over TLS)
+
+The stand-in runs in its own process: uvicorn for HTTP/1.1 and a small h2
+server for cleartext HTTP/2. Requests/second and client CPU per request
+(time.process_time) are reported.
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_supabase_async
+"""
+import asyncio
+import multiprocessing
+import socket
+import time
+
+import h2.config
+import h2.connection
+import h2.events
+import httpx
+import orjson
+import uvicorn
+from postgrest import AsyncPostgrestClient
+
+from backend.services import supabase_async, supabase_client
+from backend.services.executors import run_io
+
+REQUESTS = 1000
+CONCURRENCY = 50
+# Simulated database and network time per PostgREST request
+LATENCY_MS = 20
+
+def user_row(path: str) -> dict:
+    user_id = int(path.split('id=eq.')[1].split('&')[0]) if 'id=eq.' in path else 1
+    return {'id': user_id, 'phone_number': f"+1555{user_id:07d}", 'name': f"User {user_id}", 'coins': 10}
+
+async def http1_stand_in(scope, receive, send):
+    """Minimal PostgREST over HTTP/1.1: one user row for any read"""
+    if scope['type'] != 'http':
+        return
+    await asyncio.sleep(LATENCY_MS / 1000)
+    row = user_row(scope['query_string'].decode())
+    single = (b'accept', b'application/vnd.pgrst.object+json') in scope['headers']
+    await send({'type': 'http.response.start', 'status': 200,
+                'headers': [(b'content-type', b'application/json')]})
+    await send({'type': 'http.response.body', 'body': orjson.dumps(row if single else [row])})
+
+class Http2StandIn(asyncio.Protocol):
+    """The same stand-in over cleartext HTTP/2 (prior knowledge)"""
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.conn = h2.connection.H2Connection(h2.config.H2Configuration(client_side=False, header_encoding='utf-8'))
+        self.conn.initiate_connection()
+        transport.write(self.conn.data_to_send())
+
+    def data_received(self, data: bytes):
+        for event in self.conn.receive_data(data):
+            if isinstance(event, h2.events.RequestReceived):
+                asyncio.get_running_loop().create_task(self.respond(event.stream_id, dict(event.headers)))
+        self.transport.write(self.conn.data_to_send())
+
+    async def respond(self, stream_id: int, headers: dict):
+        await asyncio.sleep(LATENCY_MS / 1000)
+        row = user_row(headers[':path'])
+        body = orjson.dumps(row if headers.get('accept') == 'application/vnd.pgrst.object+json' else [row])
+        self.conn.send_headers(stream_id, [(':status', '200'), ('content-type', 'application/json'),
+                                           ('content-length', str(len(body)))])
+        self.conn.send_data(stream_id, body, end_stream=True)
+        self.transport.write(self.conn.data_to_send())
+
+def serve(http1_port: int, http2_port: int):
+    async def run():
+        await asyncio.get_running_loop().create_server(Http2StandIn, '127.0.0.1', http2_port, backlog=1024)
+        await uvicorn.Server(uvicorn.Config(http1_stand_in, host='127.0.0.1', port=http1_port,
+                                            log_level='warning', backlog=1024)).serve()
+    asyncio.run(run())
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def start_stand_in():
+    """Start both stand-ins in a child process (so they do not share our GIL); returns their URLs"""
+    ports = free_port(), free_port()
+    multiprocessing.Process(target=serve, args=ports, daemon=True).start()
+    for port in ports:
+        while True:
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                break
+            except OSError:
+                time.sleep(0.05)
+    return tuple(f"http://127.0.0.1:{port}" for port in ports)
+
+def use_async_client(url: str, http2: bool):
+    """Point the async layer at a stand-in, keeping the layer's pool limits"""
+    limits = httpx.Limits(
+        max_connections=supabase_async.SUPABASE_POOL_CONNECTIONS,
+        max_keepalive_connections=supabase_async.SUPABASE_POOL_CONNECTIONS,
+        keepalive_expiry=supabase_async.SUPABASE_KEEPALIVE_SECONDS
+    )
+    # Cleartext HTTP/2 needs prior knowledge; Supabase negotiates it over TLS
+    http_client = httpx.AsyncClient(http1=not http2, http2=http2, limits=limits)
+    supabase_async._async_supabase = AsyncPostgrestClient(
+        f"{url}/rest/v1", headers={'apikey': 'bench', 'Authorization': 'Bearer bench'}, http_client=http_client
+    )
+
+async def run_requests(call):
+    """Issue REQUESTS lookups, at most CONCURRENCY in flight; returns (requests/second, CPU ms/request)"""
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    failures = []
+
+    async def one(user_id):
+        async with semaphore:
+            if not await call(user_id):
+                failures.append(user_id)
+
+    start, cpu_start = time.perf_counter(), time.process_time()
+    await asyncio.gather(*(one(i % 1000 + 1) for i in range(REQUESTS)))
+    elapsed, cpu = time.perf_counter() - start, time.process_time() - cpu_start
+    assert not failures, f"{len(failures)} lookups failed"
+    return REQUESTS / elapsed, cpu / REQUESTS * 1000
+
+def sync_get_user_by_id(user_id):
+    """The lookup the old sync endpoints made"""
+    result = supabase_client.get_supabase_client().table('users').select('*').eq('id', user_id).single().execute()
+    return result.data
+
+async def sync_on_loop(user_id):
+    return sync_get_user_by_id(user_id)
+
+async def sync_in_threadpool(user_id):
+    return await run_io(sync_get_user_by_id, user_id)
+
+async def async_layer(user_id):
+    return await supabase_async.get_user_by_id(user_id)
+
+async def main():
+    http1_url, http2_url = start_stand_in()
+    supabase_client.SUPABASE_URL = http1_url
+    sync_get_user_by_id(1)
+
+    print(f"{REQUESTS} user lookups, {CONCURRENCY} concurrent, {LATENCY_MS} ms per PostgREST request, "
+          f"{supabase_async.SUPABASE_POOL_CONNECTIONS} pooled connections")
+    for label, call, url, http2 in [('sync, on the event loop', sync_on_loop, None, False),
+                                    ('sync, in the threadpool', sync_in_threadpool, None, False),
+                                    ('async, HTTP/1.1', async_layer, http1_url, False),
+                                    ('async, HTTP/2', async_layer, http2_url, True)]:
+        if url:
+            use_async_client(url, http2)
+            await call(1)  # open the connection first
+        rate, cpu_ms = await run_requests(call)
+        print(f"  {label:<24} {rate:8.0f} req/s {cpu_ms:8.2f} ms CPU/request")
+        await supabase_async.close_async_supabase()
+
+if __name__ == '__main__':
+    asyncio.run(main())
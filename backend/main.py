@@ -1,19 +1,65 @@
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 import os
-from backend.database import engine, Base
+from contextlib import asynccontextmanager
+from backend.database import create_schema
 from backend.routers import (
     auth, scan, profile, 
     notifications as notif_router, 
     referrals, coins, admin, admin_management,
-    admin_auth, settings, security, user_management
+    admin_auth, settings, security, user_management,
+    media, foods
 )
+from backend.services.ai_recognition import close_http_client, close_recognition_batcher
+from backend.services.executors import shutdown_executors
+from backend.services.recognition_cache import close_recognition_cache
+from backend.services.uploads import UploadSizeLimitMiddleware
+from backend.services.dataloader import RequestLoadersMiddleware
+from backend.services.storage import get_upload_dir
+from backend.services.scan_jobs import start_scan_workers, stop_scan_workers
+from backend.services.nutrition_catalog import start_catalog_refresh, stop_catalog_refresh
+from backend.services.coin_ledger import start_ledger_maintenance, stop_ledger_maintenance
+from backend.services.write_behind import start_scan_writer, stop_scan_writer
+from backend.services.serialization import FastJSONResponse
+from backend.services.supabase_async import start_async_supabase, close_async_supabase
 
-# Create DB tables
-Base.metadata.create_all(bind=engine)
+# Create DB tables (and indexes added since the database was created)
+create_schema()
 
-app = FastAPI(title="FoodID API", version="0.2.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open the pooled async PostgREST client the endpoints await
+    start_async_supabase()
+    # Buffer scan writes when SCAN_WRITE_MODE=write-behind
+    start_scan_writer(scan.flush_scan_records)
+    # Process queued async scans, including ones left over from a restart
+    start_scan_workers(scan.run_scan_job)
+    # Load the nutrition catalog from food_database and watch it for changes
+    start_catalog_refresh()
+    # Snapshot coin balances from the ledger (and compact old entries)
+    start_ledger_maintenance()
+    yield
+    # Release shared clients and worker pools on shutdown
+    await stop_ledger_maintenance()
+    await stop_catalog_refresh()
+    await stop_scan_workers()
+    # Write out buffered scans after the workers have stopped adding to them
+    await stop_scan_writer()
+    await close_recognition_batcher()
+    await close_http_client()
+    await close_async_supabase()
+    shutdown_executors()
+    close_recognition_cache()
+
+# Responses are rendered with orjson (see services/serialization.py)
+app = FastAPI(title="FoodID API", version="0.2.0", lifespan=lifespan, default_response_class=FastJSONResponse)
+
+# Per-request DataLoaders: repeated lookups of one entity share a batched query
+app.add_middleware(RequestLoadersMiddleware)
+
+# Cap multipart upload bodies while they stream in (added first so it
+# runs inside CORS and its 413 responses still carry CORS headers)
+app.add_middleware(UploadSizeLimitMiddleware)
 
 # Add CORS middleware
 app.add_middleware(
@@ -30,6 +76,7 @@ app.include_router(scan.router, prefix="/api/scan", tags=["scan"])
 app.include_router(profile.router, prefix="/api", tags=["profile"])
 app.include_router(referrals.router, prefix="/api/admin", tags=["referrals"])
 app.include_router(coins.router, prefix="/api", tags=["coins"])
+app.include_router(foods.router, prefix="/api/foods", tags=["foods"])
 app.include_router(notif_router.router, prefix="/api/admin", tags=["notifications"])
 app.include_router(admin_management.router, prefix="/api/admin", tags=["admin-management"])
 app.include_router(admin.router, prefix="/api/admin", tags=["admin"])
@@ -40,17 +87,11 @@ app.include_router(settings.router, prefix="/api/admin", tags=["settings"])
 app.include_router(security.router, prefix="/api/admin", tags=["security"])
 app.include_router(user_management.router, prefix="/api/admin", tags=["user-management"])
 
-# Create directories if they don't exist
-if os.getenv("VERCEL"):
-    upload_dir = "/tmp/uploads"
-else:
-    upload_dir = "uploads"
-
-os.makedirs(upload_dir, exist_ok=True)
-os.makedirs(f"{upload_dir}/profile_images", exist_ok=True)
+# Create upload directory if it doesn't exist
+os.makedirs(get_upload_dir(), exist_ok=True)
 
-# Mount uploads directory to serve static files
-app.mount("/static", StaticFiles(directory=upload_dir), name="static")
+# Serve stored images (content-addressed storage plus legacy flat files)
+app.include_router(media.router, tags=["media"])
 
 @app.get("/")
 def read_root():
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Boolean
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Boolean, Float, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from backend.database import Base
@@ -37,6 +37,9 @@ class Scan(Base):
 
     owner = relationship("User", back_populates="scans")
 
+    # Same indexes as supabase_schema.sql, for the local data backend
+    __table_args__ = (Index("idx_scans_user", "user_id", "created_at"),)
+
 class Notification(Base):
     __tablename__ = "notifications"
 
@@ -51,12 +54,14 @@ class Notification(Base):
 
     user = relationship("User", back_populates="notifications")
 
+    __table_args__ = (Index("idx_notifications_user", "user_id", "created_at"),)
+
 class Referral(Base):
     __tablename__ = "referrals"
 
     id = Column(Integer, primary_key=True, index=True)
-    referrer_id = Column(Integer, ForeignKey("users.id"))
-    referred_phone = Column(String, nullable=False)
+    referrer_id = Column(Integer, ForeignKey("users.id"), index=True)
+    referred_phone = Column(String, nullable=False, index=True)
     referred_user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     status = Column(String, default="pending")  # pending, accepted, registered
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -74,3 +79,43 @@ class CoinTransaction(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
     user = relationship("User", back_populates="coin_transactions")
+
+    __table_args__ = (Index("idx_coin_transactions_user", "user_id", "created_at"),)
+
+class CoinBalanceSnapshot(Base):
+    """A user's balance through one coin_transactions entry (the ledger)"""
+    __tablename__ = "coin_balance_snapshots"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    balance = Column(Integer, nullable=False)
+    last_transaction_id = Column(Integer, nullable=False)  # latest ledger entry included
+    as_of = Column(DateTime, nullable=False)  # created_at of that entry
+    compacted = Column(Boolean, default=False)  # older entries were folded in and deleted
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (Index("idx_coin_balance_snapshots_user", "user_id", "last_transaction_id", unique=True),)
+
+class ScanRecordKey(Base):
+    """What a record_scan call made with an idempotency key (a scan job) returned"""
+    __tablename__ = "scan_record_keys"
+
+    key = Column(String, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    result = Column(Text, nullable=True)  # record_scan result as JSON
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class FoodItem(Base):
+    __tablename__ = "food_database"
+
+    id = Column(Integer, primary_key=True, index=True)
+    food_name = Column(String, nullable=False, index=True)
+    category = Column(String, nullable=True)
+    calories = Column(Float, nullable=True)
+    protein = Column(Float, nullable=True)
+    carbs = Column(Float, nullable=True)
+    fat = Column(Float, nullable=True)
+    health_score = Column(Integer, nullable=True)
+    ingredients = Column(Text, nullable=True)  # JSON list
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -1,10 +1,14 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from backend.services.supabase_client import get_supabase_client, get_dashboard_stats, get_all_users, get_all_scans
+from backend.services.supabase_client import get_supabase_client
+from backend.services.executors import run_io
+from backend.services.repository import get_repository
+from backend.services.dataloader import get_user_loader
 from typing import Optional
 import csv
 import io
 from fastapi.responses import StreamingResponse
+from backend.services.serialization import FastJSONResponse
 import json
 
 router = APIRouter()
@@ -14,7 +18,6 @@ class UserUpdate(BaseModel):
     name: Optional[str] = None
     email: Optional[str] = None
     phone_number: Optional[str] = None
-    status: Optional[str] = None
 
 class CoinAdjustment(BaseModel):
     user_id: int
@@ -24,81 +27,68 @@ class CoinAdjustment(BaseModel):
     admin_id: str = "admin"
 
 @router.get("/stats")
-def get_stats():
+async def get_stats():
     """Get dashboard statistics"""
-    return get_dashboard_stats()
+    return await get_repository().get_dashboard_stats()
 
 @router.get("/users")
-def get_users():
+async def get_users():
     """Get all users"""
-    return get_all_users()
+    # Rows are plain JSON already; skip the jsonable_encoder pass
+    return FastJSONResponse(await get_repository().get_all_users())
 
 @router.get("/users/{user_id}")
-def get_user(user_id: int):
+async def get_user(user_id: int):
     """Get specific user by ID"""
-    try:
-        response = get_supabase_client().table('users').select('*').eq('id', user_id).execute()
-        if not response.data:
-            raise HTTPException(status_code=404, detail="User not found")
-        return response.data[0]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    user = await get_repository().get_user_by_id(user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
 
 @router.put("/users/{user_id}")
-def update_user(user_id: int, user_data: UserUpdate):
+async def update_user(user_id: int, user_data: UserUpdate):
     """Update user information"""
-    try:
-        update_data = {k: v for k, v in user_data.dict().items() if v is not None}
-        if not update_data:
-            raise HTTPException(status_code=400, detail="No data to update")
-        
-        response = get_supabase_client().table('users').update(update_data).eq('id', user_id).execute()
-        if not response.data:
-            raise HTTPException(status_code=404, detail="User not found")
-        return {"message": "User updated successfully", "user": response.data[0]}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    update_data = {k: v for k, v in user_data.dict().items() if v is not None}
+    if not update_data:
+        raise HTTPException(status_code=400, detail="No data to update")
+
+    user = await get_repository().update_user_profile(user_id, **update_data)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return {"message": "User updated successfully", "user": user}
 
 @router.delete("/users/{user_id}")
-def delete_user(user_id: int):
+async def delete_user(user_id: int):
     """Delete a user"""
-    try:
-        # Check if user exists
-        user = get_supabase_client().table('users').select('*').eq('id', user_id).execute()
-        if not user.data:
-            raise HTTPException(status_code=404, detail="User not found")
-        
-        # Delete user
-        get_supabase_client().table('users').delete().eq('id', user_id).execute()
-        return {"message": "User deleted successfully"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    if not await get_repository().delete_user(user_id):
+        raise HTTPException(status_code=404, detail="User not found")
+    return {"message": "User deleted successfully"}
 
 @router.post("/users/coins/adjust")
-def adjust_user_coins(adjustment: CoinAdjustment):
+async def adjust_user_coins(adjustment: CoinAdjustment):
     """Adjust user coins (add or subtract)"""
     try:
-        # Get current user coins
-        user = get_supabase_client().table('users').select('coins').eq('id', adjustment.user_id).execute()
-        if not user.data:
-            raise HTTPException(status_code=404, detail="User not found")
-        
-        current_coins = user.data[0].get('coins', 0)
-        
-        # Calculate new coin balance
+        # One atomic ledger append; it reports the amount actually applied
+        # (a subtraction stops at 0), so the old balance needs no extra read
         if adjustment.adjustment_type == 'add':
-            new_coins = current_coins + adjustment.amount
+            movement = await get_repository().append_coin_transaction(
+                adjustment.user_id, adjustment.amount, 'admin_adjustment', adjustment.reason)
         elif adjustment.adjustment_type == 'subtract':
-            new_coins = max(0, current_coins - adjustment.amount)  # Don't go below 0
+            # Don't go below 0
+            movement = await get_repository().append_coin_transaction(
+                adjustment.user_id, -adjustment.amount, 'admin_adjustment', adjustment.reason,
+                min_balance=0, clamp=True)
         else:
             raise HTTPException(status_code=400, detail="Invalid adjustment type")
+        if movement is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        new_coins = movement['new_balance']
+        current_coins = new_coins - movement['transaction']['amount']
         
-        # Update user coins
-        get_supabase_client().table('users').update({'coins': new_coins}).eq('id', adjustment.user_id).execute()
-        
-        # Log the adjustment (create coin_adjustments table entry)
+        # Audit the adjustment (the movement itself is in the coin ledger).
+        # coin_adjustments is an admin panel table, kept in Supabase only
         try:
-            get_supabase_client().table('coin_adjustments').insert({
+            await run_io(get_supabase_client().table('coin_adjustments').insert({
                 'user_id': adjustment.user_id,
                 'amount': adjustment.amount,
                 'adjustment_type': adjustment.adjustment_type,
@@ -106,7 +96,7 @@ def adjust_user_coins(adjustment: CoinAdjustment):
                 'admin_id': adjustment.admin_id,
                 'previous_balance': current_coins,
                 'new_balance': new_coins
-            }).execute()
+            }).execute)
         except:
             pass  # Table might not exist, continue anyway
         
@@ -132,10 +122,10 @@ def get_coin_adjustment_history(limit: int = 50):
         return []
 
 @router.get("/users/export/{format}")
-def export_users(format: str = "csv"):
+async def export_users(format: str = "csv"):
     """Export users in CSV or JSON format"""
     try:
-        users = supabase_client.get_all_users()
+        users = await get_repository().get_all_users()
         
         if format == "csv":
             # Create CSV
@@ -172,16 +162,16 @@ def export_users(format: str = "csv"):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/scans")
-def get_scans(limit: int = 50):
+async def get_scans(limit: int = 50):
     """Get recent scans"""
-    return get_all_scans(limit)
+    return await get_repository().get_all_scans(limit)
 
 @router.get("/scans/analytics")
-def get_scan_analytics():
+async def get_scan_analytics():
     """Get comprehensive scan analytics"""
     try:
         # Get all scans
-        scans = get_all_scans(1000)  # Get more for analytics
+        scans = await get_repository().get_all_scans(1000)  # Get more for analytics
         
         if not scans:
             return {
@@ -279,9 +269,13 @@ def get_scan_analytics():
             if user_id:
                 user_scans[user_id] = user_scans.get(user_id, 0) + 1
         
+        top_counts = sorted(user_scans.items(), key=lambda x: x[1], reverse=True)[:10]
+        # Names and phone numbers of all top users in one batched lookup
+        top_profiles = await get_user_loader().load_many([user_id for user_id, _ in top_counts])
         top_users = [
-            {"user_id": user_id, "scan_count": count}
-            for user_id, count in sorted(user_scans.items(), key=lambda x: x[1], reverse=True)[:10]
+            {"user_id": user_id, "scan_count": count,
+             "name": (profile or {}).get('name'), "phone_number": (profile or {}).get('phone_number')}
+            for (user_id, count), profile in zip(top_counts, top_profiles)
         ]
         
         # Nutrition insights (average values)
@@ -317,10 +311,10 @@ def get_scan_analytics():
 
 
 @router.get("/scans/categories")
-def get_scan_categories():
+async def get_scan_categories():
     """Get scan distribution by food categories"""
     try:
-        scans = get_all_scans(1000)
+        scans = await get_repository().get_all_scans(1000)
         
         # Categorize foods (simple categorization based on common patterns)
         categories = {
@@ -363,10 +357,10 @@ def get_scan_categories():
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/scans/confidence-distribution")
-def get_confidence_distribution():
+async def get_confidence_distribution():
     """Get distribution of scan confidence levels"""
     try:
-        scans = get_all_scans(1000)
+        scans = await get_repository().get_all_scans(1000)
         
         # Categorize by confidence ranges
         ranges = {
@@ -404,9 +398,9 @@ def get_confidence_distribution():
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/transactions")
-def get_transactions(limit: int = 50):
+async def get_transactions(limit: int = 50):
     """Get recent transactions"""
-    return supabase_client.get_all_transactions(limit)
+    return await get_repository().get_all_transactions(limit)
 
 # ==================== COIN SYSTEM MANAGEMENT ====================
 
@@ -4,7 +4,7 @@ from typing import Optional
 from datetime import datetime, timedelta
 import bcrypt
 import secrets
-from backend.services.supabase_client import get_supabase_client
+from backend.services.supabase_async import get_async_supabase
 
 router = APIRouter(prefix="/auth", tags=["Admin Authentication"])
 
@@ -38,10 +38,10 @@ def generate_session_token() -> str:
     """Generate secure session token"""
     return secrets.token_urlsafe(32)
 
-def log_security_event(event_type: str, username: str, ip_address: str, severity: str = 'low', details: dict = None):
+async def log_security_event(event_type: str, username: str, ip_address: str, severity: str = 'low', details: dict = None):
     """Log security event"""
     try:
-        supabase = get_supabase_client()
+        supabase = get_async_supabase()
         event_data = {
             'event_type': event_type,
             'username': username,
@@ -50,14 +50,14 @@ def log_security_event(event_type: str, username: str, ip_address: str, severity
             'details': details or {},
             'created_at': datetime.utcnow().isoformat()
         }
-        supabase.table('security_events').insert(event_data).execute()
+        await supabase.table('security_events').insert(event_data).execute()
     except Exception as e:
         print(f"Failed to log security event: {e}")
 
-def log_login_attempt(username: str, status: str, ip_address: str, failure_reason: str = None):
+async def log_login_attempt(username: str, status: str, ip_address: str, failure_reason: str = None):
     """Log login attempt"""
     try:
-        supabase = get_supabase_client()
+        supabase = get_async_supabase()
         log_data = {
             'username': username,
             'login_status': status,
@@ -65,7 +65,7 @@ def log_login_attempt(username: str, status: str, ip_address: str, failure_reaso
             'ip_address': ip_address,
             'created_at': datetime.utcnow().isoformat()
         }
-        supabase.table('login_history').insert(log_data).execute()
+        await supabase.table('login_history').insert(log_data).execute()
     except Exception as e:
         print(f"Failed to log login attempt: {e}")
 
@@ -77,18 +77,18 @@ def log_login_attempt(username: str, status: str, ip_address: str, failure_reaso
 async def login(request: LoginRequest, x_forwarded_for: Optional[str] = Header(None)):
     """Admin login endpoint"""
     try:
-        supabase = get_supabase_client()
+        supabase = get_async_supabase()
         ip_address = x_forwarded_for or "unknown"
         
         # Get admin user by username
-        user_response = supabase.table('admin_users')\
+        user_response = await supabase.table('admin_users')\
             .select('*, admin_roles(role_name, permissions)')\
             .eq('username', request.username)\
             .execute()
         
         if not user_response.data:
-            log_login_attempt(request.username, 'failed', ip_address, 'Invalid username')
-            log_security_event('login_failed', request.username, ip_address, 'medium', {'reason': 'Invalid username'})
+            await log_login_attempt(request.username, 'failed', ip_address, 'Invalid username')
+            await log_security_event('login_failed', request.username, ip_address, 'medium', {'reason': 'Invalid username'})
             raise HTTPException(status_code=401, detail="Invalid username or password")
         
         user = user_response.data[0]
@@ -97,11 +97,11 @@ async def login(request: LoginRequest, x_forwarded_for: Optional[str] = Header(N
         if user.get('account_locked'):
             locked_until = user.get('locked_until')
             if locked_until and datetime.fromisoformat(locked_until.replace('Z', '')) > datetime.utcnow():
-                log_login_attempt(request.username, 'blocked', ip_address, 'Account locked')
+                await log_login_attempt(request.username, 'blocked', ip_address, 'Account locked')
                 raise HTTPException(status_code=403, detail="Account is locked. Please try again later.")
             else:
                 # Unlock account if lockout period has passed
-                supabase.table('admin_users').update({
+                await supabase.table('admin_users').update({
                     'account_locked': False,
                     'failed_login_attempts': 0,
                     'locked_until': None
@@ -109,7 +109,7 @@ async def login(request: LoginRequest, x_forwarded_for: Optional[str] = Header(N
         
         # Check if account is active
         if not user.get('is_active'):
-            log_login_attempt(request.username, 'failed', ip_address, 'Account inactive')
+            await log_login_attempt(request.username, 'failed', ip_address, 'Account inactive')
             raise HTTPException(status_code=403, detail="Account is inactive")
         
         # Verify password
@@ -125,18 +125,18 @@ async def login(request: LoginRequest, x_forwarded_for: Optional[str] = Header(N
                 locked_until = datetime.utcnow() + timedelta(minutes=lockout_minutes)
                 update_data['account_locked'] = True
                 update_data['locked_until'] = locked_until.isoformat()
-                log_security_event('account_locked', request.username, ip_address, 'high', {
+                await log_security_event('account_locked', request.username, ip_address, 'high', {
                     'reason': 'Max login attempts exceeded',
                     'attempts': failed_attempts
                 })
             
-            supabase.table('admin_users').update(update_data).eq('id', user['id']).execute()
-            log_login_attempt(request.username, 'failed', ip_address, 'Invalid password')
-            log_security_event('login_failed', request.username, ip_address, 'medium', {'reason': 'Invalid password'})
+            await supabase.table('admin_users').update(update_data).eq('id', user['id']).execute()
+            await log_login_attempt(request.username, 'failed', ip_address, 'Invalid password')
+            await log_security_event('login_failed', request.username, ip_address, 'medium', {'reason': 'Invalid password'})
             raise HTTPException(status_code=401, detail="Invalid username or password")
         
         # Reset failed login attempts on successful login
-        supabase.table('admin_users').update({
+        await supabase.table('admin_users').update({
             'failed_login_attempts': 0,
             'last_login': datetime.utcnow().isoformat()
         }).eq('id', user['id']).execute()
@@ -155,11 +155,11 @@ async def login(request: LoginRequest, x_forwarded_for: Optional[str] = Header(N
             'last_activity': datetime.utcnow().isoformat()
         }
         
-        supabase.table('admin_sessions').insert(session_data).execute()
+        await supabase.table('admin_sessions').insert(session_data).execute()
         
         # Log successful login
-        log_login_attempt(request.username, 'success', ip_address)
-        log_security_event('login_success', request.username, ip_address, 'low', {'remember_me': request.remember_me})
+        await log_login_attempt(request.username, 'success', ip_address)
+        await log_security_event('login_success', request.username, ip_address, 'low', {'remember_me': request.remember_me})
         
         # Return user data and permissions
         return {
@@ -190,10 +190,10 @@ async def logout(authorization: str = Header(None)):
             raise HTTPException(status_code=401, detail="No session token provided")
         
         session_token = authorization.replace('Bearer ', '')
-        supabase = get_supabase_client()
+        supabase = get_async_supabase()
         
         # Delete session
-        supabase.table('admin_sessions').delete().eq('session_token', session_token).execute()
+        await supabase.table('admin_sessions').delete().eq('session_token', session_token).execute()
         
         return {"message": "Logout successful"}
         
@@ -210,10 +210,10 @@ async def get_current_user(authorization: str = Header(None)):
             raise HTTPException(status_code=401, detail="Not authenticated")
         
         session_token = authorization.replace('Bearer ', '')
-        supabase = get_supabase_client()
+        supabase = get_async_supabase()
         
         # Get session
-        session_response = supabase.table('admin_sessions')\
+        session_response = await supabase.table('admin_sessions')\
             .select('*')\
             .eq('session_token', session_token)\
             .execute()
@@ -226,16 +226,16 @@ async def get_current_user(authorization: str = Header(None)):
         # Check if session expired
         expires_at = datetime.fromisoformat(session['expires_at'].replace('Z', ''))
         if expires_at < datetime.utcnow():
-            supabase.table('admin_sessions').delete().eq('session_token', session_token).execute()
+            await supabase.table('admin_sessions').delete().eq('session_token', session_token).execute()
             raise HTTPException(status_code=401, detail="Session expired")
         
         # Update last activity
-        supabase.table('admin_sessions').update({
+        await supabase.table('admin_sessions').update({
             'last_activity': datetime.utcnow().isoformat()
         }).eq('session_token', session_token).execute()
         
         # Get user data
-        user_response = supabase.table('admin_users')\
+        user_response = await supabase.table('admin_users')\
             .select('*, admin_roles(role_name, permissions)')\
             .eq('id', session['admin_user_id'])\
             .execute()
@@ -268,10 +268,10 @@ async def change_password(request: ChangePasswordRequest, authorization: str = H
             raise HTTPException(status_code=401, detail="Not authenticated")
         
         session_token = authorization.replace('Bearer ', '')
-        supabase = get_supabase_client()
+        supabase = get_async_supabase()
         
         # Get current user from session
-        session_response = supabase.table('admin_sessions')\
+        session_response = await supabase.table('admin_sessions')\
             .select('admin_user_id')\
             .eq('session_token', session_token)\
             .execute()
@@ -282,7 +282,7 @@ async def change_password(request: ChangePasswordRequest, authorization: str = H
         user_id = session_response.data[0]['admin_user_id']
         
         # Get user
-        user_response = supabase.table('admin_users').select('*').eq('id', user_id).execute()
+        user_response = await supabase.table('admin_users').select('*').eq('id', user_id).execute()
         if not user_response.data:
             raise HTTPException(status_code=404, detail="User not found")
         
@@ -296,14 +296,14 @@ async def change_password(request: ChangePasswordRequest, authorization: str = H
         new_password_hash = hash_password(request.new_password)
         
         # Update password
-        supabase.table('admin_users').update({
+        await supabase.table('admin_users').update({
             'password_hash': new_password_hash,
             'password_changed_at': datetime.utcnow().isoformat(),
             'must_change_password': False
         }).eq('id', user_id).execute()
         
         # Log security event
-        log_security_event('password_change', user['username'], 'internal', 'low', {'user_id': user_id})
+        await log_security_event('password_change', user['username'], 'internal', 'low', {'user_id': user_id})
         
         return {"message": "Password changed successfully"}
         
@@ -3,7 +3,7 @@ from pydantic import BaseModel
 from typing import Optional, List, Dict
 from datetime import datetime
 import bcrypt
-from backend.services.supabase_client import get_supabase_client
+from backend.services.supabase_async import get_async_supabase
 
 router = APIRouter(prefix="/admin-management", tags=["Admin Management"])
 
@@ -45,8 +45,8 @@ def hash_password(password: str) -> str:
 async def get_roles():
     """Get all admin roles"""
     try:
-        supabase = get_supabase_client()
-        response = supabase.table('admin_roles').select('*').order('created_at', desc=True).execute()
+        supabase = get_async_supabase()
+        response = await supabase.table('admin_roles').select('*').order('created_at', desc=True).execute()
         return response.data
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -55,7 +55,7 @@ async def get_roles():
 async def create_role(role: RoleCreate):
     """Create a new admin role"""
     try:
-        supabase = get_supabase_client()
+        supabase = get_async_supabase()
         
         role_data = {
             'role_name': role.role_name,
@@ -65,7 +65,7 @@ async def create_role(role: RoleCreate):
             'updated_at': datetime.utcnow().isoformat()
         }
         
-        response = supabase.table('admin_roles').insert(role_data).execute()
+        response = await supabase.table('admin_roles').insert(role_data).execute()
         
         return {
             "message": "Role created successfully",
@@ -78,7 +78,7 @@ async def create_role(role: RoleCreate):
 async def update_role(role_id: int, role_update: RoleUpdate):
     """Update an admin role"""
     try:
-        supabase = get_supabase_client()
+        supabase = get_async_supabase()
         
         update_data = {k: v for k, v in role_update.dict().items() if v is not None}
         update_data['updated_at'] = datetime.utcnow().isoformat()
@@ -86,7 +86,7 @@ async def update_role(role_id: int, role_update: RoleUpdate):
         if not update_data:
             raise HTTPException(status_code=400, detail="No data to update")
         
-        response = supabase.table('admin_roles').update(update_data).eq('id', role_id).execute()
+        response = await supabase.table('admin_roles').update(update_data).eq('id', role_id).execute()
         
         if not response.data:
             raise HTTPException(status_code=404, detail="Role not found")
@@ -104,14 +104,14 @@ async def update_role(role_id: int, role_update: RoleUpdate):
 async def delete_role(role_id: int):
     """Delete an admin role"""
     try:
-        supabase = get_supabase_client()
+        supabase = get_async_supabase()
         
         # Check if any users have this role
-        users_with_role = supabase.table('admin_users').select('id').eq('role_id', role_id).execute()
+        users_with_role = await supabase.table('admin_users').select('id').eq('role_id', role_id).execute()
         if users_with_role.data:
             raise HTTPException(status_code=400, detail=f"Cannot delete role. {len(users_with_role.data)} users are assigned to this role.")
         
-        response = supabase.table('admin_roles').delete().eq('id', role_id).execute()
+        response = await supabase.table('admin_roles').delete().eq('id', role_id).execute()
         
         if not response.data:
             raise HTTPException(status_code=404, detail="Role not found")
@@ -130,8 +130,8 @@ async def delete_role(role_id: int):
 async def get_admin_users():
     """Get all admin users"""
     try:
-        supabase = get_supabase_client()
-        response = supabase.table('admin_users')\
+        supabase = get_async_supabase()
+        response = await supabase.table('admin_users')\
             .select('*, admin_roles(role_name, description)')\
             .order('created_at', desc=True)\
             .execute()
@@ -143,7 +143,7 @@ async def get_admin_users():
 async def create_admin_user(user: AdminUserCreate):
     """Create a new admin user"""
     try:
-        supabase = get_supabase_client()
+        supabase = get_async_supabase()
         
         # Hash password
         password_hash = hash_password(user.password)
@@ -164,7 +164,7 @@ async def create_admin_user(user: AdminUserCreate):
             'updated_at': datetime.utcnow().isoformat()
         }
         
-        response = supabase.table('admin_users').insert(user_data).execute()
+        response = await supabase.table('admin_users').insert(user_data).execute()
         
         return {
             "message": "Admin user created successfully",
@@ -177,7 +177,7 @@ async def create_admin_user(user: AdminUserCreate):
 async def update_admin_user(user_id: int, user_update: AdminUserUpdate):
     """Update an admin user"""
     try:
-        supabase = get_supabase_client()
+        supabase = get_async_supabase()
         
         update_data = {k: v for k, v in user_update.dict().items() if v is not None}
         update_data['updated_at'] = datetime.utcnow().isoformat()
@@ -185,7 +185,7 @@ async def update_admin_user(user_id: int, user_update: AdminUserUpdate):
         if not update_data:
             raise HTTPException(status_code=400, detail="No data to update")
         
-        response = supabase.table('admin_users').update(update_data).eq('id', user_id).execute()
+        response = await supabase.table('admin_users').update(update_data).eq('id', user_id).execute()
         
         if not response.data:
             raise HTTPException(status_code=404, detail="Admin user not found")
@@ -203,8 +203,8 @@ async def update_admin_user(user_id: int, user_update: AdminUserUpdate):
 async def delete_admin_user(user_id: int):
     """Delete an admin user"""
     try:
-        supabase = get_supabase_client()
-        response = supabase.table('admin_users').delete().eq('id', user_id).execute()
+        supabase = get_async_supabase()
+        response = await supabase.table('admin_users').delete().eq('id', user_id).execute()
         
         if not response.data:
             raise HTTPException(status_code=404, detail="Admin user not found")
@@ -228,7 +228,7 @@ async def get_activity_logs(
 ):
     """Get admin activity logs with optional filters"""
     try:
-        supabase = get_supabase_client()
+        supabase = get_async_supabase()
         
         query = supabase.table('admin_activity_logs').select('*, admin_users(name, email)')
         
@@ -239,7 +239,7 @@ async def get_activity_logs(
         if resource_type:
             query = query.eq('resource_type', resource_type)
         
-        response = query.order('created_at', desc=True).limit(limit).execute()
+        response = await query.order('created_at', desc=True).limit(limit).execute()
         
         return response.data
     except Exception as e:
@@ -256,7 +256,7 @@ async def create_activity_log(
 ):
     """Create an activity log entry"""
     try:
-        supabase = get_supabase_client()
+        supabase = get_async_supabase()
         
         log_data = {
             'admin_email': admin_email,
@@ -268,7 +268,7 @@ async def create_activity_log(
             'created_at': datetime.utcnow().isoformat()
         }
         
-        response = supabase.table('admin_activity_logs').insert(log_data).execute()
+        response = await supabase.table('admin_activity_logs').insert(log_data).execute()
         
         return {
             "message": "Activity logged successfully",
@@ -281,11 +281,11 @@ async def create_activity_log(
 async def get_activity_stats():
     """Get activity log statistics"""
     try:
-        supabase = get_supabase_client()
+        supabase = get_async_supabase()
         from datetime import timedelta
         
         # Get all logs
-        logs = supabase.table('admin_activity_logs').select('*').execute().data
+        logs = (await supabase.table('admin_activity_logs').select('*').execute()).data
         
         if not logs:
             return {
@@ -1,7 +1,8 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from backend.services.otp_service import create_otp, verify_otp
-from backend.services.supabase_client import create_user, get_user_by_phone
+from backend.services.repository import get_repository
+from backend.services.executors import run_io
 
 router = APIRouter()
 
@@ -28,18 +29,20 @@ def send_otp(request: PhoneRequest):
     }
 
 @router.post("/verify-otp")
-def verify_otp_endpoint(request: OTPVerifyRequest):
-    """Verify OTP and login/register user in Supabase"""
-    result = verify_otp(request.phone_number, request.otp_code)
+async def verify_otp_endpoint(request: OTPVerifyRequest):
+    """Verify OTP and login/register user"""
+    # OTPs are kept in Supabase by the sync client
+    result = await run_io(verify_otp, request.phone_number, request.otp_code)
     
     if not result.get('success'):
         raise HTTPException(status_code=400, detail=result.get('error', 'Invalid OTP'))
     
-    # Get or create user in Supabase
-    user = get_user_by_phone(request.phone_number)
+    # Get or create user
+    repository = get_repository()
+    user = await repository.get_user_by_phone(request.phone_number)
     if not user:
         # Create new user
-        user = create_user(request.phone_number)
+        user = await repository.create_user(request.phone_number)
         if not user:
             raise HTTPException(status_code=500, detail='Failed to create user')
     
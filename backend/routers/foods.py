@@ -0,0 +1,30 @@
+from fastapi import APIRouter, Query
+from typing import Mapping, Any, Dict
+from backend.services.nutrition_catalog import get_nutrition_catalog
+
+router = APIRouter()
+
+def _entry_json(entry: Mapping[str, Any]) -> Dict[str, Any]:
+    """Plain-JSON copy of a read-only catalog entry"""
+    data = dict(entry)
+    data['ingredients'] = list(entry['ingredients'])
+    data['history'] = dict(entry['history'])
+    return data
+
+@router.get("/resolve")
+async def resolve_food(q: str = Query(..., min_length=1, max_length=200), limit: int = Query(5, ge=1, le=20)):
+    """Map a free-text food name (e.g. a Clarifai concept) to the closest catalog food"""
+    catalog = get_nutrition_catalog()
+    match = catalog.resolve(q)
+    return {
+        "query": q,
+        "catalog_version": catalog.version,
+        "match": {
+            "name": match[0]['name'],
+            "similarity": match[1],
+            "nutrition": _entry_json(match[0])
+        } if match else None,
+        "candidates": [
+            {"name": entry['name'], "similarity": score} for entry, score in catalog.search(q, limit=limit)
+        ]
+    }
@@ -0,0 +1,55 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse, Response
+from typing import Optional
+import mimetypes
+import os
+from backend.services.executors import run_io
+from backend.services.derivatives import DERIVATIVE_WIDTHS, DERIVATIVE_FORMATS, get_derivative
+from backend.services.storage import get_storage, get_upload_dir, resolve_key
+
+router = APIRouter()
+
+# Content-addressed objects never change, so clients may cache them forever
+IMMUTABLE_CACHE = {"Cache-Control": "public, max-age=31536000, immutable"}
+
+@router.get("/static/{path:path}")
+async def get_static(path: str, w: Optional[int] = None, fmt: Optional[str] = None):
+    """Serve stored images.
+
+    Accepts a full sharded key (ab/cd/<sha256>.jpg) or just the file name
+    (<sha256>.jpg), which older clients build from image_path. Other paths
+    are served from the legacy flat upload directory.
+
+    ?w=256&fmt=webp returns a downscaled variant of a stored image; variants
+    are rendered on first request and cached in storage.
+    """
+    key = resolve_key(path)
+    if key is not None and (w is not None or fmt is not None):
+        if w is not None and w not in DERIVATIVE_WIDTHS:
+            raise HTTPException(status_code=400, detail=f"w must be one of {list(DERIVATIVE_WIDTHS)}")
+        if fmt is not None and fmt not in DERIVATIVE_FORMATS:
+            raise HTTPException(status_code=400, detail=f"fmt must be one of {sorted(DERIVATIVE_FORMATS)}")
+        derivative = await get_derivative(key, w or max(DERIVATIVE_WIDTHS), fmt or 'jpeg')
+        if derivative is None:
+            raise HTTPException(status_code=404, detail="Not found")
+        _, data = derivative
+        media_type = DERIVATIVE_FORMATS[fmt or 'jpeg'][1]
+        return Response(content=data, media_type=media_type, headers=IMMUTABLE_CACHE)
+    
+    if key is not None:
+        storage = get_storage()
+        local_path = storage.local_path(key)
+        if local_path:
+            return FileResponse(local_path, headers=IMMUTABLE_CACHE)
+        data = await run_io(storage.get, key)
+        if data is not None:
+            media_type = mimetypes.guess_type(key)[0] or "application/octet-stream"
+            return Response(content=data, media_type=media_type, headers=IMMUTABLE_CACHE)
+        raise HTTPException(status_code=404, detail="Not found")
+    
+    # Legacy uploads written before content-addressed storage
+    root = os.path.realpath(get_upload_dir())
+    full_path = os.path.realpath(os.path.join(root, path))
+    if full_path.startswith(root + os.sep) and os.path.isfile(full_path):
+        return FileResponse(full_path)
+    raise HTTPException(status_code=404, detail="Not found")
@@ -2,7 +2,8 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import Optional, List
 from datetime import datetime
-from backend.services.supabase_client import get_supabase_client
+from backend.services.supabase_async import get_async_supabase
+from backend.services.repository import get_repository
 
 router = APIRouter(prefix="/notifications", tags=["Notifications"])
 
@@ -24,35 +25,21 @@ class ScheduledNotificationUpdate(BaseModel):
 async def send_notification(notif: NotificationCreate):
     """Send or schedule a notification"""
     try:
-        supabase = get_supabase_client()
-        
         if notif.send_now:
-            # Send immediately to all users or specific audience
-            # For now, we'll create notification records for all users
-            users_response = supabase.table('users').select('id').execute()
-            
-            notifications_to_create = []
-            for user in users_response.data:
-                notifications_to_create.append({
-                    'user_id': user['id'],
-                    'title': notif.title,
-                    'message': notif.message,
-                    'notification_type': notif.priority,
-                    'read': False
-                })
-            
-            if notifications_to_create:
-                supabase.table('notifications').insert(notifications_to_create).execute()
+            # Send immediately: one notification record per user
+            recipients = await get_repository().broadcast_notification(notif.title, notif.message, notif.priority)
             
             return {
                 "message": "Notification sent successfully",
-                "recipients": len(notifications_to_create)
+                "recipients": recipients
             }
         else:
             # Schedule for later
             if not notif.scheduled_for:
                 raise HTTPException(status_code=400, detail="scheduled_for is required when send_now is False")
             
+            # Scheduled notifications are an admin panel table, kept in Supabase only
+            supabase = get_async_supabase()
             scheduled_data = {
                 'title': notif.title,
                 'message': notif.message,
@@ -62,7 +49,7 @@ async def send_notification(notif: NotificationCreate):
                 'status': 'pending'
             }
             
-            response = supabase.table('scheduled_notifications').insert(scheduled_data).execute()
+            response = await supabase.table('scheduled_notifications').insert(scheduled_data).execute()
             
             return {
                 "message": "Notification scheduled successfully",
@@ -77,8 +64,8 @@ async def send_notification(notif: NotificationCreate):
 async def get_scheduled_notifications():
     """Get all scheduled notifications"""
     try:
-        supabase = get_supabase_client()
-        response = supabase.table('scheduled_notifications').select('*').order('scheduled_for', desc=False).execute()
+        supabase = get_async_supabase()
+        response = await supabase.table('scheduled_notifications').select('*').order('scheduled_for', desc=False).execute()
         return response.data
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -87,7 +74,7 @@ async def get_scheduled_notifications():
 async def update_scheduled_notification(notification_id: int, update: ScheduledNotificationUpdate):
     """Update a scheduled notification"""
     try:
-        supabase = get_supabase_client()
+        supabase = get_async_supabase()
         
         update_data = {k: v.isoformat() if isinstance(v, datetime) else v 
                       for k, v in update.dict().items() if v is not None}
@@ -95,7 +82,7 @@ async def update_scheduled_notification(notification_id: int, update: ScheduledN
         if not update_data:
             raise HTTPException(status_code=400, detail="No data to update")
         
-        response = supabase.table('scheduled_notifications').update(update_data).eq('id', notification_id).execute()
+        response = await supabase.table('scheduled_notifications').update(update_data).eq('id', notification_id).execute()
         
         if not response.data:
             raise HTTPException(status_code=404, detail="Scheduled notification not found")
@@ -113,8 +100,8 @@ async def update_scheduled_notification(notification_id: int, update: ScheduledN
 async def delete_scheduled_notification(notification_id: int):
     """Delete a scheduled notification"""
     try:
-        supabase = get_supabase_client()
-        response = supabase.table('scheduled_notifications').delete().eq('id', notification_id).execute()
+        supabase = get_async_supabase()
+        response = await supabase.table('scheduled_notifications').delete().eq('id', notification_id).execute()
         
         if not response.data:
             raise HTTPException(status_code=404, detail="Scheduled notification not found")
@@ -129,10 +116,10 @@ async def delete_scheduled_notification(notification_id: int):
 async def get_notification_history(limit: int = 100):
     """Get notification history"""
     try:
-        supabase = get_supabase_client()
+        supabase = get_async_supabase()
         
         # Get sent scheduled notifications
-        response = supabase.table('scheduled_notifications')\
+        response = await supabase.table('scheduled_notifications')\
             .select('*')\
             .eq('status', 'sent')\
             .order('sent_at', desc=True)\
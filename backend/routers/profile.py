@@ -1,10 +1,11 @@
 from fastapi import APIRouter, HTTPException, UploadFile, File
 from pydantic import BaseModel, EmailStr
 from typing import Optional
-import os
-import shutil
-from datetime import datetime
-from backend.services.supabase_client import get_user_by_id, update_user_profile
+from backend.services.repository import get_repository
+from backend.services.dataloader import get_user_loader
+from backend.services.uploads import ingest_upload
+from backend.services.storage import store_content
+from backend.services.executors import run_io
 
 router = APIRouter()
 
@@ -25,8 +26,8 @@ class ProfileResponse(BaseModel):
 
 @router.get("/profile/{user_id}")
 async def get_profile(user_id: int):
-    """Get user profile from Supabase"""
-    user = get_user_by_id(user_id)
+    """Get user profile"""
+    user = await get_user_loader().load(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -36,12 +37,12 @@ async def get_profile(user_id: int):
 async def update_profile(user_id: int, profile: ProfileUpdate):
     """Update user profile (phone_number is not editable)"""
     # Verify user exists
-    user = get_user_by_id(user_id)
+    user = await get_user_loader().load(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    # Update profile in Supabase
-    updated_user = update_user_profile(
+    # Update profile
+    updated_user = await get_repository().update_user_profile(
         user_id=user_id,
         name=profile.name,
         email=profile.email
@@ -49,6 +50,7 @@ async def update_profile(user_id: int, profile: ProfileUpdate):
     
     if not updated_user:
         raise HTTPException(status_code=500, detail="Failed to update profile")
+    get_user_loader().prime(user_id, updated_user)
     
     return updated_user
 
@@ -56,7 +58,7 @@ async def update_profile(user_id: int, profile: ProfileUpdate):
 async def upload_profile_image(user_id: int, file: UploadFile = File(...)):
     """Upload profile image"""
     # Verify user exists
-    user = get_user_by_id(user_id)
+    user = await get_user_loader().load(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -64,25 +66,21 @@ async def upload_profile_image(user_id: int, file: UploadFile = File(...)):
     if not file.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="File must be an image")
     
-    # Create profile_images directory if it doesn't exist
-    os.makedirs("uploads/profile_images", exist_ok=True)
+    # Read through the size/pixel-bounded ingestion layer, then store under
+    # the content hash computed while reading (the write and fsync run on
+    # the I/O executor)
+    upload = await ingest_upload(file, require_image=True)
+    stored = await run_io(store_content, upload.content, digest=upload.sha256)
     
-    # Save file with unique name
-    file_extension = file.filename.split(".")[-1]
-    file_name = f"user_{user_id}_{int(datetime.utcnow().timestamp())}.{file_extension}"
-    file_path = f"uploads/profile_images/{file_name}"
-    
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    
-    # Update user profile in Supabase
-    updated_user = update_user_profile(user_id=user_id, profile_image=file_path)
+    # Update user profile
+    updated_user = await get_repository().update_user_profile(user_id=user_id, profile_image=stored.url)
     
     if not updated_user:
         raise HTTPException(status_code=500, detail="Failed to update profile image")
+    get_user_loader().prime(user_id, updated_user)
     
     return {
         "success": True,
-        "profile_image": file_path,
+        "profile_image": stored.url,
         "message": "Profile image uploaded successfully"
     }
@@ -2,7 +2,7 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import Optional, List
 from datetime import datetime
-from backend.services.supabase_client import get_supabase_client
+from backend.services.supabase_async import get_async_supabase
 
 router = APIRouter(prefix="/referrals", tags=["Referral Management"])
 
@@ -20,7 +20,7 @@ class ReferralUpdate(BaseModel):
 @router.get("/")
 async def list_referrals():
     try:
-        resp = get_supabase_client().table('referral_codes').select('*').order('created_at', desc=True).execute()
+        resp = await get_async_supabase().table('referral_codes').select('*').order('created_at', desc=True).execute()
         return resp.data
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -36,7 +36,7 @@ async def create_referral(ref: ReferralCreate):
             "created_at": datetime.utcnow().isoformat(),
             "updated_at": datetime.utcnow().isoformat()
         }
-        resp = get_supabase_client().table('referral_codes').insert(data).execute()
+        resp = await get_async_supabase().table('referral_codes').insert(data).execute()
         return {"message": "Referral created", "referral": resp.data}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -46,7 +46,7 @@ async def update_referral(ref_id: int, ref: ReferralUpdate):
     try:
         update_data = {k: v for k, v in ref.dict().items() if v is not None}
         update_data["updated_at"] = datetime.utcnow().isoformat()
-        resp = get_supabase_client().table('referral_codes').update(update_data).eq('id', ref_id).execute()
+        resp = await get_async_supabase().table('referral_codes').update(update_data).eq('id', ref_id).execute()
         if not resp.data:
             raise HTTPException(status_code=404, detail="Referral not found")
         return {"message": "Referral updated", "referral": resp.data}
@@ -56,7 +56,7 @@ async def update_referral(ref_id: int, ref: ReferralUpdate):
 @router.delete("/{ref_id}")
 async def delete_referral(ref_id: int):
     try:
-        resp = get_supabase_client().table('referral_codes').delete().eq('id', ref_id).execute()
+        resp = await get_async_supabase().table('referral_codes').delete().eq('id', ref_id).execute()
         if not resp.data:
             raise HTTPException(status_code=404, detail="Referral not found")
         return {"message": "Referral deleted"}
@@ -67,11 +67,11 @@ async def delete_referral(ref_id: int):
 async def toggle_referral(ref_id: int):
     try:
         # get current status
-        cur = get_supabase_client().table('referral_codes').select('is_active').eq('id', ref_id).execute()
+        cur = await get_async_supabase().table('referral_codes').select('is_active').eq('id', ref_id).execute()
         if not cur.data:
             raise HTTPException(status_code=404, detail="Referral not found")
         new_status = not cur.data[0]['is_active']
-        resp = get_supabase_client().table('referral_codes').update({"is_active": new_status, "updated_at": datetime.utcnow().isoformat()}).eq('id', ref_id).execute()
+        resp = await get_async_supabase().table('referral_codes').update({"is_active": new_status, "updated_at": datetime.utcnow().isoformat()}).eq('id', ref_id).execute()
         return {"message": f"Referral {'activated' if new_status else 'deactivated'}", "is_active": new_status}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,77 +1,43 @@
-from fastapi import APIRouter, UploadFile, File, Depends
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
-import json
+from typing import List, Dict, Any, Optional, Tuple
+import asyncio
 import os
-from PIL import Image
-import io
 from backend.database import get_db
-from backend.services.ai_recognition import recognize_food, get_nutritional_data
-from backend.services.supabase_client import create_scan, get_recent_scans
+from backend.services.ai_recognition import recognize_images, get_nutritional_data, get_clarifai_breaker, get_recognition_batcher
+from backend.services.recognition_backends import get_recognition_backend
+from backend.services.image_processing import prepare_image
+from backend.services.repository import get_repository
+from backend.services.executors import run_cpu, run_io
+from backend.services.recognition_cache import get_recognition_cache
+from backend.services.perceptual_index import get_perceptual_index
+from backend.services.uploads import ingest_upload, get_upload_stats
+from backend.services.storage import store_content, get_storage, get_storage_stats
+from backend.services.scan_jobs import (
+    submit_scan_job, get_scan_job_queue, public_job, wait_for_job_update,
+    FINISHED, SCAN_JOB_POLL_SECONDS
+)
+from backend.services.derivatives import get_derivative_stats
+from backend.services.nutrition_catalog import get_nutrition_catalog
+from backend.services.write_behind import FlushError, get_scan_writer
+from backend.services.recent_scans_cache import get_recent_scans_cache
+from backend.services.serialization import FastJSONResponse, raw_json, dumps_str
 
 router = APIRouter()
 
-def compress_image(file_content: bytes, max_size_kb: int = 500) -> bytes:
-    """Compress image to reduce file size and improve performance"""
-    try:
-        image = Image.open(io.BytesIO(file_content))
-        
-        # Convert to RGB if necessary
-        if image.mode in ('RGBA', 'LA', 'P'):
-            image = image.convert('RGB')
-        
-        # Resize if too large (max 1024px on longest side)
-        max_dimension = 1024
-        if max(image.size) > max_dimension:
-            ratio = max_dimension / max(image.size)
-            new_size = tuple(int(dim * ratio) for dim in image.size)
-            image = image.resize(new_size, Image.Resampling.LANCZOS)
-        
-        # Compress with quality adjustment
-        output = io.BytesIO()
-        quality = 85
-        image.save(output, format='JPEG', quality=quality, optimize=True)
-        
-        # If still too large, reduce quality
-        while output.tell() > max_size_kb * 1024 and quality > 50:
-            output = io.BytesIO()
-            quality -= 10
-            image.save(output, format='JPEG', quality=quality, optimize=True)
-        
-        return output.getvalue()
-    except Exception as e:
-        print(f"Image compression error: {e}")
-        return file_content
+# Maximum number of images accepted by /analyze-batch
+MAX_BATCH_IMAGES = int(os.getenv('MAX_BATCH_IMAGES', '10'))
+# Comment line sent on idle SSE streams so proxies keep the connection open
+SSE_KEEPALIVE_SECONDS = 15
 
-@router.post("/analyze")
-async def analyze_food(file: UploadFile = File(...), user_id: int = 1):
-    # Read and compress image
-    file_content = await file.read()
-    compressed_content = compress_image(file_content)
-    
-    # Save compressed file locally
-    # Save compressed file locally
-    if os.getenv("VERCEL"):
-        upload_dir = "/tmp/uploads"
-    else:
-        upload_dir = "uploads"
-    
-    file_location = f"{upload_dir}/{file.filename}"
-    os.makedirs(upload_dir, exist_ok=True)
-    with open(file_location, "wb") as file_object:
-        file_object.write(compressed_content)
-    
-    # Use AI to recognize food
-    recognition_result = recognize_food(file_location)
+def _build_result(recognition_result: Dict[str, Any]) -> Dict[str, Any]:
+    """Combine a recognition result with its nutritional data"""
     food_name = recognition_result['name']
-    confidence = recognition_result['confidence']
-    
-    # Get nutritional data
     nutrition_data = get_nutritional_data(food_name)
-    
-    # Combine results
-    result = {
+    return {
         "name": food_name,
-        "confidence": confidence,
+        "confidence": recognition_result['confidence'],
         "calories": nutrition_data['calories'],
         "macros": {
             "protein": nutrition_data['protein'],
@@ -79,41 +45,297 @@ async def analyze_food(file: UploadFile = File(...), user_id: int = 1):
             "fat": nutrition_data['fat']
         },
         "healthScore": nutrition_data['healthScore'],
-        "ingredients": nutrition_data['ingredients']
+        "ingredients": list(nutrition_data['ingredients'])
     }
+
+def _with_nutrition_data(scan: Dict[str, Any]) -> Dict[str, Any]:
+    """Add a scan row's nutrition_json as nutrition_data
+
+    Stored JSON text is embedded in responses as a raw fragment, so it is
+    never parsed and re-encoded.
+    """
+    if scan.get('nutrition_json'):
+        scan['nutrition_data'] = raw_json(scan['nutrition_json']) if isinstance(scan['nutrition_json'], str) else scan['nutrition_json']
+    return scan
+
+async def flush_scan_records(entries: List[Dict[str, Any]]):
+    """Flush handler of the scan write-behind buffer: one bulk write
+
+    Raises FlushError with the entries that could not be saved, so the
+    buffer retries them.
+    """
+    repository = get_repository()
+    failed = []
+    if await repository.record_scan_batch(entries) is None:
+        # The batch is written in one transaction, so one bad entry (e.g. an
+        # unknown user) fails all of it; fall back to one call per entry
+        for entry in entries:
+            if await repository.record_scan(entry['user_id'], entry['scans'], coins=entry['coins'],
+                                            description=entry['description']) is None:
+                failed.append(entry)
+    # The bulk call does not return the saved rows, so re-read these users
+    get_recent_scans_cache().invalidate({entry['user_id'] for entry in entries})
+    if failed:
+        raise FlushError(failed, f"could not record buffered scans for users {[entry['user_id'] for entry in failed]}")
+
+async def _persist_scans(user_id: int, scans: List[Dict[str, Any]], coins: int, description: str,
+                         idempotency_key: Optional[str] = None) -> Tuple[int, Optional[int]]:
+    """Save scans and award their coins; returns (coins awarded, new balance)
+
+    In write-behind mode the record is only buffered and the new balance is
+    not known yet, so it is None. A failed save awards nothing. Saves with an
+    idempotency key (async scan jobs, which may be retried) are written
+    through, and a repeated save returns the first one's result.
+    """
+    writer = get_scan_writer()
+    if writer is not None and idempotency_key is None:
+        await writer.enqueue({'user_id': user_id, 'scans': scans, 'coins': coins, 'description': description})
+        return coins, None
+    options = {'idempotency_key': idempotency_key} if idempotency_key is not None else {}
+    record = await get_repository().record_scan(user_id, scans, coins=coins, description=description, **options)
+    if not record:
+        return 0, None
+    # Write-through: cached recent scans pick up the saved rows
+    get_recent_scans_cache().add(user_id, [_with_nutrition_data(row) for row in record.get("scans") or []])
+    return coins, record["new_balance"]
+
+async def _scan_image(content: bytes, user_id: int, idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+    """Compress, store, recognize, save and reward one uploaded image"""
+    # Compress (CPU work runs on the bounded executor). The prepared image
+    # carries the compressed bytes, their hash and the analysis thumbnail
+    # through the rest of the pipeline in memory.
+    prepared = await run_cpu(prepare_image, content)
     
-    # Save to Supabase
-    create_scan(
-        user_id=user_id,
-        food_name=result["name"],
-        confidence=result["confidence"],
-        image_path=file_location,
-        nutrition_json=json.dumps(result)
+    # Store the image under its content hash (identical uploads share one
+    # object) while the AI recognizes the food from the in-memory copy
+    stored, recognition_results = await asyncio.gather(
+        run_io(store_content, prepared.content, prepared.sha256),
+        recognize_images([prepared])
     )
+    recognition_result = recognition_results[0]
+    food_name = recognition_result['name']
     
-    # Award coins for the scan
-    from backend.routers.coins import award_coins
-    coin_result = award_coins(
-        user_id=user_id,
-        amount=1,
-        transaction_type="scan",
-        description=f"Scanned {food_name}"
+    # Get nutritional data and combine results
+    result = _build_result(recognition_result)
+    
+    # Save the scan and award its coin in one round trip
+    coins_earned, total_coins = await _persist_scans(
+        user_id,
+        [{
+            'food_name': result["name"],
+            'confidence': result["confidence"],
+            'image_path': stored.url,
+            'nutrition_json': dumps_str(result)
+        }],
+        coins=1,
+        description=f"Scanned {food_name}",
+        idempotency_key=idempotency_key
     )
     
     # Add coin information to result
-    result["coins_earned"] = 1
-    result["total_coins"] = coin_result["new_balance"]
+    result["coins_earned"] = coins_earned
+    result["total_coins"] = total_coins
     
     return result
 
+async def run_scan_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Process a queued async scan (runs on the scan job workers)
+
+    A job can run more than once (a retry, or a lease taken over after a
+    crash), so the save is keyed by the job id: only the first run records
+    the scan and awards its coin. The workers delete the upload once the job
+    is finished.
+    """
+    content = await run_io(get_storage().get, job['image_key'])
+    if content is None:
+        raise ValueError("Uploaded image is missing")
+    return await _scan_image(content, job['user_id'], idempotency_key=f"scan-job:{job['id']}")
+
+@router.post("/analyze")
+async def analyze_food(file: UploadFile = File(...), user_id: int = 1, mode: str = "sync"):
+    """Analyze one food image.
+
+    With mode=async the upload is stored and queued, and the response is a
+    202 with a job id right away; the result is available from
+    /api/scan/jobs/{job_id} (polling) or /api/scan/jobs/{job_id}/events (SSE).
+    """
+    if mode not in ("sync", "async"):
+        raise HTTPException(status_code=400, detail="mode must be 'sync' or 'async'")
+    
+    # Read the upload into a bounded buffer
+    upload = await ingest_upload(file)
+    
+    if mode == "async":
+        job = await submit_scan_job(upload.content, user_id, file.filename)
+        status_url = f"/api/scan/jobs/{job['id']}"
+        return JSONResponse(
+            status_code=202,
+            content={**public_job(job), "status_url": status_url, "events_url": f"{status_url}/events"},
+            headers={"Location": status_url}
+        )
+    
+    content = upload.content
+    upload.content = b''
+    return await _scan_image(content, user_id)
+
+async def _get_job_or_404(job_id: str) -> Dict[str, Any]:
+    job = await run_io(get_scan_job_queue().get, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Scan job not found")
+    return job
+
+@router.get("/jobs/{job_id}")
+async def get_scan_job(job_id: str):
+    """Get the status (and, once done, the result) of an async scan"""
+    return public_job(await _get_job_or_404(job_id))
+
+@router.get("/jobs/{job_id}/events")
+async def stream_scan_job(job_id: str):
+    """Server-Sent Events stream of an async scan's status until it finishes"""
+    job = await _get_job_or_404(job_id)
+    
+    async def events():
+        nonlocal job
+        last_status = None
+        idle_seconds = 0.0
+        while True:
+            if job['status'] != last_status:
+                last_status = job['status']
+                idle_seconds = 0.0
+                yield f"event: {last_status}\ndata: {dumps_str(public_job(job))}\n\n"
+                if last_status in FINISHED:
+                    return
+            elif idle_seconds >= SSE_KEEPALIVE_SECONDS:
+                idle_seconds = 0.0
+                yield ": keep-alive\n\n"
+            # Woken by local workers; the timeout also picks up changes made
+            # by workers in other processes
+            await wait_for_job_update(job_id, SCAN_JOB_POLL_SECONDS)
+            idle_seconds += SCAN_JOB_POLL_SECONDS
+            job = await run_io(get_scan_job_queue().get, job_id)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/analyze-batch")
+async def analyze_batch(files: List[UploadFile] = File(...), user_id: int = 1):
+    """Analyze several images at once.
+
+    Images are compressed in parallel, recognized with one multi-input
+    Clarifai request, then saved and rewarded with one record_scan call.
+    Results (or per-image errors) come back in upload order.
+    """
+    if len(files) > MAX_BATCH_IMAGES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_IMAGES} images per batch")
+    
+    # Validate uploads; invalid ones get an error entry and are skipped
+    items: List[Dict[str, Any]] = [{"index": i, "filename": f.filename} for i, f in enumerate(files)]
+    contents: Dict[int, bytes] = {}
+    for i, upload in enumerate(files):
+        if upload.content_type and not upload.content_type.startswith("image/"):
+            items[i].update({"success": False, "error": "File must be an image"})
+            continue
+        try:
+            ingested = await ingest_upload(upload)
+        except HTTPException as e:
+            items[i].update({"success": False, "error": e.detail})
+            continue
+        if not ingested.size:
+            items[i].update({"success": False, "error": "Empty file"})
+            continue
+        contents[i] = ingested.content
+    
+    coins_earned, total_coins = 0, None
+    valid = list(contents)
+    if valid:
+        # Compress all images in parallel on the CPU executor; an image that
+        # fails here (or in storage below) gets an error entry of its own
+        prepared = await asyncio.gather(*[run_cpu(prepare_image, contents[i]) for i in valid],
+                                        return_exceptions=True)
+        contents.clear()
+        for i, image in zip(list(valid), prepared):
+            if isinstance(image, Exception):
+                print(f"Error preparing batch image {i}: {image}")
+                items[i].update({"success": False, "error": "Image could not be processed"})
+                valid.remove(i)
+        prepared = [image for image in prepared if not isinstance(image, Exception)]
+    
+    if valid:
+        # Store every image while one multi-input recognition call handles
+        # the whole batch
+        stored_objects = asyncio.gather(*[
+            run_io(store_content, image.content, image.sha256) for image in prepared
+        ], return_exceptions=True)
+        stored, recognition_results = await asyncio.gather(
+            stored_objects, recognize_images(list(prepared))
+        )
+        
+        scan_rows = []
+        for i, stored_object, recognition_result in zip(valid, stored, recognition_results):
+            if isinstance(stored_object, Exception):
+                print(f"Error storing batch image {i}: {stored_object}")
+                items[i].update({"success": False, "error": "Image could not be stored"})
+                continue
+            result = _build_result(recognition_result)
+            items[i].update({"success": True, **result})
+            scan_rows.append({
+                'food_name': result["name"],
+                'confidence': result["confidence"],
+                'image_path': stored_object.url,
+                'nutrition_json': dumps_str(result)
+            })
+        
+        # Persist every scan and award their coins with one round trip
+        if scan_rows:
+            coins_earned, total_coins = await _persist_scans(
+                user_id,
+                scan_rows,
+                coins=len(scan_rows),
+                description=f"Scanned {len(scan_rows)} foods"
+            )
+    
+    return {
+        "results": items,
+        "coins_earned": coins_earned,
+        "total_coins": total_coins
+    }
+
 @router.get("/recent")
 async def get_recent(user_id: int = 1, limit: int = 10):
-    """Get recent scans for a user"""
-    scans = get_recent_scans(user_id, limit)
+    """Get recent scans for a user (served from the per-user cache when possible)"""
+    cache = get_recent_scans_cache()
+    scans = cache.get(user_id, limit)
+    if scans is not None:
+        return FastJSONResponse(scans)
     
-    # Parse nutrition_json for each scan
-    for scan in scans:
-        if scan.get('nutrition_json'):
-            scan['nutrition_data'] = json.loads(scan['nutrition_json']) if isinstance(scan['nutrition_json'], str) else scan['nutrition_json']
+    # Read at least a full cache entry, so later calls with other limits hit
+    requested = max(limit, cache.per_user)
+    token = cache.write_token()
+    scans = await get_repository().get_recent_scans(user_id, requested)
     
-    return scans
+    scans = [_with_nutrition_data(scan) for scan in scans]
+    # An empty list may be a failed read, so it is not cached
+    if scans:
+        cache.fill(user_id, scans, requested, token)
+    return FastJSONResponse(scans[:limit])
+
+@router.get("/metrics")
+async def get_scan_metrics():
+    """Get scan pipeline metrics (cache hit/miss counters etc.)"""
+    return {
+        "recognition_cache": get_recognition_cache().stats(),
+        "perceptual_index": get_perceptual_index().stats(),
+        "uploads": get_upload_stats(),
+        "storage": get_storage_stats(),
+        "derivatives": get_derivative_stats(),
+        "clarifai_breaker": get_clarifai_breaker().stats(),
+        "recognition_backend": get_recognition_backend().stats(),
+        "recognition_batcher": get_recognition_batcher().stats(),
+        "scan_jobs": get_scan_job_queue().stats(),
+        "nutrition_catalog": get_nutrition_catalog().stats(),
+        "write_behind": get_scan_writer().stats() if get_scan_writer() else {"enabled": False},
+        "recent_scans_cache": get_recent_scans_cache().stats()
+    }
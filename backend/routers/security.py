@@ -1,7 +1,7 @@
 from fastapi import APIRouter, HTTPException
 from typing import Optional
 from datetime import datetime, timedelta
-from backend.services.supabase_client import get_supabase_client
+from backend.services.supabase_async import get_async_supabase
 
 router = APIRouter(prefix="/security", tags=["Security & Logs"])
 
@@ -18,7 +18,7 @@ async def get_security_events(
 ):
     """Get security events with filters"""
     try:
-        supabase = get_supabase_client()
+        supabase = get_async_supabase()
         
         query = supabase.table('security_events').select('*')
         
@@ -29,7 +29,7 @@ async def get_security_events(
         if admin_user_id:
             query = query.eq('admin_user_id', admin_user_id)
         
-        response = query.order('created_at', desc=True).limit(limit).execute()
+        response = await query.order('created_at', desc=True).limit(limit).execute()
         return response.data
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -38,10 +38,10 @@ async def get_security_events(
 async def get_security_stats():
     """Get security event statistics"""
     try:
-        supabase = get_supabase_client()
+        supabase = get_async_supabase()
         
         # Get all events
-        events = supabase.table('security_events').select('*').execute().data
+        events = (await supabase.table('security_events').select('*').execute()).data
         
         if not events:
             return {
@@ -92,7 +92,7 @@ async def get_login_history(
 ):
     """Get login history with filters"""
     try:
-        supabase = get_supabase_client()
+        supabase = get_async_supabase()
         
         query = supabase.table('login_history').select('*')
         
@@ -101,7 +101,7 @@ async def get_login_history(
         if username:
             query = query.eq('username', username)
         
-        response = query.order('created_at', desc=True).limit(limit).execute()
+        response = await query.order('created_at', desc=True).limit(limit).execute()
         return response.data
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -110,10 +110,10 @@ async def get_login_history(
 async def get_login_stats():
     """Get login history statistics"""
     try:
-        supabase = get_supabase_client()
+        supabase = get_async_supabase()
         
         # Get all login attempts
-        logins = supabase.table('login_history').select('*').execute().data
+        logins = (await supabase.table('login_history').select('*').execute()).data
         
         if not logins:
             return {
@@ -158,11 +158,11 @@ async def get_login_stats():
 async def get_active_sessions():
     """Get all active sessions"""
     try:
-        supabase = get_supabase_client()
+        supabase = get_async_supabase()
         
         # Get sessions that haven't expired
         now = datetime.utcnow().isoformat()
-        response = supabase.table('admin_sessions')\
+        response = await supabase.table('admin_sessions')\
             .select('*, admin_users(username, email, name)')\
             .gte('expires_at', now)\
             .order('created_at', desc=True)\
@@ -176,9 +176,9 @@ async def get_active_sessions():
 async def force_logout_session(session_id: int):
     """Force logout a session"""
     try:
-        supabase = get_supabase_client()
+        supabase = get_async_supabase()
         
-        response = supabase.table('admin_sessions').delete().eq('id', session_id).execute()
+        response = await supabase.table('admin_sessions').delete().eq('id', session_id).execute()
         
         if not response.data:
             raise HTTPException(status_code=404, detail="Session not found")
@@ -193,17 +193,17 @@ async def force_logout_session(session_id: int):
 async def get_session_stats():
     """Get session statistics"""
     try:
-        supabase = get_supabase_client()
+        supabase = get_async_supabase()
         
         # Get all sessions
-        all_sessions = supabase.table('admin_sessions').select('*').execute().data
+        all_sessions = (await supabase.table('admin_sessions').select('*').execute()).data
         
         # Get active sessions
         now = datetime.utcnow().isoformat()
-        active_sessions = supabase.table('admin_sessions')\
+        active_sessions = (await supabase.table('admin_sessions')\
             .select('*')\
             .gte('expires_at', now)\
-            .execute().data
+            .execute()).data
         
         return {
             "total_sessions": len(all_sessions),
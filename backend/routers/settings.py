@@ -2,7 +2,7 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import Optional, List, Dict
 from datetime import datetime
-from backend.services.supabase_client import get_supabase_client
+from backend.services.supabase_async import get_async_supabase
 
 router = APIRouter(prefix="/settings", tags=["App Settings"])
 
@@ -21,8 +21,8 @@ class BulkSettingsUpdate(BaseModel):
 async def get_all_settings():
     """Get all app settings"""
     try:
-        supabase = get_supabase_client()
-        response = supabase.table('app_settings').select('*').order('category').execute()
+        supabase = get_async_supabase()
+        response = await supabase.table('app_settings').select('*').order('category').execute()
         
         # Group by category
         settings_by_category = {}
@@ -40,8 +40,8 @@ async def get_all_settings():
 async def get_settings_by_category(category: str):
     """Get settings by category"""
     try:
-        supabase = get_supabase_client()
-        response = supabase.table('app_settings')\
+        supabase = get_async_supabase()
+        response = await supabase.table('app_settings')\
             .select('*')\
             .eq('category', category)\
             .execute()
@@ -53,8 +53,8 @@ async def get_settings_by_category(category: str):
 async def get_setting(setting_key: str):
     """Get single setting by key"""
     try:
-        supabase = get_supabase_client()
-        response = supabase.table('app_settings')\
+        supabase = get_async_supabase()
+        response = await supabase.table('app_settings')\
             .select('*')\
             .eq('setting_key', setting_key)\
             .execute()
@@ -72,14 +72,14 @@ async def get_setting(setting_key: str):
 async def update_setting(setting_key: str, update: SettingUpdate):
     """Update single setting"""
     try:
-        supabase = get_supabase_client()
+        supabase = get_async_supabase()
         
         update_data = {
             'setting_value': update.setting_value,
             'updated_at': datetime.utcnow().isoformat()
         }
         
-        response = supabase.table('app_settings')\
+        response = await supabase.table('app_settings')\
             .update(update_data)\
             .eq('setting_key', setting_key)\
             .execute()
@@ -100,7 +100,7 @@ async def update_setting(setting_key: str, update: SettingUpdate):
 async def bulk_update_settings(update: BulkSettingsUpdate):
     """Update multiple settings at once"""
     try:
-        supabase = get_supabase_client()
+        supabase = get_async_supabase()
         updated_settings = []
         
         for setting_key, setting_value in update.settings.items():
@@ -109,7 +109,7 @@ async def bulk_update_settings(update: BulkSettingsUpdate):
                 'updated_at': datetime.utcnow().isoformat()
             }
             
-            response = supabase.table('app_settings')\
+            response = await supabase.table('app_settings')\
                 .update(update_data)\
                 .eq('setting_key', setting_key)\
                 .execute()
@@ -1,8 +1,7 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import Optional
-from datetime import datetime
-from backend.services.supabase_client import get_supabase_client
+from backend.services.repository import get_repository
 
 router = APIRouter(prefix="/users", tags=["User Management"])
 
@@ -25,56 +24,52 @@ class UserUpdate(BaseModel):
 @router.post("/create")
 async def create_user(user: UserCreate):
     """Create a new user"""
-    try:
-        supabase = get_supabase_client()
-        
-        # Check if user already exists
-        existing = supabase.table('users').select('*').eq('phone_number', user.phone_number).execute()
-        if existing.data:
-            raise HTTPException(status_code=400, detail="User with this phone number already exists")
-        
-        user_data = {
-            'phone_number': user.phone_number,
-            'name': user.name,
-            'email': user.email,
-            'coins': user.coins,
-            'created_at': datetime.utcnow().isoformat(),
-            'updated_at': datetime.utcnow().isoformat()
-        }
-        
-        response = supabase.table('users').insert(user_data).execute()
-        
-        return {
-            "message": "User created successfully",
-            "user": response.data[0] if response.data else None
-        }
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    repository = get_repository()
+
+    # Check if user already exists
+    if await repository.get_user_by_phone(user.phone_number):
+        raise HTTPException(status_code=400, detail="User with this phone number already exists")
+
+    created = await repository.create_user(user.phone_number, name=user.name, email=user.email)
+    if not created:
+        raise HTTPException(status_code=500, detail="Failed to create user")
+    if user.coins:
+        # Starting coins go through the ledger like every other balance change
+        balance = await repository.increment_coins(created['id'], user.coins, transaction_type='admin_adjustment',
+                                                   description='Starting balance')
+        if balance is not None:
+            created['coins'] = balance
+
+    return {
+        "message": "User created successfully",
+        "user": created
+    }
 
 @router.put("/{user_id}")
 async def update_user(user_id: int, user_update: UserUpdate):
     """Update user details"""
-    try:
-        supabase = get_supabase_client()
-        
-        update_data = {k: v for k, v in user_update.dict().items() if v is not None}
-        update_data['updated_at'] = datetime.utcnow().isoformat()
-        
-        if not update_data:
-            raise HTTPException(status_code=400, detail="No data to update")
-        
-        response = supabase.table('users').update(update_data).eq('id', user_id).execute()
-        
-        if not response.data:
-            raise HTTPException(status_code=404, detail="User not found")
-        
-        return {
-            "message": "User updated successfully",
-            "user": response.data[0]
-        }
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    repository = get_repository()
+    if user_update.name is None and user_update.email is None and user_update.coins is None:
+        raise HTTPException(status_code=400, detail="No data to update")
+
+    user = await repository.get_user_by_id(user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    if user_update.name is not None or user_update.email is not None:
+        user = await repository.update_user_profile(user_id, name=user_update.name, email=user_update.email)
+        if not user:
+            raise HTTPException(status_code=500, detail="Failed to update user")
+    difference = user_update.coins - (user.get('coins') or 0) if user_update.coins is not None else 0
+    if difference:
+        # Setting a balance is recorded as the difference in the coin ledger
+        balance = await repository.increment_coins(user_id, difference, transaction_type='admin_adjustment',
+                                                   description='Balance set by admin')
+        if balance is None:
+            raise HTTPException(status_code=500, detail="Failed to update coins")
+        user['coins'] = balance
+
+    return {
+        "message": "User updated successfully",
+        "user": user
+    }
@@ -1,9 +1,21 @@
 import os
+import time
+import asyncio
 import base64
-import requests
-import random
-from typing import Dict, Any
+import httpx
+from typing import Dict, Any, Tuple, Optional, List, Union, Mapping
 from PIL import Image
+from backend.services.executors import run_cpu, run_io
+from backend.services.recognition_cache import get_recognition_cache, content_hash
+from backend.services.perceptual_index import get_perceptual_index, dhash
+from backend.services.color_classifier import analyze_image_colors
+from backend.services.image_processing import decode_thumbnail, PreparedImage
+from backend.services.circuit_breaker import CircuitBreaker
+from backend.services.recognition_backends import RecognitionBackend, register_backend, get_recognition_backend
+from backend.services.micro_batcher import MicroBatcher
+from backend.services.nutrition_catalog import get_nutrition_catalog
+# Registers the offline 'local' backend
+from backend.services import local_recognition  # noqa: F401
 
 # Clarifai API configuration
 CLARIFAI_API_KEY = os.getenv('CLARIFAI_API_KEY', 'demo_key')
@@ -11,35 +23,304 @@ CLARIFAI_USER_ID = 'clarifai'
 CLARIFAI_APP_ID = 'main'
 CLARIFAI_MODEL_ID = 'food-item-recognition'
 CLARIFAI_MODEL_VERSION_ID = 'dfebc169854e429086aceb8368662641'
-CLARIFAI_TIMEOUT = 5  # 5 second timeout
+CLARIFAI_API_URL = os.getenv('CLARIFAI_API_URL', 'https://api.clarifai.com')
+CLARIFAI_TIMEOUT = 5  # 5 second timeout (upper bound of the adaptive timeout)
+CLARIFAI_MIN_TIMEOUT = float(os.getenv('CLARIFAI_MIN_TIMEOUT', '1.0'))
+CLARIFAI_MAX_BATCH = int(os.getenv('CLARIFAI_MAX_BATCH', '32'))  # inputs per outputs request
 
-def analyze_image_colors(image_path: str) -> str:
-    """Analyze image colors to make educated guess about food type"""
+# Shared async HTTP client (keeps connections to Clarifai alive between scans)
+_http_client = None
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get or create the shared async HTTP client"""
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(timeout=CLARIFAI_TIMEOUT)
+    return _http_client
+
+async def close_http_client():
+    """Close the shared async HTTP client (called from the app lifespan)"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+# Circuit breaker around Clarifai: skips the provider while it is failing and
+# derives the request timeout from recently observed latency
+CLARIFAI_BREAKER_WINDOW = int(os.getenv('CLARIFAI_BREAKER_WINDOW', '50'))
+CLARIFAI_BREAKER_MIN_CALLS = int(os.getenv('CLARIFAI_BREAKER_MIN_CALLS', '10'))
+CLARIFAI_BREAKER_FAILURE_RATE = float(os.getenv('CLARIFAI_BREAKER_FAILURE_RATE', '0.5'))
+CLARIFAI_BREAKER_OPEN_SECONDS = float(os.getenv('CLARIFAI_BREAKER_OPEN_SECONDS', '30'))
+
+_clarifai_breaker = None
+
+def get_clarifai_breaker() -> CircuitBreaker:
+    """Get or create the Clarifai circuit breaker"""
+    global _clarifai_breaker
+    if _clarifai_breaker is None:
+        _clarifai_breaker = CircuitBreaker(
+            'clarifai',
+            window=CLARIFAI_BREAKER_WINDOW,
+            min_calls=CLARIFAI_BREAKER_MIN_CALLS,
+            failure_threshold=CLARIFAI_BREAKER_FAILURE_RATE,
+            open_seconds=CLARIFAI_BREAKER_OPEN_SECONDS,
+            max_timeout=CLARIFAI_TIMEOUT,
+            min_timeout=CLARIFAI_MIN_TIMEOUT
+        )
+    return _clarifai_breaker
+
+# Micro-batching: cache misses from concurrent scans are coalesced into one
+# backend call (one multi-input Clarifai request per batch)
+RECOGNITION_BATCH_SIZE = int(os.getenv('RECOGNITION_BATCH_SIZE', '16'))
+RECOGNITION_BATCH_WAIT_MS = float(os.getenv('RECOGNITION_BATCH_WAIT_MS', '5'))
+RECOGNITION_MAX_IN_FLIGHT = int(os.getenv('RECOGNITION_MAX_IN_FLIGHT', '8'))
+
+_recognition_batcher = None
+
+async def _recognize_batch(items: List[Tuple[bytes, Optional[Image.Image]]]) -> List[Tuple[Dict[str, Any], bool]]:
+    """Batch handler: one backend call for (image, thumbnail) pairs from any number of scans"""
+    return await get_recognition_backend().recognize(
+        [image for image, _ in items], [thumbnail for _, thumbnail in items]
+    )
+
+def get_recognition_batcher() -> MicroBatcher:
+    """Get or create the recognition micro-batcher"""
+    global _recognition_batcher
+    if _recognition_batcher is None:
+        _recognition_batcher = MicroBatcher(
+            _recognize_batch,
+            max_batch=RECOGNITION_BATCH_SIZE,
+            max_wait=RECOGNITION_BATCH_WAIT_MS / 1000,
+            max_in_flight=RECOGNITION_MAX_IN_FLIGHT
+        )
+    return _recognition_batcher
+
+async def close_recognition_batcher():
+    """Stop the recognition micro-batcher (called from the app lifespan)"""
+    global _recognition_batcher
+    if _recognition_batcher is not None:
+        await _recognition_batcher.close()
+        _recognition_batcher = None
+
+def _build_clarifai_payload(images: List[bytes]) -> Dict[str, Any]:
+    """Build the Clarifai outputs request body; input ids are list positions"""
+    return {
+        "user_app_id": {
+            "user_id": CLARIFAI_USER_ID,
+            "app_id": CLARIFAI_APP_ID
+        },
+        "inputs": [
+            {
+                "id": str(position),
+                "data": {
+                    "image": {
+                        "base64": base64.b64encode(image_bytes).decode('utf-8')
+                    }
+                }
+            }
+            for position, image_bytes in enumerate(images)
+        ]
+    }
+
+def _read_file(image_path: str) -> bytes:
+    with open(image_path, 'rb') as f:
+        return f.read()
+
+def _thumbnail_phash(thumbnail: Optional[Image.Image]) -> Optional[int]:
+    """dHash of an analysis thumbnail (None for missing or flat images)"""
+    if thumbnail is None:
+        return None
+    phash = dhash(thumbnail)
+    # A flat image has no gradients, so every flat image shares this hash
+    if phash == 0:
+        return None
+    return phash
+
+def _prepare_analysis(image_bytes: bytes) -> Tuple[Optional[Image.Image], Optional[int]]:
+    """Decode one small copy shared by the perceptual hash and color fallback.
+
+    Returns the thumbnail and its dHash (None for undecodable or flat images).
+    """
     try:
-        img = Image.open(image_path)
-        img = img.resize((100, 100))  # Reduce size for faster processing
-        pixels = list(img.getdata())
+        thumbnail = decode_thumbnail(image_bytes)
+    except Exception as e:
+        print(f"Image decode error: {e}")
+        return None, None
+    return thumbnail, _thumbnail_phash(thumbnail)
+
+async def _fallback_result(thumbnail: Optional[Image.Image], low: int, high: int) -> Dict[str, Any]:
+    """Run the color-analysis fallback off the event loop.
+
+    Confidence is placed inside [low, high] by how close the image is to the
+    chosen color profile, so the result is stable for a given image.
+    """
+    food_name, closeness = await run_cpu(analyze_image_colors, thumbnail)
+    return {
+        'name': food_name,
+        'confidence': low + int(round((high - low) * closeness))
+    }
+
+async def _call_clarifai(images: List[bytes], timeout: float = CLARIFAI_TIMEOUT) -> List[Optional[Dict[str, Any]]]:
+    """Recognize several images with one Clarifai outputs request.
+
+    Returns one entry per image, in order: the top concept, or None when
+    Clarifai returned no concepts for that input. Transport and HTTP errors
+    propagate to the caller.
+    """
+    payload = _build_clarifai_payload(images)
+    
+    # Prepare API request
+    url = f"{CLARIFAI_API_URL}/v2/models/{CLARIFAI_MODEL_ID}/versions/{CLARIFAI_MODEL_VERSION_ID}/outputs"
+    
+    headers = {
+        'Authorization': f'Key {CLARIFAI_API_KEY}',
+        'Content-Type': 'application/json'
+    }
+    
+    # Make API request with timeout
+    client = get_http_client()
+    response = await client.post(url, json=payload, headers=headers, timeout=timeout)
+    response.raise_for_status()
+    
+    results: List[Optional[Dict[str, Any]]] = [None] * len(images)
+    for position, output in enumerate(response.json().get('outputs') or []):
+        # Outputs normally echo the input id; fall back to response order
+        input_id = output.get('input', {}).get('id')
+        if input_id is not None and input_id.isdigit():
+            position = int(input_id)
+        concepts = output.get('data', {}).get('concepts')
+        if concepts and 0 <= position < len(images):
+            top_concept = concepts[0]
+            results[position] = {
+                'name': top_concept['name'].title(),
+                'confidence': int(top_concept['value'] * 100)
+            }
+    return results
+
+@register_backend('clarifai')
+class ClarifaiBackend(RecognitionBackend):
+    """Clarifai food model, with the color classifier as fallback"""
+
+    async def recognize(self, images, thumbnails):
+        """Call Clarifai for a group of images, falling back to color analysis.
+
+        Clarifai results are authoritative; fallback guesses are not and are
+        never cached, so a later scan can still reach Clarifai. While the
+        circuit breaker is open, Clarifai is not called at all.
+        """
+        breaker = get_clarifai_breaker()
+        outcomes = []
+        for start in range(0, len(images), CLARIFAI_MAX_BATCH):
+            chunk = images[start:start + CLARIFAI_MAX_BATCH]
+            chunk_thumbnails = thumbnails[start:start + CLARIFAI_MAX_BATCH]
+            if not breaker.allow_request():
+                provider_results = [None] * len(chunk)
+                low, high = 65, 75
+            else:
+                started = time.monotonic()
+                try:
+                    provider_results = await _call_clarifai(chunk, timeout=breaker.current_timeout())
+                    breaker.record_success(time.monotonic() - started)
+                    low, high = 75, 85
+                except asyncio.CancelledError:
+                    # Cancelled by the caller: says nothing about Clarifai,
+                    # but a half-open probe must not keep its slot
+                    breaker.release_probe()
+                    raise
+                except httpx.TimeoutException:
+                    print(f"Clarifai API timeout - using fallback recognition")
+                    breaker.record_failure(time.monotonic() - started)
+                    provider_results = [None] * len(chunk)
+                    low, high = 70, 80
+                except Exception as e:
+                    print(f"Error recognizing food: {e}")
+                    breaker.record_failure(time.monotonic() - started)
+                    provider_results = [None] * len(chunk)
+                    low, high = 65, 75
+            
+            for provider_result, thumbnail in zip(provider_results, chunk_thumbnails):
+                if provider_result is not None:
+                    outcomes.append((provider_result, True))
+                else:
+                    # Fallback to color analysis
+                    outcomes.append((await _fallback_result(thumbnail, low, high), False))
+        return outcomes
+
+@register_backend('color')
+class ColorBackend(RecognitionBackend):
+    """Color-profile classifier only (no network)"""
+
+    async def recognize(self, images, thumbnails):
+        return [(await _fallback_result(thumbnail, 65, 75), False) for thumbnail in thumbnails]
+
+async def recognize_images(images: List[Union[bytes, PreparedImage]]) -> List[Dict[str, Any]]:
+    """
+    Recognize several in-memory images, sending all cache misses to the
+    configured recognition backend (RECOGNITION_BACKEND)
+    
+    Results are cached by a hash of the image bytes, so a repeated upload
+    skips both the backend and the color fallback. On a miss, a
+    perceptual-hash index of recent scans lets a near-duplicate photo reuse
+    an earlier Clarifai result. Misses go through the micro-batcher, so
+    misses from concurrent scans share one backend call (for Clarifai, one
+    multi-input request through the shared async HTTP client). Image
+    analysis runs on the bounded executors, so this never blocks the event
+    loop.
+    
+    Args:
+        images: Compressed image bytes or PreparedImage objects, one entry
+            per image. PreparedImage reuses its hash and thumbnail, so the
+            image is neither hashed nor decoded again here.
         
-        # Calculate average color
-        avg_r = sum(p[0] for p in pixels) / len(pixels)
-        avg_g = sum(p[1] for p in pixels) / len(pixels)
-        avg_b = sum(p[2] for p in pixels) / len(pixels)
+    Returns:
+        List of dicts containing food name and confidence, in input order
+    """
+    cache = get_recognition_cache()
+    index = get_perceptual_index()
+    results: List[Optional[Dict[str, Any]]] = [None] * len(images)
+    pending = []  # (position, cache key, thumbnail, phash)
+    
+    contents = [image.content if isinstance(image, PreparedImage) else image for image in images]
+    
+    for position, image in enumerate(images):
+        cache_key = image.sha256 if isinstance(image, PreparedImage) else content_hash(image)
+        cached = await run_io(cache.get, cache_key)
+        if cached is not None:
+            results[position] = cached
+            continue
         
-        # Simple heuristics based on color
-        if avg_r > 150 and avg_g < 100:  # Reddish
-            return random.choice(['Pizza', 'Burger', 'Pasta with Tomato Sauce'])
-        elif avg_g > avg_r and avg_g > avg_b:  # Greenish
-            return random.choice(['Salad', 'Vegetables', 'Green Smoothie'])
-        elif avg_r > 200 and avg_g > 150 and avg_b < 100:  # Yellowish
-            return random.choice(['Rice', 'Pasta', 'Chicken'])
-        elif avg_r > 100 and avg_g > 80 and avg_b > 60:  # Brownish
-            return random.choice(['Chicken', 'Beef', 'Sandwich'])
+        # Near-duplicate of a recent scan (same plate, slightly different angle)
+        if isinstance(image, PreparedImage):
+            thumbnail = image.thumbnail
+            phash = await run_cpu(_thumbnail_phash, thumbnail)
         else:
-            return random.choice(['Mixed Meal', 'Healthy Bowl', 'Lunch Plate'])
-    except:
-        return 'Delicious Food'
+            thumbnail, phash = await run_cpu(_prepare_analysis, image)
+        if phash is not None:
+            match = await run_cpu(index.lookup, phash)
+            if match is not None:
+                results[position] = match[0]
+                await run_io(cache.set, cache_key, match[0])
+                continue
+        pending.append((position, cache_key, thumbnail, phash))
+    
+    if pending:
+        batcher = get_recognition_batcher()
+        outcomes = await asyncio.gather(*[
+            batcher.submit((contents[position], thumbnail)) for position, _, thumbnail, _ in pending
+        ])
+        for (position, cache_key, _, phash), (result, from_provider) in zip(pending, outcomes):
+            results[position] = result
+            # Fallback guesses are not cached, so the next scan of the
+            # image asks the provider again
+            if not from_provider:
+                continue
+            await run_io(cache.set, cache_key, result)
+            if phash is not None:
+                await run_cpu(index.add, phash, result)
+    
+    return results
 
-def recognize_food(image_path: str) -> Dict[str, Any]:
+async def recognize_food(image_path: str) -> Dict[str, Any]:
     """
     Recognize food from image using Clarifai API with fallback
     
@@ -50,201 +331,27 @@ def recognize_food(image_path: str) -> Dict[str, Any]:
         Dict containing food name and confidence
     """
     try:
-        # Read and encode image
-        with open(image_path, 'rb') as f:
-            image_bytes = f.read()
-        
-        base64_image = base64.b64encode(image_bytes).decode('utf-8')
-        
-        # Prepare API request
-        url = f"https://api.clarifai.com/v2/models/{CLARIFAI_MODEL_ID}/versions/{CLARIFAI_MODEL_VERSION_ID}/outputs"
-        
-        headers = {
-            'Authorization': f'Key {CLARIFAI_API_KEY}',
-            'Content-Type': 'application/json'
-        }
-        
-        payload = {
-            "user_app_id": {
-                "user_id": CLARIFAI_USER_ID,
-                "app_id": CLARIFAI_APP_ID
-            },
-            "inputs": [
-                {
-                    "data": {
-                        "image": {
-                            "base64": base64_image
-                        }
-                    }
-                }
-            ]
-        }
-        
-        # Make API request with timeout
-        response = requests.post(url, json=payload, headers=headers, timeout=CLARIFAI_TIMEOUT)
-        response.raise_for_status()
-        
-        result = response.json()
-        
-        # Extract top prediction
-        if result.get('outputs') and result['outputs'][0].get('data', {}).get('concepts'):
-            concepts = result['outputs'][0]['data']['concepts']
-            top_concept = concepts[0]
-            
-            return {
-                'name': top_concept['name'].title(),
-                'confidence': int(top_concept['value'] * 100)
-            }
-        else:
-            # Fallback to color analysis
-            food_name = analyze_image_colors(image_path)
-            return {
-                'name': food_name,
-                'confidence': random.randint(75, 85)
-            }
-            
-    except requests.exceptions.Timeout:
-        print(f"Clarifai API timeout - using fallback recognition")
-        food_name = analyze_image_colors(image_path)
-        return {
-            'name': food_name,
-            'confidence': random.randint(70, 80)
-        }
+        image_bytes = await run_io(_read_file, image_path)
     except Exception as e:
-        print(f"Error recognizing food: {e}")
-        # Fallback to color analysis
-        food_name = analyze_image_colors(image_path)
-        return {
-            'name': food_name,
-            'confidence': random.randint(65, 75)
-        }
+        print(f"Error reading image: {e}")
+        return await _fallback_result(None, 65, 75)
+    
+    results = await recognize_images([image_bytes])
+    return results[0]
 
 
-def get_nutritional_data(food_name: str) -> Dict[str, Any]:
+def get_nutritional_data(food_name: str) -> Mapping[str, Any]:
     """
     Get nutritional data for recognized food
-    Uses USDA FoodData Central API (free tier)
+    
+    Served from the in-memory nutrition catalog (built-in foods plus the
+    food_database table), so this is a dict probe, not a database call.
+    The returned mapping is shared and read-only.
     
     Args:
         food_name: Name of the food item
         
     Returns:
-        Dict containing nutritional information
+        Mapping containing nutritional information
     """
-    # For MVP, return estimated data based on common foods
-    # In production, integrate with USDA FoodData Central API
-    
-    nutrition_db = {
-        'pizza': {
-            'calories': 266,
-            'protein': '11g',
-            'carbs': '33g',
-            'fat': '10g',
-            'healthScore': 45,
-            'ingredients': ['Dough', 'Tomato Sauce', 'Cheese', 'Toppings'],
-            'history': {
-                'origin': 'Naples, Italy (18th century)',
-                'cultural': 'Pizza became popular worldwide after World War II. The Margherita pizza was created in 1889 to honor Queen Margherita of Italy.',
-                'funFact': 'Americans eat approximately 350 slices of pizza per second!'
-            }
-        },
-        'salad': {
-            'calories': 150,
-            'protein': '8g',
-            'carbs': '12g',
-            'fat': '9g',
-            'healthScore': 92,
-            'ingredients': ['Lettuce', 'Vegetables', 'Dressing'],
-            'history': {
-                'origin': 'Ancient Rome and Greece',
-                'cultural': 'The word "salad" comes from the Latin "sal" meaning salt. Romans used to salt their leafy greens and vegetables.',
-                'funFact': 'Caesar salad was invented in Tijuana, Mexico, not Italy!'
-            }
-        },
-        'burger': {
-            'calories': 540,
-            'protein': '25g',
-            'carbs': '45g',
-            'fat': '28g',
-            'healthScore': 38,
-            'ingredients': ['Bun', 'Beef Patty', 'Lettuce', 'Tomato', 'Cheese'],
-            'history': {
-                'origin': 'Hamburg, Germany / United States (late 1800s)',
-                'cultural': 'The hamburger became an American icon in the 20th century. It\'s named after Hamburg, Germany, where a similar dish originated.',
-                'funFact': 'Americans consume about 50 billion burgers per year!'
-            }
-        },
-        'chicken': {
-            'calories': 335,
-            'protein': '38g',
-            'carbs': '0g',
-            'fat': '19g',
-            'healthScore': 78,
-            'ingredients': ['Chicken Breast', 'Seasonings'],
-            'history': {
-                'origin': 'Domesticated in Southeast Asia (8000 years ago)',
-                'cultural': 'Chicken is the most common type of poultry in the world. It\'s a staple protein in cuisines across all continents.',
-                'funFact': 'There are more chickens on Earth than any other bird species!'
-            }
-        },
-        'rice': {
-            'calories': 206,
-            'protein': '4g',
-            'carbs': '45g',
-            'fat': '0.4g',
-            'healthScore': 65,
-            'ingredients': ['Rice', 'Water'],
-            'history': {
-                'origin': 'China and India (over 5000 years ago)',
-                'cultural': 'Rice is a staple food for more than half of the world\'s population. It plays a central role in Asian cultures and ceremonies.',
-                'funFact': 'There are over 40,000 varieties of rice worldwide!'
-            }
-        },
-        'pasta': {
-            'calories': 371,
-            'protein': '13g',
-            'carbs': '74g',
-            'fat': '1.5g',
-            'healthScore': 55,
-            'ingredients': ['Pasta', 'Sauce'],
-            'history': {
-                'origin': 'Italy (13th century)',
-                'cultural': 'While pasta is synonymous with Italian cuisine, similar noodles existed in ancient China. Italy perfected the art of pasta making.',
-                'funFact': 'There are over 600 different shapes of pasta produced worldwide!'
-            }
-        },
-        'sandwich': {
-            'calories': 300,
-            'protein': '15g',
-            'carbs': '40g',
-            'fat': '10g',
-            'healthScore': 60,
-            'ingredients': ['Bread', 'Meat', 'Vegetables', 'Condiments'],
-            'history': {
-                'origin': 'England (18th century)',
-                'cultural': 'Named after the Earl of Sandwich who wanted to eat without leaving his gambling table. The concept revolutionized quick meals.',
-                'funFact': 'The average American eats about 300 sandwiches per year!'
-            }
-        }
-    }
-    
-    # Try to find matching food in database
-    food_lower = food_name.lower()
-    for key, data in nutrition_db.items():
-        if key in food_lower:
-            return data
-    
-    # Default nutritional data if not found
-    return {
-        'calories': 250,
-        'protein': '10g',
-        'carbs': '30g',
-        'fat': '8g',
-        'healthScore': 60,
-        'ingredients': ['Various ingredients'],
-        'history': {
-            'origin': 'Various regions worldwide',
-            'cultural': 'This dish has been enjoyed by cultures around the world for generations.',
-            'funFact': 'Food brings people together across all cultures!'
-        }
-    }
+    return get_nutrition_catalog().lookup(food_name)
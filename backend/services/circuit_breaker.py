@@ -0,0 +1,134 @@
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, Optional
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+class CircuitBreaker:
+    """Circuit breaker with a rolling error window and an adaptive timeout.
+
+    The last `window` calls are kept as (succeeded, latency) pairs. Once at
+    least `min_calls` are recorded and the failure rate reaches
+    `failure_threshold`, the breaker opens and callers skip the provider for
+    `open_seconds`. After that it goes half-open and lets `half_open_calls`
+    probe requests through: a success closes it, a failure opens it again.
+    A probe that ends with neither (e.g. cancelled) must call release_probe()
+    so the slot is not held forever.
+
+    The request timeout follows the observed p95 latency of successful
+    calls (times `timeout_multiplier`), clamped to [min_timeout, max_timeout],
+    so a degraded provider is given up on long before the static limit.
+    """
+
+    def __init__(self, name: str, window: int = 50, min_calls: int = 10,
+                 failure_threshold: float = 0.5, open_seconds: float = 30.0,
+                 half_open_calls: int = 1, max_timeout: float = 5.0,
+                 min_timeout: float = 1.0, timeout_multiplier: float = 3.0,
+                 clock=time.monotonic):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self.max_timeout = max_timeout
+        self.min_timeout = min_timeout
+        self.timeout_multiplier = timeout_multiplier
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._calls = deque(maxlen=window)  # (succeeded, latency)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        self._transitions: Dict[str, int] = {}
+        self._stats = {'calls': 0, 'failures': 0, 'short_circuited': 0}
+
+    def _transition(self, state: str):
+        name = f"{self._state}->{state}"
+        self._transitions[name] = self._transitions.get(name, 0) + 1
+        self._state = state
+        if state == OPEN:
+            self._opened_at = self._clock()
+        elif state == HALF_OPEN:
+            self._probes = 0
+        else:
+            self._calls.clear()
+
+    def _refresh(self):
+        if self._state == OPEN and self._clock() - self._opened_at >= self.open_seconds:
+            self._transition(HALF_OPEN)
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._refresh()
+            return self._state
+
+    def allow_request(self) -> bool:
+        """Whether the next call may go to the provider"""
+        with self._lock:
+            self._refresh()
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and self._probes < self.half_open_calls:
+                self._probes += 1
+                return True
+            self._stats['short_circuited'] += 1
+            return False
+
+    def release_probe(self):
+        """Give back a half-open probe slot for a call that ended without a verdict"""
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def record_success(self, latency: float):
+        with self._lock:
+            self._stats['calls'] += 1
+            self._calls.append((True, latency))
+            if self._state == HALF_OPEN:
+                self._transition(CLOSED)
+
+    def record_failure(self, latency: Optional[float] = None):
+        with self._lock:
+            self._stats['calls'] += 1
+            self._stats['failures'] += 1
+            self._calls.append((False, latency))
+            if self._state == HALF_OPEN:
+                self._transition(OPEN)
+            elif self._state == CLOSED and len(self._calls) >= self.min_calls:
+                failures = sum(1 for succeeded, _ in self._calls if not succeeded)
+                if failures / len(self._calls) >= self.failure_threshold:
+                    self._transition(OPEN)
+
+    def _p95_latency(self) -> Optional[float]:
+        latencies = sorted(latency for succeeded, latency in self._calls if succeeded)
+        if len(latencies) < self.min_calls:
+            return None
+        return latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+
+    def current_timeout(self) -> float:
+        """Request timeout derived from recent p95 latency"""
+        with self._lock:
+            p95 = self._p95_latency()
+        if p95 is None:
+            return self.max_timeout
+        return min(self.max_timeout, max(self.min_timeout, p95 * self.timeout_multiplier))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refresh()
+            recent_failures = sum(1 for succeeded, _ in self._calls if not succeeded)
+            stats = dict(self._stats)
+            stats.update({
+                'name': self.name,
+                'state': self._state,
+                'transitions': dict(self._transitions),
+                'window_calls': len(self._calls),
+                'window_failure_rate': round(recent_failures / len(self._calls), 3) if self._calls else 0.0,
+                'p95_latency': self._p95_latency(),
+            })
+        stats['timeout'] = self.current_timeout()
+        return stats
@@ -0,0 +1,49 @@
+import asyncio
+import os
+from datetime import datetime, timedelta
+from typing import Optional, Dict
+
+from backend.services.repository import get_repository
+
+# coin_transactions is the append-only coin ledger; users.coins is the
+# cached balance kept in step with it. Snapshots store each user's balance
+# through a ledger entry, so a balance (now or at a past time) is the latest
+# snapshot plus the entries after it.
+
+# How often balances are snapshotted (0 disables the background task)
+COIN_SNAPSHOT_INTERVAL_SECONDS = float(os.getenv('COIN_SNAPSHOT_INTERVAL_SECONDS', '3600'))
+# Ledger entries older than this are folded into snapshots and deleted
+# (0 keeps the full history)
+COIN_LEDGER_RETENTION_DAYS = float(os.getenv('COIN_LEDGER_RETENTION_DAYS', '0'))
+
+_maintenance_task: Optional[asyncio.Task] = None
+
+async def run_ledger_maintenance() -> Dict[str, int]:
+    """Snapshot balances, then compact entries past the retention period"""
+    repository = get_repository()
+    result = {'snapshots': await repository.snapshot_coin_balances(), 'compacted': 0}
+    if COIN_LEDGER_RETENTION_DAYS > 0:
+        before = datetime.utcnow() - timedelta(days=COIN_LEDGER_RETENTION_DAYS)
+        result['compacted'] = await repository.compact_coin_ledger(before)
+    return result
+
+async def _maintenance_loop():
+    while True:
+        await asyncio.sleep(COIN_SNAPSHOT_INTERVAL_SECONDS)
+        try:
+            await run_ledger_maintenance()
+        except Exception as e:
+            print(f"Error in coin ledger maintenance: {e}")
+
+def start_ledger_maintenance():
+    """Snapshot (and compact) the coin ledger periodically (called from the app lifespan)"""
+    global _maintenance_task
+    if COIN_SNAPSHOT_INTERVAL_SECONDS > 0 and _maintenance_task is None:
+        _maintenance_task = asyncio.get_running_loop().create_task(_maintenance_loop())
+
+async def stop_ledger_maintenance():
+    global _maintenance_task
+    if _maintenance_task is not None:
+        _maintenance_task.cancel()
+        await asyncio.gather(_maintenance_task, return_exceptions=True)
+        _maintenance_task = None
@@ -0,0 +1,118 @@
+import asyncio
+import os
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional
+
+from backend.services.repository import get_repository
+
+# Keys per batch query (ids end up in the PostgREST URL: id=in.(1,2,...))
+DATALOADER_MAX_BATCH_SIZE = int(os.getenv('DATALOADER_MAX_BATCH_SIZE', '100'))
+
+class DataLoader:
+    """Batches and caches lookups by key for one request.
+
+    load() calls made in the same event loop turn are collected and resolved
+    together with one batch_load(keys) call, which returns the rows found
+    (matched back to keys by the `key` field; missing keys load as None).
+    Each key is fetched once per loader and later loads reuse the result;
+    prime() and clear() keep the cache in step with writes made meanwhile.
+    """
+
+    def __init__(self, batch_load: Callable[[List[Hashable]], Awaitable[List[Dict[str, Any]]]],
+                 key: str = 'id', max_batch_size: int = DATALOADER_MAX_BATCH_SIZE):
+        self.batch_load = batch_load
+        self.key = key
+        self.max_batch_size = max_batch_size
+        self.batches = 0
+        self._cache: Dict[Hashable, asyncio.Future] = {}
+        self._queue: List[Hashable] = []
+        self._tasks = set()
+
+    def load(self, key: Hashable) -> Awaitable[Optional[Dict[str, Any]]]:
+        """Row for key (None if it does not exist), fetched with the other pending keys"""
+        future = self._cache.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._cache[key] = loop.create_future()
+            if not self._queue:
+                # Runs after the tasks already scheduled in this turn have queued their keys
+                loop.call_soon(self._dispatch)
+            self._queue.append(key)
+        return future
+
+    async def load_many(self, keys: Iterable[Hashable]) -> List[Optional[Dict[str, Any]]]:
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def prime(self, key: Hashable, value: Optional[Dict[str, Any]]):
+        """Cache a row the request already has (e.g. just written)"""
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(value)
+        self._cache[key] = future
+
+    def clear(self, key: Hashable):
+        """Forget a cached row so the next load fetches it again"""
+        self._cache.pop(key, None)
+
+    def _dispatch(self):
+        keys, self._queue = self._queue, []
+        for start in range(0, len(keys), self.max_batch_size):
+            batch = keys[start:start + self.max_batch_size]
+            task = asyncio.get_running_loop().create_task(self._load_batch(batch, [self._cache[k] for k in batch]))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _load_batch(self, keys: List[Hashable], futures: List[asyncio.Future]):
+        self.batches += 1
+        try:
+            rows = await self.batch_load(keys)
+            found = {row[self.key]: row for row in rows}
+        except BaseException as e:
+            for key, future in zip(keys, futures):
+                # Failures are not cached; a later load retries
+                if self._cache.get(key) is future:
+                    del self._cache[key]
+                if future.done():
+                    continue
+                if isinstance(e, Exception):
+                    future.set_exception(e)
+                else:
+                    # Cancelled (e.g. at shutdown): don't leave loads waiting
+                    future.cancel()
+            if isinstance(e, Exception):
+                return
+            raise
+        for key, future in zip(keys, futures):
+            if not future.done():
+                future.set_result(found.get(key))
+
+# Loaders of the current request (see RequestLoadersMiddleware)
+_request_loaders: ContextVar[Optional[Dict[str, DataLoader]]] = ContextVar('request_loaders', default=None)
+
+class RequestLoadersMiddleware:
+    """ASGI middleware giving each HTTP request its own set of loaders"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        token = _request_loaders.set({})
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_loaders.reset(token)
+
+def _get_loader(name: str, create: Callable[[], DataLoader]) -> DataLoader:
+    loaders = _request_loaders.get()
+    if loaders is None:
+        # Outside a request (background jobs): nothing to share the cache with
+        return create()
+    if name not in loaders:
+        loaders[name] = create()
+    return loaders[name]
+
+def get_user_loader() -> DataLoader:
+    """Users by id for the current request, batched into get_users_by_ids queries"""
+    return _get_loader('users', lambda: DataLoader(get_repository().get_users_by_ids))
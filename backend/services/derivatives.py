@@ -0,0 +1,79 @@
+import io
+import threading
+from typing import Optional, Tuple, Dict, Any
+
+from PIL import Image
+
+from backend.services.executors import run_cpu, run_io
+from backend.services.storage import get_storage
+
+# Fixed set of variants, so URL parameters cannot create unbounded work
+DERIVATIVE_WIDTHS = (128, 256, 512, 1024)
+DERIVATIVE_FORMATS = {
+    'webp': ('WEBP', 'image/webp'),
+    'jpeg': ('JPEG', 'image/jpeg'),
+    'jpg': ('JPEG', 'image/jpeg'),
+}
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+
+_stats_lock = threading.Lock()
+_stats = {'renders': 0, 'hits': 0, 'missing_source': 0}
+
+def _count(key: str):
+    with _stats_lock:
+        _stats[key] += 1
+
+def derivative_key(key: str, width: int, fmt: str) -> str:
+    """Object key of a variant: derived/ab/cd/<sha256>_w256.webp"""
+    base = key.rsplit('.', 1)[0]
+    extension = 'jpg' if DERIVATIVE_FORMATS[fmt][0] == 'JPEG' else fmt
+    return f"derived/{base}_w{width}.{extension}"
+
+def render_derivative(data: bytes, width: int, fmt: str) -> bytes:
+    """Downscale an image to fit width x width and encode it as fmt
+
+    JPEG sources are decoded at a reduced scale (draft mode), so thumbnails
+    never pay for a full-size decode. Images are never upscaled.
+    """
+    image_format = DERIVATIVE_FORMATS[fmt][0]
+    image = Image.open(io.BytesIO(data))
+    image.draft('RGB', (width, width))
+    if image_format == 'JPEG' or image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGB')
+    image.thumbnail((width, width), Image.Resampling.LANCZOS)
+
+    output = io.BytesIO()
+    if image_format == 'WEBP':
+        image.save(output, format='WEBP', quality=WEBP_QUALITY, method=4)
+    else:
+        image.save(output, format='JPEG', quality=JPEG_QUALITY, optimize=True)
+    return output.getvalue()
+
+async def get_derivative(key: str, width: int, fmt: str) -> Optional[Tuple[str, bytes]]:
+    """Return (derived key, bytes) for a stored image, rendering it on first use
+
+    Rendered variants are written back to storage, so each one is generated
+    once and then served like any other object. Returns None if the source
+    image does not exist.
+    """
+    storage = get_storage()
+    derived = derivative_key(key, width, fmt)
+    data = await run_io(storage.get, derived)
+    if data is not None:
+        _count('hits')
+        return derived, data
+
+    source = await run_io(storage.get, key)
+    if source is None:
+        _count('missing_source')
+        return None
+
+    data = await run_cpu(render_derivative, source, width, fmt)
+    await run_io(storage.put, derived, data)
+    _count('renders')
+    return derived, data
+
+def get_derivative_stats() -> Dict[str, Any]:
+    with _stats_lock:
+        return dict(_stats)
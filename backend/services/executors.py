@@ -0,0 +1,49 @@
+import os
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Any
+
+# Bounded worker pools so request handlers never block the event loop.
+# CPU work (PIL decode/resize/encode) and blocking I/O (sync Supabase client,
+# file writes) get separate pools so a burst of one cannot starve the other,
+# and neither competes with the default threadpool used by sync endpoints.
+CPU_WORKERS = int(os.getenv('CPU_WORKERS', str(min(4, os.cpu_count() or 1))))
+IO_WORKERS = int(os.getenv('IO_WORKERS', '32'))
+
+_cpu_executor = None
+_io_executor = None
+
+def get_cpu_executor() -> ThreadPoolExecutor:
+    """Get or create the bounded executor for CPU-bound work"""
+    global _cpu_executor
+    if _cpu_executor is None:
+        _cpu_executor = ThreadPoolExecutor(max_workers=CPU_WORKERS, thread_name_prefix='foodid-cpu')
+    return _cpu_executor
+
+def get_io_executor() -> ThreadPoolExecutor:
+    """Get or create the bounded executor for blocking I/O"""
+    global _io_executor
+    if _io_executor is None:
+        _io_executor = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix='foodid-io')
+    return _io_executor
+
+async def run_cpu(func: Callable, *args, **kwargs) -> Any:
+    """Run a CPU-bound callable on the CPU executor"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_cpu_executor(), functools.partial(func, *args, **kwargs))
+
+async def run_io(func: Callable, *args, **kwargs) -> Any:
+    """Run a blocking I/O callable on the I/O executor"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_io_executor(), functools.partial(func, *args, **kwargs))
+
+def shutdown_executors():
+    """Shut down both executors (called from the app lifespan)"""
+    global _cpu_executor, _io_executor
+    if _cpu_executor is not None:
+        _cpu_executor.shutdown(wait=True)
+        _cpu_executor = None
+    if _io_executor is not None:
+        _io_executor.shutdown(wait=True)
+        _io_executor = None
@@ -0,0 +1,117 @@
+import os
+import re
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+# Minimum trigram similarity for a fuzzy match to count. Names contained word
+# for word are matched before the fuzzy pass, so this only has to admit
+# misspellings ("chiken" 0.5) and keep out names that merely share a word
+# ending ("pineapple"/"apple" 0.33).
+FOOD_RESOLVER_MIN_SIMILARITY = float(os.getenv('FOOD_RESOLVER_MIN_SIMILARITY', '0.4'))
+# Distinct queries remembered per index
+FOOD_RESOLVER_MEMO_SIZE = 10000
+
+_SEPARATORS = re.compile(r'[\s_\-]+')
+
+def normalize_name(name: str) -> str:
+    """Index key for a food or category name: lowercase, single spaces"""
+    return _SEPARATORS.sub(' ', name).strip().lower()
+
+def words(text: str) -> Set[str]:
+    """Distinct words of a normalized name"""
+    return {word for word in normalize_name(text).split(' ') if word}
+
+def trigrams(text: str) -> Set[str]:
+    """Character trigrams of each word, padded like pg_trgm ("  ab", "abc", "bc ")"""
+    grams = set()
+    for word in normalize_name(text).split(' '):
+        if not word:
+            continue
+        padded = f"  {word} "
+        for i in range(len(padded) - 2):
+            grams.add(padded[i:i + 3])
+    return grams
+
+class TrigramIndex:
+    """Inverted index from words and character trigrams to names
+
+    Names whose words all appear in the query ("pasta" in "Pasta with
+    Tomato Sauce") rank first, more words before fewer, so a long
+    recognized label still finds the food it names. The rest rank by
+    similarity, the Jaccard index of the trigram sets (shared trigrams over
+    trigrams in either name), the same measure as pg_trgm's similarity().
+    A query touches only the posting lists of its own words and trigrams:
+    one bincount over each gives the shared counts of every name, and the
+    scores are computed in a single vectorized pass. Resolved queries are
+    memoized.
+    """
+
+    def __init__(self, names: Sequence[str]):
+        self.names = tuple(names)
+        postings: Dict[str, List[int]] = {}
+        word_postings: Dict[str, List[int]] = {}
+        sizes = np.zeros(len(self.names), dtype=np.float32)
+        word_counts = np.zeros(len(self.names), dtype=np.intp)
+        for position, name in enumerate(self.names):
+            grams = trigrams(name)
+            sizes[position] = len(grams)
+            for gram in grams:
+                postings.setdefault(gram, []).append(position)
+            name_words = words(name)
+            word_counts[position] = len(name_words)
+            for word in name_words:
+                word_postings.setdefault(word, []).append(position)
+        # intp postings feed bincount without a conversion copy
+        self._postings = {gram: np.asarray(ids, dtype=np.intp) for gram, ids in postings.items()}
+        self._word_postings = {word: np.asarray(ids, dtype=np.intp) for word, ids in word_postings.items()}
+        self._sizes = sizes
+        self._word_counts = word_counts
+        self._memo: Dict[str, Optional[Tuple[str, float]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def search(self, query: str, limit: int = 5, min_similarity: float = 0.0) -> List[Tuple[str, float]]:
+        """Best (name, similarity) matches for a query, highest first"""
+        grams = trigrams(query)
+        lists = [self._postings[gram] for gram in grams if gram in self._postings]
+        if not lists or limit < 1:
+            return []
+        shared = np.bincount(np.concatenate(lists), minlength=len(self.names)).astype(np.float32)
+        scores = shared / (len(grams) + self._sizes - shared)
+        rank = scores
+        word_lists = [self._word_postings[word] for word in words(query) if word in self._word_postings]
+        if word_lists:
+            shared_words = np.bincount(np.concatenate(word_lists), minlength=len(self.names))
+            # Contained names outrank every fuzzy match (similarity <= 1),
+            # longer ones first; the similarity breaks ties
+            contained = shared_words == self._word_counts
+            rank = np.where(contained, self._word_counts + 1.0, 0.0) + scores
+        else:
+            contained = np.zeros(len(self.names), dtype=bool)
+
+        if limit == 1:
+            top = np.flatnonzero(rank == rank.max())
+        elif limit < len(rank):
+            top = np.argpartition(-rank, limit - 1)[:limit]
+        else:
+            top = np.arange(len(rank))
+        # Best first; ties go to the name sharing more trigrams
+        top = top[np.lexsort((-shared[top], -rank[top]))][:limit]
+        return [
+            (self.names[i], round(float(scores[i]), 4))
+            for i in top if contained[i] or (scores[i] > 0 and scores[i] >= min_similarity)
+        ]
+
+    def resolve(self, query: str, min_similarity: float = FOOD_RESOLVER_MIN_SIMILARITY) -> Optional[Tuple[str, float]]:
+        """Best contained name, else best match above min_similarity (memoized), or None"""
+        try:
+            return self._memo[query]
+        except KeyError:
+            pass
+        matches = self.search(query, limit=1, min_similarity=min_similarity)
+        match = matches[0] if matches else None
+        if len(self._memo) < FOOD_RESOLVER_MEMO_SIZE:
+            self._memo[query] = match
+        return match
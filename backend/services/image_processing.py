@@ -0,0 +1,156 @@
+import io
+import hashlib
+from dataclasses import dataclass
+from typing import Optional, Tuple
+from PIL import Image
+
+# Compression budget for stored scan images
+MAX_DIMENSION = 1024  # max px on the longest side
+DEFAULT_MAX_SIZE_KB = 500
+START_QUALITY = 85
+MIN_QUALITY = 40
+THUMBNAIL_MIN_SIZE = 64  # analysis thumbnails for hashing and color stats
+
+# Output size relative to the quality-85 encode, measured on food photos with
+# optimize=True and default 4:2:0 subsampling. Deliberately on the flat side
+# so the estimate undershoots the byte target rather than overshooting it.
+_RELATIVE_SIZE = [
+    (85, 1.00),
+    (80, 0.82),
+    (75, 0.70),
+    (70, 0.62),
+    (65, 0.56),
+    (60, 0.51),
+    (55, 0.47),
+    (50, 0.43),
+    (45, 0.40),
+    (40, 0.37),
+]
+_SAFETY_MARGIN = 0.95
+
+def _estimate_quality(first_size: int, target_size: int) -> int:
+    """Pick the highest quality whose predicted size fits the byte target"""
+    ratio = target_size * _SAFETY_MARGIN / first_size
+    for quality, relative in _RELATIVE_SIZE:
+        if relative <= ratio:
+            return quality
+    return MIN_QUALITY
+
+def _is_within_budget(image: Image.Image, content_size: int, max_bytes: int) -> bool:
+    """Header-only check: JPEG already small enough in bytes and pixels"""
+    return (
+        image.format == 'JPEG'
+        and image.mode in ('RGB', 'L')
+        and content_size <= max_bytes
+        and max(image.size) <= MAX_DIMENSION
+    )
+
+def _decode_scaled(image: Image.Image) -> Image.Image:
+    """Decode at the smallest scale that still covers MAX_DIMENSION, as RGB or L"""
+    longest = max(image.size)
+    ratio = MAX_DIMENSION / longest
+    target = tuple(max(1, int(dim * ratio)) for dim in image.size)
+
+    if longest > MAX_DIMENSION and image.format == 'JPEG':
+        # Let libjpeg do the first 1/2, 1/4 or 1/8 downscale during decoding
+        image.draft('RGB', target)
+
+    # Palette, 1-bit and 16-bit images can't be reduced or resampled directly
+    if image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+
+    if longest <= MAX_DIMENSION:
+        return image
+
+    # Cheap box reduction by an integer factor before the final resample
+    # (drafted JPEGs are usually already within 2x of the target)
+    factor = max(image.size) // MAX_DIMENSION
+    if factor >= 2:
+        image = image.reduce(factor)
+
+    if image.size != target:
+        image = image.resize(target, Image.Resampling.LANCZOS)
+    return image
+
+def _encode(image: Image.Image, quality: int) -> bytes:
+    output = io.BytesIO()
+    image.save(output, format='JPEG', quality=quality, optimize=True)
+    return output.getvalue()
+
+def decode_thumbnail(file_content: bytes, min_size: int = THUMBNAIL_MIN_SIZE) -> Image.Image:
+    """Decode a small RGB copy of an image for analysis (hashing, color stats)
+
+    JPEGs are decoded directly at 1/2, 1/4 or 1/8 scale, so this costs a
+    fraction of a full decode. The result is at least min_size on each side
+    when the source is.
+    """
+    image = Image.open(io.BytesIO(file_content))
+    image.draft('RGB', (min_size, min_size))
+    image = image.convert('RGB')
+    if min(image.size) > min_size * 2:
+        image.thumbnail((min_size * 2, min_size * 2), Image.Resampling.BOX)
+    return image
+
+def _compress(file_content: bytes, max_bytes: int) -> Tuple[bytes, Optional[Image.Image]]:
+    """Compressed bytes plus the decoded image they were encoded from.
+
+    The image is None when the input was returned without decoding.
+    """
+    image = Image.open(io.BytesIO(file_content))
+    if _is_within_budget(image, len(file_content), max_bytes):
+        return file_content, None
+
+    image = _decode_scaled(image)
+
+    encoded = _encode(image, START_QUALITY)
+    if len(encoded) <= max_bytes:
+        return encoded, image
+
+    return _encode(image, _estimate_quality(len(encoded), max_bytes)), image
+
+def compress_image(file_content: bytes, max_size_kb: int = DEFAULT_MAX_SIZE_KB) -> bytes:
+    """Compress image to reduce file size and improve performance
+
+    Images already within the byte and dimension budget are returned as-is
+    without being decoded. Everything else is decoded at a reduced scale and
+    encoded at most twice: once at START_QUALITY and, if that is over the
+    target, once more at a quality estimated from the first result.
+    """
+    try:
+        return _compress(file_content, max_size_kb * 1024)[0]
+    except Exception as e:
+        print(f"Image compression error: {e}")
+        return file_content
+
+@dataclass
+class PreparedImage:
+    """A compressed scan image with its content hash and analysis thumbnail"""
+    content: bytes
+    sha256: str
+    thumbnail: Optional[Image.Image] = None
+
+def prepare_image(file_content: bytes, max_size_kb: int = DEFAULT_MAX_SIZE_KB) -> PreparedImage:
+    """Compress an upload and derive everything the scan pipeline needs from it
+
+    The pixels decoded for compression are reused for the analysis thumbnail,
+    so storage, caching, hashing and the color fallback all work from this
+    one object without reading or decoding the image again. When compression
+    returns the input untouched, the thumbnail is decoded in draft mode.
+    """
+    try:
+        content, image = _compress(file_content, max_size_kb * 1024)
+    except Exception as e:
+        print(f"Image compression error: {e}")
+        content, image = file_content, None
+
+    thumbnail = None
+    try:
+        if image is not None:
+            thumbnail = image.convert('RGB') if image.mode != 'RGB' else image.copy()
+            thumbnail.thumbnail((THUMBNAIL_MIN_SIZE * 2, THUMBNAIL_MIN_SIZE * 2), Image.Resampling.BOX)
+        else:
+            thumbnail = decode_thumbnail(content)
+    except Exception as e:
+        print(f"Image decode error: {e}")
+
+    return PreparedImage(content=content, sha256=hashlib.sha256(content).hexdigest(), thumbnail=thumbnail)
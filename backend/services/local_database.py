@@ -0,0 +1,649 @@
+import json
+from datetime import datetime
+from typing import Optional, List, Dict, Any
+
+from sqlalchemy import select, insert, update, delete, func, literal
+from sqlalchemy.orm import joinedload
+
+from backend.database import SessionLocal
+from backend.models import (
+    User, Scan, CoinTransaction, CoinBalanceSnapshot, ScanRecordKey, Notification, Referral, FoodItem
+)
+from backend.services.serialization import dumps_str
+
+# Local (SQLite through SQLAlchemy) versions of the Supabase data functions,
+# behind LocalRepository (DATA_BACKEND=local) for single-node deployments,
+# offline development and tests. Same signatures and return shapes as their
+# supabase_async counterparts; multi-row changes run in one transaction.
+
+# Text columns holding JSON, decoded on the way out like Postgres JSONB/arrays
+_JSON_COLUMNS = {'extra_data', 'ingredients'}
+
+def _as_dict(row) -> Dict[str, Any]:
+    data = {}
+    for column in row.__table__.columns:
+        value = getattr(row, column.name)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        elif column.name in _JSON_COLUMNS and isinstance(value, str):
+            value = json.loads(value)
+        data[column.name] = value
+    return data
+
+def _with_user(row) -> Dict[str, Any]:
+    """Row plus its user's name and phone, like PostgREST's users(name, phone_number) embed"""
+    data = _as_dict(row)
+    user = row.owner if isinstance(row, Scan) else row.user
+    data['users'] = {'name': user.name, 'phone_number': user.phone_number} if user else None
+    return data
+
+def _newest_first(model):
+    return (model.created_at.desc(), model.id.desc())
+
+# ============================================
+# USER PROFILE FUNCTIONS
+# ============================================
+
+def create_user(phone_number: str, name: str = None, email: str = None) -> Optional[Dict]:
+    """Create a new user or get existing user by phone number"""
+    db = SessionLocal()
+    try:
+        user = db.scalar(select(User).where(User.phone_number == phone_number))
+        if user is None:
+            user = User(phone_number=phone_number, name=name, email=email, coins=0)
+            db.add(user)
+            db.commit()
+        return _as_dict(user)
+    except Exception as e:
+        db.rollback()
+        print(f"Error creating user: {e}")
+        return None
+    finally:
+        db.close()
+
+def get_user_by_phone(phone_number: str) -> Optional[Dict]:
+    """Get user by phone number"""
+    try:
+        with SessionLocal() as db:
+            user = db.scalar(select(User).where(User.phone_number == phone_number))
+            return _as_dict(user) if user else None
+    except Exception as e:
+        print(f"Error fetching user: {e}")
+        return None
+
+def get_user_by_id(user_id: int) -> Optional[Dict]:
+    """Get user by ID"""
+    try:
+        with SessionLocal() as db:
+            user = db.get(User, user_id)
+            return _as_dict(user) if user else None
+    except Exception as e:
+        print(f"Error fetching user: {e}")
+        return None
+
+def get_users_by_ids(user_ids: List[int]) -> List[Dict]:
+    """Get several users in one query (unknown ids are left out)"""
+    try:
+        with SessionLocal() as db:
+            return [_as_dict(row) for row in db.scalars(select(User).where(User.id.in_(list(user_ids))))]
+    except Exception as e:
+        print(f"Error fetching users: {e}")
+        return []
+
+def update_user_profile(user_id: int, name: str = None, email: str = None, profile_image: str = None,
+                        phone_number: str = None) -> Optional[Dict]:
+    """Update user profile information"""
+    data = {key: value for key, value in
+            {'name': name, 'email': email, 'profile_image': profile_image,
+             'phone_number': phone_number}.items() if value is not None}
+    if not data:
+        return None
+    db = SessionLocal()
+    try:
+        user = db.get(User, user_id)
+        if user is None:
+            return None
+        for key, value in data.items():
+            setattr(user, key, value)
+        db.commit()
+        return _as_dict(user)
+    except Exception as e:
+        db.rollback()
+        print(f"Error updating user profile: {e}")
+        return None
+    finally:
+        db.close()
+
+def delete_user(user_id: int) -> bool:
+    """Delete a user and their rows (ON DELETE CASCADE in Supabase); False if unknown"""
+    db = SessionLocal()
+    try:
+        if db.get(User, user_id) is None:
+            return False
+        for model in (Scan, Notification, CoinTransaction, CoinBalanceSnapshot, ScanRecordKey):
+            db.execute(delete(model).where(model.user_id == user_id))
+        db.execute(delete(Referral).where(Referral.referrer_id == user_id))
+        db.execute(update(Referral).where(Referral.referred_user_id == user_id).values(referred_user_id=None))
+        db.execute(delete(User).where(User.id == user_id))
+        db.commit()
+        return True
+    except Exception as e:
+        db.rollback()
+        print(f"Error deleting user: {e}")
+        return False
+    finally:
+        db.close()
+
+def _increment_coins(db, user_id: int, amount: int, min_balance: int = None) -> Optional[int]:
+    """Atomically add amount to a user's cached balance in the session; returns
+    the new balance, or None if the user is unknown or the balance would drop
+    below min_balance
+    """
+    balance = func.coalesce(User.coins, 0) + amount
+    statement = update(User).where(User.id == user_id)
+    if min_balance is not None:
+        statement = statement.where(balance >= min_balance)
+    return db.execute(statement.values(coins=balance).returning(User.coins)).scalar_one_or_none()
+
+def increment_coins(user_id: int, amount: int, min_balance: int = None, clamp: bool = False,
+                    transaction_type: str = 'adjustment', description: str = None) -> Optional[int]:
+    """Append a coin movement to the ledger and apply it to the balance.
+    Returns the new balance, or None if the user is unknown or the balance
+    would drop below min_balance (with clamp it stops at min_balance instead).
+    """
+    movement = append_coin_transaction(user_id, amount, transaction_type, description, min_balance, clamp)
+    return movement['new_balance'] if movement else None
+
+def update_user_coins(user_id: int, amount: int) -> Optional[Dict]:
+    """Update user coin balance (increment/decrement); returns the id and new balance"""
+    new_balance = increment_coins(user_id, amount)
+    return {'id': user_id, 'coins': new_balance} if new_balance is not None else None
+
+# ============================================
+# SCAN FUNCTIONS
+# ============================================
+
+def create_scan(user_id: int, food_name: str, confidence: int, image_path: str, nutrition_json: str):
+    """Create a new scan record"""
+    db = SessionLocal()
+    try:
+        scan = Scan(user_id=user_id, food_name=food_name, confidence=confidence,
+                    image_path=image_path, nutrition_json=nutrition_json)
+        db.add(scan)
+        db.commit()
+        return _as_dict(scan)
+    except Exception as e:
+        db.rollback()
+        print(f"Error creating scan: {e}")
+        return None
+    finally:
+        db.close()
+
+def _add_scan_record(db, user_id: int, scans: List[Dict], coins: int, description: Optional[str]):
+    """Stage one record_scan in a session; returns (scan rows, transaction, new balance)"""
+    rows = [
+        Scan(
+            user_id=user_id,
+            food_name=scan['food_name'],
+            confidence=scan['confidence'],
+            image_path=scan.get('image_path'),
+            nutrition_json=scan.get('nutrition_json')
+        )
+        for scan in scans
+    ]
+    db.add_all(rows)
+    transaction, new_balance = _add_coin_transaction(db, user_id, coins, 'scan', description)
+    return rows, transaction, new_balance
+
+def record_scan(user_id: int, scans: List[Dict], coins: int = 1, description: str = None,
+                idempotency_key: str = None) -> Optional[Dict]:
+    """Save scans, append their coin transaction and increment the balance in one transaction
+
+    With an idempotency_key, a repeated call returns the first call's result
+    without saving anything again.
+    """
+    db = SessionLocal()
+    try:
+        if idempotency_key is not None:
+            saved = db.get(ScanRecordKey, idempotency_key)
+            if saved is not None:
+                return json.loads(saved.result)
+        rows, transaction, new_balance = _add_scan_record(db, user_id, scans, coins, description)
+        db.flush()
+        record = {
+            'scans': [_as_dict(row) for row in rows],
+            'transaction': _as_dict(transaction),
+            'new_balance': new_balance
+        }
+        if idempotency_key is not None:
+            # Committed together with the scans; a concurrent duplicate
+            # fails on the primary key and rolls back
+            db.add(ScanRecordKey(key=idempotency_key, user_id=user_id, result=dumps_str(record)))
+        db.commit()
+        return record
+    except Exception as e:
+        db.rollback()
+        print(f"Error recording scan: {e}")
+        return None
+    finally:
+        db.close()
+
+def record_scan_batch(entries: List[Dict]) -> Optional[Dict]:
+    """Write several record_scan entries in one transaction"""
+    db = SessionLocal()
+    try:
+        balances = {}
+        for entry in entries:
+            _, _, new_balance = _add_scan_record(
+                db, entry['user_id'], entry['scans'], entry['coins'], entry.get('description')
+            )
+            balances[str(entry['user_id'])] = new_balance
+        db.commit()
+        return {'balances': balances}
+    except Exception as e:
+        db.rollback()
+        print(f"Error recording scan batch: {e}")
+        return None
+    finally:
+        db.close()
+
+def get_recent_scans(user_id: int, limit: int = 10):
+    """Get recent scans for a user"""
+    try:
+        with SessionLocal() as db:
+            rows = db.scalars(select(Scan).where(Scan.user_id == user_id).order_by(*_newest_first(Scan)).limit(limit))
+            return [_as_dict(row) for row in rows]
+    except Exception as e:
+        print(f"Error fetching scans: {e}")
+        return []
+
+def get_scan_by_id(scan_id: str):
+    """Get a specific scan by ID"""
+    try:
+        with SessionLocal() as db:
+            scan = db.get(Scan, int(scan_id))
+            return _as_dict(scan) if scan else None
+    except Exception as e:
+        print(f"Error fetching scan: {e}")
+        return None
+
+# ============================================
+# FOOD DATABASE FUNCTIONS
+# ============================================
+
+def get_food_database() -> Optional[List[Dict]]:
+    """Get every row of the food_database table (None on error)"""
+    try:
+        with SessionLocal() as db:
+            return [_as_dict(row) for row in db.scalars(select(FoodItem))]
+    except Exception as e:
+        print(f"Error fetching food database: {e}")
+        return None
+
+def get_food_database_version() -> Optional[str]:
+    """Cheap change marker for food_database: row count plus latest updated_at"""
+    try:
+        with SessionLocal() as db:
+            count, latest = db.execute(select(func.count(FoodItem.id), func.max(FoodItem.updated_at))).one()
+        return f"{count}:{latest.isoformat() if latest else None}"
+    except Exception as e:
+        print(f"Error fetching food database version: {e}")
+        return None
+
+# ============================================
+# NOTIFICATION FUNCTIONS
+# ============================================
+
+def create_notification(user_id: int, title: str, message: str, notification_type: str = 'system', extra_data: Dict = None) -> Optional[Dict]:
+    """Create a new notification"""
+    db = SessionLocal()
+    try:
+        notification = Notification(
+            user_id=user_id, title=title, message=message, notification_type=notification_type,
+            extra_data=dumps_str(extra_data) if extra_data is not None else None, read=False
+        )
+        db.add(notification)
+        db.commit()
+        return _as_dict(notification)
+    except Exception as e:
+        db.rollback()
+        print(f"Error creating notification: {e}")
+        return None
+    finally:
+        db.close()
+
+def broadcast_notification(title: str, message: str, notification_type: str = 'system') -> int:
+    """Create a notification for every user; returns the number created"""
+    db = SessionLocal()
+    try:
+        rows = select(User.id, literal(title), literal(message), literal(notification_type),
+                      literal(False), literal(datetime.utcnow()))
+        result = db.execute(insert(Notification).from_select(
+            ['user_id', 'title', 'message', 'notification_type', 'read', 'created_at'], rows
+        ))
+        db.commit()
+        return result.rowcount
+    except Exception as e:
+        db.rollback()
+        print(f"Error broadcasting notification: {e}")
+        return 0
+    finally:
+        db.close()
+
+def get_user_notifications(user_id: int, limit: int = 50) -> List[Dict]:
+    """Get all notifications for a user"""
+    try:
+        with SessionLocal() as db:
+            rows = db.scalars(select(Notification).where(Notification.user_id == user_id)
+                              .order_by(*_newest_first(Notification)).limit(limit))
+            return [_as_dict(row) for row in rows]
+    except Exception as e:
+        print(f"Error fetching notifications: {e}")
+        return []
+
+def mark_notification_read(notification_id: int) -> bool:
+    """Mark a notification as read"""
+    db = SessionLocal()
+    try:
+        db.execute(update(Notification).where(Notification.id == notification_id).values(read=True))
+        db.commit()
+        return True
+    except Exception as e:
+        db.rollback()
+        print(f"Error marking notification as read: {e}")
+        return False
+    finally:
+        db.close()
+
+# ============================================
+# REFERRAL FUNCTIONS
+# ============================================
+
+def create_referral(referrer_id: int, referred_phone: str) -> Optional[Dict]:
+    """Create a new referral"""
+    db = SessionLocal()
+    try:
+        referral = Referral(referrer_id=referrer_id, referred_phone=referred_phone, status='pending')
+        db.add(referral)
+        db.commit()
+        return _as_dict(referral)
+    except Exception as e:
+        db.rollback()
+        print(f"Error creating referral: {e}")
+        return None
+    finally:
+        db.close()
+
+def _add_coin_transaction(db, user_id: int, amount: int, transaction_type: str, description: str = None,
+                          min_balance: int = None, clamp: bool = False):
+    """Stage a ledger entry and its balance change; returns (transaction, new balance).
+
+    Same rules as the append_coin_transaction SQL function. Raises ValueError
+    if the user is unknown or min_balance refuses the change.
+    """
+    if min_balance is not None and clamp:
+        # Lock the row and read the balance, so the ledger records the amount actually applied
+        current = db.execute(
+            update(User).where(User.id == user_id).values(coins=func.coalesce(User.coins, 0)).returning(User.coins)
+        ).scalar_one_or_none()
+        if current is not None:
+            amount, min_balance = max(amount, min_balance - current), None
+    new_balance = _increment_coins(db, user_id, amount, min_balance)
+    if new_balance is None:
+        raise ValueError(f"User {user_id} not found or insufficient balance")
+    transaction = CoinTransaction(user_id=user_id, amount=amount, transaction_type=transaction_type,
+                                  description=description, created_at=datetime.utcnow())
+    db.add(transaction)
+    return transaction, new_balance
+
+def transfer_coins(sender_id: int, receiver_phone: str, amount: int) -> Optional[Dict]:
+    """Transfer coins from sender to receiver identified by phone number.
+    Returns dict with new balances, or None on failure. Both sides are
+    written in one transaction.
+    """
+    db = SessionLocal()
+    try:
+        receiver_id = db.scalar(select(User.id).where(User.phone_number == receiver_phone))
+        if receiver_id is None:
+            raise Exception('Receiver not found')
+        # Conditional decrement: the balance check and the update are one statement
+        _, sender_balance = _add_coin_transaction(db, sender_id, -amount, 'transfer_out',
+                                                  f'Transfer to {receiver_phone}', min_balance=0)
+        _, receiver_balance = _add_coin_transaction(db, receiver_id, amount, 'transfer_in',
+                                                    f'Transfer from {sender_id}')
+        db.commit()
+        return {
+            'sender_new_balance': sender_balance,
+            'receiver_new_balance': receiver_balance
+        }
+    except Exception as e:
+        db.rollback()
+        print(f"Error in transfer_coins: {e}")
+        return None
+    finally:
+        db.close()
+
+def redeem_referral(referral_id: int, new_user_id: int) -> Optional[Dict]:
+    """Mark a referral as registered and award bonus coins to both parties.
+    Returns the referral record as it was before the update, or None on failure.
+    """
+    db = SessionLocal()
+    try:
+        referral = db.get(Referral, referral_id)
+        if referral is None:
+            raise Exception('Referral not found')
+        record = _as_dict(referral)
+        referral.status = 'registered'
+        referral.referred_user_id = new_user_id
+        # Award bonus coins (e.g., 10 each)
+        bonus = 10
+        _add_coin_transaction(db, referral.referrer_id, bonus, 'referral_bonus', f'Referral {referral_id} redeemed')
+        _add_coin_transaction(db, new_user_id, bonus, 'referral_bonus', f'Referral {referral_id} redeemed')
+        db.commit()
+        return record
+    except Exception as e:
+        db.rollback()
+        print(f"Error in redeem_referral: {e}")
+        return None
+    finally:
+        db.close()
+
+def get_user_referrals(user_id: int) -> List[Dict]:
+    """Get all referrals made by a user"""
+    try:
+        with SessionLocal() as db:
+            rows = db.scalars(select(Referral).where(Referral.referrer_id == user_id).order_by(*_newest_first(Referral)))
+            return [_as_dict(row) for row in rows]
+    except Exception as e:
+        print(f"Error fetching referrals: {e}")
+        return []
+
+# ============================================
+# COIN TRANSACTION FUNCTIONS
+# ============================================
+
+def append_coin_transaction(user_id: int, amount: int, transaction_type: str, description: str = None,
+                            min_balance: int = None, clamp: bool = False) -> Optional[Dict]:
+    """Append a ledger entry and apply it to the balance in one transaction.
+    Returns {transaction, new_balance}, or None if the user is unknown or
+    min_balance refuses the change.
+    """
+    db = SessionLocal()
+    try:
+        transaction, new_balance = _add_coin_transaction(db, user_id, amount, transaction_type, description,
+                                                         min_balance=min_balance, clamp=clamp)
+        db.commit()
+        return {'transaction': _as_dict(transaction), 'new_balance': new_balance}
+    except Exception as e:
+        db.rollback()
+        print(f"Error appending coin transaction: {e}")
+        return None
+    finally:
+        db.close()
+
+def create_coin_transaction(user_id: int, amount: int, transaction_type: str, description: str = None) -> Optional[Dict]:
+    """Create a coin transaction and update user balance"""
+    movement = append_coin_transaction(user_id, amount, transaction_type, description)
+    return movement['transaction'] if movement else None
+
+def get_user_coin_history(user_id: int, limit: int = 50) -> List[Dict]:
+    """Get coin transaction history for a user"""
+    try:
+        with SessionLocal() as db:
+            rows = db.scalars(select(CoinTransaction).where(CoinTransaction.user_id == user_id)
+                              .order_by(*_newest_first(CoinTransaction)).limit(limit))
+            return [_as_dict(row) for row in rows]
+    except Exception as e:
+        print(f"Error fetching coin history: {e}")
+        return []
+
+def _latest_snapshot(db, user_id: int, at: datetime = None) -> Optional[CoinBalanceSnapshot]:
+    query = select(CoinBalanceSnapshot).where(CoinBalanceSnapshot.user_id == user_id)
+    if at is not None:
+        query = query.where(CoinBalanceSnapshot.as_of <= at)
+    return db.scalars(query.order_by(CoinBalanceSnapshot.last_transaction_id.desc()).limit(1)).first()
+
+def _ledger_balance(db, user_id: int, snapshot: Optional[CoinBalanceSnapshot], through=None) -> int:
+    """Snapshot balance plus the ledger entries after it (up to a filter)"""
+    query = select(func.coalesce(func.sum(CoinTransaction.amount), 0)).where(CoinTransaction.user_id == user_id)
+    if snapshot is not None:
+        query = query.where(CoinTransaction.id > snapshot.last_transaction_id)
+    if through is not None:
+        query = query.where(through)
+    return (snapshot.balance if snapshot is not None else 0) + db.scalar(query)
+
+def get_coin_balance_at(user_id: int, at: datetime = None) -> Optional[int]:
+    """Balance from the ledger: the latest snapshot plus the entries since,
+    as of a past time if given. None if that time was compacted away.
+    """
+    try:
+        with SessionLocal() as db:
+            snapshot = _latest_snapshot(db, user_id, at)
+            if snapshot is None and at is not None:
+                first = db.scalars(select(CoinBalanceSnapshot).where(CoinBalanceSnapshot.user_id == user_id)
+                                   .order_by(CoinBalanceSnapshot.last_transaction_id).limit(1)).first()
+                if first is not None and first.compacted:
+                    return None
+            return _ledger_balance(db, user_id, snapshot, CoinTransaction.created_at <= at if at else None)
+    except Exception as e:
+        print(f"Error fetching coin balance: {e}")
+        return None
+
+def snapshot_coin_balances() -> int:
+    """Snapshot the balance of every user with ledger entries since their last snapshot"""
+    db = SessionLocal()
+    try:
+        last_snapshot = select(CoinBalanceSnapshot.user_id, func.max(CoinBalanceSnapshot.last_transaction_id).label('last_id'))\
+            .group_by(CoinBalanceSnapshot.user_id).subquery()
+        pending = db.execute(
+            select(CoinTransaction.user_id, func.max(CoinTransaction.id))
+            .outerjoin(last_snapshot, last_snapshot.c.user_id == CoinTransaction.user_id)
+            .where(CoinTransaction.id > func.coalesce(last_snapshot.c.last_id, 0))
+            .group_by(CoinTransaction.user_id)
+        ).all()
+        for user_id, last_id in pending:
+            _add_snapshot(db, user_id, last_id)
+        db.commit()
+        return len(pending)
+    except Exception as e:
+        db.rollback()
+        print(f"Error snapshotting coin balances: {e}")
+        return 0
+    finally:
+        db.close()
+
+def _add_snapshot(db, user_id: int, last_id: int, compacted: bool = False) -> CoinBalanceSnapshot:
+    """Stage a snapshot of a user's balance through ledger entry last_id"""
+    existing = db.scalars(select(CoinBalanceSnapshot).where(CoinBalanceSnapshot.user_id == user_id,
+                                                            CoinBalanceSnapshot.last_transaction_id == last_id)).first()
+    if existing is not None:
+        existing.compacted = existing.compacted or compacted
+        return existing
+    previous = db.scalars(select(CoinBalanceSnapshot).where(CoinBalanceSnapshot.user_id == user_id,
+                                                            CoinBalanceSnapshot.last_transaction_id < last_id)
+                          .order_by(CoinBalanceSnapshot.last_transaction_id.desc()).limit(1)).first()
+    snapshot = CoinBalanceSnapshot(
+        user_id=user_id,
+        balance=_ledger_balance(db, user_id, previous, CoinTransaction.id <= last_id),
+        last_transaction_id=last_id,
+        as_of=db.get(CoinTransaction, last_id).created_at,
+        compacted=compacted
+    )
+    db.add(snapshot)
+    return snapshot
+
+def compact_coin_ledger(before: datetime) -> int:
+    """Fold ledger entries older than `before` into per-user snapshots and
+    delete them (and the snapshots they supersede); returns the entries removed
+    """
+    db = SessionLocal()
+    try:
+        folded = db.execute(
+            select(CoinTransaction.user_id, func.max(CoinTransaction.id))
+            .where(CoinTransaction.created_at < before)
+            .group_by(CoinTransaction.user_id)
+        ).all()
+        removed = 0
+        for user_id, last_id in folded:
+            _add_snapshot(db, user_id, last_id, compacted=True)
+            db.flush()
+            removed += db.execute(delete(CoinTransaction).where(CoinTransaction.user_id == user_id,
+                                                                CoinTransaction.id <= last_id)).rowcount
+            db.execute(delete(CoinBalanceSnapshot).where(CoinBalanceSnapshot.user_id == user_id,
+                                                         CoinBalanceSnapshot.last_transaction_id < last_id))
+        db.commit()
+        return removed
+    except Exception as e:
+        db.rollback()
+        print(f"Error compacting coin ledger: {e}")
+        return 0
+    finally:
+        db.close()
+
+# ============================================
+# ADMIN FUNCTIONS
+# ============================================
+
+def get_all_users() -> List[Dict]:
+    """Get all users for admin panel"""
+    try:
+        with SessionLocal() as db:
+            return [_as_dict(row) for row in db.scalars(select(User).order_by(*_newest_first(User)))]
+    except Exception as e:
+        print(f"Error fetching all users: {e}")
+        return []
+
+def get_all_scans(limit: int = 50) -> List[Dict]:
+    """Get all scans for admin panel"""
+    try:
+        with SessionLocal() as db:
+            rows = db.scalars(select(Scan).options(joinedload(Scan.owner)).order_by(*_newest_first(Scan)).limit(limit))
+            return [_with_user(row) for row in rows]
+    except Exception as e:
+        print(f"Error fetching all scans: {e}")
+        return []
+
+def get_all_transactions(limit: int = 50) -> List[Dict]:
+    """Get all transactions for admin panel"""
+    try:
+        with SessionLocal() as db:
+            rows = db.scalars(select(CoinTransaction).options(joinedload(CoinTransaction.user))
+                              .order_by(*_newest_first(CoinTransaction)).limit(limit))
+            return [_with_user(row) for row in rows]
+    except Exception as e:
+        print(f"Error fetching all transactions: {e}")
+        return []
+
+def get_dashboard_stats() -> Dict:
+    """Get dashboard statistics"""
+    try:
+        with SessionLocal() as db:
+            total_users, total_coins = db.execute(select(func.count(User.id), func.coalesce(func.sum(User.coins), 0))).one()
+            return {
+                'total_users': total_users,
+                'total_scans': db.scalar(select(func.count(Scan.id))),
+                'total_coins': total_coins
+            }
+    except Exception as e:
+        print(f"Error fetching stats: {e}")
+        return {'total_users': 0, 'total_scans': 0, 'total_coins': 0}
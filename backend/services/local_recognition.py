@@ -0,0 +1,210 @@
+import os
+import io
+import json
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from backend.services.color_classifier import COLOR_PROFILES, UNKNOWN_FOOD
+from backend.services.executors import run_cpu
+from backend.services.recognition_backends import RecognitionBackend, register_backend
+
+# Reference feature set: features.npy (float32, one row per reference image),
+# labels.npy (int32 class index per row) and classes.json (class names)
+LOCAL_RECOGNITION_DIR = os.getenv(
+    'LOCAL_RECOGNITION_DIR',
+    '/tmp/local_recognition' if os.getenv('VERCEL') else 'local_recognition'
+)
+LOCAL_RECOGNITION_K = int(os.getenv('LOCAL_RECOGNITION_K', '7'))
+# Synthetic references per class, used when no reference set has been built
+SYNTHETIC_SAMPLES_PER_CLASS = 48
+
+_SAMPLE_SIZE = (32, 32)
+_HIST_BINS = 4
+_LEVELS = np.arange(256, dtype=np.float32) / 255.0
+# Group weights: mean color, color spread, per-channel histogram, texture
+_WEIGHTS = (1.0, 0.8, 0.6, 1.5)
+FEATURE_DIM = 3 + 3 + 3 * _HIST_BINS + 2
+
+def image_features(image: Image.Image) -> np.ndarray:
+    """Color/texture feature vector of an (analysis thumbnail) image
+
+    Mean and spread of each channel, a coarse per-channel histogram and the
+    mean horizontal/vertical gradient of the luma channel, computed on a
+    32x32 sample. Color statistics all come from PIL's channel histogram,
+    so no per-pixel float arrays are built for them.
+    """
+    sample = image.convert('RGB').resize(_SAMPLE_SIZE, Image.Resampling.BOX)
+    counts = np.asarray(sample.histogram(), dtype=np.float32).reshape(3, 256)
+    counts /= _SAMPLE_SIZE[0] * _SAMPLE_SIZE[1]
+
+    mean = counts @ _LEVELS
+    std = np.sqrt(np.maximum(counts @ (_LEVELS * _LEVELS) - mean * mean, 0.0))
+    histogram = counts.reshape(3, _HIST_BINS, -1).sum(axis=2).ravel()
+
+    luma = np.asarray(sample.convert('L'), dtype=np.float32) * (1.0 / 255.0)
+    texture = np.array([
+        np.abs(np.diff(luma, axis=1)).mean(),
+        np.abs(np.diff(luma, axis=0)).mean(),
+    ], dtype=np.float32)
+
+    return np.concatenate([
+        mean * _WEIGHTS[0],
+        std * _WEIGHTS[1],
+        histogram * _WEIGHTS[2],
+        texture * _WEIGHTS[3],
+    ]).astype(np.float32)
+
+def _synthetic_image(mean, std, rng: np.random.Generator) -> Image.Image:
+    """A smooth random image drawn from a color profile"""
+    shift = rng.normal(0, 12, size=3)
+    coarse = rng.normal(np.asarray(mean) + shift, np.asarray(std), size=(8, 8, 3))
+    image = Image.fromarray(np.clip(coarse, 0, 255).astype(np.uint8), 'RGB')
+    return image.resize(_SAMPLE_SIZE, Image.Resampling.BILINEAR)
+
+def build_synthetic_reference(samples_per_class: int = SYNTHETIC_SAMPLES_PER_CLASS,
+                              seed: int = 0) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+    """Reference set generated from the color profiles (no image files needed)"""
+    rng = np.random.default_rng(seed)
+    features, labels = [], []
+    classes = [name for name, _, _ in COLOR_PROFILES]
+    for label, (_, mean, std) in enumerate(COLOR_PROFILES):
+        for _ in range(samples_per_class):
+            features.append(image_features(_synthetic_image(mean, std, rng)))
+            labels.append(label)
+    return np.stack(features), np.asarray(labels, dtype=np.int32), classes
+
+def build_reference_from_directory(source_dir: str) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+    """Reference set from labeled images laid out as <source_dir>/<food name>/*.jpg"""
+    classes = sorted(
+        name for name in os.listdir(source_dir) if os.path.isdir(os.path.join(source_dir, name))
+    )
+    features, labels = [], []
+    for label, name in enumerate(classes):
+        class_dir = os.path.join(source_dir, name)
+        for file_name in sorted(os.listdir(class_dir)):
+            try:
+                with open(os.path.join(class_dir, file_name), 'rb') as f:
+                    image = Image.open(io.BytesIO(f.read()))
+                    image.draft('RGB', (128, 128))
+                    features.append(image_features(image))
+                    labels.append(label)
+            except Exception as e:
+                print(f"Skipping reference image {file_name}: {e}")
+    return np.stack(features), np.asarray(labels, dtype=np.int32), classes
+
+def save_reference(directory: str, features: np.ndarray, labels: np.ndarray, classes: List[str]):
+    """Write a reference set in the layout LocalKnnEngine memory-maps"""
+    os.makedirs(directory, exist_ok=True)
+    np.save(os.path.join(directory, 'features.npy'), features.astype(np.float32))
+    np.save(os.path.join(directory, 'labels.npy'), labels.astype(np.int32))
+    with open(os.path.join(directory, 'classes.json'), 'w') as f:
+        json.dump(classes, f)
+
+class LocalKnnEngine:
+    """k-nearest-neighbour food classifier over a reference feature matrix
+
+    The matrix is memory-mapped, so startup cost and resident memory do not
+    grow with the reference set, and several worker processes share the same
+    pages. Scoring is a single matrix product per batch of images.
+    """
+
+    def __init__(self, features: np.ndarray, labels: np.ndarray, classes: List[str],
+                 k: int = LOCAL_RECOGNITION_K):
+        self.features = features
+        self.labels = np.asarray(labels)
+        self.classes = classes
+        self.k = max(1, min(k, len(features)))
+        self._squared_norms = np.einsum('ij,ij->i', features, features)
+
+    @classmethod
+    def load(cls, directory: str = LOCAL_RECOGNITION_DIR, k: int = LOCAL_RECOGNITION_K) -> 'LocalKnnEngine':
+        """Memory-map a saved reference set, building the synthetic one if none exists"""
+        features_path = os.path.join(directory, 'features.npy')
+        if not os.path.exists(features_path):
+            features, labels, classes = build_synthetic_reference()
+            try:
+                save_reference(directory, features, labels, classes)
+            except OSError as e:
+                print(f"Error saving local recognition reference set: {e}")
+                return cls(features, labels, classes, k)
+        with open(os.path.join(directory, 'classes.json')) as f:
+            classes = json.load(f)
+        features = np.load(features_path, mmap_mode='r')
+        labels = np.load(os.path.join(directory, 'labels.npy'), mmap_mode='r')
+        return cls(features, labels, classes, k)
+
+    def classify(self, queries: np.ndarray) -> List[Tuple[str, float]]:
+        """(food name, vote share) for each row of a query feature matrix"""
+        # Squared distances via |a|^2 - 2ab + |b|^2; the |a|^2 term does not
+        # change the ranking within a row, so it is left out
+        distances = self._squared_norms[None, :] - 2.0 * (queries @ self.features.T)
+        if self.k < distances.shape[1]:
+            nearest = np.argpartition(distances, self.k - 1, axis=1)[:, :self.k]
+        else:
+            nearest = np.tile(np.arange(distances.shape[1]), (len(queries), 1))
+
+        results = []
+        for row, neighbours in enumerate(nearest):
+            votes = np.bincount(self.labels[neighbours], minlength=len(self.classes))
+            best = int(np.argmax(votes))
+            results.append((self.classes[best], float(votes[best]) / self.k))
+        return results
+
+    def recognize(self, images: List[Optional[Image.Image]]) -> List[Dict[str, Any]]:
+        """Recognize decoded images; undecodable entries (None) get the unknown label"""
+        positions = [i for i, image in enumerate(images) if image is not None]
+        results = [{'name': UNKNOWN_FOOD, 'confidence': 50} for _ in images]
+        if positions:
+            queries = np.stack([image_features(images[i]) for i in positions])
+            for position, (name, share) in zip(positions, self.classify(queries)):
+                # Unanimous neighbours give 90, a bare plurality about 60
+                results[position] = {'name': name, 'confidence': 55 + int(round(35 * share))}
+        return results
+
+_engine = None
+_engine_lock = threading.Lock()
+
+def get_local_engine() -> LocalKnnEngine:
+    """Get or load the local k-NN engine"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = LocalKnnEngine.load()
+    return _engine
+
+@register_backend('local')
+class LocalKnnBackend(RecognitionBackend):
+    """Offline, deterministic recognition with the local k-NN engine"""
+
+    async def recognize(self, images, thumbnails):
+        # The first call loads (or builds and saves) the reference set, so
+        # that runs on the CPU executor too
+        engine = await run_cpu(get_local_engine)
+        results = await run_cpu(engine.recognize, thumbnails)
+        # Not authoritative: a later switch back to Clarifai should not be
+        # answered from persisted local guesses
+        return [(result, False) for result in results]
+
+    def stats(self):
+        # Called from async endpoints: report, but never load, the engine
+        engine = _engine
+        if engine is None:
+            return {'name': self.name, 'loaded': False}
+        return {'name': self.name, 'loaded': True, 'reference_images': len(engine.features),
+                'classes': len(engine.classes), 'k': engine.k}
+
+if __name__ == "__main__":
+    import sys
+    # Build a reference set from labeled images:
+    #   python -m backend.services.local_recognition <images dir> [output dir]
+    if len(sys.argv) < 2:
+        print("Usage: python -m backend.services.local_recognition <images dir> [output dir]")
+        sys.exit(1)
+    output_dir = sys.argv[2] if len(sys.argv) > 2 else LOCAL_RECOGNITION_DIR
+    features, labels, classes = build_reference_from_directory(sys.argv[1])
+    save_reference(output_dir, features, labels, classes)
+    print(f"Saved {len(features)} reference images in {len(classes)} classes to {output_dir}")
@@ -0,0 +1,157 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List
+
+class MicroBatcher:
+    """Coalesce concurrent calls into batched calls of an async handler.
+
+    Callers submit single items and await their own result. A dispatcher
+    task collects pending items and calls `handler` with a list of up to
+    `max_batch` of them, either as soon as that many are waiting or once the
+    oldest has waited `max_wait` seconds. At most `max_in_flight` handler
+    calls run at once; while that limit is reached, new items keep queueing
+    and go out in the next (fuller) batch. The handler must return one
+    result per item, in order; if it raises, every caller in that batch gets
+    the exception, and callers left without a result get a RuntimeError.
+    If the dispatcher dies, the next submit starts a new one that picks up
+    the queued items. close() stops the dispatcher and cancels whatever is
+    still waiting.
+    """
+
+    def __init__(self, handler: Callable[[List[Any]], Awaitable[List[Any]]], max_batch: int = 16,
+                 max_wait: float = 0.005, max_in_flight: int = 8):
+        self.handler = handler
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.max_in_flight = max_in_flight
+        self._loop = None
+        self._stats = {'batches': 0, 'items': 0, 'full_batches': 0, 'errors': 0}
+        self._queue_delays = deque(maxlen=1000)
+        self._in_flight = 0
+        self._tasks = set()
+
+    def _bind_loop(self, loop: asyncio.AbstractEventLoop):
+        if self._loop is loop:
+            # The dispatcher died; a new one takes over the items it left queued
+            reason = 'cancelled' if self._dispatcher.cancelled() else repr(self._dispatcher.exception())
+            print(f"Error in micro-batcher dispatcher ({reason}); restarting it with "
+                  f"{len(self._pending)} queued items")
+        else:
+            # Queue state belongs to one event loop; start fresh on a new one
+            if self._loop is not None:
+                self._cancel_pending()
+            self._loop = loop
+            self._pending = deque()  # (item, future, enqueued_at)
+            self._item_added = asyncio.Event()
+            self._slots = asyncio.Semaphore(self.max_in_flight)
+        self._dispatcher = loop.create_task(self._dispatch_loop())
+
+    def _cancel_pending(self):
+        while self._pending:
+            future = self._pending.popleft()[1]
+            try:
+                future.cancel()
+            except RuntimeError:
+                pass  # its event loop is closed; nobody is waiting on it
+
+    async def submit(self, item: Any) -> Any:
+        """Queue one item and wait for its result"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._dispatcher.done():
+            self._bind_loop(loop)
+        future = loop.create_future()
+        self._pending.append((item, future, time.perf_counter()))
+        self._item_added.set()
+        return await future
+
+    async def _wait_for_item(self, timeout: float) -> bool:
+        self._item_added.clear()
+        try:
+            await asyncio.wait_for(self._item_added.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def _dispatch_loop(self):
+        while True:
+            while not self._pending:
+                self._item_added.clear()
+                await self._item_added.wait()
+
+            # Hold the batch open until it is full or the oldest item's window ends
+            deadline = self._pending[0][2] + self.max_wait
+            while len(self._pending) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0 or not await self._wait_for_item(remaining):
+                    break
+
+            await self._slots.acquire()
+            size = min(self.max_batch, len(self._pending))
+            batch = [self._pending.popleft() for _ in range(size)]
+            # Keep a reference so the task is not garbage collected mid-flight
+            task = self._loop.create_task(self._execute(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _execute(self, batch):
+        started = time.perf_counter()
+        self._in_flight += 1
+        self._stats['batches'] += 1
+        self._stats['items'] += len(batch)
+        if len(batch) == self.max_batch:
+            self._stats['full_batches'] += 1
+        self._queue_delays.extend(started - enqueued_at for _, _, enqueued_at in batch)
+        try:
+            results = await self.handler([item for item, _, _ in batch])
+        except asyncio.CancelledError:
+            for _, future, _ in batch:
+                future.cancel()
+            raise
+        except Exception as e:
+            self._stats['errors'] += 1
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            results = list(results)
+            for (_, future, _), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+            if len(results) < len(batch):
+                self._stats['errors'] += 1
+                error = RuntimeError(f"Batch handler returned {len(results)} results for {len(batch)} items")
+                for _, future, _ in batch[len(results):]:
+                    if not future.done():
+                        future.set_exception(error)
+        finally:
+            self._in_flight -= 1
+            self._slots.release()
+
+    async def close(self):
+        """Stop the dispatcher and cancel queued and in-flight calls"""
+        if self._loop is None or self._loop is not asyncio.get_running_loop():
+            return
+        self._dispatcher.cancel()
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(self._dispatcher, *self._tasks, return_exceptions=True)
+        self._cancel_pending()
+        self._loop = None
+
+    def stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        batches = stats['batches']
+        delays = sorted(self._queue_delays)
+        stats.update({
+            'max_batch': self.max_batch,
+            'max_wait_ms': self.max_wait * 1000,
+            'max_in_flight': self.max_in_flight,
+            'in_flight': self._in_flight,
+            'pending': len(self._pending) if self._loop is not None else 0,
+            'avg_batch_size': round(stats['items'] / batches, 2) if batches else 0.0,
+            'fill_ratio': round(stats['items'] / (batches * self.max_batch), 3) if batches else 0.0,
+            'avg_queue_delay_ms': round(sum(delays) / len(delays) * 1000, 3) if delays else 0.0,
+            'p95_queue_delay_ms': round(delays[int(len(delays) * 0.95)] * 1000, 3) if delays else 0.0,
+        })
+        return stats
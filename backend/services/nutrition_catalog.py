@@ -0,0 +1,308 @@
+import os
+import time
+import asyncio
+from types import MappingProxyType
+from typing import Dict, Any, List, Mapping, Optional, Tuple
+
+from backend.services.executors import run_cpu
+from backend.services.food_resolver import TrigramIndex, normalize_name
+from backend.services.repository import get_repository
+
+# How often the food_database version is checked (seconds); 0 disables
+# loading from food_database and keeps the built-in foods only
+NUTRITION_CATALOG_REFRESH_SECONDS = float(os.getenv('NUTRITION_CATALOG_REFRESH_SECONDS', '300'))
+# Distinct recognized names remembered per catalog version
+NUTRITION_LOOKUP_MEMO_SIZE = 10000
+
+# Foods known without the database, with their background stories. Rows in
+# food_database override the nutrition values and keep the story.
+BUILTIN_FOODS = {
+    'pizza': {
+        'calories': 266,
+        'protein': '11g',
+        'carbs': '33g',
+        'fat': '10g',
+        'healthScore': 45,
+        'ingredients': ['Dough', 'Tomato Sauce', 'Cheese', 'Toppings'],
+        'history': {
+            'origin': 'Naples, Italy (18th century)',
+            'cultural': 'Pizza became popular worldwide after World War II. The Margherita pizza was created in 1889 to honor Queen Margherita of Italy.',
+            'funFact': 'Americans eat approximately 350 slices of pizza per second!'
+        }
+    },
+    'salad': {
+        'calories': 150,
+        'protein': '8g',
+        'carbs': '12g',
+        'fat': '9g',
+        'healthScore': 92,
+        'ingredients': ['Lettuce', 'Vegetables', 'Dressing'],
+        'history': {
+            'origin': 'Ancient Rome and Greece',
+            'cultural': 'The word "salad" comes from the Latin "sal" meaning salt. Romans used to salt their leafy greens and vegetables.',
+            'funFact': 'Caesar salad was invented in Tijuana, Mexico, not Italy!'
+        }
+    },
+    'burger': {
+        'calories': 540,
+        'protein': '25g',
+        'carbs': '45g',
+        'fat': '28g',
+        'healthScore': 38,
+        'ingredients': ['Bun', 'Beef Patty', 'Lettuce', 'Tomato', 'Cheese'],
+        'history': {
+            'origin': 'Hamburg, Germany / United States (late 1800s)',
+            'cultural': 'The hamburger became an American icon in the 20th century. It\'s named after Hamburg, Germany, where a similar dish originated.',
+            'funFact': 'Americans consume about 50 billion burgers per year!'
+        }
+    },
+    'chicken': {
+        'calories': 335,
+        'protein': '38g',
+        'carbs': '0g',
+        'fat': '19g',
+        'healthScore': 78,
+        'ingredients': ['Chicken Breast', 'Seasonings'],
+        'history': {
+            'origin': 'Domesticated in Southeast Asia (8000 years ago)',
+            'cultural': 'Chicken is the most common type of poultry in the world. It\'s a staple protein in cuisines across all continents.',
+            'funFact': 'There are more chickens on Earth than any other bird species!'
+        }
+    },
+    'rice': {
+        'calories': 206,
+        'protein': '4g',
+        'carbs': '45g',
+        'fat': '0.4g',
+        'healthScore': 65,
+        'ingredients': ['Rice', 'Water'],
+        'history': {
+            'origin': 'China and India (over 5000 years ago)',
+            'cultural': 'Rice is a staple food for more than half of the world\'s population. It plays a central role in Asian cultures and ceremonies.',
+            'funFact': 'There are over 40,000 varieties of rice worldwide!'
+        }
+    },
+    'pasta': {
+        'calories': 371,
+        'protein': '13g',
+        'carbs': '74g',
+        'fat': '1.5g',
+        'healthScore': 55,
+        'ingredients': ['Pasta', 'Sauce'],
+        'history': {
+            'origin': 'Italy (13th century)',
+            'cultural': 'While pasta is synonymous with Italian cuisine, similar noodles existed in ancient China. Italy perfected the art of pasta making.',
+            'funFact': 'There are over 600 different shapes of pasta produced worldwide!'
+        }
+    },
+    'sandwich': {
+        'calories': 300,
+        'protein': '15g',
+        'carbs': '40g',
+        'fat': '10g',
+        'healthScore': 60,
+        'ingredients': ['Bread', 'Meat', 'Vegetables', 'Condiments'],
+        'history': {
+            'origin': 'England (18th century)',
+            'cultural': 'Named after the Earl of Sandwich who wanted to eat without leaving his gambling table. The concept revolutionized quick meals.',
+            'funFact': 'The average American eats about 300 sandwiches per year!'
+        }
+    },
+    'vegetables': {
+        'calories': 65,
+        'protein': '3g',
+        'carbs': '13g',
+        'fat': '0.5g',
+        'healthScore': 95,
+        'ingredients': ['Broccoli', 'Carrots', 'Peppers', 'Green Beans'],
+        'history': {
+            'origin': 'Cultivated worldwide since the dawn of agriculture (10,000 years ago)',
+            'cultural': 'Vegetables were among the first crops farmed in the Fertile Crescent. Every cuisine has its own signature vegetable dishes.',
+            'funFact': 'Carrots were originally purple before Dutch growers bred the orange variety!'
+        }
+    },
+    'beef': {
+        'calories': 250,
+        'protein': '26g',
+        'carbs': '0g',
+        'fat': '15g',
+        'healthScore': 58,
+        'ingredients': ['Beef', 'Salt', 'Pepper'],
+        'history': {
+            'origin': 'Domesticated cattle in the Middle East (10,500 years ago)',
+            'cultural': 'Beef is central to cuisines from Argentine asado to Japanese wagyu. Cattle were once a measure of wealth in many societies.',
+            'funFact': 'There are over 800 breeds of cattle in the world!'
+        }
+    },
+    'smoothie': {
+        'calories': 180,
+        'protein': '4g',
+        'carbs': '36g',
+        'fat': '2g',
+        'healthScore': 82,
+        'ingredients': ['Fruit', 'Leafy Greens', 'Yogurt', 'Ice'],
+        'history': {
+            'origin': 'United States (1930s)',
+            'cultural': 'Smoothies spread with the electric blender and the health food stores of 1930s California. Green smoothies became popular in the 2000s.',
+            'funFact': 'The word "smoothie" first appeared in recipe books in the 1940s!'
+        }
+    }
+}
+
+DEFAULT_FOOD = {
+    'calories': 250,
+    'protein': '10g',
+    'carbs': '30g',
+    'fat': '8g',
+    'healthScore': 60,
+    'ingredients': ['Various ingredients'],
+    'history': {
+        'origin': 'Various regions worldwide',
+        'cultural': 'This dish has been enjoyed by cultures around the world for generations.',
+        'funFact': 'Food brings people together across all cultures!'
+    }
+}
+
+
+def _grams(value) -> str:
+    return f"{float(value or 0):g}g"
+
+def _freeze(entry: Dict[str, Any]) -> Mapping[str, Any]:
+    """Read-only view of an entry, so shared entries cannot be modified by callers"""
+    frozen = dict(entry)
+    frozen['ingredients'] = tuple(entry.get('ingredients') or ())
+    frozen['history'] = MappingProxyType(dict(entry.get('history') or DEFAULT_FOOD['history']))
+    return MappingProxyType(frozen)
+
+def _entry_from_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a food_database row to the nutrition response shape"""
+    builtin = BUILTIN_FOODS.get(normalize_name(row['food_name']), DEFAULT_FOOD)
+    return {
+        'name': row['food_name'],
+        'calories': row.get('calories') if row.get('calories') is not None else builtin['calories'],
+        'protein': _grams(row.get('protein')),
+        'carbs': _grams(row.get('carbs')),
+        'fat': _grams(row.get('fat')),
+        'healthScore': row.get('health_score') if row.get('health_score') is not None else builtin['healthScore'],
+        'ingredients': row.get('ingredients') or builtin['ingredients'],
+        'history': builtin['history'],
+        'category': normalize_name(row['category']) if row.get('category') else None,
+    }
+
+class NutritionCatalog:
+    """Immutable nutrition index keyed by normalized food name and category
+
+    Built once per food_database version and swapped in whole on reload, so
+    readers never see a half-updated index and need no locking. Entries are
+    read-only mappings shared by every caller. lookup() answers repeated
+    names with a single dict probe and no allocation; the first lookup of a
+    new name normalizes it and, if there is no exact match, resolves it with
+    the fuzzy trigram index.
+    """
+
+    def __init__(self, entries: Dict[str, Dict[str, Any]], version: str, source: str):
+        self.version = version
+        self.source = source
+        self.loaded_at = time.time()
+        self._by_name = MappingProxyType({name: _freeze(entry) for name, entry in entries.items()})
+        categories: Dict[str, List[Mapping[str, Any]]] = {}
+        for name, entry in self._by_name.items():
+            if entry.get('category'):
+                categories.setdefault(entry['category'], []).append(entry)
+        self._by_category = MappingProxyType({key: tuple(value) for key, value in categories.items()})
+        self.resolver = TrigramIndex(list(self._by_name))
+        self._default = _freeze(DEFAULT_FOOD)
+        self._resolved: Dict[str, Mapping[str, Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._by_name)
+
+    def lookup(self, food_name: str) -> Mapping[str, Any]:
+        """Nutrition entry for a recognized food name (the default entry if unknown)"""
+        entry = self._resolved.get(food_name)
+        if entry is None:
+            entry = self._resolve(food_name)
+        return entry
+
+    def _resolve(self, food_name: str) -> Mapping[str, Any]:
+        match = self.resolve(food_name)
+        entry = match[0] if match else self._default
+        if len(self._resolved) < NUTRITION_LOOKUP_MEMO_SIZE:
+            self._resolved[food_name] = entry
+        return entry
+
+    def resolve(self, food_name: str) -> Optional[Tuple[Mapping[str, Any], float]]:
+        """Best entry for a recognized name with its similarity (1.0 for an exact match), or None"""
+        key = normalize_name(food_name)
+        entry = self._by_name.get(key)
+        if entry is not None:
+            return entry, 1.0
+        match = self.resolver.resolve(key)
+        return (self._by_name[match[0]], match[1]) if match else None
+
+    def get(self, food_name: str) -> Optional[Mapping[str, Any]]:
+        """Exact entry for a name, or None"""
+        return self._by_name.get(normalize_name(food_name))
+
+    def search(self, query: str, limit: int = 5) -> List[Tuple[Mapping[str, Any], float]]:
+        """Closest catalog entries for a free-text name, with similarity scores"""
+        return [(self._by_name[name], score) for name, score in self.resolver.search(query, limit=limit)]
+
+    def by_category(self, category: str) -> Tuple[Mapping[str, Any], ...]:
+        return self._by_category.get(normalize_name(category), ())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'version': self.version,
+            'source': self.source,
+            'foods': len(self._by_name),
+            'categories': len(self._by_category),
+            'loaded_at': self.loaded_at,
+            'memoized_names': len(self._resolved),
+        }
+
+def build_catalog(rows: List[Dict[str, Any]], version: str, source: str = 'food_database') -> NutritionCatalog:
+    """Catalog of the built-in foods overlaid with food_database rows"""
+    entries = {name: {'name': name.title(), **entry} for name, entry in BUILTIN_FOODS.items()}
+    for row in rows:
+        if row.get('food_name'):
+            entries[normalize_name(row['food_name'])] = _entry_from_row(row)
+    return NutritionCatalog(entries, version, source)
+
+_catalog = build_catalog([], version='builtin', source='builtin')
+_refresh_task: Optional[asyncio.Task] = None
+
+def get_nutrition_catalog() -> NutritionCatalog:
+    """Current catalog (never blocks; the built-in foods until the first load)"""
+    return _catalog
+
+async def reload_nutrition_catalog(force: bool = False) -> bool:
+    """Rebuild the catalog if food_database changed; returns True if swapped"""
+    global _catalog
+    repository = get_repository()
+    version = await repository.get_food_database_version()
+    if version is None or (version == _catalog.version and not force):
+        return False
+    rows = await repository.get_food_database()
+    if rows is None:
+        return False
+    _catalog = await run_cpu(build_catalog, rows, version)
+    return True
+
+async def _refresh_loop():
+    while True:
+        await reload_nutrition_catalog()
+        await asyncio.sleep(NUTRITION_CATALOG_REFRESH_SECONDS)
+
+def start_catalog_refresh():
+    """Load food_database and keep checking it for changes (called from the app lifespan)"""
+    global _refresh_task
+    if NUTRITION_CATALOG_REFRESH_SECONDS > 0 and _refresh_task is None:
+        _refresh_task = asyncio.get_running_loop().create_task(_refresh_loop())
+
+async def stop_catalog_refresh():
+    global _refresh_task
+    if _refresh_task is not None:
+        _refresh_task.cancel()
+        await asyncio.gather(_refresh_task, return_exceptions=True)
+        _refresh_task = None
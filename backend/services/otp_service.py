@@ -1,12 +1,11 @@
 import random
 import string
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional
+from typing import Dict, Any
 from backend.services.supabase_client import get_supabase_client
 
 # In-memory storage for testing (when Supabase tables don't exist)
 _otp_storage = {}
-_user_storage = {}
 
 def generate_otp(length: int = 6) -> str:
     """Generate a random OTP code"""
@@ -90,12 +89,9 @@ def verify_otp(phone_number: str, otp_code: str) -> Dict[str, Any]:
                     .eq('id', otp_record['id'])\
                     .execute()
                 
-                # Get or create user
-                user = get_or_create_user(phone_number)
-                
+                # The caller gets or creates the user through the repository
                 return {
                     'success': True,
-                    'user': user,
                     'message': 'OTP verified successfully'
                 }
         except Exception as db_error:
@@ -109,17 +105,8 @@ def verify_otp(phone_number: str, otp_code: str) -> Dict[str, Any]:
                     
                     stored['verified'] = True
                     
-                    # Create mock user
-                    user = {
-                        'id': phone_number,
-                        'phone_number': phone_number,
-                        'created_at': datetime.utcnow().isoformat()
-                    }
-                    _user_storage[phone_number] = user
-                    
                     return {
                         'success': True,
-                        'user': user,
                         'message': 'OTP verified successfully'
                     }
         
@@ -134,36 +121,3 @@ def verify_otp(phone_number: str, otp_code: str) -> Dict[str, Any]:
             'success': False,
             'error': str(e)
         }
-
-def get_or_create_user(phone_number: str) -> Dict[str, Any]:
-    """Get existing user or create new one"""
-    try:
-        supabase = get_supabase_client()
-        
-        # Check if user exists
-        result = supabase.table('users')\
-            .select('*')\
-            .eq('phone_number', phone_number)\
-            .execute()
-        
-        if result.data:
-            # Update last login
-            user = result.data[0]
-            supabase.table('users')\
-                .update({'last_login': datetime.utcnow().isoformat()})\
-                .eq('id', user['id'])\
-                .execute()
-            return user
-        
-        # Create new user
-        new_user = {
-            'phone_number': phone_number,
-            'is_active': True
-        }
-        
-        result = supabase.table('users').insert(new_user).execute()
-        return result.data[0] if result.data else None
-        
-    except Exception as e:
-        print(f"Error getting/creating user: {e}")
-        return None
@@ -0,0 +1,159 @@
+import os
+import threading
+from itertools import combinations
+from typing import Optional, Dict, Any, Tuple, List
+
+import numpy as np
+from PIL import Image
+
+# Near-duplicate index configuration
+PHASH_MAX_DISTANCE = int(os.getenv('PHASH_MAX_DISTANCE', '6'))  # max Hamming distance for a reuse
+PHASH_INDEX_CAPACITY = int(os.getenv('PHASH_INDEX_CAPACITY', '100000'))  # most recent scans kept
+
+HASH_BITS = 64
+CHUNKS = 4  # multi-index hashing: 4 tables of 16-bit substrings
+CHUNK_BITS = HASH_BITS // CHUNKS
+CHUNK_MASK = (1 << CHUNK_BITS) - 1
+# Inserts are scanned linearly until this many accumulate, then the tables are rebuilt
+DELTA_LIMIT = 8192
+
+_POPCOUNT8 = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+def dhash(image: Image.Image) -> int:
+    """64-bit difference hash: sign of horizontal gradients on a 9x8 thumbnail"""
+    pixels = np.asarray(image.convert('L').resize((9, 8), Image.Resampling.BILINEAR), dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int(np.packbits(bits).view('>u8')[0])
+
+def _hamming(hashes: np.ndarray, query: int) -> np.ndarray:
+    diff = np.bitwise_xor(hashes, np.uint64(query))
+    return _POPCOUNT8[diff.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+def _flip_masks(radius: int) -> List[int]:
+    """All CHUNK_BITS-bit masks with at most `radius` bits set"""
+    masks = [0]
+    for weight in range(1, radius + 1):
+        for bits in combinations(range(CHUNK_BITS), weight):
+            mask = 0
+            for bit in bits:
+                mask |= 1 << bit
+            masks.append(mask)
+    return masks
+
+class PerceptualIndex:
+    """Multi-index hash table over the dHashes of recent scans.
+
+    Each 64-bit hash is split into four 16-bit chunks. By the pigeonhole
+    principle two hashes within distance r share at least one chunk within
+    distance r // 4, so a lookup only probes a handful of buckets per table
+    and verifies the candidates with a vectorized popcount.
+
+    Hashes live in a fixed-capacity ring buffer (oldest scans are dropped).
+    Recent inserts are kept in a small delta that is scanned linearly and
+    folded into the bucket tables once it reaches DELTA_LIMIT (or capacity).
+    """
+
+    def __init__(self, capacity: int = PHASH_INDEX_CAPACITY, max_distance: int = PHASH_MAX_DISTANCE):
+        self.capacity = capacity
+        self.max_distance = max_distance
+        self._hashes = np.zeros(capacity, dtype=np.uint64)
+        self._results: List[Optional[Tuple[str, int]]] = [None] * capacity
+        self._count = 0  # total inserts; slot = count % capacity
+        self._indexed = 0  # value of _count when the bucket tables were last rebuilt
+        self._tables = [None] * CHUNKS  # per chunk: (bucket starts, slots sorted by chunk)
+        self._masks = _flip_masks(max_distance // CHUNKS)
+        self._lock = threading.Lock()
+        self._stats = {'lookups': 0, 'hits': 0, 'rebuilds': 0}
+
+    def __len__(self) -> int:
+        return min(self._count, self.capacity)
+
+    def add(self, phash: int, result: Dict[str, Any]):
+        """Remember the recognition result for an image hash"""
+        with self._lock:
+            slot = self._count % self.capacity
+            self._hashes[slot] = np.uint64(phash)
+            self._results[slot] = (result['name'], int(result['confidence']))
+            self._count += 1
+            if self._count - self._indexed >= min(DELTA_LIMIT, self.capacity):
+                self._rebuild()
+
+    def lookup(self, phash: int) -> Optional[Tuple[Dict[str, Any], int]]:
+        """Return (result, distance) of the closest stored hash within max_distance"""
+        with self._lock:
+            self._stats['lookups'] += 1
+            candidates = self._candidates(phash)
+            if candidates.size == 0:
+                return None
+            distances = _hamming(self._hashes[candidates], phash)
+            best = int(np.argmin(distances))
+            distance = int(distances[best])
+            if distance > self.max_distance:
+                return None
+            self._stats['hits'] += 1
+            name, confidence = self._results[int(candidates[best])]
+            return {'name': name, 'confidence': confidence}, distance
+
+    def _candidates(self, phash: int) -> np.ndarray:
+        # Caller holds the lock. Candidates may repeat; that is harmless for argmin.
+        parts = []
+        if self._count > self._indexed:
+            parts.append(self._delta_slots())
+        if self._indexed:
+            for chunk, (starts, slots) in enumerate(self._tables):
+                value = (phash >> (chunk * CHUNK_BITS)) & CHUNK_MASK
+                for mask in self._masks:
+                    bucket = value ^ mask
+                    begin, end = starts[bucket], starts[bucket + 1]
+                    if begin != end:
+                        parts.append(slots[begin:end])
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(parts)
+
+    def _delta_slots(self) -> np.ndarray:
+        # Slots written since the last rebuild; contiguous apart from ring wrap-around
+        positions = np.arange(self._indexed, self._count, dtype=np.int64)
+        return positions % self.capacity
+
+    def _rebuild(self):
+        # Caller holds the lock. Counting sort of every slot by each 16-bit chunk.
+        size = len(self)
+        hashes = self._hashes[:size]
+        for chunk in range(CHUNKS):
+            keys = ((hashes >> np.uint64(chunk * CHUNK_BITS)) & np.uint64(CHUNK_MASK)).astype(np.uint16)
+            slots = np.argsort(keys, kind='stable').astype(np.int64)
+            starts = np.zeros(CHUNK_MASK + 2, dtype=np.int64)
+            np.cumsum(np.bincount(keys, minlength=CHUNK_MASK + 1), out=starts[1:])
+            # Bucket boundaries as a plain list: probing indexes it dozens of times per lookup
+            self._tables[chunk] = (starts.tolist(), slots)
+        self._indexed = self._count
+        self._stats['rebuilds'] += 1
+
+    def memory_bytes(self) -> int:
+        """Approximate memory held by the index structures"""
+        total = self._hashes.nbytes + 8 * len(self._results)
+        for table in self._tables:
+            if table is not None:
+                starts, slots = table
+                total += 36 * len(starts) + slots.nbytes  # list slot + int object per boundary
+        return total
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self)
+            stats['capacity'] = self.capacity
+            stats['max_distance'] = self.max_distance
+            stats['memory_bytes'] = self.memory_bytes()
+        return stats
+
+# Singleton pattern, same as the Supabase client
+_perceptual_index = None
+
+def get_perceptual_index() -> PerceptualIndex:
+    """Get or create the process-wide near-duplicate index"""
+    global _perceptual_index
+    if _perceptual_index is None:
+        _perceptual_index = PerceptualIndex()
+    return _perceptual_index
@@ -0,0 +1,140 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Iterable
+
+# Latest scans kept per user (the mobile home screen asks for 10)
+RECENT_SCANS_PER_USER = int(os.getenv('RECENT_SCANS_PER_USER', '20'))
+# Memory budget for all cached users; least recently used users are evicted
+RECENT_SCANS_CACHE_BYTES = int(os.getenv('RECENT_SCANS_CACHE_BYTES', str(16 * 1024 * 1024)))
+# Users whose latest write is remembered for detecting stale fills
+_TRACKED_WRITERS = 4096
+
+def _deep_size(value: Any) -> int:
+    """Approximate memory used by a JSON-like value (dicts, lists, scalars)
+
+    A raw JSON fragment counts as a small object: it references the row's
+    nutrition_json text, which is counted already.
+    """
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(_deep_size(k) + _deep_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(_deep_size(item) for item in value)
+    return size
+
+class RecentScansCache:
+    """Per-user cache of the latest scans, newest first, ready to serialize.
+
+    Users are kept in LRU order and evicted once the cached rows exceed the
+    memory budget. New scans are added write-through after they are saved,
+    so cached lists stay current without a re-read. A fill that raced with
+    a write is dropped instead of caching rows read before the write.
+    """
+
+    def __init__(self, per_user: int = RECENT_SCANS_PER_USER, max_bytes: int = RECENT_SCANS_CACHE_BYTES):
+        self.per_user = per_user
+        self.max_bytes = max_bytes
+        self._users = OrderedDict()  # user_id -> [scans, complete, size]
+        self._bytes = 0
+        self._writes = 0
+        self._last_write = OrderedDict()  # user_id -> write sequence number
+        self._forgotten_write = 0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'fills': 0, 'stale_fills': 0, 'write_throughs': 0,
+                       'invalidations': 0, 'evictions': 0}
+
+    def get(self, user_id: int, limit: int) -> Optional[List[Dict[str, Any]]]:
+        """Up to limit latest scans of a user, or None if the cache cannot answer"""
+        with self._lock:
+            entry = self._users.get(user_id)
+            # complete: the user has no scans beyond the cached ones
+            if entry is None or (len(entry[0]) < limit and not entry[1]):
+                self._stats['misses'] += 1
+                return None
+            self._users.move_to_end(user_id)
+            self._stats['hits'] += 1
+            return entry[0][:limit]
+
+    def write_token(self) -> int:
+        """Marker to take before reading scans from the database for fill()"""
+        with self._lock:
+            return self._writes
+
+    def fill(self, user_id: int, scans: List[Dict[str, Any]], requested: int, token: int):
+        """Cache scans read from the database (newest first, `requested` asked for)"""
+        with self._lock:
+            if self._last_write.get(user_id, self._forgotten_write) > token:
+                # A scan was saved while we were reading; the rows may miss it
+                self._stats['stale_fills'] += 1
+                return
+            self._stats['fills'] += 1
+            self._store(user_id, list(scans[:self.per_user]), len(scans) < requested)
+
+    def add(self, user_id: int, scans: Iterable[Dict[str, Any]]):
+        """Write-through: put newly saved scans at the front of a cached user's list"""
+        with self._lock:
+            self._note_write(user_id)
+            entry = self._users.get(user_id)
+            if entry is None:
+                return
+            self._stats['write_throughs'] += 1
+            merged = list(reversed(list(scans))) + entry[0]
+            complete = entry[1] and len(merged) <= self.per_user
+            self._store(user_id, merged[:self.per_user], complete)
+
+    def invalidate(self, user_ids: Iterable[int]):
+        """Drop cached users whose scans changed without a write-through"""
+        with self._lock:
+            for user_id in user_ids:
+                self._note_write(user_id)
+                entry = self._users.pop(user_id, None)
+                if entry is not None:
+                    self._bytes -= entry[2]
+                    self._stats['invalidations'] += 1
+
+    def _note_write(self, user_id: int):
+        # Caller holds the lock
+        self._writes += 1
+        self._last_write[user_id] = self._writes
+        self._last_write.move_to_end(user_id)
+        if len(self._last_write) > _TRACKED_WRITERS:
+            # Fills that started before this write are treated as stale
+            _, self._forgotten_write = self._last_write.popitem(last=False)
+
+    def _store(self, user_id: int, scans: List[Dict[str, Any]], complete: bool):
+        # Caller holds the lock
+        old = self._users.pop(user_id, None)
+        if old is not None:
+            self._bytes -= old[2]
+        size = _deep_size(scans)
+        self._users[user_id] = [scans, complete, size]
+        self._bytes += size
+        while self._bytes > self.max_bytes and len(self._users) > 1:
+            _, (_, _, evicted_size) = self._users.popitem(last=False)
+            self._bytes -= evicted_size
+            self._stats['evictions'] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                'users': len(self._users),
+                'rows': sum(len(entry[0]) for entry in self._users.values()),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+            })
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        return stats
+
+# Singleton pattern, same as the Supabase client
+_recent_scans_cache = None
+
+def get_recent_scans_cache() -> RecentScansCache:
+    """Get or create the process-wide recent scans cache"""
+    global _recent_scans_cache
+    if _recent_scans_cache is None:
+        _recent_scans_cache = RecentScansCache()
+    return _recent_scans_cache
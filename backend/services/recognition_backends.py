@@ -0,0 +1,55 @@
+import os
+from typing import Dict, Any, List, Optional, Tuple, Type
+
+from PIL import Image
+
+# Which recognition backend scans use: 'clarifai' (default), 'local' (offline
+# k-NN engine) or 'color' (color-profile classifier only)
+RECOGNITION_BACKEND = os.getenv('RECOGNITION_BACKEND', 'clarifai')
+
+class RecognitionBackend:
+    """Interface for food recognition providers
+
+    Backends receive images that missed the recognition cache, as compressed
+    bytes plus the decoded analysis thumbnail (None if undecodable), and
+    return one (result, authoritative) pair per image, in order. Results are
+    {'name': str, 'confidence': int}. Authoritative results are persisted in
+    the recognition cache and the near-duplicate index; the rest are only
+    kept in memory.
+    """
+    name = 'base'
+
+    async def recognize(self, images: List[bytes],
+                        thumbnails: List[Optional[Image.Image]]) -> List[Tuple[Dict[str, Any], bool]]:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        return {'name': self.name}
+
+_registry: Dict[str, Type[RecognitionBackend]] = {}
+
+def register_backend(name: str):
+    """Class decorator adding a backend to the registry under name"""
+    def decorator(cls: Type[RecognitionBackend]) -> Type[RecognitionBackend]:
+        cls.name = name
+        _registry[name] = cls
+        return cls
+    return decorator
+
+def available_backends() -> List[str]:
+    return sorted(_registry)
+
+def create_backend(name: str) -> RecognitionBackend:
+    if name not in _registry:
+        raise ValueError(f"Unknown recognition backend '{name}' (available: {', '.join(available_backends())})")
+    return _registry[name]()
+
+# Singleton pattern, same as the Supabase client
+_backend = None
+
+def get_recognition_backend() -> RecognitionBackend:
+    """Get or create the configured recognition backend"""
+    global _backend
+    if _backend is None:
+        _backend = create_backend(RECOGNITION_BACKEND)
+    return _backend
@@ -0,0 +1,173 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any
+
+# Recognition cache configuration
+RECOGNITION_CACHE_SIZE = int(os.getenv('RECOGNITION_CACHE_SIZE', '2048'))  # in-memory entries
+RECOGNITION_CACHE_TTL = int(os.getenv('RECOGNITION_CACHE_TTL', '3600'))  # seconds
+RECOGNITION_CACHE_DISK_TTL = int(os.getenv('RECOGNITION_CACHE_DISK_TTL', str(7 * 24 * 3600)))  # seconds
+RECOGNITION_CACHE_DISK_ROWS = int(os.getenv('RECOGNITION_CACHE_DISK_ROWS', '100000'))  # 0 = unbounded
+RECOGNITION_CACHE_PURGE_EVERY = int(os.getenv('RECOGNITION_CACHE_PURGE_EVERY', '500'))  # disk writes
+
+if os.getenv("VERCEL"):
+    RECOGNITION_CACHE_PATH = os.getenv('RECOGNITION_CACHE_PATH', '/tmp/recognition_cache.db')
+else:
+    RECOGNITION_CACHE_PATH = os.getenv('RECOGNITION_CACHE_PATH', 'recognition_cache.db')
+
+def content_hash(image_bytes: bytes) -> str:
+    """Cache key for an image: SHA-256 of the (compressed) bytes"""
+    return hashlib.sha256(image_bytes).hexdigest()
+
+class RecognitionCache:
+    """Two-tier cache of recognition results keyed by image content hash.
+
+    The memory tier is an LRU with a TTL. The disk tier is a SQLite table
+    that survives restarts; disk hits are promoted back into memory. Expired
+    rows are purged when the table is opened and every purge_every writes,
+    which also trims it to max_disk_rows (oldest entries first).
+    """
+
+    def __init__(self, path: str = RECOGNITION_CACHE_PATH, max_entries: int = RECOGNITION_CACHE_SIZE,
+                 ttl: int = RECOGNITION_CACHE_TTL, disk_ttl: int = RECOGNITION_CACHE_DISK_TTL,
+                 max_disk_rows: int = RECOGNITION_CACHE_DISK_ROWS, purge_every: int = RECOGNITION_CACHE_PURGE_EVERY):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_ttl = disk_ttl
+        self.max_disk_rows = max_disk_rows
+        self.purge_every = purge_every
+        self._writes_since_purge = 0
+        self._memory = OrderedDict()  # key -> (expires_at, result)
+        self._lock = threading.Lock()
+        self._stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0, 'purged': 0}
+
+        self._db = None
+        try:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS recognition_cache ('
+                'key TEXT PRIMARY KEY, result TEXT NOT NULL, expires_at REAL NOT NULL)'
+            )
+            self._db.execute(
+                'CREATE INDEX IF NOT EXISTS idx_recognition_cache_expires ON recognition_cache (expires_at)'
+            )
+            self._purge(time.time())
+        except Exception as e:
+            print(f"Recognition cache disk tier unavailable, using memory only: {e}")
+            self._db = None
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Look up a result, checking memory first and then disk"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, result = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self._stats['memory_hits'] += 1
+                    return dict(result)
+                del self._memory[key]
+
+            row = None
+            if self._db is not None:
+                try:
+                    row = self._db.execute(
+                        'SELECT result FROM recognition_cache WHERE key = ? AND expires_at > ?', (key, now)
+                    ).fetchone()
+                except Exception as e:
+                    print(f"Recognition cache read error: {e}")
+
+            if row is None:
+                self._stats['misses'] += 1
+                return None
+
+            result = json.loads(row[0])
+            self._stats['disk_hits'] += 1
+            self._remember(key, result, now)
+            return dict(result)
+
+    def set(self, key: str, result: Dict[str, Any], persist: bool = True):
+        """Store a result in memory and, unless persist is False, on disk"""
+        now = time.time()
+        with self._lock:
+            self._remember(key, dict(result), now)
+            self._stats['writes'] += 1
+            if persist and self._db is not None:
+                try:
+                    self._db.execute(
+                        'INSERT OR REPLACE INTO recognition_cache (key, result, expires_at) VALUES (?, ?, ?)',
+                        (key, json.dumps(result), now + self.disk_ttl)
+                    )
+                    self._writes_since_purge += 1
+                    if self.purge_every and self._writes_since_purge >= self.purge_every:
+                        self._purge(now)
+                    else:
+                        self._db.commit()
+                except Exception as e:
+                    print(f"Recognition cache write error: {e}")
+
+    def _remember(self, key: str, result: Dict[str, Any], now: float):
+        # Caller holds the lock
+        self._memory[key] = (now + self.ttl, result)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._stats['evictions'] += 1
+
+    def _purge(self, now: float) -> int:
+        # Caller holds the lock (or is the constructor)
+        removed = self._db.execute('DELETE FROM recognition_cache WHERE expires_at <= ?', (now,)).rowcount
+        if self.max_disk_rows:
+            # Entries written earliest expire earliest
+            removed += self._db.execute(
+                'DELETE FROM recognition_cache WHERE key IN ('
+                'SELECT key FROM recognition_cache ORDER BY expires_at DESC LIMIT -1 OFFSET ?)',
+                (self.max_disk_rows,)
+            ).rowcount
+        self._db.commit()
+        self._writes_since_purge = 0
+        self._stats['purged'] += removed
+        return removed
+
+    def purge_expired(self) -> int:
+        """Delete expired (and over-capacity) rows from the disk tier, returning how many were removed"""
+        if self._db is None:
+            return 0
+        with self._lock:
+            return self._purge(time.time())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['memory_entries'] = len(self._memory)
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_ratio'] = round((stats['memory_hits'] + stats['disk_hits']) / lookups, 4) if lookups else 0.0
+        return stats
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+# Singleton pattern, same as the Supabase client
+_recognition_cache = None
+
+def get_recognition_cache() -> RecognitionCache:
+    """Get or create the process-wide recognition cache"""
+    global _recognition_cache
+    if _recognition_cache is None:
+        _recognition_cache = RecognitionCache()
+    return _recognition_cache
+
+def close_recognition_cache():
+    """Close the recognition cache (called from the app lifespan)"""
+    global _recognition_cache
+    if _recognition_cache is not None:
+        _recognition_cache.close()
+        _recognition_cache = None
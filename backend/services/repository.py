@@ -0,0 +1,182 @@
+import os
+from datetime import datetime
+from functools import wraps
+from typing import Optional, List, Dict
+
+from backend.services import local_database, supabase_async
+from backend.services.executors import run_io
+
+# Where users, scans, coins, notifications and referrals live: 'supabase'
+# (default) or 'local' (SQLite through SQLAlchemy, no network hop)
+DATA_BACKEND = os.getenv('DATA_BACKEND', 'supabase')
+
+class Repository:
+    """Data access interface behind the API.
+
+    Coroutines with the names, arguments and return values of the
+    supabase_async functions: rows come back as dicts, lookups return None
+    (or an empty list) when nothing matches or the backend fails, and
+    record_scan / record_scan_batch save scans, coin transactions and
+    balances together.
+    """
+    name = 'base'
+
+    # Users
+    async def create_user(self, phone_number: str, name: str = None, email: str = None) -> Optional[Dict]:
+        raise NotImplementedError
+
+    async def get_user_by_phone(self, phone_number: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    async def get_user_by_id(self, user_id: int) -> Optional[Dict]:
+        raise NotImplementedError
+
+    async def get_users_by_ids(self, user_ids: List[int]) -> List[Dict]:
+        raise NotImplementedError
+
+    async def update_user_profile(self, user_id: int, name: str = None, email: str = None,
+                                  profile_image: str = None, phone_number: str = None) -> Optional[Dict]:
+        raise NotImplementedError
+
+    async def delete_user(self, user_id: int) -> bool:
+        raise NotImplementedError
+
+    async def update_user_coins(self, user_id: int, amount: int) -> Optional[Dict]:
+        raise NotImplementedError
+
+    async def increment_coins(self, user_id: int, amount: int, min_balance: int = None, clamp: bool = False,
+                              transaction_type: str = 'adjustment', description: str = None) -> Optional[int]:
+        raise NotImplementedError
+
+    # Scans
+    async def create_scan(self, user_id: int, food_name: str, confidence: int, image_path: str,
+                          nutrition_json: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    async def record_scan(self, user_id: int, scans: List[Dict], coins: int = 1,
+                          description: str = None, idempotency_key: str = None) -> Optional[Dict]:
+        raise NotImplementedError
+
+    async def record_scan_batch(self, entries: List[Dict]) -> Optional[Dict]:
+        raise NotImplementedError
+
+    async def get_recent_scans(self, user_id: int, limit: int = 10) -> List[Dict]:
+        raise NotImplementedError
+
+    async def get_scan_by_id(self, scan_id: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    # Food database
+    async def get_food_database(self) -> Optional[List[Dict]]:
+        raise NotImplementedError
+
+    async def get_food_database_version(self) -> Optional[str]:
+        raise NotImplementedError
+
+    # Notifications and referrals
+    async def create_notification(self, user_id: int, title: str, message: str, notification_type: str = 'system',
+                                  extra_data: Dict = None) -> Optional[Dict]:
+        raise NotImplementedError
+
+    async def broadcast_notification(self, title: str, message: str, notification_type: str = 'system') -> int:
+        raise NotImplementedError
+
+    async def get_user_notifications(self, user_id: int, limit: int = 50) -> List[Dict]:
+        raise NotImplementedError
+
+    async def mark_notification_read(self, notification_id: int) -> bool:
+        raise NotImplementedError
+
+    async def create_referral(self, referrer_id: int, referred_phone: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    async def redeem_referral(self, referral_id: int, new_user_id: int) -> Optional[Dict]:
+        raise NotImplementedError
+
+    async def get_user_referrals(self, user_id: int) -> List[Dict]:
+        raise NotImplementedError
+
+    # Coins
+    async def transfer_coins(self, sender_id: int, receiver_phone: str, amount: int) -> Optional[Dict]:
+        raise NotImplementedError
+
+    async def append_coin_transaction(self, user_id: int, amount: int, transaction_type: str, description: str = None,
+                                      min_balance: int = None, clamp: bool = False) -> Optional[Dict]:
+        raise NotImplementedError
+
+    async def create_coin_transaction(self, user_id: int, amount: int, transaction_type: str,
+                                      description: str = None) -> Optional[Dict]:
+        raise NotImplementedError
+
+    async def get_user_coin_history(self, user_id: int, limit: int = 50) -> List[Dict]:
+        raise NotImplementedError
+
+    # Coin ledger
+    async def get_coin_balance_at(self, user_id: int, at: datetime = None) -> Optional[int]:
+        raise NotImplementedError
+
+    async def snapshot_coin_balances(self) -> int:
+        raise NotImplementedError
+
+    async def compact_coin_ledger(self, before: datetime) -> int:
+        raise NotImplementedError
+
+    # Admin
+    async def get_all_users(self) -> List[Dict]:
+        raise NotImplementedError
+
+    async def get_all_scans(self, limit: int = 50) -> List[Dict]:
+        raise NotImplementedError
+
+    async def get_all_transactions(self, limit: int = 50) -> List[Dict]:
+        raise NotImplementedError
+
+    async def get_dashboard_stats(self) -> Dict:
+        raise NotImplementedError
+
+# Every data function of the interface
+REPOSITORY_FUNCTIONS = tuple(
+    name for name, value in vars(Repository).items() if not name.startswith('_') and callable(value)
+)
+
+class SupabaseRepository(Repository):
+    """Remote Supabase, through the async PostgREST layer (supabase_async)"""
+    name = 'supabase'
+
+class LocalRepository(Repository):
+    """SQLite through SQLAlchemy (local_database), run on the I/O executor"""
+    name = 'local'
+
+def _awaiting(name: str):
+    @wraps(getattr(Repository, name))
+    async def call(self, *args, **kwargs):
+        return await getattr(supabase_async, name)(*args, **kwargs)
+    return call
+
+def _in_executor(name: str):
+    @wraps(getattr(Repository, name))
+    async def call(self, *args, **kwargs):
+        # Synchronous SQLAlchemy session, so keep it off the event loop
+        return await run_io(getattr(local_database, name), *args, **kwargs)
+    return call
+
+for _name in REPOSITORY_FUNCTIONS:
+    setattr(SupabaseRepository, _name, _awaiting(_name))
+    setattr(LocalRepository, _name, _in_executor(_name))
+
+_backends = {'supabase': SupabaseRepository, 'local': LocalRepository}
+
+def create_repository(name: str) -> Repository:
+    if name not in _backends:
+        raise ValueError(f"Unknown data backend '{name}' (available: {', '.join(sorted(_backends))})")
+    return _backends[name]()
+
+# Singleton pattern, same as the Supabase client
+_repository = None
+
+def get_repository() -> Repository:
+    """Get or create the configured repository"""
+    global _repository
+    if _repository is None:
+        _repository = create_repository(DATA_BACKEND)
+    return _repository
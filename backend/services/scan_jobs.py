@@ -0,0 +1,314 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import asyncio
+import threading
+from typing import Optional, Dict, Any, List, Callable, Awaitable
+
+from backend.services.executors import run_io
+from backend.services.storage import get_storage
+
+# Scan job configuration
+SCAN_JOB_WORKERS = int(os.getenv('SCAN_JOB_WORKERS', '2'))
+SCAN_JOB_MAX_ATTEMPTS = int(os.getenv('SCAN_JOB_MAX_ATTEMPTS', '3'))
+# A claimed job whose worker has not finished it within the lease is handed
+# out again (the worker crashed or the process restarted)
+SCAN_JOB_LEASE_SECONDS = float(os.getenv('SCAN_JOB_LEASE_SECONDS', '60'))
+# Finished (done/failed) jobs are kept this long for clients to fetch
+SCAN_JOB_RETENTION_SECONDS = float(os.getenv('SCAN_JOB_RETENTION_SECONDS', str(24 * 3600)))
+# Idle workers re-check the queue this often (jobs queued by other processes)
+SCAN_JOB_POLL_SECONDS = 1.0
+# How often finished jobs past the retention period are pruned
+SCAN_JOB_PRUNE_SECONDS = 600.0
+
+if os.getenv("VERCEL"):
+    SCAN_JOBS_PATH = os.getenv('SCAN_JOBS_PATH', '/tmp/scan_jobs.db')
+else:
+    SCAN_JOBS_PATH = os.getenv('SCAN_JOBS_PATH', 'scan_jobs.db')
+
+QUEUED = 'queued'
+PROCESSING = 'processing'
+DONE = 'done'
+FAILED = 'failed'
+FINISHED = (DONE, FAILED)
+
+_COLUMNS = ('id', 'user_id', 'image_key', 'filename', 'status', 'result', 'error',
+            'attempts', 'created_at', 'updated_at')
+
+class ScanJobQueue:
+    """Durable scan job queue in a local SQLite database.
+
+    Jobs move queued -> processing -> done/failed. Claiming a job takes a
+    lease, which the worker renews while it runs; if the worker dies before
+    finishing, the lease runs out and the job is claimed again, so queued and
+    in-progress work survives restarts. Failed attempts are retried up to
+    max_attempts times. Finished jobs are removed by prune().
+    """
+
+    def __init__(self, path: str = SCAN_JOBS_PATH, lease_seconds: float = SCAN_JOB_LEASE_SECONDS,
+                 max_attempts: int = SCAN_JOB_MAX_ATTEMPTS):
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS scan_jobs ('
+            'id TEXT PRIMARY KEY, user_id INTEGER NOT NULL, image_key TEXT NOT NULL, filename TEXT, '
+            'status TEXT NOT NULL, result TEXT, error TEXT, attempts INTEGER NOT NULL DEFAULT 0, '
+            'lease_expires REAL, created_at REAL NOT NULL, updated_at REAL NOT NULL)'
+        )
+        self._db.execute('CREATE INDEX IF NOT EXISTS scan_jobs_status ON scan_jobs (status, created_at)')
+        self._db.commit()
+
+    def _row_to_job(self, row) -> Dict[str, Any]:
+        job = dict(zip(_COLUMNS, row))
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+    def enqueue(self, job_id: str, user_id: int, image_key: str, filename: Optional[str] = None) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                'INSERT INTO scan_jobs (id, user_id, image_key, filename, status, created_at, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (job_id, user_id, image_key, filename, QUEUED, now, now)
+            )
+            self._db.commit()
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM scan_jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """Take the oldest runnable job (queued, or processing with an expired lease)"""
+        now = time.time()
+        with self._lock:
+            candidates = self._db.execute(
+                'SELECT id FROM scan_jobs WHERE status = ? OR (status = ? AND lease_expires < ?) '
+                'ORDER BY created_at LIMIT 5',
+                (QUEUED, PROCESSING, now)
+            ).fetchall()
+            for (job_id,) in candidates:
+                # Conditional update, so two processes cannot claim the same job
+                cursor = self._db.execute(
+                    'UPDATE scan_jobs SET status = ?, attempts = attempts + 1, lease_expires = ?, updated_at = ? '
+                    'WHERE id = ? AND (status = ? OR (status = ? AND lease_expires < ?))',
+                    (PROCESSING, now + self.lease_seconds, now, job_id, QUEUED, PROCESSING, now)
+                )
+                self._db.commit()
+                if cursor.rowcount == 1:
+                    break
+            else:
+                return None
+        return self.get(job_id)
+
+    def renew(self, job_id: str) -> bool:
+        """Extend the lease of a job still being processed"""
+        now = time.time()
+        with self._lock:
+            cursor = self._db.execute(
+                'UPDATE scan_jobs SET lease_expires = ? WHERE id = ? AND status = ?',
+                (now + self.lease_seconds, job_id, PROCESSING)
+            )
+            self._db.commit()
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: str, result: Dict[str, Any]):
+        with self._lock:
+            self._db.execute(
+                'UPDATE scan_jobs SET status = ?, result = ?, error = NULL, lease_expires = NULL, updated_at = ? '
+                'WHERE id = ?',
+                (DONE, json.dumps(result), time.time(), job_id)
+            )
+            self._db.commit()
+
+    def fail(self, job_id: str, error: str) -> str:
+        """Record a failed attempt; returns the new status (queued for a retry, or failed)"""
+        with self._lock:
+            row = self._db.execute('SELECT attempts FROM scan_jobs WHERE id = ?', (job_id,)).fetchone()
+            status = QUEUED if row and row[0] < self.max_attempts else FAILED
+            self._db.execute(
+                'UPDATE scan_jobs SET status = ?, error = ?, lease_expires = NULL, updated_at = ? WHERE id = ?',
+                (status, error, time.time(), job_id)
+            )
+            self._db.commit()
+        return status
+
+    def prune(self, older_than: float) -> List[str]:
+        """Delete jobs finished before older_than; returns their image keys"""
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT id, image_key FROM scan_jobs WHERE status IN (?, ?) AND updated_at < ?',
+                (DONE, FAILED, older_than)
+            ).fetchall()
+            self._db.executemany('DELETE FROM scan_jobs WHERE id = ?', [(job_id,) for job_id, _ in rows])
+            self._db.commit()
+        return [image_key for _, image_key in rows]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            rows = self._db.execute('SELECT status, COUNT(*) FROM scan_jobs GROUP BY status').fetchall()
+        counts = {status: 0 for status in (QUEUED, PROCESSING, DONE, FAILED)}
+        counts.update(dict(rows))
+        return counts
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+# Singleton pattern, same as the Supabase client
+_scan_job_queue = None
+
+def get_scan_job_queue() -> ScanJobQueue:
+    """Get or create the scan job queue"""
+    global _scan_job_queue
+    if _scan_job_queue is None:
+        _scan_job_queue = ScanJobQueue()
+    return _scan_job_queue
+
+def public_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Job fields returned to clients"""
+    return {
+        'job_id': job['id'],
+        'status': job['status'],
+        'result': job['result'],
+        'error': job['error'] if job['status'] == FAILED else None,
+        'attempts': job['attempts'],
+        'created_at': job['created_at'],
+        'updated_at': job['updated_at'],
+    }
+
+# Workers and change notifications live on the app's event loop
+_workers: List[asyncio.Task] = []
+_wakeup: Optional[asyncio.Event] = None
+_watchers: Dict[str, List[asyncio.Event]] = {}
+
+def _notify(job_id: str):
+    for event in _watchers.get(job_id, []):
+        event.set()
+
+async def wait_for_job_update(job_id: str, timeout: float) -> bool:
+    """Wait until a local worker changes the job, or timeout; True if it changed"""
+    event = asyncio.Event()
+    _watchers.setdefault(job_id, []).append(event)
+    try:
+        await asyncio.wait_for(event.wait(), timeout)
+        return True
+    except asyncio.TimeoutError:
+        return False
+    finally:
+        _watchers[job_id].remove(event)
+        if not _watchers[job_id]:
+            del _watchers[job_id]
+
+async def submit_scan_job(content: bytes, user_id: int, filename: Optional[str] = None) -> Dict[str, Any]:
+    """Store an upload and queue it for processing; returns the queued job"""
+    job_id = uuid.uuid4().hex
+    image_key = f"incoming/{job_id}"
+    await run_io(get_storage().put, image_key, content)
+    job = await run_io(get_scan_job_queue().enqueue, job_id, user_id, image_key, filename)
+    if _wakeup is not None:
+        _wakeup.set()
+    return job
+
+async def _renew_lease(queue: ScanJobQueue, job_id: str):
+    # Long scans keep their lease, so no other worker picks the job up meanwhile
+    while True:
+        await asyncio.sleep(max(queue.lease_seconds / 3, 0.1))
+        try:
+            await run_io(queue.renew, job_id)
+        except Exception as e:
+            print(f"Error renewing lease of scan job {job_id}: {e}")
+
+async def _run_job(queue: ScanJobQueue, job: Dict[str, Any],
+                   processor: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]) -> str:
+    """Process a claimed job and record the outcome; returns its new status"""
+    try:
+        result = await processor(job)
+    except asyncio.CancelledError:
+        # Shutting down: the lease expires and the job runs again later
+        raise
+    except Exception as e:
+        print(f"Error processing scan job {job['id']}: {e}")
+        return await run_io(queue.fail, job['id'], str(e))
+    await run_io(queue.complete, job['id'], result)
+    return DONE
+
+async def _worker(processor: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]):
+    queue = get_scan_job_queue()
+    while True:
+        try:
+            job = await run_io(queue.claim)
+        except Exception as e:
+            # e.g. the queue database is locked; the worker keeps going
+            print(f"Error claiming scan job: {e}")
+            await asyncio.sleep(SCAN_JOB_POLL_SECONDS)
+            continue
+        if job is None:
+            _wakeup.clear()
+            try:
+                await asyncio.wait_for(_wakeup.wait(), SCAN_JOB_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        _notify(job['id'])
+        renewal = asyncio.get_running_loop().create_task(_renew_lease(queue, job['id']))
+        try:
+            status = await _run_job(queue, job, processor)
+        except Exception as e:
+            # The outcome was not recorded: the lease expires and the job
+            # runs again later
+            print(f"Error updating scan job {job['id']}: {e}")
+            status = None
+        finally:
+            renewal.cancel()
+        if status in FINISHED:
+            # No further attempts will need the upload
+            try:
+                await run_io(get_storage().delete, job['image_key'])
+            except Exception as e:
+                print(f"Error deleting upload of scan job {job['id']}: {e}")
+        _notify(job['id'])
+
+async def _prune_loop():
+    queue = get_scan_job_queue()
+    while True:
+        try:
+            image_keys = await run_io(queue.prune, time.time() - SCAN_JOB_RETENTION_SECONDS)
+            # Uploads of finished jobs are normally deleted already; this
+            # catches ones left behind by a crash
+            for image_key in image_keys:
+                await run_io(get_storage().delete, image_key)
+        except Exception as e:
+            print(f"Error pruning scan jobs: {e}")
+        await asyncio.sleep(SCAN_JOB_PRUNE_SECONDS)
+
+def start_scan_workers(processor: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]],
+                       workers: int = SCAN_JOB_WORKERS):
+    """Start the worker tasks (called from the app lifespan)"""
+    global _wakeup
+    _wakeup = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for _ in range(workers):
+        _workers.append(loop.create_task(_worker(processor)))
+    _workers.append(loop.create_task(_prune_loop()))
+
+async def stop_scan_workers():
+    """Cancel the worker tasks and close the queue (called from the app lifespan)"""
+    global _scan_job_queue, _wakeup
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+    _wakeup = None
+    if _scan_job_queue is not None:
+        _scan_job_queue.close()
+        _scan_job_queue = None
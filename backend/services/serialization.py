@@ -0,0 +1,47 @@
+from collections.abc import Mapping
+from decimal import Decimal
+from typing import Any, Union
+
+import orjson
+from fastapi.responses import JSONResponse
+
+# Options for every API response: int dict keys and numpy values are allowed
+_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+# Already-serialized JSON embedded as-is in a response (no decode/encode)
+RawJSON = orjson.Fragment
+
+def raw_json(value: Union[str, bytes]) -> RawJSON:
+    """Wrap a stored JSON document so responses embed it without parsing it"""
+    return orjson.Fragment(value)
+
+def _default(value: Any) -> Any:
+    # Types orjson does not serialize natively
+    if isinstance(value, Mapping):
+        return dict(value)
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    if isinstance(value, Decimal):
+        return float(value)
+    if hasattr(value, 'model_dump'):
+        return value.model_dump(mode='json')
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(value: Any) -> bytes:
+    """Serialize to JSON bytes with orjson (datetimes, UUIDs, numpy, raw fragments)"""
+    return orjson.dumps(value, default=_default, option=_OPTIONS)
+
+def dumps_str(value: Any) -> str:
+    """dumps() as a str, for JSON stored in text columns"""
+    return dumps(value).decode()
+
+class FastJSONResponse(JSONResponse):
+    """Default response class of the app: renders with orjson.
+
+    Endpoints that return this class directly also skip FastAPI's
+    jsonable_encoder pass, and may embed RawJSON fragments.
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
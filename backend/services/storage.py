@@ -0,0 +1,191 @@
+import os
+import re
+import hashlib
+import tempfile
+import threading
+from dataclasses import dataclass
+from typing import Optional, Dict, Any
+
+# Storage configuration
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'local')  # 'local' or 'memory'
+STATIC_URL_PREFIX = '/static'
+
+# Content-addressed names: 64 hex chars of SHA-256 plus an extension
+_CONTENT_NAME = re.compile(r'^(?:[0-9a-f]{2}/[0-9a-f]{2}/)?([0-9a-f]{64})\.([a-z0-9]{2,4})$')
+
+def get_upload_dir() -> str:
+    """Root directory for locally stored uploads"""
+    if os.getenv("VERCEL"):
+        return "/tmp/uploads"
+    return "uploads"
+
+def guess_extension(data: bytes) -> str:
+    """File extension from the image magic bytes"""
+    if data.startswith(b'\xff\xd8\xff'):
+        return 'jpg'
+    if data.startswith(b'\x89PNG'):
+        return 'png'
+    if data.startswith(b'GIF8'):
+        return 'gif'
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'webp'
+    return 'bin'
+
+def content_key(digest: str, extension: str) -> str:
+    """Sharded object key: ab/cd/abcd...ef.jpg"""
+    return f"{digest[:2]}/{digest[2:4]}/{digest}.{extension}"
+
+def resolve_key(name: str) -> Optional[str]:
+    """Map a full key or a bare content-addressed file name to its key"""
+    match = _CONTENT_NAME.match(name)
+    if not match:
+        return None
+    return content_key(match.group(1), match.group(2))
+
+class StorageBackend:
+    """Object storage interface used for uploaded images"""
+
+    def put(self, key: str, data: bytes) -> bool:
+        """Store data under key; returns False if the object already existed"""
+        raise NotImplementedError
+
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def local_path(self, key: str) -> Optional[str]:
+        """Filesystem path for efficient serving, if the backend has one"""
+        return None
+
+class LocalFileStorage(StorageBackend):
+    """Sharded directory tree on the local filesystem.
+
+    Objects are written to a temp file in the target directory, fsynced and
+    renamed into place, so readers never see a partial file.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, *key.split('/'))
+
+    def put(self, key: str, data: bytes) -> bool:
+        path = self._path(key)
+        if os.path.exists(path):
+            return False
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as tmp_file:
+                tmp_file.write(data)
+                # On disk before the rename: a crash must not leave an empty
+                # object under a content key that put() will not overwrite
+                tmp_file.flush()
+                os.fsync(tmp_file.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return True
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._path(key), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+    def delete(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def local_path(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        return path if os.path.exists(path) else None
+
+class InMemoryObjectStorage(StorageBackend):
+    """S3-style object store held in memory (bucket of key -> object).
+
+    Stands in for an S3-compatible backend in tests and local runs.
+    """
+
+    def __init__(self, bucket: str = 'foodid-uploads'):
+        self.bucket = bucket
+        self._objects: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def put(self, key: str, data: bytes) -> bool:
+        with self._lock:
+            if key in self._objects:
+                return False
+            self._objects[key] = {'body': bytes(data), 'etag': hashlib.md5(data).hexdigest()}
+            return True
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            obj = self._objects.get(key)
+            return obj['body'] if obj else None
+
+    def exists(self, key: str) -> bool:
+        with self._lock:
+            return key in self._objects
+
+    def delete(self, key: str):
+        with self._lock:
+            self._objects.pop(key, None)
+
+@dataclass
+class StoredObject:
+    key: str
+    url: str
+    sha256: str
+    size: int
+    created: bool
+
+_stats_lock = threading.Lock()
+_stats = {'writes': 0, 'deduplicated': 0, 'bytes_written': 0}
+
+def store_content(data: bytes, digest: Optional[str] = None, extension: Optional[str] = None) -> StoredObject:
+    """Store bytes under their content hash, skipping identical uploads"""
+    digest = digest or hashlib.sha256(data).hexdigest()
+    key = content_key(digest, extension or guess_extension(data))
+    created = get_storage().put(key, data)
+    with _stats_lock:
+        if created:
+            _stats['writes'] += 1
+            _stats['bytes_written'] += len(data)
+        else:
+            _stats['deduplicated'] += 1
+    return StoredObject(key=key, url=f"{STATIC_URL_PREFIX}/{key}", sha256=digest, size=len(data), created=created)
+
+def get_storage_stats() -> Dict[str, Any]:
+    with _stats_lock:
+        stats = dict(_stats)
+    stats['backend'] = type(get_storage()).__name__
+    return stats
+
+# Singleton pattern, same as the Supabase client
+_storage = None
+
+def get_storage() -> StorageBackend:
+    """Get or create the configured storage backend"""
+    global _storage
+    if _storage is None:
+        if STORAGE_BACKEND == 'memory':
+            _storage = InMemoryObjectStorage()
+        else:
+            _storage = LocalFileStorage(get_upload_dir())
+    return _storage
@@ -0,0 +1,591 @@
+import os
+import asyncio
+from datetime import datetime
+from typing import Optional, List, Dict, Any
+
+import httpx
+from postgrest import AsyncPostgrestClient
+
+from backend.services.supabase_client import SUPABASE_URL, SUPABASE_KEY
+
+# Supabase data functions behind SupabaseRepository. Every call goes through
+# one pooled keep-alive HTTP client instead of blocking the event loop.
+
+# Connections kept open to PostgREST (HTTP/2 multiplexes requests over them)
+SUPABASE_POOL_CONNECTIONS = int(os.getenv('SUPABASE_POOL_CONNECTIONS', '20'))
+# Idle connections are closed after this many seconds
+SUPABASE_KEEPALIVE_SECONDS = float(os.getenv('SUPABASE_KEEPALIVE_SECONDS', '30'))
+SUPABASE_TIMEOUT_SECONDS = float(os.getenv('SUPABASE_TIMEOUT_SECONDS', '10'))
+
+# HTTP/2 needs the optional h2 package (httpx[http2]); HTTP/1.1 keep-alive otherwise
+try:
+    import h2  # noqa: F401
+    SUPABASE_HTTP2 = os.getenv('SUPABASE_HTTP2', 'true').lower() == 'true'
+except ImportError:
+    SUPABASE_HTTP2 = False
+
+# One client per process, created by the app lifespan (or lazily on first use)
+_async_supabase: Optional[AsyncPostgrestClient] = None
+
+def _create_http_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        http2=SUPABASE_HTTP2,
+        timeout=SUPABASE_TIMEOUT_SECONDS,
+        follow_redirects=True,
+        limits=httpx.Limits(
+            max_connections=SUPABASE_POOL_CONNECTIONS,
+            max_keepalive_connections=SUPABASE_POOL_CONNECTIONS,
+            keepalive_expiry=SUPABASE_KEEPALIVE_SECONDS
+        )
+    )
+
+def get_async_supabase() -> AsyncPostgrestClient:
+    """Get or create the shared async PostgREST client (same query API as supabase.table())"""
+    global _async_supabase
+    if _async_supabase is None:
+        _async_supabase = AsyncPostgrestClient(
+            f"{SUPABASE_URL}/rest/v1",
+            headers={
+                'Accept': 'application/json',
+                'Content-Type': 'application/json',
+                'apikey': SUPABASE_KEY,
+                'Authorization': f'Bearer {SUPABASE_KEY}'
+            },
+            http_client=_create_http_client()
+        )
+    return _async_supabase
+
+def start_async_supabase():
+    """Open the shared client when the app starts"""
+    get_async_supabase()
+
+async def close_async_supabase():
+    """Close the pooled connections (called from the app lifespan)"""
+    global _async_supabase
+    client, _async_supabase = _async_supabase, None
+    if client is not None:
+        await client.aclose()
+
+# ============================================
+# USER PROFILE FUNCTIONS
+# ============================================
+
+async def create_user(phone_number: str, name: str = None, email: str = None) -> Optional[Dict]:
+    """Create a new user or get existing user by phone number"""
+    try:
+        supabase = get_async_supabase()
+        
+        # Check if user already exists
+        existing = await supabase.table('users').select('*').eq('phone_number', phone_number).execute()
+        if existing.data:
+            return existing.data[0]
+        
+        # Create new user
+        data = {
+            'phone_number': phone_number,
+            'name': name,
+            'email': email,
+            'coins': 0
+        }
+        result = await supabase.table('users').insert(data).execute()
+        return result.data[0] if result.data else None
+    except Exception as e:
+        print(f"Error creating user: {e}")
+        return None
+
+async def get_user_by_phone(phone_number: str) -> Optional[Dict]:
+    """Get user by phone number"""
+    try:
+        supabase = get_async_supabase()
+        result = await supabase.table('users').select('*').eq('phone_number', phone_number).single().execute()
+        return result.data
+    except Exception as e:
+        print(f"Error fetching user: {e}")
+        return None
+
+async def get_user_by_id(user_id: int) -> Optional[Dict]:
+    """Get user by ID"""
+    try:
+        supabase = get_async_supabase()
+        result = await supabase.table('users').select('*').eq('id', user_id).single().execute()
+        return result.data
+    except Exception as e:
+        print(f"Error fetching user: {e}")
+        return None
+
+async def get_users_by_ids(user_ids: List[int]) -> List[Dict]:
+    """Get several users in one query (unknown ids are left out)"""
+    try:
+        supabase = get_async_supabase()
+        result = await supabase.table('users').select('*').in_('id', list(user_ids)).execute()
+        return result.data
+    except Exception as e:
+        print(f"Error fetching users: {e}")
+        return []
+
+async def update_user_profile(user_id: int, name: str = None, email: str = None, profile_image: str = None,
+                              phone_number: str = None) -> Optional[Dict]:
+    """Update user profile information"""
+    try:
+        supabase = get_async_supabase()
+        data = {}
+        if name is not None:
+            data['name'] = name
+        if email is not None:
+            data['email'] = email
+        if profile_image is not None:
+            data['profile_image'] = profile_image
+        if phone_number is not None:
+            data['phone_number'] = phone_number
+        
+        if not data:
+            return None
+            
+        result = await supabase.table('users').update(data).eq('id', user_id).execute()
+        return result.data[0] if result.data else None
+    except Exception as e:
+        print(f"Error updating user profile: {e}")
+        return None
+
+async def delete_user(user_id: int) -> bool:
+    """Delete a user (their rows go with them, ON DELETE CASCADE); False if unknown"""
+    try:
+        supabase = get_async_supabase()
+        result = await supabase.table('users').delete().eq('id', user_id).execute()
+        return bool(result.data)
+    except Exception as e:
+        print(f"Error deleting user: {e}")
+        return False
+
+async def increment_coins(user_id: int, amount: int, min_balance: int = None, clamp: bool = False,
+                          transaction_type: str = 'adjustment', description: str = None) -> Optional[int]:
+    """Append a coin movement to the ledger and apply it to the balance.
+    Returns the new balance, or None if the user is unknown or the balance
+    would drop below min_balance (with clamp it stops at min_balance instead).
+    """
+    movement = await append_coin_transaction(user_id, amount, transaction_type, description, min_balance, clamp)
+    return movement['new_balance'] if movement else None
+
+async def update_user_coins(user_id: int, amount: int) -> Optional[Dict]:
+    """Update user coin balance (increment/decrement); returns the id and new balance"""
+    new_balance = await increment_coins(user_id, amount)
+    return {'id': user_id, 'coins': new_balance} if new_balance is not None else None
+
+# ============================================
+# SCAN FUNCTIONS
+# ============================================
+
+async def create_scan(user_id: int, food_name: str, confidence: int, image_path: str, nutrition_json: str):
+    """Create a new scan record in Supabase"""
+    try:
+        supabase = get_async_supabase()
+        data = {
+            'user_id': user_id,
+            'food_name': food_name,
+            'confidence': confidence,
+            'image_path': image_path,
+            'nutrition_json': nutrition_json
+        }
+        result = await supabase.table('scans').insert(data).execute()
+        return result.data[0] if result.data else None
+    except Exception as e:
+        print(f"Error creating scan: {e}")
+        return None
+
+async def record_scan(user_id: int, scans: List[Dict], coins: int = 1, description: str = None,
+                      idempotency_key: str = None) -> Optional[Dict]:
+    """Save scans, append their coin transaction and increment the balance in one round trip
+
+    Calls the record_scan Postgres function (supabase_schema.sql), which does
+    all three in a single transaction. Each scan is a dict with food_name,
+    confidence, image_path and nutrition_json. Returns
+    {'scans': [...], 'transaction': {...}, 'new_balance': int}, or None on error.
+    A repeated call with the same idempotency_key returns the first result
+    without saving again.
+    """
+    try:
+        supabase = get_async_supabase()
+        params = {
+            'p_user_id': user_id,
+            'p_scans': scans,
+            'p_coins': coins,
+            'p_description': description
+        }
+        if idempotency_key is not None:
+            params['p_idempotency_key'] = idempotency_key
+        result = await supabase.rpc('record_scan', params).execute()
+        return result.data
+    except Exception as e:
+        print(f"Error recording scan: {e}")
+        return None
+
+async def record_scan_batch(entries: List[Dict]) -> Optional[Dict]:
+    """Bulk record_scan for write-behind persistence, in one round trip
+
+    Each entry is {'user_id', 'scans', 'coins', 'description'}. Calls the
+    record_scan_batch Postgres function; the whole batch is written in one
+    transaction. Returns {'balances': {user_id: new balance}}, or None on error.
+    """
+    try:
+        supabase = get_async_supabase()
+        result = await supabase.rpc('record_scan_batch', {'p_entries': entries}).execute()
+        return result.data
+    except Exception as e:
+        print(f"Error recording scan batch: {e}")
+        return None
+
+async def get_recent_scans(user_id: int, limit: int = 10):
+    """Get recent scans for a user"""
+    try:
+        supabase = get_async_supabase()
+        result = await supabase.table('scans')\
+            .select('*')\
+            .eq('user_id', user_id)\
+            .order('created_at', desc=True)\
+            .limit(limit)\
+            .execute()
+        return result.data
+    except Exception as e:
+        print(f"Error fetching scans: {e}")
+        return []
+
+async def get_scan_by_id(scan_id: str):
+    """Get a specific scan by ID"""
+    try:
+        supabase = get_async_supabase()
+        result = await supabase.table('scans')\
+            .select('*')\
+            .eq('id', scan_id)\
+            .single()\
+            .execute()
+        return result.data
+    except Exception as e:
+        print(f"Error fetching scan: {e}")
+        return None
+
+# ============================================
+# FOOD DATABASE FUNCTIONS
+# ============================================
+
+FOOD_DATABASE_COLUMNS = 'food_name,category,calories,protein,carbs,fat,health_score,ingredients,updated_at'
+
+async def get_food_database() -> Optional[List[Dict]]:
+    """Get every row of the food_database table (None on error)"""
+    try:
+        supabase = get_async_supabase()
+        result = await supabase.table('food_database').select(FOOD_DATABASE_COLUMNS).execute()
+        return result.data or []
+    except Exception as e:
+        print(f"Error fetching food database: {e}")
+        return None
+
+async def get_food_database_version() -> Optional[str]:
+    """Cheap change marker for food_database: row count plus latest updated_at"""
+    try:
+        supabase = get_async_supabase()
+        result = await supabase.table('food_database')\
+            .select('updated_at', count='exact')\
+            .order('updated_at', desc=True)\
+            .limit(1)\
+            .execute()
+        latest = result.data[0]['updated_at'] if result.data else None
+        return f"{result.count}:{latest}"
+    except Exception as e:
+        print(f"Error fetching food database version: {e}")
+        return None
+
+# ============================================
+# NOTIFICATION FUNCTIONS
+# ============================================
+
+async def create_notification(user_id: int, title: str, message: str, notification_type: str = 'system', extra_data: Dict = None) -> Optional[Dict]:
+    """Create a new notification"""
+    try:
+        supabase = get_async_supabase()
+        data = {
+            'user_id': user_id,
+            'title': title,
+            'message': message,
+            'notification_type': notification_type,
+            'extra_data': extra_data,
+            'read': False
+        }
+        result = await supabase.table('notifications').insert(data).execute()
+        return result.data[0] if result.data else None
+    except Exception as e:
+        print(f"Error creating notification: {e}")
+        return None
+
+async def broadcast_notification(title: str, message: str, notification_type: str = 'system') -> int:
+    """Create a notification for every user; returns the number created"""
+    try:
+        supabase = get_async_supabase()
+        users = await supabase.table('users').select('id').execute()
+        rows = [{
+            'user_id': user['id'],
+            'title': title,
+            'message': message,
+            'notification_type': notification_type,
+            'read': False
+        } for user in users.data]
+        if rows:
+            await supabase.table('notifications').insert(rows).execute()
+        return len(rows)
+    except Exception as e:
+        print(f"Error broadcasting notification: {e}")
+        return 0
+
+async def get_user_notifications(user_id: int, limit: int = 50) -> List[Dict]:
+    """Get all notifications for a user"""
+    try:
+        supabase = get_async_supabase()
+        result = await supabase.table('notifications')\
+            .select('*')\
+            .eq('user_id', user_id)\
+            .order('created_at', desc=True)\
+            .limit(limit)\
+            .execute()
+        return result.data
+    except Exception as e:
+        print(f"Error fetching notifications: {e}")
+        return []
+
+async def mark_notification_read(notification_id: int) -> bool:
+    """Mark a notification as read"""
+    try:
+        supabase = get_async_supabase()
+        await supabase.table('notifications').update({'read': True}).eq('id', notification_id).execute()
+        return True
+    except Exception as e:
+        print(f"Error marking notification as read: {e}")
+        return False
+
+# ============================================
+# REFERRAL FUNCTIONS
+# ============================================
+
+async def create_referral(referrer_id: int, referred_phone: str) -> Optional[Dict]:
+    """Create a new referral"""
+    try:
+        supabase = get_async_supabase()
+        data = {
+            'referrer_id': referrer_id,
+            'referred_phone': referred_phone,
+            'status': 'pending'
+        }
+        result = await supabase.table('referrals').insert(data).execute()
+        return result.data[0] if result.data else None
+    except Exception as e:
+        print(f"Error creating referral: {e}")
+        return None
+
+# -------------------------------------------------
+# COIN TRANSFER FUNCTION
+# -------------------------------------------------
+
+async def transfer_coins(sender_id: int, receiver_phone: str, amount: int) -> Optional[Dict]:
+    """Transfer coins from sender to receiver identified by phone number.
+    Returns dict with new balances, or None on failure. The transfer_coins
+    function checks the balance and writes both sides in one transaction.
+    """
+    try:
+        supabase = get_async_supabase()
+        result = await supabase.rpc('transfer_coins', {
+            'p_sender_id': sender_id,
+            'p_receiver_phone': receiver_phone,
+            'p_amount': amount
+        }).execute()
+        if not result.data:
+            raise Exception('Receiver not found or insufficient balance')
+        return result.data
+    except Exception as e:
+        print(f"Error in transfer_coins: {e}")
+        return None
+
+# -------------------------------------------------
+# REFERRAL REDEEM FUNCTION
+# -------------------------------------------------
+
+async def redeem_referral(referral_id: int, new_user_id: int) -> Optional[Dict]:
+    """Mark a referral as registered and award bonus coins to both parties.
+    Returns the updated referral record or None on failure.
+    """
+    try:
+        supabase = get_async_supabase()
+        # Fetch referral
+        referral_res = await supabase.table('referrals').select('*').eq('id', referral_id).single().execute()
+        if not referral_res.data:
+            raise Exception('Referral not found')
+        referral = referral_res.data
+        # Update referral status and link new user
+        await supabase.table('referrals').update({
+            'status': 'registered',
+            'referred_user_id': new_user_id
+        }).eq('id', referral_id).execute()
+        # Award bonus coins (e.g., 10 each)
+        bonus = 10
+        await create_coin_transaction(referral['referrer_id'], bonus, 'referral_bonus', f'Referral {referral_id} redeemed')
+        await create_coin_transaction(new_user_id, bonus, 'referral_bonus', f'Referral {referral_id} redeemed')
+        return referral
+    except Exception as e:
+        print(f"Error in redeem_referral: {e}")
+        return None
+
+async def get_user_referrals(user_id: int) -> List[Dict]:
+    """Get all referrals made by a user"""
+    try:
+        supabase = get_async_supabase()
+        result = await supabase.table('referrals')\
+            .select('*')\
+            .eq('referrer_id', user_id)\
+            .order('created_at', desc=True)\
+            .execute()
+        return result.data
+    except Exception as e:
+        print(f"Error fetching referrals: {e}")
+        return []
+
+# ============================================
+# COIN TRANSACTION FUNCTIONS
+# ============================================
+
+async def append_coin_transaction(user_id: int, amount: int, transaction_type: str, description: str = None,
+                                  min_balance: int = None, clamp: bool = False) -> Optional[Dict]:
+    """Append a ledger entry and apply it to the balance in one call.
+    Returns {transaction, new_balance}, or None if the user is unknown or
+    min_balance refuses the change.
+    """
+    try:
+        supabase = get_async_supabase()
+        result = await supabase.rpc('append_coin_transaction', {
+            'p_user_id': user_id,
+            'p_amount': amount,
+            'p_transaction_type': transaction_type,
+            'p_description': description,
+            'p_min_balance': min_balance,
+            'p_clamp': clamp
+        }).execute()
+        # A refused change or unknown user comes back as null
+        return result.data if isinstance(result.data, dict) else None
+    except Exception as e:
+        print(f"Error appending coin transaction: {e}")
+        return None
+
+async def create_coin_transaction(user_id: int, amount: int, transaction_type: str, description: str = None) -> Optional[Dict]:
+    """Create a coin transaction and update user balance"""
+    movement = await append_coin_transaction(user_id, amount, transaction_type, description)
+    return movement['transaction'] if movement else None
+
+async def get_user_coin_history(user_id: int, limit: int = 50) -> List[Dict]:
+    """Get coin transaction history for a user"""
+    try:
+        supabase = get_async_supabase()
+        result = await supabase.table('coin_transactions')\
+            .select('*')\
+            .eq('user_id', user_id)\
+            .order('created_at', desc=True)\
+            .limit(limit)\
+            .execute()
+        return result.data
+    except Exception as e:
+        print(f"Error fetching coin history: {e}")
+        return []
+
+async def get_coin_balance_at(user_id: int, at: datetime = None) -> Optional[int]:
+    """Balance from the ledger: the latest snapshot plus the entries since,
+    as of a past time if given. None if that time was compacted away.
+    """
+    try:
+        supabase = get_async_supabase()
+        result = await supabase.rpc('coin_balance_at', {
+            'p_user_id': user_id,
+            'p_at': at.isoformat() if at else None
+        }).execute()
+        return result.data if isinstance(result.data, int) else None
+    except Exception as e:
+        print(f"Error fetching coin balance: {e}")
+        return None
+
+async def snapshot_coin_balances() -> int:
+    """Snapshot the balance of every user with ledger entries since their last snapshot"""
+    try:
+        supabase = get_async_supabase()
+        return (await supabase.rpc('snapshot_coin_balances', {}).execute()).data or 0
+    except Exception as e:
+        print(f"Error snapshotting coin balances: {e}")
+        return 0
+
+async def compact_coin_ledger(before: datetime) -> int:
+    """Fold ledger entries older than `before` into per-user snapshots and
+    delete them (and the snapshots they supersede); returns the entries removed
+    """
+    try:
+        supabase = get_async_supabase()
+        return (await supabase.rpc('compact_coin_ledger', {'p_before': before.isoformat()}).execute()).data or 0
+    except Exception as e:
+        print(f"Error compacting coin ledger: {e}")
+        return 0
+
+# ============================================
+# ADMIN FUNCTIONS
+# ============================================
+
+async def get_all_users() -> List[Dict]:
+    """Get all users for admin panel"""
+    try:
+        supabase = get_async_supabase()
+        result = await supabase.table('users').select('*').order('created_at', desc=True).execute()
+        return result.data
+    except Exception as e:
+        print(f"Error fetching all users: {e}")
+        return []
+
+async def get_all_scans(limit: int = 50) -> List[Dict]:
+    """Get all scans for admin panel"""
+    try:
+        supabase = get_async_supabase()
+        result = await supabase.table('scans').select('*, users(name, phone_number)').order('created_at', desc=True).limit(limit).execute()
+        return result.data
+    except Exception as e:
+        print(f"Error fetching all scans: {e}")
+        return []
+
+async def get_all_transactions(limit: int = 50) -> List[Dict]:
+    """Get all transactions for admin panel"""
+    try:
+        supabase = get_async_supabase()
+        result = await supabase.table('coin_transactions').select('*, users(name, phone_number)').order('created_at', desc=True).limit(limit).execute()
+        return result.data
+    except Exception as e:
+        print(f"Error fetching all transactions: {e}")
+        return []
+
+async def get_dashboard_stats() -> Dict:
+    """Get dashboard statistics"""
+    try:
+        supabase = get_async_supabase()
+        
+        # The three queries are independent, so they share the pool concurrently
+        users_result, scans_result, users = await asyncio.gather(
+            supabase.table('users').select('*', count='exact', head=True).execute(),
+            supabase.table('scans').select('*', count='exact', head=True).execute(),
+            # Total coins in circulation (heavy for large datasets, fine for MVP)
+            supabase.table('users').select('coins').execute()
+        )
+        users_count = users_result.count
+        scans_count = scans_result.count
+        
+        total_coins = sum(user['coins'] for user in users.data) if users.data else 0
+        
+        return {
+            'total_users': users_count,
+            'total_scans': scans_count,
+            'total_coins': total_coins
+        }
+    except Exception as e:
+        print(f"Error fetching stats: {e}")
+        return {
+            'total_users': 0,
+            'total_scans': 0,
+            'total_coins': 0
+        }
@@ -0,0 +1,207 @@
+import os
+import io
+import hashlib
+import resource
+import threading
+from dataclasses import dataclass
+from typing import Optional, Dict, Any
+
+from fastapi import HTTPException, UploadFile
+from PIL import Image
+
+# Upload limits
+MAX_UPLOAD_BYTES = int(os.getenv('MAX_UPLOAD_BYTES', str(10 * 1024 * 1024)))  # per file
+MAX_IMAGE_PIXELS = int(os.getenv('MAX_IMAGE_PIXELS', str(40_000_000)))  # width * height
+MAX_REQUEST_BYTES = int(os.getenv('MAX_REQUEST_BYTES', str(64 * 1024 * 1024)))  # whole multipart body
+UPLOAD_CHUNK_SIZE = 64 * 1024
+# Give up on reading dimensions from the header after this many bytes
+# (large EXIF blocks can push the JPEG frame header back a long way)
+HEADER_PROBE_LIMIT = 1024 * 1024
+
+_stats_lock = threading.Lock()
+_stats = {
+    'uploads': 0,
+    'bytes_ingested': 0,
+    'rejected_size': 0,
+    'rejected_pixels': 0,
+    'rejected_not_image': 0,
+    'peak_buffer_bytes': 0,
+}
+
+@dataclass
+class IngestedUpload:
+    """An upload read into a bounded in-memory buffer"""
+    content: bytes
+    sha256: str
+    size: int
+    width: Optional[int] = None
+    height: Optional[int] = None
+    format: Optional[str] = None
+
+def _count(key: str, amount: int = 1):
+    with _stats_lock:
+        _stats[key] += amount
+
+def _probe_dimensions(buffer: bytearray):
+    """Read (width, height, format) from the image header, or None if incomplete
+
+    Headers past twice PIL's own pixel limit make Image.open raise
+    DecompressionBombError, which is passed on rather than taken for an
+    incomplete header.
+    """
+    try:
+        with Image.open(io.BytesIO(buffer)) as image:
+            return image.size[0], image.size[1], image.format
+    except Image.DecompressionBombError:
+        raise
+    except Exception:
+        return None
+
+def _reject_pixels(max_pixels: int):
+    _count('rejected_pixels')
+    raise HTTPException(status_code=413, detail=f"Image exceeds {max_pixels} pixel limit")
+
+async def ingest_upload(upload: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES,
+                        max_pixels: int = MAX_IMAGE_PIXELS, require_image: bool = False) -> IngestedUpload:
+    """Read an upload in chunks into a bounded buffer, hashing as it goes.
+
+    Rejects with 413 as soon as the file passes max_bytes, and as soon as the
+    image header shows more than max_pixels (before anything is decoded), so
+    oversized files and decompression bombs never reach the image pipeline.
+    With require_image, content whose header cannot be parsed gets a 400.
+    """
+    digest = hashlib.sha256()
+    buffer = bytearray()
+    dimensions = None
+    probing = True
+
+    while True:
+        chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        if len(buffer) + len(chunk) > max_bytes:
+            _count('rejected_size')
+            raise HTTPException(status_code=413, detail=f"File exceeds {max_bytes // 1024} KB limit")
+        digest.update(chunk)
+        buffer.extend(chunk)
+
+        if probing:
+            try:
+                dimensions = _probe_dimensions(buffer)
+            except Image.DecompressionBombError:
+                _reject_pixels(max_pixels)
+            if dimensions is not None or len(buffer) >= HEADER_PROBE_LIMIT:
+                probing = False
+            if dimensions is not None and dimensions[0] * dimensions[1] > max_pixels:
+                _reject_pixels(max_pixels)
+
+    if dimensions is None and probing:
+        try:
+            dimensions = _probe_dimensions(buffer)
+        except Image.DecompressionBombError:
+            _reject_pixels(max_pixels)
+    if dimensions is None and require_image:
+        _count('rejected_not_image')
+        raise HTTPException(status_code=400, detail="File must be an image")
+
+    size = len(buffer)
+    with _stats_lock:
+        _stats['uploads'] += 1
+        _stats['bytes_ingested'] += size
+        _stats['peak_buffer_bytes'] = max(_stats['peak_buffer_bytes'], size)
+
+    width, height, image_format = dimensions if dimensions is not None else (None, None, None)
+    return IngestedUpload(
+        content=bytes(buffer),
+        sha256=digest.hexdigest(),
+        size=size,
+        width=width,
+        height=height,
+        format=image_format
+    )
+
+def get_upload_stats() -> Dict[str, Any]:
+    """Ingestion counters plus the process peak RSS"""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats['max_upload_bytes'] = MAX_UPLOAD_BYTES
+    stats['max_image_pixels'] = MAX_IMAGE_PIXELS
+    # ru_maxrss is in kilobytes on Linux
+    stats['peak_rss_kb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return stats
+
+class _BodyTooLarge(Exception):
+    pass
+
+class UploadSizeLimitMiddleware:
+    """ASGI middleware capping multipart request bodies at MAX_REQUEST_BYTES.
+
+    The limit is checked against Content-Length up front and against the
+    bytes actually received while the body streams in, so an oversized
+    upload is cut off instead of being spooled in full.
+    """
+
+    def __init__(self, app, max_bytes: int = MAX_REQUEST_BYTES):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get('headers') or [])
+        if not headers.get(b'content-type', b'').startswith(b'multipart/form-data'):
+            await self.app(scope, receive, send)
+            return
+
+        content_length = headers.get(b'content-length')
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_bytes:
+            _count('rejected_size')
+            await self._reject(send)
+            return
+
+        received = 0
+        exceeded = False
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message['type'] == 'http.request':
+                received += len(message.get('body', b''))
+                if received > self.max_bytes:
+                    exceeded = True
+                    raise _BodyTooLarge()
+            return message
+
+        async def guarded_send(message):
+            nonlocal response_started
+            if exceeded:
+                # The app turned the aborted body into its own error response
+                # (e.g. a 400 parse error); answer with 413 instead.
+                if message['type'] == 'http.response.start' and not response_started:
+                    response_started = True
+                    await self._reject(send)
+                return
+            if message['type'] == 'http.response.start':
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except _BodyTooLarge:
+            pass
+        if exceeded:
+            _count('rejected_size')
+            if not response_started:
+                await self._reject(send)
+
+    async def _reject(self, send):
+        body = b'{"detail":"Request body too large"}'
+        await send({
+            'type': 'http.response.start',
+            'status': 413,
+            'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())],
+        })
+        await send({'type': 'http.response.body', 'body': body})
@@ -0,0 +1,175 @@
+import os
+import time
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+# How scan results are persisted: 'sync' (before the response is sent) or
+# 'write-behind' (buffered and bulk-written by a background task)
+SCAN_WRITE_MODE = os.getenv('SCAN_WRITE_MODE', 'sync')
+# A buffered batch is written once it has this many rows...
+WRITE_BEHIND_BATCH_ROWS = int(os.getenv('WRITE_BEHIND_BATCH_ROWS', '100'))
+# ...or once its oldest row has waited this long
+WRITE_BEHIND_FLUSH_MS = float(os.getenv('WRITE_BEHIND_FLUSH_MS', '200'))
+# Writers wait (backpressure) while this many rows are buffered
+WRITE_BEHIND_MAX_BUFFERED = int(os.getenv('WRITE_BEHIND_MAX_BUFFERED', '1000'))
+# Rows of a failed flush go back to the head of the buffer and are retried
+# this many times, waiting WRITE_BEHIND_RETRY_MS (doubling, capped at
+# WRITE_BEHIND_MAX_RETRY_MS) after each failure, before they are dropped
+WRITE_BEHIND_RETRIES = int(os.getenv('WRITE_BEHIND_RETRIES', '5'))
+WRITE_BEHIND_RETRY_MS = float(os.getenv('WRITE_BEHIND_RETRY_MS', '100'))
+WRITE_BEHIND_MAX_RETRY_MS = float(os.getenv('WRITE_BEHIND_MAX_RETRY_MS', '5000'))
+
+class FlushError(Exception):
+    """Raised by a flush callable that wrote only part of its batch"""
+
+    def __init__(self, rows: List[Any], message: str = ''):
+        super().__init__(message or f"{len(rows)} rows were not written")
+        self.rows = rows
+
+class WriteBehindBuffer:
+    """In-process buffer of rows written in bulk by a background task.
+
+    `enqueue` returns as soon as the row is buffered. The flusher task hands
+    up to `max_batch` rows at a time to the async `flush` callable, when
+    that many are waiting or when the oldest has waited `flush_interval`
+    seconds. While `max_buffered` rows are waiting, `enqueue` blocks until
+    a flush makes room. If `flush` raises, the batch (or, for a FlushError,
+    just its unwritten rows) goes back to the head of the buffer and is
+    retried after a backoff, up to `retries` times. `close` writes out
+    everything still buffered.
+    """
+
+    def __init__(self, flush: Callable[[List[Any]], Awaitable[None]], max_batch: int = WRITE_BEHIND_BATCH_ROWS,
+                 flush_interval: float = WRITE_BEHIND_FLUSH_MS / 1000, max_buffered: int = WRITE_BEHIND_MAX_BUFFERED,
+                 retries: int = WRITE_BEHIND_RETRIES, retry_delay: float = WRITE_BEHIND_RETRY_MS / 1000,
+                 max_retry_delay: float = WRITE_BEHIND_MAX_RETRY_MS / 1000):
+        self.flush = flush
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_buffered = max(max_buffered, max_batch)
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self._rows = deque()  # (row, enqueued_at, failed attempts)
+        self._failures = 0  # consecutive failed flushes, for the backoff
+        self._added = asyncio.Event()
+        self._space = asyncio.Event()
+        self._closing = False
+        self._stats = {'enqueued': 0, 'flushes': 0, 'rows_written': 0, 'failed_flushes': 0,
+                       'retried_rows': 0, 'failed_rows': 0, 'backpressure_waits': 0}
+        self._batch_sizes = deque(maxlen=1000)
+        self._flush_latencies = deque(maxlen=1000)
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def enqueue(self, row: Any):
+        """Buffer one row, waiting first if the buffer is full"""
+        if self._closing:
+            raise RuntimeError("Write-behind buffer is closed")
+        if len(self._rows) >= self.max_buffered:
+            self._stats['backpressure_waits'] += 1
+            while len(self._rows) >= self.max_buffered:
+                self._space.clear()
+                await self._space.wait()
+        self._rows.append((row, time.perf_counter(), 0))
+        self._stats['enqueued'] += 1
+        self._added.set()
+
+    async def _wait_for_row(self, timeout: float) -> bool:
+        self._added.clear()
+        try:
+            await asyncio.wait_for(self._added.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def _run(self):
+        while self._rows or not self._closing:
+            if not self._rows:
+                self._added.clear()
+                await self._added.wait()
+                continue
+
+            # Hold the batch open until it is full or the oldest row's window ends
+            deadline = self._rows[0][1] + self.flush_interval
+            while len(self._rows) < self.max_batch and not self._closing:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0 or not await self._wait_for_row(remaining):
+                    break
+
+            batch = [self._rows.popleft() for _ in range(min(self.max_batch, len(self._rows)))]
+            self._space.set()
+            if await self._write(batch):
+                self._failures = 0
+            else:
+                self._failures += 1
+                await asyncio.sleep(min(self.retry_delay * 2 ** (self._failures - 1), self.max_retry_delay))
+
+    async def _write(self, batch) -> bool:
+        """Flush one batch; rows that were not written are put back to retry"""
+        try:
+            await self.flush([row for row, _, _ in batch])
+            failed = []
+        except Exception as e:
+            unwritten = {id(row) for row in e.rows} if isinstance(e, FlushError) else None
+            failed = [item for item in batch if unwritten is None or id(item[0]) in unwritten]
+            self._stats['failed_flushes'] += 1
+            retry = [(row, enqueued_at, attempts + 1) for row, enqueued_at, attempts in failed if attempts < self.retries]
+            dropped = len(failed) - len(retry)
+            # Back to the head of the buffer, in their original order; the
+            # buffer may briefly exceed max_buffered, which keeps writers waiting
+            self._rows.extendleft(reversed(retry))
+            self._stats['retried_rows'] += len(retry)
+            self._stats['failed_rows'] += dropped
+            print(f"Error flushing write-behind batch of {len(batch)} rows ({len(retry)} to retry, "
+                  f"{dropped} dropped after {self.retries} retries): {e}")
+        written = len(batch) - len(failed)
+        if written:
+            # Latency from the oldest row being buffered to the batch being written
+            self._flush_latencies.append(time.perf_counter() - batch[0][1])
+            self._batch_sizes.append(written)
+            self._stats['flushes'] += 1
+            self._stats['rows_written'] += written
+        return not failed
+
+    async def close(self):
+        """Stop accepting rows and write out the buffer"""
+        self._closing = True
+        self._added.set()
+        await self._task
+
+    def stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        sizes = sorted(self._batch_sizes)
+        latencies = sorted(self._flush_latencies)
+        stats.update({
+            'buffered': len(self._rows),
+            'max_buffered': self.max_buffered,
+            'max_batch': self.max_batch,
+            'flush_interval_ms': self.flush_interval * 1000,
+            'avg_batch_size': round(sum(sizes) / len(sizes), 2) if sizes else 0.0,
+            'p95_batch_size': sizes[int(len(sizes) * 0.95)] if sizes else 0,
+            'avg_flush_latency_ms': round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+            'p95_flush_latency_ms': round(latencies[int(len(latencies) * 0.95)] * 1000, 3) if latencies else 0.0,
+        })
+        return stats
+
+# The scan writer lives on the app's event loop (started by the lifespan)
+_scan_writer: Optional[WriteBehindBuffer] = None
+
+def get_scan_writer() -> Optional[WriteBehindBuffer]:
+    """The running scan write-behind buffer, or None if scans are written synchronously"""
+    return _scan_writer
+
+def start_scan_writer(flush: Callable[[List[Any]], Awaitable[None]]):
+    """Start the scan write-behind buffer when SCAN_WRITE_MODE is 'write-behind'"""
+    global _scan_writer
+    if SCAN_WRITE_MODE == 'write-behind':
+        _scan_writer = WriteBehindBuffer(flush)
+
+async def stop_scan_writer():
+    """Flush buffered scans and stop the writer (called from the app lifespan)"""
+    global _scan_writer
+    writer, _scan_writer = _scan_writer, None
+    if writer is not None:
+        await writer.close()
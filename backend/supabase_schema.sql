@@ -86,6 +86,30 @@ CREATE TABLE IF NOT EXISTS coin_transactions (
 -- Create index for user transaction history
 CREATE INDEX IF NOT EXISTS idx_coin_transactions_user ON coin_transactions(user_id, created_at DESC);
 
+-- coin_transactions is the append-only coin ledger. Snapshots hold a user's
+-- balance through one ledger entry: a balance is the latest snapshot plus
+-- the entries after it, and compaction folds old entries into a snapshot.
+CREATE TABLE IF NOT EXISTS coin_balance_snapshots (
+    id BIGSERIAL PRIMARY KEY,
+    user_id BIGINT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    balance INTEGER NOT NULL,
+    last_transaction_id BIGINT NOT NULL,
+    as_of TIMESTAMP WITH TIME ZONE NOT NULL,
+    compacted BOOLEAN DEFAULT FALSE,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_coin_balance_snapshots_user ON coin_balance_snapshots(user_id, last_transaction_id);
+
+-- record_scan calls made with an idempotency key (async scan jobs use their
+-- job id) and what they returned, so a retried job does not save twice
+CREATE TABLE IF NOT EXISTS scan_record_keys (
+    key TEXT PRIMARY KEY,
+    user_id BIGINT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    result JSONB,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
 -- ============================================
 -- 6. TRIGGER FOR UPDATED_AT
 -- ============================================
@@ -112,6 +136,8 @@ ALTER TABLE scans ENABLE ROW LEVEL SECURITY;
 ALTER TABLE notifications ENABLE ROW LEVEL SECURITY;
 ALTER TABLE referrals ENABLE ROW LEVEL SECURITY;
 ALTER TABLE coin_transactions ENABLE ROW LEVEL SECURITY;
+ALTER TABLE coin_balance_snapshots ENABLE ROW LEVEL SECURITY;
+ALTER TABLE scan_record_keys ENABLE ROW LEVEL SECURITY;
 
 -- Drop existing policies if they exist
 DROP POLICY IF EXISTS "Enable all for service role" ON users;
@@ -119,6 +145,8 @@ DROP POLICY IF EXISTS "Enable all for service role" ON scans;
 DROP POLICY IF EXISTS "Enable all for service role" ON notifications;
 DROP POLICY IF EXISTS "Enable all for service role" ON referrals;
 DROP POLICY IF EXISTS "Enable all for service role" ON coin_transactions;
+DROP POLICY IF EXISTS "Enable all for service role" ON coin_balance_snapshots;
+DROP POLICY IF EXISTS "Enable all for service role" ON scan_record_keys;
 
 -- Create policies (allowing all operations for service role)
 CREATE POLICY "Enable all for service role" ON users FOR ALL USING (true);
@@ -126,9 +154,312 @@ CREATE POLICY "Enable all for service role" ON scans FOR ALL USING (true);
 CREATE POLICY "Enable all for service role" ON notifications FOR ALL USING (true);
 CREATE POLICY "Enable all for service role" ON referrals FOR ALL USING (true);
 CREATE POLICY "Enable all for service role" ON coin_transactions FOR ALL USING (true);
+CREATE POLICY "Enable all for service role" ON coin_balance_snapshots FOR ALL USING (true);
+CREATE POLICY "Enable all for service role" ON scan_record_keys FOR ALL USING (true);
+
+-- ============================================
+-- 8. COIN LEDGER FUNCTIONS
+-- ============================================
+-- Every coin movement appends a coin_transactions entry and applies it to
+-- users.coins (the O(1) cached balance) in the same transaction, with one
+-- RPC round trip. With p_min_balance the change is refused (NULL is
+-- returned) if the balance would drop below it; with p_clamp the balance
+-- stops at p_min_balance instead and the entry records the amount applied.
+-- NULL is also returned for an unknown user.
+CREATE OR REPLACE FUNCTION append_coin_transaction(
+    p_user_id BIGINT,
+    p_amount INTEGER,
+    p_transaction_type TEXT,
+    p_description TEXT DEFAULT NULL,
+    p_min_balance INTEGER DEFAULT NULL,
+    p_clamp BOOLEAN DEFAULT FALSE
+)
+RETURNS JSONB AS $$
+DECLARE
+    v_current INTEGER;
+    v_amount INTEGER := p_amount;
+    v_balance INTEGER;
+    v_transaction JSONB;
+BEGIN
+    -- Row lock: concurrent movements for the user apply one after another
+    SELECT COALESCE(coins, 0) INTO v_current FROM users WHERE id = p_user_id FOR UPDATE;
+    IF NOT FOUND THEN
+        RETURN NULL;
+    END IF;
+
+    IF p_min_balance IS NOT NULL AND v_current + p_amount < p_min_balance THEN
+        IF NOT p_clamp THEN
+            RETURN NULL;
+        END IF;
+        v_amount := p_min_balance - v_current;
+    END IF;
+
+    UPDATE users SET coins = v_current + v_amount WHERE id = p_user_id RETURNING coins INTO v_balance;
+
+    INSERT INTO coin_transactions (user_id, amount, transaction_type, description)
+    VALUES (p_user_id, v_amount, p_transaction_type, p_description)
+    RETURNING to_jsonb(coin_transactions) INTO v_transaction;
+
+    RETURN jsonb_build_object('transaction', v_transaction, 'new_balance', v_balance);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Same movement, returning only the new balance
+DROP FUNCTION IF EXISTS increment_coins(BIGINT, INTEGER, INTEGER, BOOLEAN);
+CREATE OR REPLACE FUNCTION increment_coins(
+    p_user_id BIGINT,
+    p_delta INTEGER,
+    p_min_balance INTEGER DEFAULT NULL,
+    p_clamp BOOLEAN DEFAULT FALSE,
+    p_transaction_type TEXT DEFAULT 'adjustment',
+    p_description TEXT DEFAULT NULL
+)
+RETURNS INTEGER AS $$
+    SELECT (append_coin_transaction(p_user_id, p_delta, p_transaction_type, p_description,
+                                    p_min_balance, p_clamp)->>'new_balance')::INTEGER;
+$$ LANGUAGE sql;
+
+-- Balance from the ledger: the latest snapshot plus the entries after it,
+-- as of p_at when given. NULL if p_at is older than the compacted history.
+CREATE OR REPLACE FUNCTION coin_balance_at(p_user_id BIGINT, p_at TIMESTAMPTZ DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+    v_snapshot coin_balance_snapshots%ROWTYPE;
+BEGIN
+    SELECT * INTO v_snapshot FROM coin_balance_snapshots
+    WHERE user_id = p_user_id AND (p_at IS NULL OR as_of <= p_at)
+    ORDER BY last_transaction_id DESC
+    LIMIT 1;
+
+    IF NOT FOUND AND p_at IS NOT NULL AND EXISTS (
+        SELECT 1 FROM coin_balance_snapshots WHERE user_id = p_user_id AND compacted
+    ) THEN
+        RETURN NULL;
+    END IF;
+
+    RETURN COALESCE(v_snapshot.balance, 0) + COALESCE((
+        SELECT SUM(amount) FROM coin_transactions
+        WHERE user_id = p_user_id
+          AND id > COALESCE(v_snapshot.last_transaction_id, 0)
+          AND (p_at IS NULL OR created_at <= p_at)
+    ), 0);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Balance through one ledger entry (for writing snapshots)
+CREATE OR REPLACE FUNCTION coin_balance_through(p_user_id BIGINT, p_transaction_id BIGINT)
+RETURNS INTEGER AS $$
+    WITH snapshot AS (
+        SELECT balance, last_transaction_id FROM coin_balance_snapshots
+        WHERE user_id = p_user_id AND last_transaction_id <= p_transaction_id
+        ORDER BY last_transaction_id DESC
+        LIMIT 1
+    )
+    SELECT (COALESCE((SELECT balance FROM snapshot), 0) + COALESCE((
+        SELECT SUM(amount) FROM coin_transactions
+        WHERE user_id = p_user_id
+          AND id > COALESCE((SELECT last_transaction_id FROM snapshot), 0)
+          AND id <= p_transaction_id
+    ), 0))::INTEGER;
+$$ LANGUAGE sql;
+
+-- Snapshot every user with ledger entries since their last snapshot; returns
+-- the snapshots written. Entries newer than p_settle are left for the next
+-- run, so a movement still committing cannot slip in behind a snapshot.
+CREATE OR REPLACE FUNCTION snapshot_coin_balances(p_settle INTERVAL DEFAULT '1 minute')
+RETURNS INTEGER AS $$
+    WITH last_snapshot AS (
+        SELECT user_id, MAX(last_transaction_id) AS last_id
+        FROM coin_balance_snapshots
+        GROUP BY user_id
+    ), pending AS (
+        SELECT t.user_id, MAX(t.id) AS last_id
+        FROM coin_transactions t
+        LEFT JOIN last_snapshot s ON s.user_id = t.user_id
+        WHERE t.id > COALESCE(s.last_id, 0) AND t.created_at < NOW() - p_settle
+        GROUP BY t.user_id
+    ), inserted AS (
+        INSERT INTO coin_balance_snapshots (user_id, balance, last_transaction_id, as_of)
+        SELECT p.user_id, coin_balance_through(p.user_id, p.last_id), p.last_id, t.created_at
+        FROM pending p
+        JOIN coin_transactions t ON t.id = p.last_id
+        ON CONFLICT (user_id, last_transaction_id) DO NOTHING
+        RETURNING 1
+    )
+    SELECT COUNT(*)::INTEGER FROM inserted;
+$$ LANGUAGE sql;
+
+-- Fold ledger entries older than p_before into one compacted snapshot per
+-- user, then delete them and the snapshots they supersede. Returns the
+-- number of entries removed.
+CREATE OR REPLACE FUNCTION compact_coin_ledger(p_before TIMESTAMPTZ)
+RETURNS INTEGER AS $$
+DECLARE
+    v_user RECORD;
+    v_count INTEGER;
+    v_removed INTEGER := 0;
+BEGIN
+    FOR v_user IN
+        SELECT user_id, MAX(id) AS last_id FROM coin_transactions
+        WHERE created_at < p_before
+        GROUP BY user_id
+    LOOP
+        INSERT INTO coin_balance_snapshots (user_id, balance, last_transaction_id, as_of, compacted)
+        SELECT v_user.user_id, coin_balance_through(v_user.user_id, v_user.last_id), v_user.last_id, created_at, TRUE
+        FROM coin_transactions WHERE id = v_user.last_id
+        ON CONFLICT (user_id, last_transaction_id) DO UPDATE SET compacted = TRUE;
+
+        DELETE FROM coin_transactions WHERE user_id = v_user.user_id AND id <= v_user.last_id;
+        GET DIAGNOSTICS v_count = ROW_COUNT;
+        v_removed := v_removed + v_count;
+
+        DELETE FROM coin_balance_snapshots
+        WHERE user_id = v_user.user_id AND last_transaction_id < v_user.last_id;
+    END LOOP;
+    RETURN v_removed;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Balances changed outside the ledger by older versions become opening
+-- entries, so the ledger and users.coins agree. Safe to re-run.
+INSERT INTO coin_transactions (user_id, amount, transaction_type, description)
+SELECT id, COALESCE(coins, 0) - coin_balance_at(id), 'opening_balance', 'Balance before the coin ledger'
+FROM users
+WHERE COALESCE(coins, 0) <> coin_balance_at(id);
+
+-- ============================================
+-- 9. RECORD SCAN FUNCTION
+-- ============================================
+-- Saves scans, appends their coin ledger entry and increments the user's
+-- balance in one transaction, so the scan endpoints persist a result with a
+-- single RPC round trip. p_scans is a JSON array of
+-- {food_name, confidence, image_path, nutrition_json} objects. With
+-- p_idempotency_key, a repeated call returns the first call's result
+-- without saving anything again.
+DROP FUNCTION IF EXISTS record_scan(BIGINT, JSONB, INTEGER, TEXT);
+
+CREATE OR REPLACE FUNCTION record_scan(
+    p_user_id BIGINT,
+    p_scans JSONB,
+    p_coins INTEGER DEFAULT 1,
+    p_description TEXT DEFAULT NULL,
+    p_idempotency_key TEXT DEFAULT NULL
+)
+RETURNS JSONB AS $$
+DECLARE
+    v_scans JSONB;
+    v_movement JSONB;
+    v_result JSONB;
+BEGIN
+    IF p_idempotency_key IS NOT NULL THEN
+        -- Claim the key; a concurrent call with the same key waits on it
+        -- until this transaction ends, then finds it taken
+        INSERT INTO scan_record_keys (key, user_id) VALUES (p_idempotency_key, p_user_id)
+        ON CONFLICT (key) DO NOTHING;
+        IF NOT FOUND THEN
+            SELECT result INTO v_result FROM scan_record_keys WHERE key = p_idempotency_key;
+            RETURN v_result;
+        END IF;
+    END IF;
+
+    WITH inserted AS (
+        INSERT INTO scans (user_id, food_name, confidence, image_path, nutrition_json)
+        SELECT p_user_id, s.food_name, s.confidence, s.image_path, s.nutrition_json
+        FROM jsonb_to_recordset(p_scans) AS s(food_name TEXT, confidence REAL, image_path TEXT, nutrition_json JSONB)
+        RETURNING *
+    )
+    SELECT COALESCE(jsonb_agg(to_jsonb(inserted) ORDER BY inserted.id), '[]'::jsonb) INTO v_scans FROM inserted;
+
+    -- Ledger entry and atomic increment: concurrent scans cannot overwrite each other's coins
+    v_movement := append_coin_transaction(p_user_id, p_coins, 'scan', p_description);
+
+    IF v_movement IS NULL THEN
+        RAISE EXCEPTION 'User % not found', p_user_id;
+    END IF;
+
+    v_result := v_movement || jsonb_build_object('scans', v_scans);
+    IF p_idempotency_key IS NOT NULL THEN
+        UPDATE scan_record_keys SET result = v_result WHERE key = p_idempotency_key;
+    END IF;
+    RETURN v_result;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Bulk version for write-behind persistence: p_entries is a JSON array of
+-- {user_id, scans, coins, description} objects, written with one insert per
+-- table and one balance update per user. Returns {"balances": {user_id: coins}}.
+CREATE OR REPLACE FUNCTION record_scan_batch(p_entries JSONB)
+RETURNS JSONB AS $$
+DECLARE
+    v_balances JSONB;
+BEGIN
+    INSERT INTO scans (user_id, food_name, confidence, image_path, nutrition_json)
+    SELECT (e->>'user_id')::BIGINT, s.food_name, s.confidence, s.image_path, s.nutrition_json
+    FROM jsonb_array_elements(p_entries) AS e,
+         jsonb_to_recordset(e->'scans') AS s(food_name TEXT, confidence REAL, image_path TEXT, nutrition_json JSONB);
+
+    INSERT INTO coin_transactions (user_id, amount, transaction_type, description)
+    SELECT (e->>'user_id')::BIGINT, (e->>'coins')::INTEGER, 'scan', e->>'description'
+    FROM jsonb_array_elements(p_entries) AS e;
+
+    WITH totals AS (
+        SELECT (e->>'user_id')::BIGINT AS user_id, SUM((e->>'coins')::INTEGER) AS coins
+        FROM jsonb_array_elements(p_entries) AS e
+        GROUP BY 1
+    ), updated AS (
+        UPDATE users SET coins = COALESCE(users.coins, 0) + totals.coins
+        FROM totals
+        WHERE users.id = totals.user_id
+        RETURNING users.id, users.coins
+    )
+    SELECT COALESCE(jsonb_object_agg(updated.id::TEXT, updated.coins), '{}'::jsonb) INTO v_balances FROM updated;
+
+    RETURN jsonb_build_object('balances', v_balances);
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================
+-- 10. COIN TRANSFER FUNCTION
+-- ============================================
+-- Moves coins from one user to another, identified by phone number: the
+-- balance check, the transfer_out and transfer_in ledger entries and both
+-- balance updates commit together, with one RPC round trip. Returns
+-- {sender_new_balance, receiver_new_balance}, or NULL (nothing written) for
+-- an unknown sender or receiver or an insufficient balance.
+CREATE OR REPLACE FUNCTION transfer_coins(
+    p_sender_id BIGINT,
+    p_receiver_phone TEXT,
+    p_amount INTEGER
+)
+RETURNS JSONB AS $$
+DECLARE
+    v_receiver_id BIGINT;
+    v_sender JSONB;
+    v_receiver JSONB;
+BEGIN
+    SELECT id INTO v_receiver_id FROM users WHERE phone_number = p_receiver_phone;
+    IF NOT FOUND THEN
+        RETURN NULL;
+    END IF;
+
+    -- Lock both rows in id order, so opposite transfers cannot deadlock
+    PERFORM 1 FROM users WHERE id IN (p_sender_id, v_receiver_id) ORDER BY id FOR UPDATE;
+
+    v_sender := append_coin_transaction(p_sender_id, -p_amount, 'transfer_out',
+                                        'Transfer to ' || p_receiver_phone, 0);
+    IF v_sender IS NULL THEN
+        RETURN NULL;
+    END IF;
+    v_receiver := append_coin_transaction(v_receiver_id, p_amount, 'transfer_in',
+                                          'Transfer from ' || p_sender_id);
+
+    RETURN jsonb_build_object('sender_new_balance', v_sender->'new_balance',
+                              'receiver_new_balance', v_receiver->'new_balance');
+END;
+$$ LANGUAGE plpgsql;
 
 -- ============================================
--- 8. VERIFICATION QUERIES
+-- 11. VERIFICATION QUERIES
 -- ============================================
 -- Run these to verify your tables were created successfully:
 -- SELECT table_name FROM information_schema.tables WHERE table_schema = 'public';
@@ -0,0 +1,39 @@
+import os
+import tempfile
+
+# The app creates its engine (and tables) at import time; point it at a
+# scratch database so test runs never rewrite the checked-in foodid.db
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='foodid-tests-'), 'foodid.db')}"
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from backend.database import Base, create_database_engine
+from backend.services import ai_recognition, local_database, nutrition_catalog, recent_scans_cache
+from backend.services import repository as repository_module
+from backend.services.repository import LocalRepository
+
+@pytest.fixture(autouse=True)
+def fresh_clarifai_breaker(monkeypatch):
+    """Give each test its own breaker so failures in one test cannot open it for the next"""
+    monkeypatch.setattr(ai_recognition, '_clarifai_breaker', None)
+
+@pytest.fixture(autouse=True)
+def no_food_database_refresh(monkeypatch):
+    """Keep the app lifespan from loading food_database over the network"""
+    monkeypatch.setattr(nutrition_catalog, 'NUTRITION_CATALOG_REFRESH_SECONDS', 0)
+
+@pytest.fixture(autouse=True)
+def fresh_recent_scans_cache(monkeypatch):
+    """Keep cached recent scans from leaking between tests"""
+    monkeypatch.setattr(recent_scans_cache, '_recent_scans_cache', None)
+
+@pytest.fixture
+def local_repository(monkeypatch, tmp_path) -> LocalRepository:
+    """LocalRepository on a fresh SQLite database, installed as the app's repository"""
+    engine = create_database_engine(f"sqlite:///{tmp_path / 'local.db'}")
+    Base.metadata.create_all(bind=engine)
+    monkeypatch.setattr(local_database, 'SessionLocal', sessionmaker(autocommit=False, autoflush=False, bind=engine))
+    repository = LocalRepository()
+    monkeypatch.setattr(repository_module, '_repository', repository)
+    return repository
@@ -0,0 +1,167 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from backend.services import ai_recognition, perceptual_index, recognition_cache
+from backend.services.circuit_breaker import CircuitBreaker, CLOSED, HALF_OPEN, OPEN
+
+class FakeClarifai:
+    """Local HTTP server standing in for Clarifai, with injectable latency and errors"""
+
+    def __init__(self):
+        self.latency = 0.0
+        self.status = 200
+        self.requests = 0
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                fake.requests += 1
+                inputs = json.loads(self.rfile.read(int(self.headers['Content-Length'])))['inputs']
+                time.sleep(fake.latency)
+                body = json.dumps({'outputs': [
+                    {'input': {'id': item['id']}, 'data': {'concepts': [{'name': 'rice', 'value': 0.9}]}}
+                    for item in inputs
+                ]}).encode()
+                try:
+                    self.send_response(fake.status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # client gave up (timeout)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+@pytest.fixture
+def fake_clarifai(monkeypatch, tmp_path):
+    fake = FakeClarifai()
+    monkeypatch.setattr(ai_recognition, 'CLARIFAI_API_URL', fake.url)
+    monkeypatch.setattr(ai_recognition, '_http_client', None)
+    monkeypatch.setattr(
+        recognition_cache, '_recognition_cache',
+        recognition_cache.RecognitionCache(path=str(tmp_path / 'cache.db'))
+    )
+    monkeypatch.setattr(perceptual_index, '_perceptual_index', perceptual_index.PerceptualIndex())
+    yield fake
+    fake.close()
+
+def _scan_all(count, offset=0):
+    """Recognize `count` distinct images one at a time; returns (results, seconds per scan)"""
+    async def run():
+        results, durations = [], []
+        try:
+            for i in range(offset, offset + count):
+                started = time.perf_counter()
+                results.append((await ai_recognition.recognize_images([f"image-{i}".encode()]))[0])
+                durations.append(time.perf_counter() - started)
+        finally:
+            await ai_recognition.close_http_client()
+        return results, durations
+    return asyncio.run(run())
+
+def test_breaker_state_machine():
+    now = [0.0]
+    breaker = CircuitBreaker('test', window=10, min_calls=4, failure_threshold=0.5,
+                             open_seconds=30, clock=lambda: now[0])
+    breaker.record_success(0.1)
+    breaker.record_success(0.1)
+    breaker.record_failure()
+    assert breaker.state == CLOSED  # below min_calls
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow_request()
+
+    now[0] = 31
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow_request()
+    assert not breaker.allow_request()  # one probe at a time
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    now[0] = 62
+    assert breaker.allow_request()
+    breaker.record_success(0.1)
+    assert breaker.state == CLOSED
+    stats = breaker.stats()
+    assert stats['transitions'] == {'closed->open': 1, 'open->half_open': 2, 'half_open->open': 1,
+                                    'half_open->closed': 1}
+    assert stats['short_circuited'] == 2
+
+def test_cancelled_probe_releases_its_slot(fake_clarifai, monkeypatch):
+    now = [0.0]
+    breaker = CircuitBreaker('clarifai', min_calls=1, open_seconds=30, clock=lambda: now[0])
+    monkeypatch.setattr(ai_recognition, '_clarifai_breaker', breaker)
+    breaker.record_failure()
+    now[0] = 31
+    assert breaker.state == HALF_OPEN
+
+    fake_clarifai.latency = 2.0
+
+    async def run():
+        try:
+            # The client gives up while the probe is in flight
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(ai_recognition.recognize_images([b'probe']), 0.2)
+        finally:
+            await ai_recognition.close_http_client()
+
+    asyncio.run(run())
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow_request()  # the next probe can go through
+    assert not breaker.allow_request()
+    breaker.release_probe()
+    assert breaker.allow_request()
+
+def test_adaptive_timeout_follows_p95():
+    breaker = CircuitBreaker('test', min_calls=10, max_timeout=5.0, min_timeout=0.2, timeout_multiplier=3)
+    assert breaker.current_timeout() == 5.0  # not enough samples yet
+    for _ in range(19):
+        breaker.record_success(0.1)
+    breaker.record_success(0.4)
+    assert breaker.current_timeout() == pytest.approx(1.2)
+    # Once the slow calls roll out of the window, the floor applies
+    for _ in range(50):
+        breaker.record_success(0.01)
+    assert breaker.current_timeout() == 0.2
+
+def test_open_breaker_skips_failing_provider(fake_clarifai):
+    fake_clarifai.status = 500
+    results, _ = _scan_all(15)
+
+    breaker = ai_recognition.get_clarifai_breaker()
+    # The breaker opened after min_calls failures; later scans never reached the server
+    assert fake_clarifai.requests == ai_recognition.CLARIFAI_BREAKER_MIN_CALLS
+    assert breaker.state == OPEN
+    assert breaker.stats()['short_circuited'] == 5
+    assert all(result['name'] != 'Rice' for result in results)
+
+def test_degraded_provider_times_out_at_adaptive_timeout(fake_clarifai, monkeypatch):
+    monkeypatch.setattr(ai_recognition, '_clarifai_breaker', CircuitBreaker(
+        'clarifai', min_calls=5, max_timeout=5.0, min_timeout=0.3, timeout_multiplier=3
+    ))
+    fake_clarifai.latency = 0.02
+    healthy, _ = _scan_all(5)
+    assert all(result['name'] == 'Rice' for result in healthy)
+    assert ai_recognition.get_clarifai_breaker().current_timeout() < 1.0
+
+    # Clarifai degrades: scans give up after the learned timeout, not the static 5 s
+    fake_clarifai.latency = 3.0
+    degraded, durations = _scan_all(2, offset=5)
+    assert all(result['name'] != 'Rice' for result in degraded)
+    assert max(durations) < 1.5
+    assert ai_recognition.get_clarifai_breaker().stats()['failures'] == 2
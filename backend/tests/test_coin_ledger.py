@@ -0,0 +1,73 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.services import coin_ledger
+
+def _moment() -> datetime:
+    # A time strictly between two ledger entries
+    time.sleep(0.01)
+    moment = datetime.utcnow()
+    time.sleep(0.01)
+    return moment
+
+def test_balances_come_from_snapshots_and_later_entries(local_repository):
+    async def run():
+        start = _moment()
+        user = await local_repository.create_user('+15550000010')
+        friend = await local_repository.create_user('+15550000011')
+        await local_repository.create_coin_transaction(user['id'], 10, 'bonus')
+        await local_repository.transfer_coins(user['id'], friend['phone_number'], 4)
+        first = _moment()
+        assert await local_repository.snapshot_coin_balances() == 2
+        assert await local_repository.snapshot_coin_balances() == 0
+
+        # Every movement is a ledger entry, including admin adjustments
+        assert await local_repository.increment_coins(user['id'], -100, min_balance=0, clamp=True,
+                                                      transaction_type='admin_adjustment', description='Refund') == 0
+        await local_repository.record_scan(user['id'], [{'food_name': 'Pizza', 'confidence': 90}], coins=3)
+        history = await local_repository.get_user_coin_history(user['id'])
+        assert [(row['transaction_type'], row['amount']) for row in history] == [
+            ('scan', 3), ('admin_adjustment', -6), ('transfer_out', -4), ('bonus', 10)]
+
+        assert await local_repository.get_coin_balance_at(user['id']) == 3
+        assert await local_repository.get_coin_balance_at(user['id'], first) == 6
+        assert await local_repository.get_coin_balance_at(friend['id'], first) == 4
+        assert await local_repository.get_coin_balance_at(user['id'], start) == 0
+
+        # Entries before `first` are folded into snapshots and deleted
+        assert await local_repository.compact_coin_ledger(first) == 3
+        assert await local_repository.compact_coin_ledger(first) == 0
+        assert len(await local_repository.get_user_coin_history(user['id'])) == 2
+        assert await local_repository.get_coin_balance_at(user['id']) == 3
+        assert await local_repository.get_coin_balance_at(user['id'], first) == 6
+        assert await local_repository.get_coin_balance_at(user['id'], start) is None
+
+        assert await local_repository.snapshot_coin_balances() == 1
+        assert await local_repository.get_coin_balance_at(user['id']) == (await local_repository.get_user_by_id(user['id']))['coins']
+        return user, first
+
+    user, first = asyncio.run(run())
+
+    with TestClient(app) as client:
+        assert client.get(f"/api/coins/{user['id']}/balance").json() == {'user_id': user['id'], 'balance': 3}
+        at = first.replace(tzinfo=timezone.utc).isoformat()
+        response = client.get(f"/api/coins/{user['id']}/balance", params={'at': at})
+        assert response.json()['balance'] == 6
+        response = client.get(f"/api/coins/{user['id']}/balance", params={'at': '2000-01-01T00:00:00Z'})
+        assert response.status_code == 404
+
+def test_maintenance_compacts_only_with_a_retention_period(monkeypatch, local_repository):
+    async def run():
+        user = await local_repository.create_user('+15550000012')
+        await local_repository.create_coin_transaction(user['id'], 5, 'bonus')
+        kept = await coin_ledger.run_ledger_maintenance()
+        monkeypatch.setattr(coin_ledger, 'COIN_LEDGER_RETENTION_DAYS', 1 / 86400000)  # a millisecond
+        await asyncio.sleep(0.01)
+        compacted = await coin_ledger.run_ledger_maintenance()
+        return kept, compacted, await local_repository.get_coin_balance_at(user['id'])
+
+    assert asyncio.run(run()) == ({'snapshots': 1, 'compacted': 0}, {'snapshots': 0, 'compacted': 1}, 5)
@@ -0,0 +1,18 @@
+from PIL import Image
+
+from backend.services.color_classifier import analyze_image_colors, UNKNOWN_FOOD
+
+def test_nearest_profile_is_chosen():
+    assert analyze_image_colors(Image.new('RGB', (64, 64), (225, 215, 195)))[0] == 'Rice'
+    assert analyze_image_colors(Image.new('RGB', (64, 64), (90, 150, 70)))[0] in ('Salad', 'Vegetables', 'Green Smoothie')
+    assert analyze_image_colors(Image.new('RGB', (64, 64), (110, 65, 45)))[0] == 'Beef'
+
+def test_output_is_deterministic():
+    image = Image.linear_gradient('L').convert('RGB').resize((96, 64))
+    results = {analyze_image_colors(image) for _ in range(20)}
+    assert len(results) == 1
+    name, closeness = results.pop()
+    assert 0.0 <= closeness <= 1.0
+
+def test_missing_image_falls_back_to_unknown():
+    assert analyze_image_colors(None) == (UNKNOWN_FOOD, 0.0)
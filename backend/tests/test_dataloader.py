@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.services import local_database
+from backend.services.dataloader import DataLoader
+
+def _users_loader(calls, **kwargs) -> DataLoader:
+    async def batch_load(keys):
+        calls.append(list(keys))
+        await asyncio.sleep(0)
+        return [{'id': key, 'name': f'user {key}'} for key in keys if key != 404]
+    return DataLoader(batch_load, **kwargs)
+
+def test_loads_in_one_turn_are_batched_and_cached():
+    calls = []
+
+    async def run():
+        loader = _users_loader(calls)
+        first = await asyncio.gather(loader.load(1), loader.load(2), loader.load(1), loader.load(404))
+        again = await loader.load_many([2, 1])
+        return first, again
+
+    first, again = asyncio.run(run())
+    assert first == [{'id': 1, 'name': 'user 1'}, {'id': 2, 'name': 'user 2'}, {'id': 1, 'name': 'user 1'}, None]
+    assert again == [{'id': 2, 'name': 'user 2'}, {'id': 1, 'name': 'user 1'}]
+    # Each key once, in a single query; the second round came from the cache
+    assert calls == [[1, 2, 404]]
+
+def test_batches_are_split_by_max_size():
+    calls = []
+
+    async def run():
+        loader = _users_loader(calls, max_batch_size=2)
+        return await loader.load_many(range(5)), loader.batches
+
+    rows, batches = asyncio.run(run())
+    assert [row['id'] for row in rows] == [0, 1, 2, 3, 4]
+    assert calls == [[0, 1], [2, 3], [4]] and batches == 3
+
+def test_failures_are_not_cached():
+    calls = []
+
+    async def batch_load(keys):
+        calls.append(list(keys))
+        if len(calls) == 1:
+            raise RuntimeError('backend down')
+        return [{'id': key} for key in keys]
+
+    async def run():
+        loader = DataLoader(batch_load)
+        with pytest.raises(RuntimeError):
+            await loader.load(1)
+        return await loader.load(1)
+
+    assert asyncio.run(run()) == {'id': 1}
+    assert calls == [[1], [1]]
+
+def test_prime_and_clear_follow_writes():
+    calls = []
+
+    async def run():
+        loader = _users_loader(calls)
+        loader.prime(1, {'id': 1, 'name': 'renamed'})
+        primed = await loader.load(1)
+        loader.clear(1)
+        return primed, await loader.load(1)
+
+    assert asyncio.run(run()) == ({'id': 1, 'name': 'renamed'}, {'id': 1, 'name': 'user 1'})
+    assert calls == [[1]]
+
+def test_analytics_looks_up_top_users_in_one_query(monkeypatch, local_repository):
+    async def seed():
+        users = []
+        for index in range(3):
+            user = await local_repository.create_user(f'+1555000002{index}', name=f'Eater {index}')
+            await local_repository.record_scan(user['id'], [{'food_name': 'Idli', 'confidence': 90}] * (index + 1))
+            users.append(user)
+        return users
+
+    users = asyncio.run(seed())
+
+    calls = []
+    get_users_by_ids = local_database.get_users_by_ids
+
+    def counted(user_ids):
+        calls.append(sorted(user_ids))
+        return get_users_by_ids(user_ids)
+
+    monkeypatch.setattr(local_database, 'get_users_by_ids', counted)
+
+    with TestClient(app) as client:
+        top_users = client.get('/api/admin/scans/analytics').json()['top_users']
+        assert [(row['user_id'], row['scan_count'], row['name']) for row in top_users] == [
+            (users[2]['id'], 3, 'Eater 2'), (users[1]['id'], 2, 'Eater 1'), (users[0]['id'], 1, 'Eater 0')]
+        assert top_users[0]['phone_number'] == users[2]['phone_number']
+        # Loaders are per request: the second request queries again
+        client.get('/api/admin/scans/analytics')
+
+    assert calls == [sorted(user['id'] for user in users)] * 2
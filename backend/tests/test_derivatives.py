@@ -0,0 +1,58 @@
+import io
+
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from backend.main import app
+from backend.services import derivatives, storage
+from backend.services.storage import InMemoryObjectStorage
+
+def _make_jpeg(size=(1600, 1200)) -> bytes:
+    output = io.BytesIO()
+    Image.new('RGB', size, (200, 60, 40)).save(output, format='JPEG', quality=90)
+    return output.getvalue()
+
+def test_variant_rendered_once_then_served_from_storage(monkeypatch):
+    object_store = InMemoryObjectStorage()
+    monkeypatch.setattr(storage, '_storage', object_store)
+    renders = []
+    render = derivatives.render_derivative
+
+    def counting_render(data, width, fmt):
+        renders.append((width, fmt))
+        return render(data, width, fmt)
+
+    monkeypatch.setattr(derivatives, 'render_derivative', counting_render)
+    original = _make_jpeg()
+    stored = storage.store_content(original)
+
+    with TestClient(app) as client:
+        url = '/static/' + stored.key.split('/')[-1]
+        first = client.get(url, params={'w': 256, 'fmt': 'webp'})
+        second = client.get(url, params={'w': 256, 'fmt': 'webp'})
+
+    assert first.status_code == second.status_code == 200
+    assert first.headers['content-type'] == 'image/webp'
+    assert first.content == second.content
+    assert len(first.content) < len(original)
+    with Image.open(io.BytesIO(first.content)) as image:
+        assert image.format == 'WEBP'
+        assert image.size == (256, 192)
+    assert renders == [(256, 'webp')]
+    assert object_store.exists(derivatives.derivative_key(stored.key, 256, 'webp'))
+
+def test_variant_parameters_are_validated(monkeypatch):
+    monkeypatch.setattr(storage, '_storage', InMemoryObjectStorage())
+    stored = storage.store_content(_make_jpeg((300, 200)))
+
+    with TestClient(app) as client:
+        url = f"/static/{stored.key}"
+        assert client.get(url, params={'w': 300}).status_code == 400
+        assert client.get(url, params={'fmt': 'tiff'}).status_code == 400
+        # Small sources are not upscaled
+        response = client.get(url, params={'w': 512, 'fmt': 'jpeg'})
+        assert response.status_code == 200
+        with Image.open(io.BytesIO(response.content)) as image:
+            assert image.size == (300, 200)
+        missing = '/static/' + 'ab' * 32 + '.jpg'
+        assert client.get(missing, params={'w': 256}).status_code == 404
@@ -0,0 +1,84 @@
+import time
+
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.services import nutrition_catalog
+from backend.services.color_classifier import COLOR_PROFILES
+from backend.services.food_resolver import TrigramIndex, trigrams
+from backend.services.nutrition_catalog import DEFAULT_FOOD, build_catalog
+from backend.benchmarks.bench_food_resolver import QUERIES, make_catalog
+
+NAMES = ['pizza', 'chicken', 'chicken breast', 'salad', 'caesar salad', 'burger', 'pasta']
+
+def test_trigrams_are_padded_per_word():
+    assert trigrams('Pie') == {'  p', ' pi', 'pie', 'ie '}
+    assert trigrams('fried_rice') == trigrams('Fried  Rice')
+
+def test_ranks_by_similarity_and_memoizes():
+    index = TrigramIndex(NAMES)
+
+    assert index.resolve('Pepperoni Pizza')[0] == 'pizza'
+    assert index.resolve('Grilled Chicken Breast')[0] == 'chicken breast'
+    assert index.resolve('chiken')[0] == 'chicken'  # misspelled
+    assert index.resolve('Quinoa') is None
+    assert index.resolve('Pasta with Tomato Sauce')[0] == 'pasta'  # long label, low similarity
+
+    names = [name for name, _ in index.search('caesar salad', limit=3)]
+    assert names[:2] == ['caesar salad', 'salad']
+    assert index.search('caesar salad', limit=1) == [('caesar salad', 1.0)]
+
+    index.search = None  # a memoized query never searches again
+    assert index.resolve('Pepperoni Pizza')[0] == 'pizza'
+
+def test_names_sharing_only_a_word_ending_do_not_match():
+    index = TrigramIndex(['apple', 'banana', 'chicken breast', 'brown rice', 'broccoli'])
+    assert index.resolve('Pineapple') is None
+    assert index.resolve('Grilled Chicken Breast')[0] == 'chicken breast'
+    assert index.resolve('Brown Rice Bowl')[0] == 'brown rice'
+
+def test_every_color_classifier_label_resolves():
+    catalog = build_catalog([], version='builtin')
+    resolved = {label: catalog.lookup(label).get('name') for label, _, _ in COLOR_PROFILES}
+    assert resolved == {
+        'Pizza': 'Pizza', 'Pasta with Tomato Sauce': 'Pasta', 'Burger': 'Burger', 'Salad': 'Salad',
+        'Vegetables': 'Vegetables', 'Green Smoothie': 'Smoothie', 'Rice': 'Rice', 'Pasta': 'Pasta',
+        'Chicken': 'Chicken', 'Beef': 'Beef', 'Sandwich': 'Sandwich', 'Mixed Meal': None,
+    }
+    # A mixed plate is the generic entry
+    assert catalog.lookup('Mixed Meal')['calories'] == DEFAULT_FOOD['calories']
+
+def test_baseline_keywords_still_resolve():
+    # Names containing one of the original keywords resolved to it by substring
+    catalog = build_catalog([], version='builtin')
+    for keyword in ['pizza', 'salad', 'burger', 'chicken', 'rice', 'pasta', 'sandwich']:
+        for name in [keyword, keyword.upper(), f"Homemade {keyword}", f"{keyword} platter", f"spicy {keyword} with extra cheese"]:
+            assert catalog.lookup(name)['name'] == keyword.title(), name
+
+def test_lookup_is_fast_against_100k_foods():
+    index = TrigramIndex(make_catalog(100_000))
+    start = time.perf_counter()
+    matches = [index.resolve(query) for query in QUERIES]
+    average = (time.perf_counter() - start) / len(QUERIES)
+    # Most queries find a close dish; a few have no good match in this catalog
+    assert sum(match is not None for match in matches) >= len(QUERIES) - 2
+    assert dict(zip(QUERIES, matches))['Fried Rice'][0] == 'fried rice fry'
+    # About 0.6 ms here; the bound leaves room for slow CI machines
+    assert average < 0.005
+
+def test_resolve_endpoint(monkeypatch):
+    rows = [{'food_name': 'Chicken Breast', 'category': 'proteins', 'calories': 165, 'protein': 31,
+             'carbs': 0, 'fat': 3.6, 'health_score': 90, 'ingredients': ['Chicken']}]
+    monkeypatch.setattr(nutrition_catalog, '_catalog', build_catalog(rows, version='v7'))
+
+    with TestClient(app) as client:
+        response = client.get('/api/foods/resolve', params={'q': 'grilled chicken breast', 'limit': 2})
+        assert response.status_code == 200
+        data = response.json()
+        assert data['catalog_version'] == 'v7'
+        assert data['match']['name'] == 'Chicken Breast'
+        assert data['match']['nutrition']['calories'] == 165
+        assert [c['name'] for c in data['candidates']] == ['Chicken Breast', 'Chicken']
+
+        assert client.get('/api/foods/resolve', params={'q': 'xyzzy'}).json()['match'] is None
+        assert client.get('/api/foods/resolve').status_code == 422
@@ -0,0 +1,93 @@
+import io
+import os
+
+import pytest
+from PIL import Image, JpegImagePlugin
+
+from backend.services import image_processing
+from backend.services.image_processing import MAX_DIMENSION, compress_image, prepare_image
+
+def _save(image: Image.Image, fmt: str, **params) -> bytes:
+    output = io.BytesIO()
+    image.save(output, format=fmt, **params)
+    return output.getvalue()
+
+def _photo(size) -> bytes:
+    # Noisy enough that the first encode misses a small byte target
+    channels = (Image.effect_noise(size, 40), Image.linear_gradient('L').resize(size),
+                Image.radial_gradient('L').resize(size))
+    return _save(Image.merge('RGB', channels), 'JPEG', quality=95)
+
+def _count_encodes(monkeypatch):
+    qualities = []
+    encode = image_processing._encode
+
+    def counting_encode(image, quality):
+        qualities.append(quality)
+        return encode(image, quality)
+
+    monkeypatch.setattr(image_processing, '_encode', counting_encode)
+    return qualities
+
+def test_jpeg_within_budget_is_returned_without_decoding(monkeypatch):
+    qualities = _count_encodes(monkeypatch)
+    original = _save(Image.new('RGB', (800, 600), (200, 60, 40)), 'JPEG', quality=80)
+
+    prepared = prepare_image(original)
+
+    assert compress_image(original) is original
+    assert prepared.content is original and prepared.thumbnail is not None
+    assert qualities == []
+
+def test_large_jpeg_is_decoded_in_draft_mode(monkeypatch):
+    drafts = []
+    draft = JpegImagePlugin.JpegImageFile.draft
+
+    def recording_draft(self, mode, size):
+        drafts.append(size)
+        return draft(self, mode, size)
+
+    monkeypatch.setattr(JpegImagePlugin.JpegImageFile, 'draft', recording_draft)
+
+    compressed = compress_image(_save(Image.new('RGB', (4096, 3072), (90, 160, 40)), 'JPEG'))
+
+    assert drafts == [(MAX_DIMENSION, 768)]
+    with Image.open(io.BytesIO(compressed)) as image:
+        assert image.format == 'JPEG' and image.size == (MAX_DIMENSION, 768)
+
+@pytest.mark.parametrize('mode', ['P', '1', 'I;16', 'LA', 'RGBA'])
+def test_large_images_in_other_modes_are_compressed(mode):
+    size = (3000, 2400)
+    if mode == 'P':
+        image = Image.frombytes('L', size, os.urandom(size[0] * size[1])).convert('P')
+    else:
+        image = Image.new(mode, size)
+    original = _save(image, 'PNG')
+
+    compressed = compress_image(original)
+
+    assert compressed is not original
+    with Image.open(io.BytesIO(compressed)) as result:
+        assert result.format == 'JPEG' and result.mode == 'RGB'
+        assert result.size == (MAX_DIMENSION, 819)
+    if mode == 'P':
+        assert len(compressed) < len(original) // 10
+
+def test_grayscale_stays_grayscale():
+    compressed = compress_image(_save(Image.linear_gradient('L').resize((2048, 2048)), 'PNG'))
+    with Image.open(io.BytesIO(compressed)) as image:
+        assert image.mode == 'L' and image.size == (MAX_DIMENSION, MAX_DIMENSION)
+
+def test_at_most_two_encodes_to_reach_the_byte_target(monkeypatch):
+    qualities = _count_encodes(monkeypatch)
+
+    compressed = compress_image(_photo((3000, 2400)), max_size_kb=80)
+
+    assert len(qualities) == 2
+    assert qualities[0] == image_processing.START_QUALITY > qualities[1] >= image_processing.MIN_QUALITY
+    assert len(compressed) <= 80 * 1024
+
+def test_undecodable_input_is_stored_as_is():
+    assert compress_image(b'not an image') == b'not an image'
+    prepared = prepare_image(b'not an image')
+    assert prepared.content == b'not an image' and prepared.thumbnail is None
@@ -0,0 +1,116 @@
+import asyncio
+import json
+
+import httpx
+from fastapi.testclient import TestClient
+from postgrest import AsyncPostgrestClient
+
+from backend.main import app
+from backend.services import local_database, supabase_async
+
+AWARDS = 100
+
+def test_concurrent_awards_are_not_lost_locally(local_repository):
+    async def run():
+        user = await local_repository.create_user('+15550000001')
+        awards = [local_repository.create_coin_transaction(user['id'], 1, 'scan', 'Scan') for _ in range(AWARDS)]
+        updates = [local_repository.update_user_coins(user['id'], 2) for _ in range(AWARDS)]
+        results = await asyncio.gather(*awards, *updates)
+        assert all(results)
+        history = await local_repository.get_user_coin_history(user['id'], limit=AWARDS * 3)
+        return (await local_repository.get_user_by_id(user['id']))['coins'], len(history)
+
+    # Every change is also a ledger entry
+    assert asyncio.run(run()) == (AWARDS * 3, AWARDS * 2)
+
+def test_minimum_balance_refuses_or_clamps_locally(local_repository):
+    async def run():
+        user = await local_repository.create_user('+15550000002')
+        assert await local_repository.increment_coins(user['id'], 5) == 5
+        assert await local_repository.increment_coins(user['id'], -6, min_balance=0) is None
+        assert await local_repository.increment_coins(user['id'], -6, min_balance=0, clamp=True) == 0
+        assert await local_repository.increment_coins(user['id'], -1) == -1
+        assert await local_repository.increment_coins(999, 1) is None
+
+    asyncio.run(run())
+
+def test_admin_adjustment_is_one_atomic_change(monkeypatch, local_repository):
+    user = asyncio.run(local_repository.create_user('+15550000003'))
+    asyncio.run(local_repository.increment_coins(user['id'], 4))
+
+    def no_read(*args, **kwargs):
+        raise AssertionError('the adjustment should not read the balance first')
+
+    monkeypatch.setattr(local_database, 'get_user_by_id', no_read)
+    adjust = {'user_id': user['id'], 'reason': 'Refund', 'adjustment_type': 'add', 'amount': 3}
+    with TestClient(app) as client:
+        added = client.post('/api/admin/users/coins/adjust', json=adjust).json()
+        assert (added['previous_balance'], added['new_balance']) == (4, 7)
+        # Clamped at 0: the previous balance comes from the amount applied
+        taken = client.post('/api/admin/users/coins/adjust', json={**adjust, 'adjustment_type': 'subtract', 'amount': 10}).json()
+        assert (taken['previous_balance'], taken['new_balance']) == (7, 0)
+        assert client.post('/api/admin/users/coins/adjust', json={**adjust, 'user_id': -1}).status_code == 404
+
+def test_supabase_awards_take_one_request(monkeypatch):
+    requests = []
+    balances = {1: 0}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        requests.append((request.method, request.url.path))
+        await asyncio.sleep(0.001)
+        # What append_coin_transaction does, as a single step on the server
+        params = json.loads(request.content)
+        balance = balances[params['p_user_id']] + params['p_amount']
+        if params['p_min_balance'] is not None and balance < params['p_min_balance']:
+            return httpx.Response(200, json=None)
+        balances[params['p_user_id']] = balance
+        transaction = {'id': len(requests), 'user_id': params['p_user_id'], 'amount': params['p_amount']}
+        return httpx.Response(200, json={'transaction': transaction, 'new_balance': balance})
+
+    monkeypatch.setattr(supabase_async, '_async_supabase', AsyncPostgrestClient(
+        'http://postgrest.test/rest/v1', headers={'apikey': 'test-key'},
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    ))
+
+    async def run():
+        awards = await asyncio.gather(*(supabase_async.create_coin_transaction(1, 1, 'scan') for _ in range(AWARDS)))
+        assert all(awards)
+        updated = await supabase_async.update_user_coins(1, 2)
+        refused = await supabase_async.increment_coins(1, -1000, min_balance=0)
+        await supabase_async.close_async_supabase()
+        return updated, refused
+
+    updated, refused = asyncio.run(run())
+    assert balances[1] == AWARDS + 2 and updated == {'id': 1, 'coins': AWARDS + 2} and refused is None
+    # An award, ledger entry and balance together, is a single request
+    assert requests == [('POST', '/rest/v1/rpc/append_coin_transaction')] * (AWARDS + 2)
+
+def test_supabase_transfer_takes_one_request(monkeypatch):
+    requests = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        params = json.loads(request.content)
+        requests.append((request.url.path, params))
+        if params['p_amount'] > 10:
+            return httpx.Response(200, json=None)
+        return httpx.Response(200, json={'sender_new_balance': 10 - params['p_amount'],
+                                         'receiver_new_balance': params['p_amount']})
+
+    monkeypatch.setattr(supabase_async, '_async_supabase', AsyncPostgrestClient(
+        'http://postgrest.test/rest/v1', headers={'apikey': 'test-key'},
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    ))
+
+    async def run():
+        moved = await supabase_async.transfer_coins(1, '+15550000004', 4)
+        refused = await supabase_async.transfer_coins(1, '+15550000004', 40)
+        await supabase_async.close_async_supabase()
+        return moved, refused
+
+    moved, refused = asyncio.run(run())
+    assert moved == {'sender_new_balance': 6, 'receiver_new_balance': 4} and refused is None
+    # Both sides of a transfer, checked and written together, are a single request
+    assert requests == [
+        ('/rest/v1/rpc/transfer_coins', {'p_sender_id': 1, 'p_receiver_phone': '+15550000004', 'p_amount': 4}),
+        ('/rest/v1/rpc/transfer_coins', {'p_sender_id': 1, 'p_receiver_phone': '+15550000004', 'p_amount': 40}),
+    ]
@@ -0,0 +1,80 @@
+import asyncio
+import threading
+
+import httpx
+import numpy as np
+import pytest
+from PIL import Image
+
+from backend.services import ai_recognition, local_recognition, perceptual_index, recognition_backends, recognition_cache
+from backend.services.color_classifier import COLOR_PROFILES
+from backend.services.local_recognition import LocalKnnBackend, LocalKnnEngine, _synthetic_image
+from backend.services.recognition_backends import available_backends, create_backend
+
+PROFILES = {name: (mean, std) for name, mean, std in COLOR_PROFILES}
+
+def test_registry_lists_backends_and_rejects_unknown_names():
+    assert {'clarifai', 'local', 'color'} <= set(available_backends())
+    assert isinstance(create_backend('local'), LocalKnnBackend)
+    with pytest.raises(ValueError):
+        create_backend('nope')
+
+def test_engine_memory_maps_reference_set_and_classifies(tmp_path):
+    engine = LocalKnnEngine.load(str(tmp_path / 'reference'))
+    assert isinstance(engine.features, np.memmap)
+    assert engine.features.shape[1] == local_recognition.FEATURE_DIM
+
+    rng = np.random.default_rng(1234)
+    for name in ('Salad', 'Rice', 'Beef', 'Pasta with Tomato Sauce'):
+        images = [_synthetic_image(*PROFILES[name], rng) for _ in range(10)]
+        results = engine.recognize(images)
+        assert sum(result['name'] == name for result in results) >= 8
+        # Deterministic: the same images give the same answers
+        assert engine.recognize(images) == results
+    assert engine.recognize([None]) == [{'name': 'Delicious Food', 'confidence': 50}]
+
+def test_local_backend_recognizes_without_network(monkeypatch, tmp_path):
+    def no_network(request):
+        raise AssertionError('the local backend must not call Clarifai')
+
+    monkeypatch.setattr(recognition_backends, '_backend', LocalKnnBackend())
+    monkeypatch.setattr(local_recognition, '_engine', LocalKnnEngine.load(str(tmp_path / 'reference')))
+    monkeypatch.setattr(
+        recognition_cache, '_recognition_cache',
+        recognition_cache.RecognitionCache(path=str(tmp_path / 'cache.db'))
+    )
+    monkeypatch.setattr(perceptual_index, '_perceptual_index', perceptual_index.PerceptualIndex())
+    monkeypatch.setattr(
+        ai_recognition, '_http_client', httpx.AsyncClient(transport=httpx.MockTransport(no_network))
+    )
+
+    rng = np.random.default_rng(99)
+    images = []
+    for name in ('Salad', 'Rice'):
+        image = _synthetic_image(*PROFILES[name], rng).resize((256, 256))
+        images.append(ai_recognition.PreparedImage(
+            content=name.encode(), sha256=name.lower() * 8, thumbnail=image
+        ))
+
+    results = asyncio.run(ai_recognition.recognize_images(images))
+    assert [result['name'] for result in results] == ['Salad', 'Rice']
+    assert all(55 <= result['confidence'] <= 90 for result in results)
+
+def test_first_recognition_loads_the_engine_off_the_event_loop(monkeypatch, tmp_path):
+    threads = []
+    load = LocalKnnEngine.load
+
+    def recording_load(*args, **kwargs):
+        threads.append(threading.current_thread().name)
+        return load(str(tmp_path / 'reference'))
+
+    backend = LocalKnnBackend()
+    monkeypatch.setattr(local_recognition, '_engine', None)
+    monkeypatch.setattr(LocalKnnEngine, 'load', recording_load)
+    assert backend.stats() == {'name': 'local', 'loaded': False}
+
+    results = asyncio.run(backend.recognize([b'plate'], [Image.new('RGB', (64, 64), (200, 60, 40))]))
+
+    assert len(results) == 1
+    assert len(threads) == 1 and threads[0].startswith('foodid-cpu')
+    assert backend.stats()['loaded'] is True
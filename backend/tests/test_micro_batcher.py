@@ -0,0 +1,163 @@
+import asyncio
+import base64
+import json
+
+import httpx
+import pytest
+
+from backend.services import ai_recognition, perceptual_index, recognition_cache
+from backend.services.micro_batcher import MicroBatcher
+
+def test_concurrent_submits_are_coalesced_into_full_batches():
+    batches = []
+
+    async def double(items):
+        batches.append(list(items))
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(double, max_batch=16, max_wait=0.05)
+
+    async def run():
+        return await asyncio.gather(*[batcher.submit(i) for i in range(40)])
+
+    assert asyncio.run(run()) == [i * 2 for i in range(40)]
+    assert [len(batch) for batch in batches] == [16, 16, 8]
+    stats = batcher.stats()
+    assert stats['batches'] == 3
+    assert stats['full_batches'] == 2
+    assert stats['fill_ratio'] == pytest.approx(40 / 48, abs=0.001)
+    assert stats['p95_queue_delay_ms'] <= 60
+
+def test_wait_window_and_in_flight_limit():
+    running = []
+    peak = []
+
+    async def slow(items):
+        running.append(1)
+        peak.append(len(running))
+        await asyncio.sleep(0.05)
+        running.pop()
+        return items
+
+    batcher = MicroBatcher(slow, max_batch=4, max_wait=0.01, max_in_flight=2)
+
+    async def run():
+        # A lone item goes out once its window ends
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        assert await batcher.submit('solo') == 'solo'
+        assert 0.01 <= loop.time() - started < 0.2
+        # 20 items, batches of 4, but never more than 2 handler calls at once
+        return await asyncio.gather(*[batcher.submit(i) for i in range(20)])
+
+    assert asyncio.run(run()) == list(range(20))
+    assert max(peak) == 2
+    assert batcher.stats()['items'] == 21
+
+def test_handler_errors_reach_every_caller_in_the_batch():
+    async def broken(items):
+        raise RuntimeError('provider down')
+
+    batcher = MicroBatcher(broken, max_batch=8, max_wait=0.01)
+
+    async def run():
+        return await asyncio.gather(*[batcher.submit(i) for i in range(3)], return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert batcher.stats()['errors'] == 1
+
+def test_callers_without_a_result_get_an_error():
+    async def short(items):
+        return items[:2]
+
+    batcher = MicroBatcher(short, max_batch=8, max_wait=0.01)
+
+    async def run():
+        return await asyncio.gather(*[batcher.submit(i) for i in range(3)], return_exceptions=True)
+
+    first, second, third = asyncio.run(asyncio.wait_for(run(), 1))
+    assert (first, second) == (0, 1)
+    assert isinstance(third, RuntimeError)
+    assert batcher.stats()['errors'] == 1
+
+def test_close_cancels_queued_and_in_flight_calls():
+    started = []
+
+    async def slow(items):
+        started.append(items)
+        await asyncio.sleep(10)
+        return items
+
+    batcher = MicroBatcher(slow, max_batch=1, max_wait=0, max_in_flight=1)
+
+    async def run():
+        calls = [asyncio.ensure_future(batcher.submit(i)) for i in range(3)]
+        while not started:
+            await asyncio.sleep(0.001)
+        # The running batch is referenced by the batcher, not just the loop
+        assert len(batcher._tasks) == 1
+        await batcher.close()
+        return await asyncio.gather(*calls, return_exceptions=True)
+
+    results = asyncio.run(asyncio.wait_for(run(), 2))
+    assert all(isinstance(result, asyncio.CancelledError) for result in results)
+    assert started == [[0]] and not batcher._tasks
+
+def test_a_restarted_dispatcher_takes_over_queued_items():
+    batches = []
+
+    async def echo(items):
+        batches.append(list(items))
+        return items
+
+    batcher = MicroBatcher(echo, max_batch=4, max_wait=0.05)
+
+    async def run():
+        first = asyncio.ensure_future(batcher.submit('queued'))
+        await asyncio.sleep(0.01)
+        batcher._dispatcher.cancel()
+        await asyncio.gather(batcher._dispatcher, return_exceptions=True)
+        # The next submit starts a new dispatcher, which does not orphan 'queued'
+        second = await batcher.submit('new')
+        return await asyncio.wait_for(first, 1), second
+
+    assert asyncio.run(run()) == ('queued', 'new')
+    assert batches == [['queued', 'new']]
+
+def test_concurrent_scans_share_one_clarifai_request(monkeypatch, tmp_path):
+    requests = []
+
+    async def clarifai(request: httpx.Request) -> httpx.Response:
+        inputs = json.loads(request.content)['inputs']
+        requests.append(len(inputs))
+        await asyncio.sleep(0.01)
+        # Each "image" is the food name, so callers can check they got their own answer
+        return httpx.Response(200, json={'outputs': [
+            {'input': {'id': item['id']},
+             'data': {'concepts': [{'name': base64.b64decode(item['data']['image']['base64']).decode(), 'value': 0.9}]}}
+            for item in inputs
+        ]})
+
+    monkeypatch.setattr(ai_recognition, '_recognition_batcher', None)
+    monkeypatch.setattr(ai_recognition, 'RECOGNITION_BATCH_SIZE', 16)
+    monkeypatch.setattr(
+        recognition_cache, '_recognition_cache',
+        recognition_cache.RecognitionCache(path=str(tmp_path / 'cache.db'))
+    )
+    monkeypatch.setattr(perceptual_index, '_perceptual_index', perceptual_index.PerceptualIndex())
+    foods = [f"food {i}" for i in range(20)]
+
+    async def run():
+        ai_recognition._http_client = httpx.AsyncClient(transport=httpx.MockTransport(clarifai))
+        try:
+            return await asyncio.gather(*[
+                ai_recognition.recognize_images([food.encode()]) for food in foods
+            ])
+        finally:
+            await ai_recognition.close_http_client()
+
+    results = asyncio.run(run())
+    assert [result[0]['name'] for result in results] == [food.title() for food in foods]
+    assert requests == [16, 4]
+    assert ai_recognition.get_recognition_batcher().stats()['batches'] == 2
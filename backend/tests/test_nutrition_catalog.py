@@ -0,0 +1,91 @@
+import asyncio
+import tracemalloc
+from itertools import repeat
+
+import pytest
+
+from backend.services import nutrition_catalog
+from backend.services.nutrition_catalog import build_catalog, reload_nutrition_catalog
+from backend.services.repository import get_repository
+
+ROWS = [
+    {'food_name': 'Apple', 'category': 'fruits', 'calories': 95, 'protein': 0.5, 'carbs': 25, 'fat': 0.3,
+     'health_score': 85, 'ingredients': None, 'updated_at': '2025-01-01T00:00:00Z'},
+    {'food_name': 'Chicken Breast', 'category': 'proteins', 'calories': 165, 'protein': 31, 'carbs': 0,
+     'fat': 3.6, 'health_score': 90, 'ingredients': ['Chicken'], 'updated_at': '2025-01-01T00:00:00Z'},
+    {'food_name': 'Pizza', 'category': 'Snacks', 'calories': 285, 'protein': 12, 'carbs': 36, 'fat': 10.4,
+     'health_score': 40, 'ingredients': None, 'updated_at': '2025-01-02T00:00:00Z'},
+]
+
+def test_lookup_by_name_category_and_similar_name():
+    catalog = build_catalog(ROWS, version='v1')
+
+    assert catalog.lookup('Apple')['calories'] == 95
+    assert catalog.lookup('  APPLE ')['protein'] == '0.5g'
+    # Most similar name wins: "chicken breast" over the built-in "chicken"
+    assert catalog.lookup('Grilled Chicken Breast')['calories'] == 165
+    assert catalog.lookup('Chicken Wings')['calories'] == 335
+    # Database rows override nutrition values and keep the built-in story
+    pizza = catalog.lookup('Pizza')
+    assert pizza['calories'] == 285 and pizza['fat'] == '10.4g'
+    assert pizza['history']['origin'].startswith('Naples')
+    assert catalog.lookup('Mystery Stew')['calories'] == 250
+    assert [entry['calories'] for entry in catalog.by_category('snacks')] == [285]
+
+    with pytest.raises(TypeError):
+        pizza['calories'] = 0
+
+def test_repeat_lookups_are_memoized_and_allocation_free():
+    catalog = build_catalog(ROWS, version='v1')
+    name = 'Pepperoni Pizza'
+    first = catalog.lookup(name)
+    assert catalog.lookup(name) is first
+
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        for _ in repeat(None, 10000):
+            catalog.lookup(name)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert peak - before < 512
+
+def test_reload_swaps_catalog_only_when_version_changes(monkeypatch):
+    versions = iter(['3:a', '3:a', '4:b', '5:c'])
+    tables = {
+        '3:a': ROWS,
+        '4:b': ROWS + [{'food_name': 'Banana', 'category': 'fruits', 'calories': 105}],
+    }
+    current = ['3:a']
+
+    async def version():
+        current[0] = next(versions)
+        return current[0]
+
+    async def food_database():
+        return tables.get(current[0])
+
+    def reload():
+        return asyncio.run(reload_nutrition_catalog())
+
+    monkeypatch.setattr(nutrition_catalog, '_catalog', build_catalog([], 'builtin', 'builtin'))
+    monkeypatch.setattr(get_repository(), 'get_food_database_version', version)
+    monkeypatch.setattr(get_repository(), 'get_food_database', food_database)
+
+    assert reload()
+    loaded = nutrition_catalog.get_nutrition_catalog()
+    assert loaded.version == '3:a' and loaded.lookup('Apple')['calories'] == 95
+
+    assert not reload()  # unchanged
+    assert nutrition_catalog.get_nutrition_catalog() is loaded
+
+    assert reload()
+    assert nutrition_catalog.get_nutrition_catalog().lookup('Banana')['calories'] == 105
+    assert len(nutrition_catalog.get_nutrition_catalog().by_category('Fruits')) == 2
+
+    # A failed table read keeps the current catalog
+    reloaded = nutrition_catalog.get_nutrition_catalog()
+    assert not reload()
+    assert nutrition_catalog.get_nutrition_catalog() is reloaded
@@ -0,0 +1,62 @@
+import io
+
+import numpy as np
+from PIL import Image, ImageEnhance
+
+from backend.services.image_processing import decode_thumbnail
+from backend.services.perceptual_index import PerceptualIndex, dhash
+
+def _photo(seed: int) -> Image.Image:
+    rng = np.random.default_rng(seed)
+    blocks = rng.integers(0, 255, (6, 8, 3), dtype=np.uint8)
+    return Image.fromarray(blocks).resize((640, 480), Image.Resampling.BICUBIC)
+
+def _jpeg(image: Image.Image) -> Image.Image:
+    """Round-trip through JPEG and decode the analysis thumbnail, as a scan does"""
+    output = io.BytesIO()
+    image.save(output, format='JPEG', quality=85)
+    return decode_thumbnail(output.getvalue())
+
+def _distance(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+def test_dhash_tolerates_small_changes():
+    plate = _photo(1)
+    original = dhash(_jpeg(plate))
+    reframed = dhash(_jpeg(plate.crop((8, 6, 632, 474)).resize((800, 600))))
+    brighter = dhash(_jpeg(ImageEnhance.Brightness(plate).enhance(1.1)))
+    other = dhash(_jpeg(_photo(2)))
+
+    assert _distance(original, reframed) <= 6
+    assert _distance(original, brighter) <= 6
+    assert _distance(original, other) > 12
+
+def test_lookup_respects_threshold():
+    index = PerceptualIndex(capacity=1000, max_distance=6)
+    rng = np.random.default_rng(0)
+    stored = [int(v) for v in rng.integers(0, 2 ** 63, size=500)]
+    for i, value in enumerate(stored):
+        index.add(value, {'name': f'Food {i}', 'confidence': 90})
+
+    # Enough inserts to exercise both the bucket tables and the delta
+    index._rebuild()
+    index.add(stored[0] ^ 0xFFFF_0000_0000_0000, {'name': 'Far', 'confidence': 50})
+
+    result, distance = index.lookup(stored[42] ^ 0b1011)
+    assert result == {'name': 'Food 42', 'confidence': 90}
+    assert distance == 3
+    assert index.lookup(stored[42] ^ 0b1111111) is None
+
+    stats = index.stats()
+    assert stats['size'] == 501
+    assert stats['hits'] == 1
+    assert stats['memory_bytes'] > 0
+
+def test_ring_buffer_drops_oldest():
+    index = PerceptualIndex(capacity=4, max_distance=1)
+    for i in range(6):
+        index.add(1 << (i * 10), {'name': f'Food {i}', 'confidence': 80})
+
+    assert len(index) == 4
+    assert index.lookup(1 << 0) is None
+    assert index.lookup(1 << 50)[0]['name'] == 'Food 5'
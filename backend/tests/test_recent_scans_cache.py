@@ -0,0 +1,95 @@
+import asyncio
+import json
+
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.routers import scan
+from backend.services.repository import get_repository
+from backend.services.recent_scans_cache import RecentScansCache
+
+def _row(scan_id, user_id=1, food='Pizza'):
+    return {'id': scan_id, 'user_id': user_id, 'food_name': food, 'confidence': 90,
+            'image_path': f'/static/{scan_id}.jpg', 'nutrition_json': json.dumps({'calories': 285}),
+            'created_at': f'2025-01-01T00:00:{scan_id:02d}Z'}
+
+def test_fill_write_through_and_stale_fills():
+    cache = RecentScansCache(per_user=5)
+    assert cache.get(1, 3) is None
+
+    # Three rows for a request of 5: the user has no more scans
+    token = cache.write_token()
+    cache.fill(1, [_row(3), _row(2), _row(1)], requested=5, token=token)
+    assert [r['id'] for r in cache.get(1, 10)] == [3, 2, 1]
+
+    cache.add(1, [_row(4), _row(5)])  # saved oldest first
+    assert [r['id'] for r in cache.get(1, 10)] == [5, 4, 3, 2, 1]
+    cache.add(1, [_row(6)])
+    # Trimmed to per_user, so longer requests go to the database again
+    assert [r['id'] for r in cache.get(1, 5)] == [6, 5, 4, 3, 2]
+    assert cache.get(1, 6) is None
+
+    # A fill that read before a concurrent write of the same user is dropped
+    token = cache.write_token()
+    cache.add(2, [_row(7, user_id=2)])
+    cache.fill(2, [_row(6, user_id=2)], requested=5, token=token)
+    assert cache.get(2, 1) is None
+    # ...but writes by other users do not spoil it
+    cache.fill(3, [_row(8, user_id=3)], requested=5, token=token)
+    assert cache.get(3, 1)[0]['id'] == 8
+
+    stats = cache.stats()
+    assert stats['stale_fills'] == 1 and stats['write_throughs'] == 2
+    assert stats['users'] == 2 and stats['bytes'] > 0
+
+def test_evicts_least_recently_used_users_within_budget():
+    one_user = RecentScansCache(per_user=10)
+    one_user.fill(1, [_row(i) for i in range(10)], requested=10, token=0)
+    budget = one_user.stats()['bytes'] * 2 + 100
+
+    cache = RecentScansCache(per_user=10, max_bytes=budget)
+    for user_id in (1, 2):
+        cache.fill(user_id, [_row(i, user_id) for i in range(10)], requested=10, token=0)
+    assert cache.get(1, 10) is not None  # user 1 is now the most recent
+    cache.fill(3, [_row(i, 3) for i in range(10)], requested=10, token=0)
+
+    assert cache.get(2, 1) is None
+    assert cache.get(1, 1) is not None and cache.get(3, 1) is not None
+    stats = cache.stats()
+    assert stats['evictions'] == 1 and stats['bytes'] <= budget
+
+def test_recent_endpoint_reads_database_once_and_stays_current(monkeypatch):
+    reads = []
+    saved = [_row(2), _row(1)]
+
+    async def fake_get_recent_scans(user_id, limit):
+        reads.append((user_id, limit))
+        return [dict(row) for row in saved[:limit]]
+
+    async def fake_record_scan(user_id, scans, **kwargs):
+        row = {**_row(3), **scans[0]}
+        saved.insert(0, row)
+        return {'scans': [dict(row)], 'transaction': {'id': 1}, 'new_balance': 3}
+
+    monkeypatch.setattr(get_repository(), 'get_recent_scans', fake_get_recent_scans)
+    monkeypatch.setattr(get_repository(), 'record_scan', fake_record_scan)
+
+    with TestClient(app) as client:
+        first = client.get('/api/scan/recent', params={'user_id': 1, 'limit': 10}).json()
+        assert [r['id'] for r in first] == [2, 1]
+        assert first[0]['nutrition_data'] == {'calories': 285}
+        assert client.get('/api/scan/recent', params={'user_id': 1, 'limit': 1}).json() == first[:1]
+        assert len(reads) == 1
+
+        # A scan saved through the synchronous path is written through
+        asyncio.run(scan._persist_scans(1, [{'food_name': 'Salad', 'confidence': 80, 'image_path': '/static/s.jpg',
+                                             'nutrition_json': json.dumps({'calories': 150})}],
+                                        coins=1, description='Scanned Salad'))
+        latest = client.get('/api/scan/recent', params={'user_id': 1}).json()
+        assert [r['food_name'] for r in latest] == ['Salad', 'Pizza', 'Pizza']
+        assert latest[0]['nutrition_data'] == {'calories': 150}
+        assert len(reads) == 1
+
+        metrics = client.get('/api/scan/metrics').json()['recent_scans_cache']
+        assert metrics['hits'] == 2 and metrics['misses'] == 1
+        assert metrics['hit_ratio'] == round(2 / 3, 4)
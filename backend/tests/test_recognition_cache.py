@@ -0,0 +1,136 @@
+import asyncio
+import io
+
+import httpx
+from PIL import Image
+
+from backend.services import ai_recognition, perceptual_index, recognition_cache
+from backend.services.image_processing import prepare_image
+from backend.services.recognition_cache import RecognitionCache, content_hash
+
+def _make_jpeg(color=(200, 60, 40), size=(64, 64)) -> bytes:
+    output = io.BytesIO()
+    Image.new('RGB', size, color).save(output, format='JPEG')
+    return output.getvalue()
+
+def test_memory_tier_lru_and_ttl(tmp_path):
+    cache = RecognitionCache(path=str(tmp_path / 'cache.db'), max_entries=2, ttl=60)
+    cache.set('a', {'name': 'Pizza', 'confidence': 90})
+    cache.set('b', {'name': 'Salad', 'confidence': 80})
+    cache.get('a')  # 'a' becomes most recently used
+    cache.set('c', {'name': 'Rice', 'confidence': 70}, persist=False)
+
+    stats = cache.stats()
+    assert stats['memory_entries'] == 2
+    assert stats['evictions'] == 1
+    # 'b' was evicted from memory but is still on disk
+    assert cache.get('b') == {'name': 'Salad', 'confidence': 80}
+    assert cache.stats()['disk_hits'] == 1
+
+    expired = RecognitionCache(path=str(tmp_path / 'expired.db'), ttl=-1, disk_ttl=-1)
+    expired.set('a', {'name': 'Pizza', 'confidence': 90})
+    assert expired.get('a') is None
+    assert expired.purge_expired() == 1
+
+def test_disk_tier_is_purged_on_open_and_while_writing(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    expired = RecognitionCache(path=path, disk_ttl=-1, purge_every=0)
+    for index in range(3):
+        expired.set(f'old{index}', {'name': 'Pizza', 'confidence': 90})
+    expired.close()
+
+    # Expired rows left by a previous process go when the table is opened
+    cache = RecognitionCache(path=path, max_disk_rows=2, purge_every=3)
+    assert cache.stats()['purged'] == 3
+
+    for index in range(4):
+        cache.set(f'new{index}', {'name': 'Salad', 'confidence': 80})
+    # The third write purged down to the two newest rows
+    rows = [row[0] for row in cache._db.execute('SELECT key FROM recognition_cache ORDER BY key')]
+    assert rows == ['new1', 'new2', 'new3']
+    assert cache.purge_expired() == 1
+    assert cache.stats()['purged'] == 5
+
+def test_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    cache = RecognitionCache(path=path)
+    cache.set('persisted', {'name': 'Burger', 'confidence': 88})
+    cache.set('memory_only', {'name': 'Lunch Plate', 'confidence': 70}, persist=False)
+    cache.close()
+
+    restarted = RecognitionCache(path=path)
+    assert restarted.get('persisted') == {'name': 'Burger', 'confidence': 88}
+    assert restarted.get('memory_only') is None
+    stats = restarted.stats()
+    assert stats['disk_hits'] == 1
+    assert stats['misses'] == 1
+
+def test_repeat_scan_skips_clarifai_and_fallback(monkeypatch, tmp_path):
+    calls = []
+
+    def clarifai(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(200, json={
+            'outputs': [{'data': {'concepts': [{'name': 'sandwich', 'value': 0.91}]}}]
+        })
+
+    def no_fallback(image_bytes):
+        raise AssertionError('color fallback should not run on a cache hit')
+
+    image_path = tmp_path / 'plate.jpg'
+    image_path.write_bytes(_make_jpeg())
+    monkeypatch.setattr(
+        recognition_cache, '_recognition_cache', RecognitionCache(path=str(tmp_path / 'cache.db'))
+    )
+    monkeypatch.setattr(perceptual_index, '_perceptual_index', perceptual_index.PerceptualIndex())
+
+    async def scan_twice():
+        ai_recognition._http_client = httpx.AsyncClient(transport=httpx.MockTransport(clarifai))
+        try:
+            first = await ai_recognition.recognize_food(str(image_path))
+            monkeypatch.setattr(ai_recognition, 'analyze_image_colors', no_fallback)
+            second = await ai_recognition.recognize_food(str(image_path))
+        finally:
+            await ai_recognition.close_http_client()
+        return first, second
+
+    first, second = asyncio.run(scan_twice())
+
+    assert first == second == {'name': 'Sandwich', 'confidence': 91}
+    assert len(calls) == 1
+    stats = recognition_cache.get_recognition_cache().stats()
+    assert stats['memory_hits'] == 1
+    assert stats['misses'] == 1
+    assert content_hash(image_path.read_bytes()) in recognition_cache.get_recognition_cache()._memory
+
+def test_prepared_image_is_not_rehashed_or_redecoded(monkeypatch, tmp_path):
+    def no_decode(image_bytes):
+        raise AssertionError('prepared images carry their own thumbnail')
+
+    def no_hash(image_bytes):
+        raise AssertionError('prepared images carry their own hash')
+
+    monkeypatch.setattr(
+        recognition_cache, '_recognition_cache', RecognitionCache(path=str(tmp_path / 'cache.db'))
+    )
+    monkeypatch.setattr(perceptual_index, '_perceptual_index', perceptual_index.PerceptualIndex())
+    prepared = prepare_image(_make_jpeg(size=(2048, 1536)))
+    assert prepared.thumbnail is not None
+    assert prepared.sha256 == content_hash(prepared.content)
+    monkeypatch.setattr(ai_recognition, 'decode_thumbnail', no_decode)
+    monkeypatch.setattr(ai_recognition, 'content_hash', no_hash)
+
+    async def scan():
+        ai_recognition._http_client = httpx.AsyncClient(
+            transport=httpx.MockTransport(lambda request: httpx.Response(503))
+        )
+        try:
+            return await ai_recognition.recognize_images([prepared])
+        finally:
+            await ai_recognition.close_http_client()
+
+    [result] = asyncio.run(scan())
+    # Clarifai is down, so the color fallback answered from the thumbnail;
+    # the guess is not cached
+    assert 65 <= result['confidence'] <= 75
+    assert recognition_cache.get_recognition_cache().get(prepared.sha256) is None
@@ -0,0 +1,116 @@
+import io
+import json
+from types import SimpleNamespace
+
+import httpx
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from backend.main import app
+from backend.models import User, Scan, CoinTransaction
+from backend.services import (
+    ai_recognition, local_database, perceptual_index, recognition_cache, storage, supabase_async
+)
+from backend.services.storage import InMemoryObjectStorage
+
+# Supabase round trips allowed per scan request
+ROUND_TRIP_BUDGET = 1
+
+class _CountingQuery:
+    def __init__(self, client, call):
+        self.client = client
+        self.call = call
+
+    def __getattr__(self, name):
+        # select/eq/insert/update/... just build the query
+        return lambda *args, **kwargs: self
+
+    async def execute(self):
+        self.client.calls.append(self.call)
+        params = self.call[2] if self.call[0] == 'rpc' else {}
+        self.client.balance += params.get('p_coins', 0)
+        return SimpleNamespace(data={'scans': params.get('p_scans', []), 'transaction': {'id': 1},
+                                     'new_balance': self.client.balance}, count=None)
+
+class _CountingSupabase:
+    """Stand-in async PostgREST client that records every round trip"""
+
+    def __init__(self, balance=0):
+        self.calls = []
+        self.balance = balance
+
+    def rpc(self, name, params):
+        return _CountingQuery(self, ('rpc', name, params))
+
+    def table(self, name):
+        return _CountingQuery(self, ('table', name))
+
+    async def aclose(self):
+        pass
+
+def _make_jpeg(color=(200, 60, 40)) -> bytes:
+    output = io.BytesIO()
+    Image.new('RGB', (320, 240), color).save(output, format='JPEG')
+    return output.getvalue()
+
+def test_scan_persists_with_one_round_trip(monkeypatch, tmp_path):
+    supabase = _CountingSupabase(balance=6)
+
+    def clarifai(request: httpx.Request) -> httpx.Response:
+        inputs = json.loads(request.content)['inputs']
+        return httpx.Response(200, json={'outputs': [
+            {'input': {'id': item['id']}, 'data': {'concepts': [{'name': 'pizza', 'value': 0.93}]}}
+            for item in inputs
+        ]})
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(supabase_async, '_async_supabase', supabase)
+    monkeypatch.setattr(storage, '_storage', InMemoryObjectStorage())
+    monkeypatch.setattr(
+        recognition_cache, '_recognition_cache',
+        recognition_cache.RecognitionCache(path=str(tmp_path / 'cache.db'))
+    )
+    monkeypatch.setattr(perceptual_index, '_perceptual_index', perceptual_index.PerceptualIndex())
+    monkeypatch.setattr(
+        ai_recognition, '_http_client', httpx.AsyncClient(transport=httpx.MockTransport(clarifai))
+    )
+
+    with TestClient(app) as client:
+        response = client.post('/api/scan/analyze?user_id=4', files={'file': ('a.jpg', _make_jpeg(), 'image/jpeg')})
+        assert response.status_code == 200
+        assert response.json()['total_coins'] == 7
+        assert len(supabase.calls) == ROUND_TRIP_BUDGET
+
+        kind, name, params = supabase.calls[0]
+        assert (kind, name) == ('rpc', 'record_scan')
+        assert params['p_user_id'] == 4 and params['p_coins'] == 1
+        assert params['p_scans'][0]['food_name'] == 'Pizza'
+
+        supabase.calls.clear()
+        files = [('files', (f'{i}.jpg', _make_jpeg((40 * i, 120, 60)), 'image/jpeg')) for i in range(3)]
+        response = client.post('/api/scan/analyze-batch?user_id=4', files=files)
+        assert response.status_code == 200
+        assert response.json()['total_coins'] == 10
+        assert len(supabase.calls) == ROUND_TRIP_BUDGET
+        assert len(supabase.calls[0][2]['p_scans']) == 3
+
+def test_local_record_scan_is_one_transaction(local_repository):
+    Session = local_database.SessionLocal
+    with Session() as db:
+        db.add(User(id=1, phone_number='+15550100', coins=2))
+        db.commit()
+
+    scans = [{'food_name': 'Pizza', 'confidence': 90, 'image_path': '/static/a.jpg', 'nutrition_json': '{}'},
+             {'food_name': 'Salad', 'confidence': 80, 'image_path': '/static/b.jpg', 'nutrition_json': '{}'}]
+    record = local_database.record_scan(1, scans, coins=2, description='Scanned 2 foods')
+    assert record['new_balance'] == 4
+    assert [scan['food_name'] for scan in record['scans']] == ['Pizza', 'Salad']
+    assert record['scans'][0]['id'] and record['transaction']['amount'] == 2
+
+    # Unknown user: nothing is written
+    assert local_database.record_scan(99, scans[:1]) is None
+
+    with Session() as db:
+        assert db.query(Scan).count() == 2
+        assert db.query(CoinTransaction).count() == 1
+        assert db.get(User, 1).coins == 4
@@ -0,0 +1,248 @@
+import asyncio
+import os
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from backend.database import Base, create_database_engine, create_schema
+from backend.main import app
+from backend.services import supabase_async
+from backend.services.repository import LocalRepository, SupabaseRepository, create_repository
+
+# The Supabase run writes rows into a real project (supabase_schema.sql applied)
+SUPABASE_CONTRACT_TESTS = os.getenv('SUPABASE_CONTRACT_TESTS') == '1'
+
+@pytest.fixture(params=['local', 'supabase'])
+def repository(request):
+    """Each contract test runs against both data backends"""
+    if request.param == 'supabase':
+        if not SUPABASE_CONTRACT_TESTS:
+            pytest.skip('set SUPABASE_CONTRACT_TESTS=1 to run against Supabase')
+        return SupabaseRepository()
+    return request.getfixturevalue('local_repository')
+
+def _run(coroutine):
+    async def run():
+        try:
+            return await coroutine
+        finally:
+            # The pooled client belongs to this event loop
+            await supabase_async.close_async_supabase()
+    return asyncio.run(run())
+
+def _phone() -> str:
+    return f"+1555{uuid.uuid4().int % 10 ** 7:07d}"
+
+def test_users_are_created_once_and_updated(repository):
+    async def run():
+        phone = _phone()
+        user = await repository.create_user(phone, name='Ada')
+        assert user['phone_number'] == phone and user['name'] == 'Ada' and user['coins'] == 0
+        assert (await repository.create_user(phone, name='Other'))['id'] == user['id']
+        assert (await repository.get_user_by_phone(phone))['id'] == user['id']
+
+        updated = await repository.update_user_profile(user['id'], email='ada@example.com')
+        assert updated['email'] == 'ada@example.com' and updated['name'] == 'Ada'
+        assert await repository.update_user_profile(user['id']) is None
+        assert (await repository.get_user_by_id(user['id']))['email'] == 'ada@example.com'
+        assert await repository.get_user_by_phone(_phone()) is None
+        assert any(row['id'] == user['id'] for row in await repository.get_all_users())
+
+    _run(run())
+
+def test_users_are_renumbered_and_deleted_with_their_rows(repository):
+    async def run():
+        user = await repository.create_user(_phone(), name='Grace')
+        phone = _phone()
+        assert (await repository.update_user_profile(user['id'], phone_number=phone))['phone_number'] == phone
+        await repository.record_scan(user['id'], [{'food_name': 'Pizza', 'confidence': 90}],
+                                     idempotency_key=f"delete:{uuid.uuid4().hex}")
+        await repository.create_notification(user['id'], 'Hi', 'Welcome')
+        await repository.create_referral(user['id'], _phone())
+
+        assert await repository.delete_user(user['id']) is True
+        assert await repository.get_user_by_id(user['id']) is None
+        assert await repository.get_recent_scans(user['id']) == []
+        assert await repository.get_user_notifications(user['id']) == []
+        assert await repository.delete_user(user['id']) is False
+
+    _run(run())
+
+def test_coin_transactions_move_the_balance(repository):
+    async def run():
+        user = await repository.create_user(_phone())
+        await repository.create_coin_transaction(user['id'], 5, 'bonus', 'Welcome')
+        transaction = await repository.create_coin_transaction(user['id'], -2, 'spend')
+        assert transaction['amount'] == -2 and transaction['transaction_type'] == 'spend'
+        assert (await repository.update_user_coins(user['id'], 10))['coins'] == 13
+        assert (await repository.get_user_by_id(user['id']))['coins'] == 13
+
+        history = await repository.get_user_coin_history(user['id'])
+        assert [row['amount'] for row in history] == [10, -2, 5]
+        assert [row['transaction_type'] for row in await repository.get_user_coin_history(user['id'], limit=1)] == ['adjustment']
+
+    _run(run())
+
+def test_record_scan_with_an_idempotency_key_saves_once(repository):
+    async def run():
+        user = await repository.create_user(_phone())
+        scans = [{'food_name': 'Pizza', 'confidence': 90, 'image_path': '/static/a.jpg', 'nutrition_json': '{}'}]
+        key = f"scan-job:{uuid.uuid4().hex}"
+        first = await repository.record_scan(user['id'], scans, description='Scanned Pizza', idempotency_key=key)
+        again = await repository.record_scan(user['id'], scans, description='Scanned Pizza', idempotency_key=key)
+        assert first['new_balance'] == again['new_balance'] == 1
+        assert again['transaction']['id'] == first['transaction']['id']
+        assert [row['id'] for row in again['scans']] == [row['id'] for row in first['scans']]
+
+        assert len(await repository.get_recent_scans(user['id'])) == 1
+        assert len(await repository.get_user_coin_history(user['id'])) == 1
+        assert (await repository.get_user_by_id(user['id']))['coins'] == 1
+
+        # Another key is another save
+        other = await repository.record_scan(user['id'], scans, idempotency_key=f"{key}-2")
+        assert other['new_balance'] == 2
+
+    _run(run())
+
+def test_record_scan_saves_scans_coins_and_balance_together(repository):
+    async def run():
+        user = await repository.create_user(_phone())
+        scans = [{'food_name': 'Pizza', 'confidence': 90, 'image_path': '/static/a.jpg', 'nutrition_json': '{}'},
+                 {'food_name': 'Salad', 'confidence': 80, 'image_path': '/static/b.jpg', 'nutrition_json': '{}'}]
+        record = await repository.record_scan(user['id'], scans, coins=2, description='Scanned 2 foods')
+        assert record['new_balance'] == 2 and record['transaction']['amount'] == 2
+        assert [row['food_name'] for row in record['scans']] == ['Pizza', 'Salad']
+
+        # Unknown user: rejected and nothing is written
+        assert await repository.record_scan(-1, scans) is None
+
+        other = await repository.create_user(_phone())
+        batch = await repository.record_scan_batch([
+            {'user_id': user['id'], 'scans': scans[:1], 'coins': 1, 'description': None},
+            {'user_id': other['id'], 'scans': scans[1:], 'coins': 1, 'description': None},
+        ])
+        assert batch['balances'] == {str(user['id']): 3, str(other['id']): 1}
+
+        recent = await repository.get_recent_scans(user['id'])
+        assert len(recent) == 3 and all(row['user_id'] == user['id'] for row in recent)
+        assert recent[0]['id'] == max(row['id'] for row in recent)
+        assert len(await repository.get_recent_scans(user['id'], limit=2)) == 2
+        assert (await repository.get_scan_by_id(str(recent[0]['id'])))['food_name'] == 'Pizza'
+
+        single = await repository.create_scan(other['id'], 'Apple', 70, None, '{}')
+        assert single['food_name'] == 'Apple'
+        assert (await repository.get_user_by_id(other['id']))['coins'] == 1
+
+        listed = await repository.get_all_scans(limit=500)
+        mine = [row for row in listed if row['user_id'] == user['id']]
+        assert len(mine) == 3 and mine[0]['users']['phone_number'] == user['phone_number']
+        stats = await repository.get_dashboard_stats()
+        assert stats['total_users'] >= 2 and stats['total_scans'] >= 5 and stats['total_coins'] >= 4
+
+    _run(run())
+
+def test_transfer_coins_checks_the_balance(repository):
+    async def run():
+        sender = await repository.create_user(_phone())
+        receiver = await repository.create_user(_phone())
+        await repository.create_coin_transaction(sender['id'], 10, 'bonus')
+
+        result = await repository.transfer_coins(sender['id'], receiver['phone_number'], 4)
+        assert result == {'sender_new_balance': 6, 'receiver_new_balance': 4}
+        assert await repository.transfer_coins(sender['id'], receiver['phone_number'], 7) is None
+        assert await repository.transfer_coins(sender['id'], _phone(), 1) is None
+        assert (await repository.get_user_by_id(sender['id']))['coins'] == 6
+        assert (await repository.get_user_by_id(receiver['id']))['coins'] == 4
+
+        transactions = await repository.get_all_transactions(limit=500)
+        moved = [row for row in transactions if row['transaction_type'] == 'transfer_in' and row['user_id'] == receiver['id']]
+        assert len(moved) == 1 and moved[0]['users']['phone_number'] == receiver['phone_number']
+
+    _run(run())
+
+def test_notifications_and_referrals(repository):
+    async def run():
+        user = await repository.create_user(_phone())
+        notification = await repository.create_notification(user['id'], 'Hi', 'Welcome', extra_data={'level': 2})
+        assert notification['read'] is False and notification['extra_data'] == {'level': 2}
+        assert await repository.mark_notification_read(notification['id'])
+        listed = await repository.get_user_notifications(user['id'])
+        assert [row['read'] for row in listed] == [True]
+
+        friend_phone = _phone()
+        referral = await repository.create_referral(user['id'], friend_phone)
+        assert referral['status'] == 'pending'
+        friend = await repository.create_user(friend_phone)
+        redeemed = await repository.redeem_referral(referral['id'], friend['id'])
+        assert redeemed['id'] == referral['id']
+        assert [row['status'] for row in await repository.get_user_referrals(user['id'])] == ['registered']
+        assert (await repository.get_user_by_id(user['id']))['coins'] == 10
+        assert (await repository.get_user_by_id(friend['id']))['coins'] == 10
+        assert await repository.redeem_referral(-1, friend['id']) is None
+
+    _run(run())
+
+def test_broadcast_notifies_every_user(repository):
+    async def run():
+        users = [await repository.create_user(_phone()) for _ in range(2)]
+        sent = await repository.broadcast_notification('Maintenance', 'Back soon', 'high')
+        assert sent == len(await repository.get_all_users())
+        for user in users:
+            [notification] = await repository.get_user_notifications(user['id'])
+            assert (notification['title'], notification['notification_type'], notification['read']) == ('Maintenance', 'high', False)
+
+    _run(run())
+
+def test_food_database_version_tracks_the_rows(repository):
+    async def run():
+        rows = await repository.get_food_database()
+        version = await repository.get_food_database_version()
+        assert isinstance(rows, list)
+        assert version.split(':')[0] == str(len(rows))
+
+    _run(run())
+
+def test_indexes_are_added_to_an_existing_database(tmp_path):
+    engine = create_database_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        connection.execute(text('DROP INDEX idx_scans_user'))
+        connection.execute(text('DROP INDEX idx_notifications_user'))
+
+    create_schema(engine)
+    with engine.connect() as connection:
+        names = {row[0] for row in connection.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'"))}
+    assert {'idx_scans_user', 'idx_notifications_user', 'idx_coin_transactions_user'} <= names
+
+def test_local_database_runs_in_wal_mode(tmp_path):
+    engine = create_database_engine(f"sqlite:///{tmp_path / 'wal.db'}")
+    with engine.connect() as connection:
+        assert connection.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+        assert connection.execute(text('PRAGMA synchronous')).scalar() == 1  # NORMAL
+        assert connection.execute(text('PRAGMA foreign_keys')).scalar() == 1
+    assert isinstance(create_repository('local'), LocalRepository)
+    with pytest.raises(ValueError):
+        create_repository('mongo')
+
+def test_admin_user_endpoints_use_the_configured_backend(local_repository):
+    phone = _phone()
+
+    with TestClient(app) as client:
+        created = client.post('/api/admin/users/create', json={'phone_number': phone, 'name': 'Ada', 'coins': 5})
+        assert created.status_code == 200
+        user = created.json()['user']
+        assert user['coins'] == 5
+        assert client.post('/api/admin/users/create', json={'phone_number': phone}).status_code == 400
+
+        assert client.get(f"/api/admin/users/{user['id']}").json()['name'] == 'Ada'
+        updated = client.put(f"/api/admin/users/{user['id']}", json={'email': 'ada@example.com'}).json()['user']
+        assert updated['email'] == 'ada@example.com'
+
+        sent = client.post('/api/admin/notifications/send', json={'title': 'Hi', 'message': 'Welcome'})
+        assert sent.json()['recipients'] == 1
+
+        assert client.delete(f"/api/admin/users/{user['id']}").status_code == 200
+        assert client.get(f"/api/admin/users/{user['id']}").status_code == 404
+        assert client.delete(f"/api/admin/users/{user['id']}").status_code == 404
@@ -0,0 +1,129 @@
+import io
+import json
+
+import httpx
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from backend.main import app
+from backend.routers import scan
+from backend.services.repository import get_repository
+from backend.services import ai_recognition, perceptual_index, recognition_cache
+
+def _make_jpeg(color) -> bytes:
+    output = io.BytesIO()
+    Image.new('RGB', (320, 240), color).save(output, format='JPEG')
+    return output.getvalue()
+
+def test_batch_uses_one_call_per_stage(monkeypatch, tmp_path):
+    clarifai_requests = []
+    records = []
+    foods = ['pizza', 'salad', 'burger']
+
+    def clarifai(request: httpx.Request) -> httpx.Response:
+        inputs = json.loads(request.content)['inputs']
+        clarifai_requests.append(inputs)
+        # Answer out of order to check results are matched by input id
+        return httpx.Response(200, json={'outputs': [
+            {'input': {'id': item['id']},
+             'data': {'concepts': [{'name': foods[int(item['id'])], 'value': 0.9}]}}
+            for item in reversed(inputs)
+        ]})
+
+    async def fake_record_scan(user_id, scans, coins=1, description=None):
+        records.append((user_id, scans, coins))
+        return {'scans': scans, 'transaction': {'id': 1}, 'new_balance': 10 + coins}
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(get_repository(), 'record_scan', fake_record_scan)
+    monkeypatch.setattr(
+        recognition_cache, '_recognition_cache',
+        recognition_cache.RecognitionCache(path=str(tmp_path / 'cache.db'))
+    )
+    monkeypatch.setattr(perceptual_index, '_perceptual_index', perceptual_index.PerceptualIndex())
+    monkeypatch.setattr(
+        ai_recognition, '_http_client', httpx.AsyncClient(transport=httpx.MockTransport(clarifai))
+    )
+
+    files = [
+        ('files', ('a.jpg', _make_jpeg((200, 60, 40)), 'image/jpeg')),
+        ('files', ('notes.txt', b'not an image', 'text/plain')),
+        ('files', ('b.jpg', _make_jpeg((90, 150, 70)), 'image/jpeg')),
+        ('files', ('c.jpg', _make_jpeg((150, 95, 60)), 'image/jpeg')),
+    ]
+    with TestClient(app) as client:
+        response = client.post('/api/scan/analyze-batch?user_id=7', files=files)
+
+    assert response.status_code == 200
+    body = response.json()
+    results = body['results']
+    assert [r['index'] for r in results] == [0, 1, 2, 3]
+    assert [r['success'] for r in results] == [True, False, True, True]
+    assert results[1]['error'] == 'File must be an image'
+    assert [r['name'] for r in results if r['success']] == ['Pizza', 'Salad', 'Burger']
+
+    assert len(clarifai_requests) == 1
+    assert len(clarifai_requests[0]) == 3
+    assert len(records) == 1
+    user_id, rows, coins = records[0]
+    assert user_id == 7 and coins == 3
+    assert [row['food_name'] for row in rows] == ['Pizza', 'Salad', 'Burger']
+    assert body['coins_earned'] == 3
+    assert body['total_coins'] == 13
+
+def test_batch_size_is_limited():
+    files = [('files', (f'{i}.jpg', b'x', 'image/jpeg')) for i in range(scan.MAX_BATCH_IMAGES + 1)]
+    response = TestClient(app).post('/api/scan/analyze-batch', files=files)
+    assert response.status_code == 400
+
+def test_one_failing_image_does_not_fail_the_batch(monkeypatch, tmp_path):
+    broken, unstorable = _make_jpeg((10, 10, 10)), _make_jpeg((250, 250, 250))
+    prepare_image, store_content = scan.prepare_image, scan.store_content
+
+    def flaky_prepare(content):
+        if content == broken:
+            raise MemoryError('too large')
+        return prepare_image(content)
+
+    def flaky_store(content, digest=None):
+        if digest == prepare_image(unstorable).sha256:
+            raise OSError('disk full')
+        return store_content(content, digest)
+
+    async def failed_record_scan(user_id, scans, coins=1, description=None):
+        return None
+
+    def clarifai(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={'outputs': [
+            {'input': {'id': item['id']}, 'data': {'concepts': [{'name': 'pizza', 'value': 0.9}]}}
+            for item in json.loads(request.content)['inputs']
+        ]})
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(scan, 'prepare_image', flaky_prepare)
+    monkeypatch.setattr(scan, 'store_content', flaky_store)
+    monkeypatch.setattr(get_repository(), 'record_scan', failed_record_scan)
+    monkeypatch.setattr(
+        recognition_cache, '_recognition_cache',
+        recognition_cache.RecognitionCache(path=str(tmp_path / 'cache.db'))
+    )
+    monkeypatch.setattr(perceptual_index, '_perceptual_index', perceptual_index.PerceptualIndex())
+    monkeypatch.setattr(
+        ai_recognition, '_http_client', httpx.AsyncClient(transport=httpx.MockTransport(clarifai))
+    )
+
+    files = [
+        ('files', ('a.jpg', broken, 'image/jpeg')),
+        ('files', ('b.jpg', _make_jpeg((200, 60, 40)), 'image/jpeg')),
+        ('files', ('c.jpg', unstorable, 'image/jpeg')),
+    ]
+    with TestClient(app) as client:
+        response = client.post('/api/scan/analyze-batch?user_id=7', files=files)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [r['success'] for r in body['results']] == [False, True, False]
+    assert body['results'][0]['error'] == 'Image could not be processed'
+    assert body['results'][2]['error'] == 'Image could not be stored'
+    # Nothing was saved, so nothing was earned
+    assert body['coins_earned'] == 0 and body['total_coins'] is None
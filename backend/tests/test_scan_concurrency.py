@@ -0,0 +1,91 @@
+import asyncio
+import io
+import json
+import time
+
+import httpx
+from PIL import Image
+
+from backend.main import app
+from backend.services import ai_recognition, local_database, perceptual_index, recognition_cache
+
+CLARIFAI_LATENCY = 0.5
+DATABASE_LATENCY = 0.25
+IN_FLIGHT_SCANS = 50
+# Allowed p99 drift for /health; one blocked database call alone exceeds it
+LATENCY_BUDGET = 0.1
+
+def _make_jpeg() -> bytes:
+    output = io.BytesIO()
+    Image.new('RGB', (640, 480), (200, 60, 40)).save(output, format='JPEG')
+    return output.getvalue()
+
+async def _slow_clarifai(request: httpx.Request) -> httpx.Response:
+    await asyncio.sleep(CLARIFAI_LATENCY)
+    inputs = json.loads(request.content)['inputs']
+    return httpx.Response(200, json={'outputs': [
+        {'input': {'id': item['id']}, 'data': {'concepts': [{'name': 'pizza', 'value': 0.93}]}}
+        for item in inputs
+    ]})
+
+def _blocking_record_scan(user_id, scans, **kwargs):
+    # A local database write blocks its calling thread
+    time.sleep(DATABASE_LATENCY)
+    return {'scans': scans, 'transaction': {'id': 1}, 'new_balance': 42}
+
+def _p99(samples):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+
+async def _measure_health(client: httpx.AsyncClient, samples: list):
+    start = time.perf_counter()
+    response = await client.get('/health')
+    samples.append(time.perf_counter() - start)
+    assert response.status_code == 200
+
+async def _run_load_test():
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+        # Baseline: /health with nothing else in flight
+        idle = []
+        for _ in range(50):
+            await _measure_health(client, idle)
+
+        image = _make_jpeg()
+        scans = asyncio.gather(*[
+            client.post('/api/scan/analyze', files={'file': (f'plate_{i}.jpg', image, 'image/jpeg')})
+            for i in range(IN_FLIGHT_SCANS)
+        ])
+
+        loaded = []
+        scan_task = asyncio.ensure_future(scans)
+        while not scan_task.done():
+            await _measure_health(client, loaded)
+            await asyncio.sleep(0.005)
+        responses = await scan_task
+
+    return idle, loaded, responses
+
+def test_health_latency_flat_while_scans_in_flight(monkeypatch, tmp_path, local_repository):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(
+        recognition_cache, '_recognition_cache',
+        recognition_cache.RecognitionCache(path=str(tmp_path / 'cache.db'))
+    )
+    monkeypatch.setattr(perceptual_index, '_perceptual_index', perceptual_index.PerceptualIndex())
+    monkeypatch.setattr(local_database, 'record_scan', _blocking_record_scan)
+    monkeypatch.setattr(
+        ai_recognition, '_http_client',
+        httpx.AsyncClient(transport=httpx.MockTransport(_slow_clarifai))
+    )
+
+    idle, loaded, responses = asyncio.run(_run_load_test())
+    monkeypatch.setattr(ai_recognition, '_http_client', None)
+
+    assert all(r.status_code == 200 for r in responses)
+    assert all(r.json()['name'] == 'Pizza' for r in responses)
+    assert len(loaded) >= 10
+
+    # If any stage of the scan blocked the loop, /health would queue behind
+    # it for at least one simulated round trip.
+    assert _p99(loaded) < _p99(idle) + LATENCY_BUDGET
@@ -0,0 +1,223 @@
+import asyncio
+import io
+import json
+import sqlite3
+import time
+
+import httpx
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from backend.main import app
+from backend.routers import scan
+from backend.services import ai_recognition, perceptual_index, recognition_cache, scan_jobs, storage
+from backend.services.repository import get_repository
+from backend.services.scan_jobs import ScanJobQueue, DONE, FAILED, PROCESSING, QUEUED
+from backend.services.storage import InMemoryObjectStorage
+
+def _make_jpeg() -> bytes:
+    output = io.BytesIO()
+    Image.new('RGB', (320, 240), (200, 60, 40)).save(output, format='JPEG')
+    return output.getvalue()
+
+def test_jobs_survive_a_restart_and_retry_until_max_attempts(tmp_path):
+    path = str(tmp_path / 'jobs.db')
+    queue = ScanJobQueue(path=path, lease_seconds=0, max_attempts=2)
+    queue.enqueue('a', 1, 'incoming/a')
+    queue.enqueue('b', 1, 'incoming/b')
+    claimed = queue.claim()
+    assert claimed['id'] == 'a' and claimed['status'] == PROCESSING
+    queue.close()
+
+    # The worker died holding 'a'; after a restart its lease has run out
+    restarted = ScanJobQueue(path=path, lease_seconds=60, max_attempts=2)
+    reclaimed = restarted.claim()
+    assert reclaimed['id'] == 'a' and reclaimed['attempts'] == 2
+    assert restarted.claim()['id'] == 'b'
+    assert restarted.claim() is None
+
+    restarted.complete('a', {'name': 'Pizza'})
+    assert restarted.get('a')['status'] == DONE
+    assert restarted.get('a')['result'] == {'name': 'Pizza'}
+    # 'b' has one attempt left, then gives up
+    assert restarted.fail('b', 'boom') == QUEUED
+    assert restarted.claim()['id'] == 'b'
+    assert restarted.fail('b', 'boom') == FAILED
+    assert restarted.stats() == {QUEUED: 0, PROCESSING: 0, DONE: 1, FAILED: 1}
+
+def test_async_scan_returns_202_and_result_by_polling_and_sse(monkeypatch, tmp_path):
+    object_store = InMemoryObjectStorage()
+    saved = []
+
+    def clarifai(request: httpx.Request) -> httpx.Response:
+        inputs = json.loads(request.content)['inputs']
+        return httpx.Response(200, json={'outputs': [
+            {'input': {'id': item['id']}, 'data': {'concepts': [{'name': 'pizza', 'value': 0.93}]}}
+            for item in inputs
+        ]})
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(storage, '_storage', object_store)
+    monkeypatch.setattr(scan_jobs, '_scan_job_queue', ScanJobQueue(path=str(tmp_path / 'jobs.db')))
+    async def fake_record_scan(user_id, scans, **kwargs):
+        saved.append(user_id)
+        return {'new_balance': 5}
+
+    monkeypatch.setattr(get_repository(), 'record_scan', fake_record_scan)
+    monkeypatch.setattr(
+        recognition_cache, '_recognition_cache',
+        recognition_cache.RecognitionCache(path=str(tmp_path / 'cache.db'))
+    )
+    monkeypatch.setattr(perceptual_index, '_perceptual_index', perceptual_index.PerceptualIndex())
+    monkeypatch.setattr(
+        ai_recognition, '_http_client', httpx.AsyncClient(transport=httpx.MockTransport(clarifai))
+    )
+
+    with TestClient(app) as client:
+        response = client.post(
+            '/api/scan/analyze?mode=async&user_id=3', files={'file': ('lunch.jpg', _make_jpeg(), 'image/jpeg')}
+        )
+        assert response.status_code == 202
+        job = response.json()
+        assert job['status'] == QUEUED
+        assert response.headers['location'] == job['status_url']
+
+        deadline = time.time() + 5
+        while client.get(job['status_url']).json()['status'] != DONE:
+            assert time.time() < deadline
+            time.sleep(0.02)
+        polled = client.get(job['status_url']).json()
+        assert polled['result']['name'] == 'Pizza'
+        assert polled['result']['total_coins'] == 5
+
+        with client.stream('GET', job['events_url']) as stream:
+            body = ''.join(stream.iter_text())
+        assert body.startswith('event: done\n')
+        assert json.loads(body.split('data: ', 1)[1])['result']['name'] == 'Pizza'
+
+        assert client.get('/api/scan/jobs/unknown').status_code == 404
+        assert client.post('/api/scan/analyze?mode=later', files={'file': ('a.jpg', b'x', 'image/jpeg')}).status_code == 400
+
+    assert saved == [3]
+    # Only the stored scan image remains; the queued upload was removed
+    assert [key for key in object_store._objects if key.startswith('incoming/')] == []
+
+def test_leases_are_renewed_and_finished_jobs_pruned(tmp_path):
+    queue = ScanJobQueue(path=str(tmp_path / 'jobs.db'), lease_seconds=60, max_attempts=1)
+    for job_id in ('a', 'b', 'c'):
+        queue.enqueue(job_id, 1, f'incoming/{job_id}')
+    queue.claim()
+    assert queue.renew('a')
+    assert not queue.renew('b')  # only jobs being processed have a lease
+
+    queue.complete('a', {'name': 'Pizza'})
+    queue.claim()
+    assert queue.fail('b', 'boom') == FAILED
+    assert not queue.renew('a')
+
+    assert queue.prune(time.time() - 60) == []
+    assert sorted(queue.prune(time.time() + 1)) == ['incoming/a', 'incoming/b']
+    assert queue.get('a') is None and queue.get('c')['status'] == QUEUED
+    assert queue.stats() == {QUEUED: 1, PROCESSING: 0, DONE: 0, FAILED: 0}
+
+def _run_jobs(processor, contents, user_id):
+    """Submit uploads to the workers and wait until every job is finished"""
+    async def run():
+        scan_jobs.start_scan_workers(processor, workers=1)
+        try:
+            jobs = [await scan_jobs.submit_scan_job(content, user_id) for content in contents]
+            deadline = time.time() + 5
+            while any(scan_jobs.get_scan_job_queue().get(job['id'])['status'] not in scan_jobs.FINISHED
+                      for job in jobs):
+                assert time.time() < deadline
+                await asyncio.sleep(0.02)
+            return [scan_jobs.get_scan_job_queue().get(job['id']) for job in jobs]
+        finally:
+            await scan_jobs.stop_scan_workers()
+            await ai_recognition.close_http_client()
+    return asyncio.run(run())
+
+def test_a_retried_job_saves_and_rewards_once(monkeypatch, tmp_path, local_repository):
+    object_store = InMemoryObjectStorage()
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(storage, '_storage', object_store)
+    monkeypatch.setattr(scan_jobs, '_scan_job_queue', ScanJobQueue(path=str(tmp_path / 'jobs.db')))
+    monkeypatch.setattr(
+        recognition_cache, '_recognition_cache',
+        recognition_cache.RecognitionCache(path=str(tmp_path / 'cache.db'))
+    )
+    monkeypatch.setattr(perceptual_index, '_perceptual_index', perceptual_index.PerceptualIndex())
+    monkeypatch.setattr(ai_recognition, '_http_client', httpx.AsyncClient(
+        transport=httpx.MockTransport(lambda request: httpx.Response(503))
+    ))
+    user = asyncio.run(local_repository.create_user('+15550000031'))
+    runs = []
+
+    async def crash_after_saving(job):
+        # The scan is saved, then the worker dies before completing the job
+        result = await scan.run_scan_job(job)
+        runs.append(result['total_coins'])
+        if len(runs) == 1:
+            raise RuntimeError('worker died')
+        return result
+
+    [job] = _run_jobs(crash_after_saving, [_make_jpeg()], user['id'])
+
+    assert job['status'] == DONE and job['attempts'] == 2
+    assert runs == [1, 1]
+
+    async def saved():
+        return (await local_repository.get_user_by_id(user['id']))['coins'], await local_repository.get_recent_scans(user['id'])
+
+    coins, scans = asyncio.run(saved())
+    assert coins == 1 and len(scans) == 1
+    assert not [key for key in object_store._objects if key.startswith('incoming/')]
+
+def test_failed_jobs_leave_no_upload_behind(monkeypatch, tmp_path):
+    object_store = InMemoryObjectStorage()
+    monkeypatch.setattr(storage, '_storage', object_store)
+    monkeypatch.setattr(scan_jobs, '_scan_job_queue', ScanJobQueue(path=str(tmp_path / 'jobs.db'), max_attempts=2))
+
+    async def broken(job):
+        raise RuntimeError('recognition down')
+
+    [job] = _run_jobs(broken, [_make_jpeg()], 3)
+
+    assert job['status'] == FAILED and job['attempts'] == 2
+    assert object_store._objects == {}
+
+class _FlakyQueue(ScanJobQueue):
+    """Queue whose first claim and first complete hit a locked database"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.errors = {'claim', 'complete'}
+
+    def _maybe_fail(self, operation):
+        if operation in self.errors:
+            self.errors.discard(operation)
+            raise sqlite3.OperationalError('database is locked')
+
+    def claim(self):
+        self._maybe_fail('claim')
+        return super().claim()
+
+    def complete(self, job_id, result):
+        self._maybe_fail('complete')
+        return super().complete(job_id, result)
+
+def test_workers_survive_queue_errors(monkeypatch, tmp_path):
+    monkeypatch.setattr(storage, '_storage', InMemoryObjectStorage())
+    monkeypatch.setattr(scan_jobs, 'SCAN_JOB_POLL_SECONDS', 0.01)
+    monkeypatch.setattr(scan_jobs, '_scan_job_queue', _FlakyQueue(path=str(tmp_path / 'jobs.db'), lease_seconds=0.2))
+    processed = []
+
+    async def processor(job):
+        processed.append(job['id'])
+        return {'name': 'Pizza'}
+
+    [job] = _run_jobs(processor, [_make_jpeg()], 5)
+
+    # The unrecorded result was processed again once its lease ran out
+    assert job['status'] == DONE and job['result'] == {'name': 'Pizza'}
+    assert processed == [job['id'], job['id']]
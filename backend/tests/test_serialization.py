@@ -0,0 +1,43 @@
+import datetime
+import json
+import uuid
+from types import MappingProxyType
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.services.repository import get_repository
+from backend.services.serialization import FastJSONResponse, dumps, raw_json
+
+def test_raw_fragments_are_embedded_verbatim():
+    stored = '{"calories": 285, "ingredients": ["Dough", "Cheese"]}'
+    body = FastJSONResponse({'scan': 1, 'nutrition_data': raw_json(stored)}).body
+    assert body == b'{"scan":1,"nutrition_data":{"calories": 285, "ingredients": ["Dough", "Cheese"]}}'
+
+def test_dumps_handles_app_types():
+    value = {
+        1: MappingProxyType({'calories': 95}),
+        'when': datetime.datetime(2025, 1, 1, 12, 0),
+        'id': uuid.UUID(int=1),
+        'score': np.float32(0.5),
+        'tags': ('a', 'b'),
+    }
+    assert json.loads(dumps(value)) == {
+        '1': {'calories': 95}, 'when': '2025-01-01T12:00:00',
+        'id': '00000000-0000-0000-0000-000000000001', 'score': 0.5, 'tags': ['a', 'b'],
+    }
+
+def test_admin_users_rendered_with_orjson(monkeypatch):
+    users = [{'id': 1, 'name': 'Ada', 'coins': 5, 'created_at': '2025-01-01T00:00:00+00:00'}]
+    async def get_all_users():
+        return users
+
+    monkeypatch.setattr(get_repository(), 'get_all_users', get_all_users)
+    with TestClient(app) as client:
+        response = client.get('/api/admin/users')
+        assert response.status_code == 200
+        assert response.headers['content-type'] == 'application/json'
+        assert response.content == dumps(users)
+        # Endpoints returning plain dicts go through the orjson default class too
+        assert client.get('/health').content == b'{"status":"healthy"}'
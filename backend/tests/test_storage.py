@@ -0,0 +1,123 @@
+import hashlib
+import io
+import os
+import threading
+
+import httpx
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from backend.main import app
+from backend.services import ai_recognition, perceptual_index, recognition_cache, storage
+from backend.services.repository import get_repository
+from backend.services.storage import InMemoryObjectStorage, LocalFileStorage, resolve_key
+
+def _make_jpeg(color=(200, 60, 40)) -> bytes:
+    output = io.BytesIO()
+    Image.new('RGB', (64, 64), color).save(output, format='JPEG')
+    return output.getvalue()
+
+def test_local_store_is_sharded_atomic_and_deduplicated(monkeypatch, tmp_path):
+    monkeypatch.setattr(storage, '_storage', LocalFileStorage(str(tmp_path)))
+    data = _make_jpeg()
+    digest = hashlib.sha256(data).hexdigest()
+    synced = []
+    fsync = os.fsync
+
+    def recording_fsync(fd):
+        synced.append(os.fstat(fd).st_size)
+        fsync(fd)
+
+    monkeypatch.setattr(os, 'fsync', recording_fsync)
+
+    first = storage.store_content(data)
+    second = storage.store_content(data)
+    # The new object was flushed to disk in full, once
+    assert synced == [len(data)]
+
+    assert first.key == f"{digest[:2]}/{digest[2:4]}/{digest}.jpg"
+    assert first.url == f"/static/{first.key}"
+    assert first.created and not second.created
+    shard = tmp_path / digest[:2] / digest[2:4]
+    # Exactly one object and no temp files left behind
+    assert os.listdir(shard) == [f"{digest}.jpg"]
+    assert (shard / f"{digest}.jpg").read_bytes() == data
+
+def test_resolve_key_accepts_basenames_only_for_content_names():
+    digest = 'ab' * 32
+    key = f"ab/ab/{digest}.jpg"
+    assert resolve_key(key) == key
+    assert resolve_key(f"{digest}.jpg") == key
+    assert resolve_key('pizza.jpg') is None
+    assert resolve_key(f"../{digest}.jpg") is None
+
+def test_scan_stores_image_and_static_serves_it(monkeypatch, tmp_path):
+    object_store = InMemoryObjectStorage()
+    saved = []
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(storage, '_storage', object_store)
+    async def fake_record_scan(user_id, scans, **kwargs):
+        saved.extend(scans)
+        return {'new_balance': 1}
+
+    monkeypatch.setattr(get_repository(), 'record_scan', fake_record_scan)
+    monkeypatch.setattr(
+        recognition_cache, '_recognition_cache',
+        recognition_cache.RecognitionCache(path=str(tmp_path / 'cache.db'))
+    )
+    monkeypatch.setattr(perceptual_index, '_perceptual_index', perceptual_index.PerceptualIndex())
+    # Clarifai is down: the color fallback answers
+    monkeypatch.setattr(ai_recognition, '_http_client', httpx.AsyncClient(
+        transport=httpx.MockTransport(lambda request: httpx.Response(503))
+    ))
+
+    data = _make_jpeg()
+    with TestClient(app) as client:
+        for name in ('lunch.jpg', 'same-photo-again.jpg'):
+            response = client.post('/api/scan/analyze', files={'file': (name, data, 'image/jpeg')})
+            assert response.status_code == 200
+
+        image_path = saved[0]['image_path']
+        assert saved[1]['image_path'] == image_path
+        key = image_path[len('/static/'):]
+        assert object_store.get(key) == data
+
+        # Served by full key and by the bare file name older clients build
+        for url in (image_path, '/static/' + image_path.split('/')[-1]):
+            served = client.get(url)
+            assert served.status_code == 200
+            assert served.content == data
+            assert served.headers['content-type'] == 'image/jpeg'
+            assert 'immutable' in served.headers['cache-control']
+
+        assert client.get('/static/../main.py').status_code == 404
+        metrics = client.get('/api/scan/metrics').json()['storage']
+        assert metrics['writes'] >= 1 and metrics['deduplicated'] >= 1
+        assert metrics['backend'] == 'InMemoryObjectStorage'
+
+def test_profile_image_is_stored_off_the_event_loop(monkeypatch):
+    threads = []
+
+    class RecordingStorage(InMemoryObjectStorage):
+        def put(self, key, data):
+            threads.append(threading.current_thread().name)
+            return super().put(key, data)
+
+    async def fake_get_users(user_ids):
+        return [{'id': user_id} for user_id in user_ids]
+
+    async def fake_update(user_id, profile_image=None, **kwargs):
+        return {'id': user_id, 'profile_image': profile_image}
+
+    object_store = RecordingStorage()
+    monkeypatch.setattr(storage, '_storage', object_store)
+    monkeypatch.setattr(get_repository(), 'get_users_by_ids', fake_get_users)
+    monkeypatch.setattr(get_repository(), 'update_user_profile', fake_update)
+
+    data = _make_jpeg()
+    with TestClient(app) as client:
+        response = client.post('/api/profile/upload-image?user_id=5', files={'file': ('me.jpg', data, 'image/jpeg')})
+
+    assert response.status_code == 200
+    assert object_store.get(response.json()['profile_image'][len('/static/'):]) == data
+    assert len(threads) == 1 and threads[0].startswith('foodid-io')
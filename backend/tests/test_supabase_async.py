@@ -0,0 +1,96 @@
+import asyncio
+import json
+
+import httpx
+from fastapi.testclient import TestClient
+from postgrest import AsyncPostgrestClient
+
+from backend.main import app
+from backend.services import supabase_async
+
+def _postgrest(handler) -> AsyncPostgrestClient:
+    """Async client talking to an in-process PostgREST stand-in"""
+    return AsyncPostgrestClient(
+        'http://postgrest.test/rest/v1',
+        headers={'apikey': 'test-key', 'Authorization': 'Bearer test-key'},
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+
+def test_data_functions_query_postgrest_without_blocking(monkeypatch):
+    requests = []
+    users = {1: {'id': 1, 'phone_number': '+911234567890', 'coins': 5}}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        assert request.headers['apikey'] == 'test-key'
+        if request.url.path == '/rest/v1/rpc/append_coin_transaction':
+            users[1]['coins'] += json.loads(request.content)['p_amount']
+            return httpx.Response(200, json={'transaction': {'id': 9}, 'new_balance': users[1]['coins']})
+        if request.method == 'HEAD':
+            return httpx.Response(200, headers={'content-range': '*/42'})
+        if request.headers['accept'] == 'application/vnd.pgrst.object+json':
+            # .single() asks for one object instead of a list
+            return httpx.Response(200, json=users[1])
+        return httpx.Response(200, json=[users[1]])
+
+    monkeypatch.setattr(supabase_async, '_async_supabase', _postgrest(handler))
+
+    async def run():
+        user = await supabase_async.get_user_by_id(1)
+        updated = await supabase_async.update_user_coins(1, 3)
+        stats = await supabase_async.get_dashboard_stats()
+        await supabase_async.close_async_supabase()
+        return user, updated, stats
+
+    user, updated, stats = asyncio.run(run())
+    assert user['phone_number'] == '+911234567890'
+    assert updated['coins'] == 8
+    assert stats == {'total_users': 42, 'total_scans': 42, 'total_coins': 8}
+    assert [r.method for r in requests[:2]] == ['GET', 'POST']
+    assert str(requests[1].url) == 'http://postgrest.test/rest/v1/rpc/append_coin_transaction'
+    assert supabase_async._async_supabase is None
+
+def test_errors_keep_the_sync_return_values(monkeypatch):
+    def handler(request: httpx.Request) -> httpx.Response:
+        raise httpx.ConnectError('PostgREST is down')
+
+    monkeypatch.setattr(supabase_async, '_async_supabase', _postgrest(handler))
+
+    async def run():
+        return (await supabase_async.get_user_by_id(1), await supabase_async.get_all_scans(),
+                await supabase_async.mark_notification_read(7))
+
+    assert asyncio.run(run()) == (None, [], False)
+
+def test_endpoints_await_the_shared_client_until_shutdown(monkeypatch):
+    paths = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        paths.append(request.url.path)
+        row = {'id': 3, 'coins': 12}
+        if request.headers.get('accept') == 'application/vnd.pgrst.object+json':
+            return httpx.Response(200, json=row)
+        # Batched lookups (id=in.(...)) get a list of rows
+        return httpx.Response(200, json=[row])
+
+    client = _postgrest(handler)
+    monkeypatch.setattr(supabase_async, '_async_supabase', client)
+
+    with TestClient(app) as test_client:
+        response = test_client.get('/api/coins/3/balance')
+        assert response.json() == {'user_id': 3, 'balance': 12}
+        assert test_client.get('/api/profile/3').json()['coins'] == 12
+        assert supabase_async.get_async_supabase() is client
+
+    assert paths == ['/rest/v1/users', '/rest/v1/users']
+    # The lifespan closed the pooled connections
+    assert supabase_async._async_supabase is None
+    assert client.session.is_closed
+
+def test_shared_client_is_pooled_with_keep_alive():
+    http_client = supabase_async._create_http_client()
+    pool = http_client._transport._pool
+    assert pool._max_connections == supabase_async.SUPABASE_POOL_CONNECTIONS
+    assert pool._max_keepalive_connections == supabase_async.SUPABASE_POOL_CONNECTIONS
+    assert pool._http2 == supabase_async.SUPABASE_HTTP2
+    asyncio.run(http_client.aclose())
@@ -0,0 +1,84 @@
+import asyncio
+import hashlib
+import io
+import struct
+import zlib
+
+import pytest
+from fastapi import FastAPI, File, HTTPException, UploadFile
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from backend.services.uploads import UploadSizeLimitMiddleware, ingest_upload
+
+def _jpeg(size=(320, 240)) -> bytes:
+    output = io.BytesIO()
+    Image.new('RGB', size, (120, 80, 40)).save(output, format='JPEG')
+    return output.getvalue()
+
+def _ingest(content: bytes, **kwargs):
+    upload = UploadFile(file=io.BytesIO(content), filename='plate.jpg')
+    return asyncio.run(ingest_upload(upload, **kwargs))
+
+def test_ingest_hashes_and_reads_header():
+    content = _jpeg()
+    ingested = _ingest(content)
+    assert ingested.content == content
+    assert ingested.sha256 == hashlib.sha256(content).hexdigest()
+    assert (ingested.width, ingested.height, ingested.format) == (320, 240, 'JPEG')
+
+def test_ingest_rejects_oversized_files():
+    with pytest.raises(HTTPException) as exc:
+        _ingest(b'x' * 200_000, max_bytes=100_000)
+    assert exc.value.status_code == 413
+
+def test_ingest_rejects_too_many_pixels_from_header():
+    with pytest.raises(HTTPException) as exc:
+        _ingest(_jpeg((400, 300)), max_pixels=100_000)
+    assert exc.value.status_code == 413
+
+def _png_chunk(kind: bytes, data: bytes = b'') -> bytes:
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+def _png_header(width: int, height: int) -> bytes:
+    # Header chunks only: enough for PIL to read the dimensions
+    ihdr = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return b'\x89PNG\r\n\x1a\n' + _png_chunk(b'IHDR', ihdr) + _png_chunk(b'IEND')
+
+def test_ingest_rejects_headers_past_pil_bomb_limit():
+    # 225 MP is over twice Image.MAX_IMAGE_PIXELS, where PIL refuses to even open it
+    assert 15000 * 15000 > 2 * Image.MAX_IMAGE_PIXELS
+    for content in (_png_header(15000, 15000), _png_header(15000, 15000) + b'\0' * 100_000):
+        with pytest.raises(HTTPException) as exc:
+            _ingest(content)
+        assert exc.value.status_code == 413
+
+def test_ingest_require_image():
+    with pytest.raises(HTTPException) as exc:
+        _ingest(b'not an image', require_image=True)
+    assert exc.value.status_code == 400
+    assert _ingest(b'not an image').width is None
+
+def _limited_app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(UploadSizeLimitMiddleware, max_bytes=10_000)
+
+    @app.post('/upload')
+    async def upload(file: UploadFile = File(...)):
+        return {'size': len(await file.read())}
+
+    return app
+
+def test_middleware_limits_request_body():
+    client = TestClient(_limited_app())
+    small = client.post('/upload', files={'file': ('a.bin', b'x' * 1000)})
+    assert small.json() == {'size': 1000}
+
+    # Rejected from Content-Length before the body is read
+    large = client.post('/upload', files={'file': ('a.bin', b'x' * 50_000)})
+    assert large.status_code == 413
+
+    # Chunked body without Content-Length: cut off while streaming
+    chunks = iter([b'--b\r\nContent-Disposition: form-data; name="file"; filename="a"\r\n\r\n'] + [b'x' * 4096] * 8)
+    streamed = client.post('/upload', content=chunks, headers={'content-type': 'multipart/form-data; boundary=b'})
+    assert streamed.status_code == 413
@@ -0,0 +1,152 @@
+import asyncio
+import io
+import json
+
+import httpx
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from backend.main import app
+from backend.services import ai_recognition, perceptual_index, recognition_cache, storage, write_behind
+from backend.services.repository import get_repository
+from backend.services.storage import InMemoryObjectStorage
+from backend.services.write_behind import FlushError, WriteBehindBuffer
+
+def test_flushes_full_batches_then_on_interval_and_on_close():
+    async def run():
+        flushed = []
+
+        async def flush(rows):
+            flushed.append(list(rows))
+
+        buffer = WriteBehindBuffer(flush, max_batch=100, flush_interval=0.05, max_buffered=1000)
+        for i in range(250):
+            await buffer.enqueue(i)
+        await asyncio.sleep(0.2)
+        assert [len(rows) for rows in flushed] == [100, 100, 50]
+
+        # A lone row goes out once its flush window ends
+        await buffer.enqueue('late')
+        await asyncio.sleep(0.01)
+        assert len(flushed) == 3
+        await asyncio.sleep(0.1)
+        assert flushed[3] == ['late']
+
+        # Closing writes whatever is left without waiting for the window
+        buffer.flush_interval = 60
+        await buffer.enqueue('last')
+        await buffer.close()
+        assert flushed[4] == ['last']
+        return buffer.stats()
+
+    stats = asyncio.run(run())
+    assert stats['rows_written'] == 252 and stats['flushes'] == 5
+    assert stats['buffered'] == 0 and stats['max_batch'] == 100
+    assert 0 < stats['avg_flush_latency_ms'] < 1000
+
+def test_full_buffer_applies_backpressure():
+    async def run():
+        flushed = []
+
+        async def slow_flush(rows):
+            await asyncio.sleep(0.02)
+            flushed.extend(rows)
+
+        buffer = WriteBehindBuffer(slow_flush, max_batch=10, flush_interval=0.001, max_buffered=20)
+        for i in range(100):
+            await buffer.enqueue(i)
+            assert buffer.stats()['buffered'] <= 20
+        await buffer.close()
+        return flushed, buffer.stats()
+
+    flushed, stats = asyncio.run(run())
+    assert flushed == list(range(100))
+    assert stats['backpressure_waits'] > 0
+
+def test_failed_rows_are_retried_at_the_head_of_the_buffer():
+    async def run():
+        flushed = []
+        attempts = []
+
+        async def flaky_flush(rows):
+            attempts.append(list(rows))
+            if len(attempts) == 1:
+                raise ConnectionError('database unavailable')
+            # 'bad' never saves; the rest of its batch does
+            if 'bad' in rows:
+                flushed.extend(row for row in rows if row != 'bad')
+                raise FlushError(['bad'])
+            flushed.extend(rows)
+
+        buffer = WriteBehindBuffer(flaky_flush, max_batch=3, flush_interval=0.001, max_buffered=10,
+                                   retries=2, retry_delay=0.01)
+        for row in ['a', 'bad', 'c', 'd']:
+            await buffer.enqueue(row)
+        await buffer.close()
+        return flushed, attempts, buffer.stats()
+
+    flushed, attempts, stats = asyncio.run(run())
+    # The failed batch was retried first, then only its unsaved row, which
+    # is dropped once its retries run out
+    assert attempts == [['a', 'bad', 'c'], ['a', 'bad', 'c'], ['bad', 'd']]
+    assert flushed == ['a', 'c', 'd']
+    assert stats['rows_written'] == 3 and stats['buffered'] == 0
+    assert stats['retried_rows'] == 4 and stats['failed_rows'] == 1
+
+def _make_jpeg(color) -> bytes:
+    output = io.BytesIO()
+    Image.new('RGB', (320, 240), color).save(output, format='JPEG')
+    return output.getvalue()
+
+def test_write_behind_scans_are_written_in_bulk_by_shutdown(monkeypatch, tmp_path):
+    batches = []
+    single_writes = []
+
+    def clarifai(request: httpx.Request) -> httpx.Response:
+        inputs = json.loads(request.content)['inputs']
+        return httpx.Response(200, json={'outputs': [
+            {'input': {'id': item['id']}, 'data': {'concepts': [{'name': 'pizza', 'value': 0.93}]}}
+            for item in inputs
+        ]})
+
+    async def fake_record_scan_batch(entries):
+        batches.append(entries)
+        # The first bulk write fails; its entries are retried one by one
+        return None if len(batches) == 1 else {'balances': {}}
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(write_behind, 'SCAN_WRITE_MODE', 'write-behind')
+    async def fake_record_scan(user_id, scans, **kwargs):
+        single_writes.append(user_id)
+        return {}
+
+    monkeypatch.setattr(get_repository(), 'record_scan_batch', fake_record_scan_batch)
+    monkeypatch.setattr(get_repository(), 'record_scan', fake_record_scan)
+    monkeypatch.setattr(storage, '_storage', InMemoryObjectStorage())
+    monkeypatch.setattr(
+        recognition_cache, '_recognition_cache',
+        recognition_cache.RecognitionCache(path=str(tmp_path / 'cache.db'))
+    )
+    monkeypatch.setattr(perceptual_index, '_perceptual_index', perceptual_index.PerceptualIndex())
+    monkeypatch.setattr(
+        ai_recognition, '_http_client', httpx.AsyncClient(transport=httpx.MockTransport(clarifai))
+    )
+
+    with TestClient(app) as client:
+        writer = write_behind.get_scan_writer()
+        writer.flush_interval = 60
+        for i in range(3):
+            response = client.post(f'/api/scan/analyze?user_id={i + 1}',
+                                   files={'file': (f'{i}.jpg', _make_jpeg((60 * i, 120, 40)), 'image/jpeg')})
+            assert response.status_code == 200
+            # Answered before the write; the new balance is not known yet
+            assert response.json()['total_coins'] is None
+        assert batches == []
+        assert client.get('/api/scan/metrics').json()['write_behind']['buffered'] == 3
+
+    # Shutdown flushed the buffer with one bulk call, then fell back per entry
+    assert len(batches) == 1
+    assert [entry['user_id'] for entry in batches[0]] == [1, 2, 3]
+    assert batches[0][0]['scans'][0]['food_name'] == 'Pizza'
+    assert single_writes == [1, 2, 3]
+    assert write_behind.get_scan_writer() is None
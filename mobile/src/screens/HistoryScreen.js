@@ -47,7 +47,7 @@ export const HistoryScreen = ({ navigation }) => {
             })}
         >
             <Image
-                source={{ uri: item.image_path ? (item.image_path.startsWith('http') ? item.image_path : `${API_URL}/static/${item.image_path.split('/').pop()}`) : 'https://via.placeholder.com/100' }}
+                source={{ uri: item.image_path ? (item.image_path.startsWith('http') ? item.image_path : `${API_URL}/static/${item.image_path.split('/').pop()}?w=256&fmt=webp`) : 'https://via.placeholder.com/100' }}
                 style={styles.foodImage}
             />
             <View style={styles.cardContent}>
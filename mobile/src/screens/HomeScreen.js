@@ -177,7 +177,7 @@ export const HomeScreen = ({ navigation }) => {
                                 >
                                     {/* Thumbnail Image */}
                                     <Image
-                                        source={{ uri: scan.image_path.startsWith('http') ? scan.image_path : `${API_URL}/static/${scan.image_path.split('/').pop()}` }}
+                                        source={{ uri: scan.image_path.startsWith('http') ? scan.image_path : `${API_URL}/static/${scan.image_path.split('/').pop()}?w=256&fmt=webp` }}
                                         style={styles.scanImage}
                                     />
                                     <View style={styles.scanInfo}>